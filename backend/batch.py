@@ -0,0 +1,321 @@
+"""
+Офлайн-прогін файлів сценаріїв через той самий конвеєр, що й /impact/batch.
+
+    python batch.py scenarios.csv --out results.csv
+    python batch.py scenarios.jsonl --out results.jsonl --workers 8 --chunk 20000
+    python batch.py scenarios.parquet --out results.csv --resume
+
+Вхід: CSV, JSON Lines або Parquet (потрібен pyarrow) з колонками lat, lon, size, speed, angle
+[, material, scenario, seed]. Вихід: CSV або JSON Lines (за розширенням --out) з плоскими
+колонками (airblast.heavy_damage.radius_km, casualties.total_deaths, ...), пишеться по шматках —
+пам'ять обмежена chunk × (workers × 2) рядків.
+Після кожного записаного шматка — контрольна точка <out>.checkpoint.json; --resume продовжує
+з неї (вихід обрізається до останнього підтвердженого шматка).
+Рядки без seed отримують seed = --seed + номер рядка, тож повторний прогін дає ті самі результати.
+"""
+import argparse
+import csv
+import io
+import json
+import multiprocessing
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from pydantic import ValidationError
+
+from models import ImpactRequest
+from constants import MATERIALS
+from compact import ZONE_TEXT_FIELDS
+from impact import SCENARIO_PHYSICS, simulate_impact_batch
+
+try:  # Parquet — опційно
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - залежить від середовища
+    pq = None
+
+BATCH_CHUNK = 10_000
+CHECKPOINT_VERSION = 1
+INPUT_COLUMNS = ("lat", "lon", "size", "speed", "angle", "material", "scenario", "seed")
+# Поля відповіді /impact, що не потрапляють у плоский результат (тексти, геометрія для мапи)
+SKIPPED_FIELDS = {"fun_fact", "layers", "material", "scenario"}
+_NUMBER_TYPES = (int, float)
+
+
+def flatten_result(result: Dict, prefix: str = "", out: Optional[Dict] = None) -> Dict:
+    """
+    Відповідь /impact -> плоский словник: вкладені словники через крапку, списки зон
+    (елементи з type) — за типом зони, лише числові поля; інші списки пропускаються
+    (strategic_risks — лише кількість).
+    """
+    out = {} if out is None else out
+    for key, value in result.items():
+        if not prefix and key in SKIPPED_FIELDS:
+            continue
+        name = prefix + key
+        if isinstance(value, dict):
+            flatten_result(value, name + ".", out)
+        elif isinstance(value, list):
+            if key == "strategic_risks":
+                out[name + ".count"] = len(value)
+            for zone in value:
+                if not isinstance(zone, dict) or "type" not in zone:
+                    break
+                zone_prefix = f"{name}.{zone['type']}."
+                for field, v in zone.items():
+                    if type(v) in _NUMBER_TYPES and field not in ZONE_TEXT_FIELDS:
+                        out[zone_prefix + field] = v
+        else:
+            out[name] = value
+    return out
+
+
+def result_columns() -> List[str]:
+    """
+    Колонки плоского результату — об'єднання по всіх сценаріях (пробний прогін),
+    щоб заголовок CSV не залежав від того, які сценарії трапились у файлі.
+    """
+    probes = [
+        ImpactRequest(lat=50.45, lon=30.52, size=300.0, speed=20.0, angle=45.0, scenario=s, seed=0)
+        for s in SCENARIO_PHYSICS
+    ]
+    columns: Dict[str, None] = {}
+    for result in simulate_impact_batch(probes):
+        columns.update(dict.fromkeys(flatten_result(result)))
+    return ["row", *INPUT_COLUMNS, "error", *columns]
+
+
+def read_rows(path: str, skip: int = 0) -> Iterator[Dict]:
+    """Рядки вхідного файлу як словники, починаючи з skip-го"""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".parquet":
+        if pq is None:
+            raise ValueError("Для Parquet потрібен pyarrow")
+        seen = 0
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=BATCH_CHUNK):
+            if seen + batch.num_rows <= skip:
+                seen += batch.num_rows
+                continue
+            rows = batch.to_pylist()
+            yield from rows[max(0, skip - seen):]
+            seen += batch.num_rows
+        return
+    with open(path, newline="", encoding="utf-8") as f:
+        if ext in (".jsonl", ".ndjson"):
+            rows = (json.loads(line) for line in f if line.strip())
+        elif ext == ".csv":
+            rows = csv.DictReader(f)
+        else:
+            raise ValueError(f"Невідомий формат входу: {ext} (csv, jsonl, parquet)")
+        for i, row in enumerate(rows):
+            if i >= skip:
+                yield row
+
+
+def chunked(rows: Iterator[Dict], size: int) -> Iterator[List[Dict]]:
+    chunk: List[Dict] = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _parse_row(row: Dict, index: int, seed_base: int) -> ImpactRequest:
+    # порожні клітинки CSV — відсутні значення (значення за замовчуванням ImpactRequest)
+    values = {k: row[k] for k in INPUT_COLUMNS if row.get(k) not in (None, "")}
+    values.setdefault("seed", seed_base + index)
+    req = ImpactRequest(**values)
+    if req.scenario not in SCENARIO_PHYSICS:
+        raise ValueError(f"Невідомий сценарій: {req.scenario}")
+    if req.material not in MATERIALS:
+        raise ValueError(f"Невідомий матеріал: {req.material}")
+    return req
+
+
+def run_chunk(rows: List[Dict], start: int, columns: List[str], fmt: str, seed_base: int) -> Tuple[bytes, int]:
+    """
+    Один шматок у процесі-воркері: розбір рядків, simulate_impact_batch і серіалізація.
+    Повертає (закодовані рядки виходу, кількість рядків з помилкою).
+    """
+    reqs: List[ImpactRequest] = []
+    flat: List[Dict] = []
+    for i, row in enumerate(rows):
+        try:
+            reqs.append(_parse_row(row, start + i, seed_base))
+            flat.append({})
+        except ValidationError as e:
+            flat.append({"error": "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())})
+        except (ValueError, TypeError) as e:
+            flat.append({"error": str(e)})
+    results = iter(simulate_impact_batch(reqs))
+    req_iter = iter(reqs)
+    errors = 0
+    for i, out in enumerate(flat):
+        out["row"] = start + i
+        if "error" in out:
+            errors += 1
+            out.update({k: rows[i].get(k) for k in INPUT_COLUMNS})
+            continue
+        req = next(req_iter)
+        out.update(req.model_dump())
+        flatten_result(next(results), out=out)
+
+    buf = io.StringIO()
+    if fmt == "csv":
+        writer = csv.DictWriter(buf, fieldnames=columns, extrasaction="ignore", lineterminator="\n")
+        writer.writerows(flat)
+    else:
+        for out in flat:
+            buf.write(json.dumps(out, ensure_ascii=False))
+            buf.write("\n")
+    return buf.getvalue().encode("utf-8"), errors
+
+
+def _checkpoint_path(out_path: str) -> str:
+    return out_path + ".checkpoint.json"
+
+
+def load_checkpoint(out_path: str, input_path: str, columns: List[str]) -> Dict:
+    with open(_checkpoint_path(out_path), encoding="utf-8") as f:
+        state = json.load(f)
+    if state.get("version") != CHECKPOINT_VERSION or state.get("input") != os.path.abspath(input_path):
+        raise ValueError("Контрольна точка від іншого входу або версії")
+    if state.get("columns") != columns:
+        raise ValueError("Колонки результату змінились — продовжити не можна, почни заново")
+    return state
+
+
+def save_checkpoint(out_path: str, state: Dict) -> None:
+    path = _checkpoint_path(out_path)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(tmp, path)
+
+
+def run(
+    input_path: str,
+    out_path: str,
+    chunk: int = BATCH_CHUNK,
+    workers: int = os.cpu_count() or 1,
+    resume: bool = False,
+    seed_base: int = 0,
+    progress_every_s: float = 5.0,
+) -> Dict:
+    """Прогін файлу; повертає підсумок {rows, errors, elapsed_s, rows_per_s}"""
+    fmt = "csv" if out_path.lower().endswith(".csv") else "jsonl"
+    columns = result_columns()
+    state = {
+        "version": CHECKPOINT_VERSION,
+        "input": os.path.abspath(input_path),
+        "columns": columns,
+        "rows_done": 0,
+        "errors": 0,
+        "output_bytes": 0,
+    }
+    if resume and os.path.exists(_checkpoint_path(out_path)):
+        state = load_checkpoint(out_path, input_path, columns)
+        out = open(out_path, "r+b")
+        # усе після останньої контрольної точки — незавершений шматок
+        out.truncate(state["output_bytes"])
+        out.seek(state["output_bytes"])
+        print(f"[batch] продовження з рядка {state['rows_done']}", file=sys.stderr)
+    else:
+        out = open(out_path, "wb")
+        if fmt == "csv":
+            out.write((",".join(columns) + "\n").encode("utf-8"))
+        state["output_bytes"] = out.tell()
+
+    pool = None
+    if workers > 1:
+        # spawn: як і в ImpactExecutor — без успадкованих потоків і стану
+        pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+    started = time.perf_counter()
+    done_here = 0
+    last_report = started
+    pending: deque = deque()
+
+    def write(result: Tuple[bytes, int], n: int) -> None:
+        nonlocal done_here, last_report
+        data, errors = result
+        out.write(data)
+        out.flush()
+        os.fsync(out.fileno())
+        state["rows_done"] += n
+        state["errors"] += errors
+        state["output_bytes"] = out.tell()
+        save_checkpoint(out_path, state)
+        done_here += n
+        now = time.perf_counter()
+        if now - last_report >= progress_every_s:
+            last_report = now
+            _report(state, done_here, now - started)
+
+    try:
+        start = state["rows_done"]
+        for rows in chunked(read_rows(input_path, skip=start), chunk):
+            if pool is None:
+                write(run_chunk(rows, start, columns, fmt, seed_base), len(rows))
+            else:
+                pending.append((pool.submit(run_chunk, rows, start, columns, fmt, seed_base), len(rows)))
+                # не більше двох шматків на воркер у польоті; запис — строго по порядку
+                while len(pending) >= workers * 2:
+                    future, n = pending.popleft()
+                    write(future.result(), n)
+            start += len(rows)
+        while pending:
+            future, n = pending.popleft()
+            write(future.result(), n)
+    finally:
+        for future, _ in pending:
+            future.cancel()
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+        out.close()
+
+    elapsed = time.perf_counter() - started
+    _report(state, done_here, elapsed)
+    return {
+        "rows": state["rows_done"],
+        "errors": state["errors"],
+        "elapsed_s": round(elapsed, 3),
+        "rows_per_s": round(done_here / elapsed, 1) if elapsed > 0 else None,
+    }
+
+
+def _report(state: Dict, done_here: int, elapsed: float) -> None:
+    rate = done_here / elapsed if elapsed > 0 else 0.0
+    print(
+        f"[batch] рядків {state['rows_done']:,}  помилок {state['errors']:,}  "
+        f"{rate:,.0f} рядків/с  {elapsed:.1f} с",
+        file=sys.stderr,
+    )
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Офлайн-прогін файлу сценаріїв через конвеєр /impact")
+    parser.add_argument("input", help="CSV, JSON Lines (.jsonl) або Parquet")
+    parser.add_argument("--out", required=True, help="результат: .csv або .jsonl")
+    parser.add_argument("--chunk", type=int, default=BATCH_CHUNK, help="рядків у шматку")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="процесів (1 — без пулу)")
+    parser.add_argument("--resume", action="store_true", help="продовжити з контрольної точки")
+    parser.add_argument("--seed", type=int, default=0, help="база seed для рядків без seed")
+    parser.add_argument("--progress", type=float, default=5.0, help="інтервал звіту про прогрес, с")
+    args = parser.parse_args(argv)
+    try:
+        summary = run(args.input, args.out, args.chunk, args.workers, args.resume, args.seed, args.progress)
+    except (OSError, ValueError) as e:
+        print(f"[batch] помилка: {e}", file=sys.stderr)
+        return 1
+    print(json.dumps(summary))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,324 @@
+"""
+Бенчмарк ядер фізики та наслідків.
+
+    python bench.py                          # усі кейси -> $TMPDIR/bench.json
+    python bench.py --out new.json --baseline old.json --threshold 15
+    python bench.py --filter airblast --quick
+
+Кожен кейс — виклик з фіксованими входами (random засіяний BENCH_SEED).
+Звіт: ops/sec, p50/p99 латентності одного виклику, пік виділеної пам'яті
+та кількість нових блоків на виклик (tracemalloc, окремий прогін).
+З --baseline порівнює p50 і повертає код 1, якщо кейс повільніший за поріг;
+код 1 і тоді, коли p50 кейсу перевищує абсолютний бюджет BENCH_BUDGETS_US.
+"""
+import argparse
+import atexit
+import gc
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from functools import lru_cache
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+
+# HTTP-кейси мають міряти розрахунок, а не влучання в кеш /impact
+os.environ.setdefault("IMPACT_CACHE_SIZE", "0")
+
+from models import CorridorRequest, ImpactRequest
+from calculations import (
+    calculate_energy,
+    calculate_crater,
+    calculate_airblast,
+    calculate_thermal,
+    calculate_tsunami,
+)
+from casualties import (
+    calculate_casualties,
+    calculate_economic_damage,
+    calculate_strategic_risks,
+    location_context,
+    LocationContext,
+)
+from impact import simulate_impact
+from corridor import evaluate_corridor, sample_track
+from population import RasterPopulation, get_population_backend, set_population_backend
+
+BENCH_SEED = 12345
+BENCH_FORMAT_VERSION = 1
+
+# Фіксовані входи: ~50 м кам'яний над Києвом (порядок Тунгуської події)
+BENCH_LAT, BENCH_LON = 50.4, 30.5
+BENCH_SIZE, BENCH_SPEED, BENCH_ANGLE = 49.0, 20.0, 45.0
+BENCH_SCENARIOS = ("ground", "water", "airburst", "fragmentation")
+
+# Тривалість одного заміру: дрібні виклики повторюються, доки замір не займе стільки
+TARGET_SAMPLE_S = 2e-4
+DEFAULT_SAMPLES = 200
+QUICK_SAMPLES = 30
+ALLOC_CALLS = 20
+
+# Коридор: точки удару вздовж траси через Київ, з растром населення — синтетичний глобальний
+# растр 5' (розмір реальних GPW/WorldPop-растрів), бо розрахунок растру залежить від форми, а не від даних
+BENCH_CORRIDOR_SAMPLES = 5000
+BENCH_RASTER_SHAPE = (2160, 4320)
+# Абсолютні бюджети p50 (мкс): кейси, що мають вкладатися в секунду незалежно від baseline
+BENCH_BUDGETS_US = {"corridor.raster": 1_000_000}
+
+
+def bench_cases() -> List[Tuple[str, Callable[[], object]]]:
+    """Усі кейси: (ім'я, виклик без аргументів)"""
+    energy = calculate_energy(BENCH_SIZE, BENCH_SPEED, "stone")
+    E = energy["energy_mt"]
+    zones = calculate_airblast(E)
+    thermal = calculate_thermal(E)
+    location = location_context(BENCH_LAT, BENCH_LON)
+
+    cases = [
+        ("energy", lambda: calculate_energy(BENCH_SIZE, BENCH_SPEED, "stone")),
+        ("crater", lambda: calculate_crater(BENCH_SIZE, BENCH_SPEED, BENCH_ANGLE, 3000)),
+        ("airblast.surface", lambda: calculate_airblast(E, burst_mode="surface")),
+        ("airblast.air", lambda: calculate_airblast(E, burst_mode="air")),
+        ("airblast.auto", lambda: calculate_airblast(E, burst_mode="auto")),
+        ("tsunami", lambda: calculate_tsunami(E)),
+        ("casualties", lambda: calculate_casualties(zones, BENCH_LAT, BENCH_LON, location, thermal)),
+        # свіжий контекст з готовою оцінкою населення — інтеграл растру активів не береться з кешу
+        ("economic_damage", lambda: calculate_economic_damage(
+            zones, thermal, BENCH_LAT, BENCH_LON, LocationContext(BENCH_LAT, BENCH_LON, location.info))),
+        ("strategic_risks", lambda: calculate_strategic_risks(
+            BENCH_LAT, BENCH_LON, zones[0]["radius_km"], location, zones)),
+    ]
+
+    corridor = CorridorRequest(
+        base={"lat": BENCH_LAT, "lon": BENCH_LON, "size": BENCH_SIZE * 3, "speed": BENCH_SPEED,
+              "angle": BENCH_ANGLE, "scenario": "ground"},
+        track=[[48.0, 20.0], [BENCH_LAT, BENCH_LON], [52.0, 40.0]], cross_sigma_km=30.0,
+        samples=BENCH_CORRIDOR_SAMPLES, seed=BENCH_SEED,
+    )
+    lat, lon, _, _ = sample_track(
+        corridor.track, None, corridor.cross_sigma_km, np.random.default_rng(BENCH_SEED), corridor.samples
+    )
+    cases.append(("corridor.regional", lambda: evaluate_corridor(corridor, lat, lon)))
+    cases.append(("corridor.raster", lambda: _with_population(_bench_raster(), evaluate_corridor, corridor, lat, lon)))
+
+    for scenario in BENCH_SCENARIOS:
+        req = ImpactRequest(
+            lat=BENCH_LAT, lon=BENCH_LON, size=BENCH_SIZE, speed=BENCH_SPEED,
+            angle=BENCH_ANGLE, material="stone", scenario=scenario, seed=BENCH_SEED,
+        )
+        cases.append((f"impact.inprocess.{scenario}", lambda req=req: simulate_impact(req)))
+
+    client = _test_client()
+    if client is not None:
+        for scenario in BENCH_SCENARIOS:
+            body = {
+                "lat": BENCH_LAT, "lon": BENCH_LON, "size": BENCH_SIZE, "speed": BENCH_SPEED,
+                "angle": BENCH_ANGLE, "material": "stone", "scenario": scenario, "seed": BENCH_SEED,
+            }
+            cases.append((f"impact.http.{scenario}", lambda body=body: _post(client, body)))
+    return cases
+
+
+@lru_cache(maxsize=1)
+def _bench_raster() -> RasterPopulation:
+    """Синтетичний растр населення (засіяний) з пірамідою у тимчасовому каталозі; будується при першому кейсі"""
+    directory = tempfile.mkdtemp(prefix="bench-raster-")
+    atexit.register(shutil.rmtree, directory, ignore_errors=True)
+    path = os.path.join(directory, "population.npy")
+    grid = np.random.default_rng(BENCH_SEED).lognormal(3.0, 2.0, BENCH_RASTER_SHAPE).astype(np.float32)
+    np.save(path, grid)
+    backend = RasterPopulation(path)
+    backend.warm_up()
+    return backend
+
+
+def _with_population(backend, fn: Callable, *args):
+    previous = get_population_backend()
+    set_population_backend(backend)
+    try:
+        return fn(*args)
+    finally:
+        set_population_backend(previous)
+
+
+def _test_client():
+    """TestClient потребує httpx; без нього HTTP-кейси пропускаються"""
+    try:
+        from fastapi.testclient import TestClient
+    except ImportError:
+        return None
+    import main
+    return TestClient(main.app)
+
+
+def _post(client, body: Dict):
+    response = client.post("/impact", json=body)
+    response.raise_for_status()
+    return response
+
+
+def _percentile(values: List[float], q: float) -> float:
+    return float(np.percentile(np.asarray(values), q))
+
+
+def time_case(fn: Callable[[], object], samples: int) -> Dict:
+    """
+    Латентність одного виклику. Якщо виклик коротший за TARGET_SAMPLE_S,
+    замір — середнє з inner викликів (p99 тоді згладжений; inner є у звіті).
+    """
+    for _ in range(3):
+        fn()
+    t = time.perf_counter()
+    fn()
+    single = time.perf_counter() - t
+    inner = max(1, int(TARGET_SAMPLE_S / max(single, 1e-9)))
+
+    gc.collect()
+    per_call_ns = []
+    total_ns = 0
+    for _ in range(samples):
+        t = time.perf_counter_ns()
+        for _ in range(inner):
+            fn()
+        elapsed = time.perf_counter_ns() - t
+        total_ns += elapsed
+        per_call_ns.append(elapsed / inner)
+
+    return {
+        "calls": samples * inner,
+        "inner": inner,
+        "ops_per_s": round(samples * inner / (total_ns / 1e9), 1),
+        "mean_us": round(total_ns / (samples * inner) / 1e3, 3),
+        "p50_us": round(_percentile(per_call_ns, 50) / 1e3, 3),
+        "p99_us": round(_percentile(per_call_ns, 99) / 1e3, 3),
+    }
+
+
+def measure_allocations(fn: Callable[[], object], calls: int = ALLOC_CALLS) -> Dict:
+    """Пік пам'яті одного виклику та нові блоки, що лишаються після нього (tracemalloc)"""
+    fn()
+    gc.collect()
+    tracemalloc.start()
+    peaks = []
+    try:
+        blocks_before = sum(stat.count for stat in tracemalloc.take_snapshot().statistics("filename"))
+        for _ in range(calls):
+            current, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            result = fn()
+            _, peak = tracemalloc.get_traced_memory()
+            peaks.append(peak - current)
+            del result
+        gc.collect()
+        blocks_after = sum(stat.count for stat in tracemalloc.take_snapshot().statistics("filename"))
+    finally:
+        tracemalloc.stop()
+    return {
+        "alloc_peak_kb": round(_percentile(peaks, 50) / 1024, 2),
+        "retained_blocks_per_call": round((blocks_after - blocks_before) / calls, 2),
+    }
+
+
+def run(filters: List[str], samples: int) -> Dict:
+    results = {}
+    for name, fn in bench_cases():
+        if filters and not any(f in name for f in filters):
+            continue
+        random.seed(BENCH_SEED)
+        stats = time_case(fn, samples)
+        random.seed(BENCH_SEED)
+        stats.update(measure_allocations(fn))
+        results[name] = stats
+        print(f"{name:<32} {stats['ops_per_s']:>11.1f} ops/s  p50 {stats['p50_us']:>10.1f} µs  "
+              f"p99 {stats['p99_us']:>10.1f} µs  peak {stats['alloc_peak_kb']:>8.1f} KB", file=sys.stderr)
+    return {"meta": _meta(samples), "results": results}
+
+
+def _meta(samples: int) -> Dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "format": BENCH_FORMAT_VERSION,
+        "commit": commit,
+        "timestamp": int(time.time()),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "samples": samples,
+        "seed": BENCH_SEED,
+    }
+
+
+def compare(current: Dict, baseline: Dict, threshold_pct: float) -> List[str]:
+    """Кейси, у яких p50 виріс більше ніж на threshold_pct відсотків"""
+    regressions = []
+    print(f"\n{'case':<32} {'base p50':>10} {'new p50':>10} {'change':>8}", file=sys.stderr)
+    for name, new in current["results"].items():
+        old = baseline.get("results", {}).get(name)
+        if old is None:
+            continue
+        change = (new["p50_us"] / old["p50_us"] - 1) * 100 if old["p50_us"] else 0.0
+        slower = change > threshold_pct
+        if slower:
+            regressions.append(name)
+        print(f"{name:<32} {old['p50_us']:>10.1f} {new['p50_us']:>10.1f} {change:>+7.1f}%"
+              f"{'  REGRESSION' if slower else ''}", file=sys.stderr)
+    return regressions
+
+
+def over_budget(report: Dict) -> List[str]:
+    """Кейси, у яких p50 більший за BENCH_BUDGETS_US"""
+    return [
+        name for name, budget in BENCH_BUDGETS_US.items()
+        if name in report["results"] and report["results"][name]["p50_us"] > budget
+    ]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Бенчмарк ядер фізики та /impact")
+    parser.add_argument(
+        "--out", default=os.path.join(tempfile.gettempdir(), "bench.json"),
+        help="куди записати JSON з результатами (типово — у тимчасовий каталог, не в дерево коду)",
+    )
+    parser.add_argument("--baseline", help="JSON попереднього прогону для порівняння")
+    parser.add_argument("--threshold", type=float, default=10.0, help="допустиме сповільнення p50, %%")
+    parser.add_argument("--filter", action="append", default=[], help="підрядок імені кейсу (можна кілька)")
+    parser.add_argument("--samples", type=int, default=DEFAULT_SAMPLES)
+    parser.add_argument("--quick", action="store_true", help=f"{QUICK_SAMPLES} замірів на кейс")
+    args = parser.parse_args(argv)
+
+    report = run(args.filter, QUICK_SAMPLES if args.quick else args.samples)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+        f.write("\n")
+    print(f"\nзвіт: {args.out}", file=sys.stderr)
+
+    status = 0
+    over = over_budget(report)
+    if over:
+        print(f"\nпоза бюджетом p50: {', '.join(over)}", file=sys.stderr)
+        status = 1
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold)
+        if regressions:
+            print(f"\nповільніше ніж на {args.threshold}%: {', '.join(regressions)}", file=sys.stderr)
+            status = 1
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,420 @@
+import base64
+import hashlib
+import json
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+
+from constants import FACTS, MATERIALS
+from exposure import get_exposure_backend
+from impact import SCENARIO_PHYSICS, impact_layers, simulate_physics
+from models import ImpactRequest
+from population import get_population_backend
+from probit import casualty_model
+from sites import site_fingerprint
+from logs import trace_enabled
+from metrics import register_collector
+
+log = logging.getLogger("api")
+
+# Версія формату ключа/відповіді: змінюється разом зі зміною фізики, щоб не віддати старий кеш
+CACHE_VERSION = 6
+
+# Канонізація запиту: size/speed/angle округлюються до CACHE_FLOAT_DECIMALS знаків,
+# lat/lon прив'язуються до сітки CACHE_LATLON_STEP градусів (0.001° ≈ 100 м)
+CACHE_FLOAT_DECIMALS = int(os.environ.get("IMPACT_CACHE_DECIMALS", 3))
+CACHE_LATLON_STEP = float(os.environ.get("IMPACT_CACHE_LATLON_STEP", 0.001))
+
+CACHE_MAX_ENTRIES = int(os.environ.get("IMPACT_CACHE_SIZE", 1024))  # 0 — кеш вимкнено
+CACHE_TTL_S = float(os.environ.get("IMPACT_CACHE_TTL_S", 3600))
+CACHE_DB = os.environ.get("IMPACT_CACHE_DB")  # спільний SQLite-файл для кількох воркерів
+
+# Секції, що використовують випадковість: без seed такі сценарії не кешуються
+RANDOM_SECTIONS = {"fragmentation"}
+
+# Як часто (у записах) SQLite-кеш чистить прострочені та зайві записи
+SQLITE_PRUNE_EVERY = 64
+
+# Фізика без локації (токен для перерахунку при перетягуванні точки удару)
+PHYSICS_TOKEN_VERSION = 3
+PHYSICS_CACHE_SIZE = int(os.environ.get("PHYSICS_CACHE_SIZE", 256))
+PHYSICS_CACHE_TTL_S = float(os.environ.get("PHYSICS_CACHE_TTL_S", 1800))
+
+
+def _snap(value: float, step: float) -> float:
+    return round(round(value / step) * step, 9)
+
+
+def canonical_request(req: ImpactRequest) -> ImpactRequest:
+    """Запит з квантованими числами — саме він рахується і кешується"""
+    return ImpactRequest(
+        lat=_snap(req.lat, CACHE_LATLON_STEP),
+        lon=_snap(req.lon, CACHE_LATLON_STEP),
+        size=round(req.size, CACHE_FLOAT_DECIMALS),
+        speed=round(req.speed, CACHE_FLOAT_DECIMALS),
+        angle=round(req.angle, CACHE_FLOAT_DECIMALS),
+        material=req.material,
+        scenario=req.scenario,
+        seed=req.seed,
+    )
+
+
+def _source_fingerprint() -> Tuple[str, ...]:
+    """Населення, вартість активів, модель втрат і набір об'єктів — від них залежать втрати, збитки й ризики"""
+    exposure = get_exposure_backend()
+    return (
+        get_population_backend().fingerprint(),
+        "regional" if exposure is None else exposure.fingerprint(),
+        casualty_model(),
+        site_fingerprint(),
+    )
+
+
+def cache_key(req: ImpactRequest, variant: str = "") -> str:
+    """
+    Ключ кешу для вже канонізованого запиту; variant — різновид відповіді (наприклад, вибрані поля).
+    Джерела даних теж у ключі (_source_fingerprint): воркери зі спільним IMPACT_CACHE_DB можуть бути
+    налаштовані по-різному.
+    """
+    payload = json.dumps(
+        [
+            CACHE_VERSION, req.lat, req.lon, req.size, req.speed, req.angle, req.material, req.scenario, req.seed,
+            variant, *_source_fingerprint(),
+        ],
+        separators=(",", ":"),
+        ensure_ascii=False,
+    )
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def is_cacheable(req: ImpactRequest) -> bool:
+    """Детермінований результат: є seed або сценарій без випадкових секцій"""
+    if req.seed is not None:
+        return True
+    return not any(section in RANDOM_SECTIONS for section, _ in SCENARIO_PHYSICS.get(req.scenario, ()))
+
+
+class CacheStats:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.bypassed = 0
+
+    def as_dict(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "bypassed": self.bypassed,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+class MemoryCache:
+    """LRU з обмеженою кількістю записів і TTL (у межах одного процесу)"""
+
+    def __init__(self, max_entries: int, ttl_s: float, stats: CacheStats):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self.stats = stats
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires, value = item
+            if expires < time.monotonic():
+                del self._data[key]
+                self.stats.expirations += 1
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def put(self, key: str, value: Dict) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl_s, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.stats.evictions += 1
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+class SQLiteCache:
+    """
+    Спільний кеш у SQLite-файлі (WAL): воркери uvicorn бачать результати одне одного.
+    Відповіді зберігаються як JSON; LRU — за часом останнього доступу.
+    """
+
+    def __init__(self, path: str, max_entries: int, ttl_s: float, stats: CacheStats):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self.stats = stats
+        self._lock = threading.Lock()
+        self._puts = 0
+        self._conn = sqlite3.connect(path, timeout=5, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS impact_cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS impact_cache_accessed ON impact_cache(accessed)")
+
+    def get(self, key: str) -> Optional[Dict]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, expires FROM impact_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if row[1] < now:
+                self._conn.execute("DELETE FROM impact_cache WHERE key = ?", (key,))
+                self.stats.expirations += 1
+                return None
+            self._conn.execute("UPDATE impact_cache SET accessed = ? WHERE key = ?", (now, key))
+        return json.loads(row[0])
+
+    def put(self, key: str, value: Dict) -> None:
+        now = time.time()
+        payload = json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO impact_cache (key, value, expires, accessed) VALUES (?, ?, ?, ?)",
+                (key, payload, now + self.ttl_s, now),
+            )
+            self._puts += 1
+            if self._puts % SQLITE_PRUNE_EVERY == 0:
+                self._prune(now)
+
+    def _prune(self, now: float) -> None:
+        self.stats.expirations += self._conn.execute("DELETE FROM impact_cache WHERE expires < ?", (now,)).rowcount
+        self.stats.evictions += self._conn.execute(
+            "DELETE FROM impact_cache WHERE key IN ("
+            "SELECT key FROM impact_cache ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        ).rowcount
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM impact_cache").fetchone()[0]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM impact_cache")
+
+
+class ImpactCache:
+    """
+    Кеш відповідей /impact за канонізованим запитом.
+    Локальний LRU перед (необов'язковим) спільним SQLite: спершу пам'ять процесу, потім файл.
+    """
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES, ttl_s: float = CACHE_TTL_S, db_path: Optional[str] = CACHE_DB):
+        self.stats = CacheStats()
+        self.enabled = max_entries > 0
+        self.memory = MemoryCache(max_entries, ttl_s, self.stats)
+        self.shared = SQLiteCache(db_path, max_entries, ttl_s, self.stats) if db_path and self.enabled else None
+
+    def lookup(self, req: ImpactRequest, variant: str = "") -> Tuple[Optional[str], ImpactRequest, Optional[Dict]]:
+        """
+        (ключ, запит для розрахунку, результат з кешу або None).
+        Ключ None — запит не кешується (кеш вимкнено або випадковий сценарій без seed),
+        тоді рахується сам запит, а не канонічний.
+        """
+        if not self.enabled or not is_cacheable(req):
+            self.stats.bypassed += 1
+            return None, req, None
+
+        canonical = canonical_request(req)
+        key = cache_key(canonical, variant)
+        result = self.memory.get(key)
+        if result is None and self.shared is not None:
+            result = self.shared.get(key)
+            if result is not None:
+                self.memory.put(key, result)
+        if result is not None:
+            self.stats.hits += 1
+        else:
+            self.stats.misses += 1
+        if trace_enabled():
+            log.debug("impact cache %s key=%s", "miss" if result is None else "hit", key)
+        return key, canonical, result
+
+    def store(self, key: Optional[str], result: Dict) -> None:
+        if key is None:
+            return
+        self.memory.put(key, result)
+        if self.shared is not None:
+            self.shared.put(key, result)
+
+    def respond(self, req: ImpactRequest, result: Dict) -> Dict:
+        """Копія для відповіді (закешований словник назовні не віддаємо); без seed факт дня — щоразу новий"""
+        result = dict(result)
+        if req.seed is None and "fun_fact" in result:
+            result["fun_fact"] = random.choice(FACTS)
+        return result
+
+    def get_or_compute(self, req: ImpactRequest, compute: Callable[[ImpactRequest], Dict]) -> Dict:
+        """Відповідь з кешу або compute(канонічний запит)"""
+        key, target, result = self.lookup(req)
+        if result is None:
+            result = compute(target)
+            self.store(key, result)
+        return self.respond(req, result)
+
+    def info(self) -> Dict:
+        info = self.stats.as_dict()
+        info.update({
+            "enabled": self.enabled,
+            "entries": len(self.memory),
+            "max_entries": self.memory.max_entries,
+            "ttl_s": self.memory.ttl_s,
+            "shared_backend": "sqlite" if self.shared is not None else None,
+        })
+        if self.shared is not None:
+            info["shared_entries"] = len(self.shared)
+        return info
+
+    def clear(self) -> None:
+        self.memory.clear()
+        if self.shared is not None:
+            self.shared.clear()
+
+
+def physics_token(req: ImpactRequest) -> str:
+    """
+    Токен фізики — канонічні параметри без lat/lon (base64 JSON).
+    Самодостатній: будь-який воркер перерахує фізику з нього, якщо її немає в кеші.
+    """
+    payload = json.dumps(
+        [
+            PHYSICS_TOKEN_VERSION,
+            round(req.size, CACHE_FLOAT_DECIMALS),
+            round(req.speed, CACHE_FLOAT_DECIMALS),
+            round(req.angle, CACHE_FLOAT_DECIMALS),
+            req.material,
+            req.scenario,
+            req.seed,
+        ],
+        separators=(",", ":"),
+        ensure_ascii=False,
+    )
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def request_from_token(token: str, lat: float, lon: float) -> ImpactRequest:
+    """Запит з токена фізики та нової точки удару; ValueError — токен не розбирається"""
+    try:
+        payload = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        version, size, speed, angle, material, scenario, seed = json.loads(payload)
+    except (ValueError, TypeError) as e:
+        raise ValueError("Invalid physics token") from e
+    if version != PHYSICS_TOKEN_VERSION or material not in MATERIALS or scenario not in SCENARIO_PHYSICS:
+        raise ValueError("Invalid physics token")
+    return ImpactRequest(
+        lat=lat, lon=lon, size=size, speed=speed, angle=angle, material=material, scenario=scenario, seed=seed,
+    )
+
+
+class PhysicsCache:
+    """
+    Результати simulate_physics за токеном: для перетягування точки удару
+    лишається лише населення, втрати, збитки та об'єкти.
+    """
+
+    def __init__(self, max_entries: int = PHYSICS_CACHE_SIZE, ttl_s: float = PHYSICS_CACHE_TTL_S):
+        self.stats = CacheStats()
+        self.memory = MemoryCache(max(1, max_entries), ttl_s, self.stats)
+
+    def prepare(self, req: ImpactRequest) -> Tuple[str, ImpactRequest, Dict]:
+        """
+        (токен, запит, стан фізики) для нового розрахунку.
+        Без seed зерно обирається тут і входить у токен — фізика за токеном завжди та сама.
+        """
+        if req.seed is None:
+            req = req.model_copy(update={"seed": random.randrange(2 ** 31)})
+        token = physics_token(req)
+        # рахуємо з канонічних параметрів токена — так само, як рахував би інший воркер
+        req = request_from_token(token, req.lat, req.lon)
+        return token, req, self.get(token, req)
+
+    def get(self, token: str, req: ImpactRequest) -> Dict:
+        """Стан фізики для токена (з кешу або перерахований з параметрів req)"""
+        state = self.memory.get(token)
+        if state is not None:
+            self.stats.hits += 1
+            return state
+        self.stats.misses += 1
+        state = simulate_physics(req)
+        state["layers"] = impact_layers(req.scenario, state["physics"])
+        self.memory.put(token, state)
+        return state
+
+    def info(self) -> Dict:
+        info = self.stats.as_dict()
+        info.update({"entries": len(self.memory), "max_entries": self.memory.max_entries, "ttl_s": self.memory.ttl_s})
+        return info
+
+
+_physics_cache: Optional[PhysicsCache] = None
+
+
+def get_physics_cache() -> PhysicsCache:
+    global _physics_cache
+    if _physics_cache is None:
+        _physics_cache = PhysicsCache()
+    return _physics_cache
+
+
+_impact_cache: Optional[ImpactCache] = None
+
+
+def get_impact_cache() -> ImpactCache:
+    """Кеш процесу (налаштування з IMPACT_CACHE_* змінних середовища)"""
+    global _impact_cache
+    if _impact_cache is None:
+        _impact_cache = ImpactCache()
+    return _impact_cache
+
+
+def _cache_metrics():
+    """Лічильники кешу для /metrics"""
+    samples = []
+    if _physics_cache is not None:
+        samples += [
+            ("physics_cache_hits_total", "counter", "Physics token cache hits", [({}, _physics_cache.stats.hits)]),
+            ("physics_cache_misses_total", "counter", "Physics token cache misses", [({}, _physics_cache.stats.misses)]),
+        ]
+    cache = _impact_cache
+    if cache is None:
+        return samples
+    stats = cache.stats
+    return samples + [
+        ("impact_cache_hits_total", "counter", "Impact cache hits", [({}, stats.hits)]),
+        ("impact_cache_misses_total", "counter", "Impact cache misses", [({}, stats.misses)]),
+        ("impact_cache_evictions_total", "counter", "Impact cache LRU evictions", [({}, stats.evictions)]),
+        ("impact_cache_expirations_total", "counter", "Impact cache TTL expirations", [({}, stats.expirations)]),
+        ("impact_cache_bypassed_total", "counter", "Requests not eligible for caching", [({}, stats.bypassed)]),
+        ("impact_cache_entries", "gauge", "Entries in the in-process cache", [({}, len(cache.memory))]),
+    ]
+
+
+register_collector(_cache_metrics)
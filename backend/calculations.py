@@ -1,7 +1,16 @@
+import logging
 import math
 import random
-from typing import Dict, List
+from typing import Dict, List, Optional
+
+import numpy as np
+
 from constants import MATERIALS
+from entry import calculate_entry
+from logs import trace_enabled
+
+# Debug-трейс фізики: пишеться лише для трасованих запитів (logs.trace_enabled)
+log = logging.getLogger("physics")
 
 
 # Очікується, що MATERIALS уже є в твоєму модулі
@@ -18,63 +27,65 @@ RHO_TARGET_DEFAULT = 2750
 # Калібрування під твій референт: 49 м, 20 км/с, 80° → ~0.9 км
 CRATER_CAL_K = 0.95  # можеш рухати в діапазоні ~0.90..1.05 під свій набір референсів
 
+# ---------------------------------------------------------------------------
+# Векторні ядра.
+# Кожне ядро приймає скаляри або numpy-масиви (з броадкастингом) і повертає
+# "сирі" масиви без округлення. Скалярні calculate_* нижче — тонкі обгортки:
+# ядро + форматування одного елемента, тому batch- і одиночний шлях не
+# можуть розійтися у фізиці.
+# ---------------------------------------------------------------------------
+
 def _angle_eff(angle_deg: float) -> float:
     """Кутова ефективність для масштабування (не дозволяємо занадто малих значень)."""
-    s = math.sin(math.radians(angle_deg))
-    return max(0.35, s)  # клемп, щоб дуже пологі не занулювали все
+    s = np.sin(np.radians(angle_deg))
+    return np.maximum(0.35, s)  # клемп, щоб дуже пологі не занулювали все
 
-def calculate_energy(size: float, speed: float, material: str) -> Dict:
-    """
-    Кінетична енергія. size — діаметр м, speed — км/с.
-    Повертає старий формат, який у тебе вже споживається фронтом.
-    """
-    mat = MATERIALS[material]
-    volume = (4/3) * math.pi * (size/2)**3
-    mass = volume * mat["density"]
-    v = speed * 1000.0
 
-    energy_j = 0.5 * mass * v**2
-    energy_mt = energy_j / TNT_J_PER_MT
+def material_density(material) -> np.ndarray:
+    """Густина (кг/м³) для назви матеріалу або послідовності назв."""
+    if isinstance(material, str):
+        return np.float64(MATERIALS[material]["density"])
+    return np.array([MATERIALS[m]["density"] for m in material], dtype=float)
 
-    hiroshima = energy_mt / 0.015
-    tnt_kg = energy_mt * 1e9
 
-    print(f"\n[ENERGY] d={size}м, v={speed}км/с, material={material}")
-    print(f"[ENERGY] mass={mass:.3e}кг, volume={volume:.1f}м³")
-    print(f"[ENERGY] E={energy_j:.3e}Дж = {energy_mt:.3f}Мт")
+def material_strength(material) -> np.ndarray:
+    """Міцність (МПа) для назви матеріалу або послідовності назв."""
+    if isinstance(material, str):
+        return np.float64(MATERIALS[material]["strength"])
+    return np.array([MATERIALS[m]["strength"] for m in material], dtype=float)
 
+
+def energy_kernel(size, speed, density) -> Dict[str, np.ndarray]:
+    """Кінетична енергія для масивів діаметрів (м), швидкостей (км/с) і густин (кг/м³)."""
+    size = np.asarray(size, dtype=float)
+    volume = (4/3) * math.pi * (size/2)**3
+    mass = volume * density
+    v = np.asarray(speed, dtype=float) * 1000.0
+
+    energy_j = 0.5 * mass * v**2
+    energy_mt = energy_j / TNT_J_PER_MT
     return {
-        "energy_j": energy_j,
-        "energy_mt": round(energy_mt, 3),
+        "volume_m3": volume,
         "mass_kg": mass,
-        "hiroshima_eq": round(hiroshima, 1),
-        "tnt_kg": round(tnt_kg, 0),
+        "energy_j": energy_j,
+        "energy_mt": energy_mt,
     }
 
-def calculate_crater(
-    size: float,
-    speed: float,
-    angle: float,
-    rho_i: float = 3000,
-    rho_t: float = RHO_TARGET_DEFAULT,
-    g: float = G_DEFAULT,
-) -> Dict:
-    """
-    Розрахунок ФІНАЛЬНОГО простого кратера (rim-to-rim).
-    ПОВЕРТАЄ СТАРІ КЛЮЧІ:
-      - diameter_km (float)
-      - depth_km (float)
-      - ejecta_mass_kg (float)
-      - rim_height_m (float)
-    Плюс допоміжні: shape, width_km, length_km, energy_mt.
-    """
-    print("\n" + "="*64)
-    print("РОЗРАХУНОК КРАТЕРА (сумісний формат)")
-    print(f"Input: size={size}м, speed={speed}км/с, angle={angle}°; rho_i={rho_i}, rho_t={rho_t}, g={g}")
 
-    v = speed * 1000.0
-    theta = math.radians(angle)
-    sin_theta = math.sin(theta)
+def crater_kernel(
+    size,
+    speed,
+    angle,
+    rho_i=3000,
+    rho_t=RHO_TARGET_DEFAULT,
+    g=G_DEFAULT,
+) -> Dict[str, np.ndarray]:
+    """Векторний π-скейлінг фінального простого кратера (усі величини в метрах/кг)."""
+    size = np.asarray(size, dtype=float)
+    angle = np.asarray(angle, dtype=float)
+    v = np.asarray(speed, dtype=float) * 1000.0
+    theta = np.radians(angle)
+    sin_theta = np.sin(theta)
 
     # Маса та енергія
     volume = (4/3) * math.pi * (size/2)**3
@@ -92,29 +103,20 @@ def calculate_crater(
 
     # Кутова корекція (без подвійного множення sinθ по енергії!)
     eff = _angle_eff(angle)  # 0.35..1.0
-    if angle < 30:
-        D_final *= (0.85 * eff + 0.10)  # помірно зменшуємо при дуже пологих
-    else:
-        D_final *= (0.95 + 0.05 * eff)  # для крутих майже без змін
+    shallow = angle < 30
+    # помірно зменшуємо при дуже пологих, для крутих майже без змін
+    D_final = D_final * np.where(shallow, 0.85 * eff + 0.10, 0.95 + 0.05 * eff)
 
     # Глобальна калібровка
-    D_final *= CRATER_CAL_K
+    D_final = D_final * CRATER_CAL_K
 
     # Форма/еліпс для дуже пологих
-    shape = "circular"
+    elong = np.where(shallow, np.minimum(1.0/np.maximum(1e-6, sin_theta), 3.0), 1.0)  # cap ×3
     width_m = D_final
-    length_m = D_final
-    if angle < 30:
-        elong = min(1.0/max(1e-6, sin_theta), 3.0)  # cap ×3
-        shape = "elliptical"
-        width_m = D_final
-        length_m = D_final * elong
-
-    # Глибина/вал
-    if angle < 30:
-        depth_m = 0.2 * D_final * sin_theta   # мілкіше при пологих
-    else:
-        depth_m = 0.2 * D_final * (0.9 + 0.1 * eff)
+    length_m = D_final * elong
+
+    # Глибина/вал (мілкіше при пологих)
+    depth_m = np.where(shallow, 0.2 * D_final * sin_theta, 0.2 * D_final * (0.9 + 0.1 * eff))
     rim_h_m = 0.04 * D_final
 
     # Маса викидів (груба оцінка)
@@ -122,28 +124,445 @@ def calculate_crater(
     ejecta_volume = crater_area * depth_m
     ejecta_mass = ejecta_volume * rho_t
 
-    print(f"[CRATER] D_tr={D_tr:.1f}м → D_final={D_final:.1f}м ({D_final/1000:.3f}км), shape={shape}")
-    if shape == "elliptical":
-        print(f"[CRATER] width={width_m:.1f}м, length={length_m:.1f}м, elong≈{length_m/width_m:.2f}")
-    print(f"[CRATER] depth≈{depth_m:.1f}м ({depth_m/1000:.3f}км), rim≈{rim_h_m:.1f}м")
-    print(f"[CRATER] ejecta_mass≈{ejecta_mass:.3e}кг; energy≈{E_mt:.3f}Мт")
+    return {
+        "transient_m": D_tr,
+        "diameter_m": D_final,
+        "width_m": width_m,
+        "length_m": length_m,
+        "depth_m": depth_m,
+        "rim_height_m": rim_h_m,
+        "ejecta_mass_kg": ejecta_mass,
+        "energy_mt": E_mt,
+        "elliptical": shallow,
+    }
+
+
+# Тиски зон ударної хвилі (кПа), від найсильнішої до найслабшої
+AIRBLAST_PRESSURES = (100, 50, 20, 5, 1)
+
+# БАЗОВІ РАДІУСИ (км) для 1 Мт ПО-ЗЕМЛІ (surface burst)
+# ці значення близькі до узагальнених ядерних таблиць для рівня землі
+AIRBLAST_BASE_SURFACE_KM = {
+    100: 3.0,   # ≈14.5 psi
+    50:  4.5,   # ≈7.3  psi
+    20:  7.0,   # ≈2.9  psi
+    5:   12.0,  # ≈0.73 psi
+    1:   20.0,  # ≈0.15 psi
+}
+
+# ОПТИМАЛЬНА ВИСОТА ПОВІТРЯНОГО ПІДРИВУ (HOB) ДЛЯ МАКСИМУМУ РАДІУСУ певного тиску (на 1 Мт, у км)
+# наближені значення: високі тиски нижче, малі тиски вище
+AIRBLAST_OPT_HOB_KM_1MT = {
+    100: 0.5,
+    50:  1.0,
+    20:  1.8,
+    5:   3.0,
+    1:   7.0,
+}
+
+# "Посилення" радіуса від повітряного підриву поблизу оптимуму (множники при максимумі)
+# для високих тисків ефект невеликий, для 5–1 кПа помітний.
+# Також для 100 кПа ми навіть трохи "штрафуємо" — надвисокі тиски менші при HOB.
+AIRBLAST_HOB_PEAK_GAIN = {
+    100: 0.00,  # -0% (можна навіть -0.1, якщо хочеш)
+    50:  0.10,  # +10%
+    20:  0.20,  # +20%
+    5:   0.35,  # +35%
+    1:   0.25,  # +25%
+}
+# ширина "дзвоника" навколо оптимуму (скільки км в масштабі 1 Мт)
+AIRBLAST_HOB_SIGMA_KM_1MT = {
+    100: 0.6,
+    50:  1.0,
+    20:  1.6,
+    5:   2.5,
+    1:   4.0,
+}
+
+# ШВИДКІСТЬ ВІТРУ при даному тиску (грубе наближення для пікової швидкості, м/с)
+# Значення підібрані за довідковими кривими: 1 кПа ~ 35–45 м/с; 5 кПа ~ 70–110; 20 кПа ~150–190; 50 кПа ~220–260; 100 кПа ~280–320
+AIRBLAST_WIND_MS = {
+    1:   (35, 45),
+    5:   (80, 110),
+    20:  (150, 190),
+    50:  (220, 260),
+    100: (280, 320),
+}
+
+# ОПИС НАСЛІДКІВ — акуратний, реалістний
+AIRBLAST_EFFECTS = {
+    100: ("Майже повне знищення будівель; бетон/цегла руйнуються.", "Дуже висока летальність"),
+    50:  ("Важкі руйнування: обвал стін, перекриттів; перекидання важкого транспорту.", "Високі втрати"),
+    20:  ("Серйозні пошкодження: частковий обвал, травми від уламків.", "Помірні–високі втрати"),
+    5:   ("Легкі–помірні пошкодження: вибиті вікна, пошкоджені дахи, травми осколками.", "Низькі–помірні втрати"),
+    1:   ("Масове биття скла; легкі поранення уламками скла.", "Низькі"),
+}
+AIRBLAST_COLORS = {
+    100: "#8B0000",
+    50:  "#DC143C",
+    20:  "#FF4500",
+    5:   "#FFA500",
+    1:   "#FFD700",
+}
+AIRBLAST_TYPES = {
+    100: "total_destruction",
+    50:  "heavy_damage",
+    20:  "moderate_damage",
+    5:   "light_damage",
+    1:   "glass_breakage",
+}
+
+
+def airblast_kernel(
+    energy_mt,
+    *,
+    burst_mode: str = "surface",
+    burst_height_m=None,
+) -> Dict[str, np.ndarray]:
+    """
+    Векторні радіуси ударної хвилі.
+    Повертає radius_km / surface_km / multiplier форми (len(AIRBLAST_PRESSURES), *shape(energy_mt))
+    у порядку AIRBLAST_PRESSURES та burst_height_m (або None для surface без висоти).
+    """
+    # захист від нулів/некоректних значень
+    E_mt = np.maximum(np.asarray(energy_mt, dtype=float), 0.0)
+    E13 = np.where(E_mt > 1e-9, E_mt, 1e-9) ** (1/3)  # кубічний корінь для масштабування
+
+    # Якщо в режимі "air" або "auto", нам потрібна висота. Якщо None — оберемо опт для 5 кПа.
+    # Масштабуємо оптимум з 1 Мт до потрібної енергії: H_opt(E) ~ H_opt(1Mt) * E^(1/3)
+    auto = (burst_mode in ("air", "auto"))
+    if auto and burst_height_m is None:
+        # максимізація зони важких руйнувань (5 кПа) — типова задача "оптимального HOB"
+        opt_h_km = AIRBLAST_OPT_HOB_KM_1MT[5] * E13
+        burst_height_m = opt_h_km * 1000.0
+
+    surface = np.stack([AIRBLAST_BASE_SURFACE_KM[p] * E13 for p in AIRBLAST_PRESSURES])
+
+    if burst_mode == "surface" or burst_height_m is None:
+        mult = np.ones_like(surface)
+    else:
+        # Гладка поправка для повітряного підриву: 1 + gain * exp(- (ΔH)^2 / (2σ^2)),
+        # де ΔH — різниця між H і оптимальною HOB для цього тиску.
+        H_km = np.asarray(burst_height_m, dtype=float) / 1000.0
+        mult = np.stack([
+            1.0 + AIRBLAST_HOB_PEAK_GAIN[p] * np.exp(
+                -0.5 * ((H_km - AIRBLAST_OPT_HOB_KM_1MT[p] * E13) / AIRBLAST_HOB_SIGMA_KM_1MT[p]) ** 2
+            )
+            for p in AIRBLAST_PRESSURES
+        ])
+        mult = np.maximum(0.7, mult)  # не даємо впасти нижче 0.7 × surface
+        surface, mult = np.broadcast_arrays(surface, mult)
+
+    return {
+        "surface_km": surface,
+        "multiplier": mult,
+        "radius_km": surface * mult,
+        "burst_height_m": burst_height_m,
+    }
+
+
+# Коефіцієнти радіусів теплових зон: R = k * E^0.41 (км)
+THERMAL_COEFFS = (0.6, 0.9, 1.5)
+THERMAL_EXPONENT = 0.41
+
+
+def thermal_kernel(energy_mt) -> np.ndarray:
+    """Радіуси теплових зон (3-й, 2-й, 1-й ступінь) форми (3, *shape(energy_mt))."""
+    E = np.asarray(energy_mt, dtype=float) ** THERMAL_EXPONENT
+    return np.stack([k * E for k in THERMAL_COEFFS])
 
-    # КЛЮЧОВЕ: diameter_km ІСНУЄ ЗАВЖДИ (беремо «ширину» як базовий діаметр)
-    result = {
+
+# Коефіцієнти MMI-зон: R = k * E^0.33 (км)
+SEISMIC_MMI = (12, 10, 8, 6, 4)
+SEISMIC_COEFFS = (0.1, 0.3, 0.6, 1.2, 2.5)
+SEISMIC_EXPONENT = 0.33
+
+
+def seismic_kernel(energy_mt) -> Dict[str, np.ndarray]:
+    """Магнітуда за Ріхтером і радіуси MMI-зон форми (5, *shape(energy_mt))."""
+    E = np.asarray(energy_mt, dtype=float)
+    # Магнітуда землетрусу за шкалою Рихтера
+    magnitude = 0.67 * np.log10(E) + 4.87
+    E33 = E ** SEISMIC_EXPONENT
+    return {
+        "magnitude": magnitude,
+        "radius_km": np.stack([k * E33 for k in SEISMIC_COEFFS]),
+    }
+
+
+# Пороги офшорної висоти для кілець цунамі (м)
+TSUNAMI_THRESHOLDS = [
+    ("tsunami_extreme",    30.0,   "#6b0000", "Immediate evacuation. High risk of flooding >10 m in coastal lowlands."),
+    ("tsunami_major",      15,   "#a50000", "Evacuate to heights >20 m. Multiple waves, strong currents."),
+    ("tsunami_moderate",   7,   "#d45500", "Avoid coastline, harbors, bridges. Increased caution."),
+    ("tsunami_minor",      3,   "#f6a800", "Possible flooding of lowlands, dangerous currents in ports."),
+    ("tsunami_information",0.0,   "#ffd166", "Weak sea level fluctuations, local currents."),
+]
+TSUNAMI_K = 0.25
+TSUNAMI_R0_KM = 10.0  # км, стабілізація центру
+
+
+def tsunami_kernel(
+    energy_mt,
+    water_depth_m=4000.0,
+    period_min=15.0,
+) -> Dict[str, np.ndarray]:
+    """Векторні радіуси кілець цунамі; radius_km форми (len(TSUNAMI_THRESHOLDS), *shape)."""
+    g = 9.81
+    E_mt = np.maximum(0.0, np.asarray(energy_mt, dtype=float))
+
+    # 1) Офшорна швидкість і довжина хвилі (інфо)
+    c_ms = np.sqrt(g * np.asarray(water_depth_m, dtype=float))
+    c_kmh = c_ms * 3.6
+    T_s = np.asarray(period_min, dtype=float) * 60.0
+    wavelength_km = (c_ms * T_s) / 1000.0
+
+    # 2) Початкова офшорна висота біля епіцентра (проста енергетична оцінка)
+    H0 = TSUNAMI_K * np.sqrt(E_mt)           # м
+    r0 = TSUNAMI_R0_KM
+
+    # 3) Знаходження радіуса для порогу H_thr:
+    #    H(r) = H0 * sqrt(r0/(r+r0)) ⇒ r = r0 * (H0/H_thr)^2 - r0
+    radii = []
+    for _, H_thr, _, _ in TSUNAMI_THRESHOLDS:
+        if H_thr <= 0:
+            R = np.full_like(H0, 4.0 * r0)  # просто велике зовнішнє кільце
+        else:
+            R = np.where(H0 <= 1e-9, 0.0, np.maximum(0.0, r0 * (H0 / H_thr)**2 - r0))
+        radii.append(R)
+    # монотонізуємо (щоб не було накладання при малих E)
+    radii = np.maximum.accumulate(np.stack(radii), axis=0)
+
+    with np.errstate(divide="ignore"):
+        eta_min = np.where(c_kmh > 1e-6, (radii / c_kmh) * 60.0, np.inf)
+
+    return {
+        "wave_speed_kmh": c_kmh,
+        "wavelength_km": wavelength_km,
+        "initial_height_m": H0,
+        "radius_km": radii,
+        "arrival_time_min": eta_min,
+    }
+
+
+# ---------------------------------------------------------------------------
+# Форматування одного елемента (старий формат відповіді для фронту).
+# Приймають звичайні float — batch-шлях передає сюди рядки з .tolist().
+# ---------------------------------------------------------------------------
+
+def energy_result(energy_j: float, energy_mt: float, mass: float) -> Dict:
+    """Словник енергії у форматі, який споживає фронт."""
+    hiroshima = energy_mt / 0.015
+    tnt_kg = energy_mt * 1e9
+    return {
+        "energy_j": energy_j,
+        "energy_mt": round(energy_mt, 3),
+        "mass_kg": mass,
+        "hiroshima_eq": round(hiroshima, 1),
+        "tnt_kg": round(tnt_kg, 0),
+    }
+
+
+def crater_result(
+    width_m: float,
+    length_m: float,
+    depth_m: float,
+    rim_h_m: float,
+    ejecta_mass: float,
+    E_mt: float,
+    elliptical: bool,
+) -> Dict:
+    """Словник кратера; diameter_km ІСНУЄ ЗАВЖДИ (беремо «ширину» як базовий діаметр)."""
+    return {
         "diameter_km": round(width_m / 1000.0, 3),
         "depth_km": round(depth_m / 1000.0, 3),
         "ejecta_mass_kg": round(ejecta_mass, 0),
         "rim_height_m": round(rim_h_m, 1),
         # додаткові:
-        "shape": shape,
+        "shape": "elliptical" if elliptical else "circular",
         "width_km": round(width_m / 1000.0, 3),
         "length_km": round(length_m / 1000.0, 3),
         "energy_mt": round(E_mt, 3),
     }
-    return result
 
-import math
-from typing import Dict, List, Optional
+
+def airblast_zones(
+    radii_km: List[float],
+    multipliers: List[float],
+    burst_mode: str = "surface",
+    burst_height_m: Optional[float] = None,
+) -> List[Dict]:
+    """Зони ударної хвилі для одного вибуху (радіуси в порядку AIRBLAST_PRESSURES)."""
+    zones: List[Dict] = []
+    for p, R_km, mult in zip(AIRBLAST_PRESSURES, radii_km, multipliers):
+        lo, hi = AIRBLAST_WIND_MS[p]
+        wind = int(round((lo + hi) / 2))
+        eff_txt, cas_txt = AIRBLAST_EFFECTS[p]
+        zones.append({
+            "type": AIRBLAST_TYPES[p],
+            "radius_km": round(R_km, 2),
+            "pressure_kpa": p,
+            "effects": eff_txt,
+            "casualties": cas_txt,
+            "color": AIRBLAST_COLORS[p],
+            # нові, не обов'язкові:
+            "wind_ms": wind,
+            "notes": (
+                "Поверхневий вибух" if burst_mode == "surface"
+                else f"Повітряний вибух, HOB≈{int(round((burst_height_m or 0)/1000))} км, множник {mult:.2f}"
+            ),
+        })
+    return zones
+
+
+def thermal_zones(radii_km: List[float]) -> List[Dict]:
+    """Теплові зони з радіусів (3-й, 2-й, 1-й ступінь)."""
+    r3, r2, r1 = radii_km
+    return [
+        # Третій ступінь опіків (повна товщина шкіри)
+        {
+            "type": "third_degree_burns",
+            "radius_km": round(r3, 2),
+            "temperature_c": 2000,
+            "effects": "Опіки 3-го ступеня",
+            "casualties": "Критичні опіки, висока летальність",
+            "ignition": "Займання всього легкозаймистого",
+            "color": "#FF0000"
+        },
+        # Другий ступінь опіків
+        {
+            "type": "second_degree_burns",
+            "radius_km": round(r2, 2),
+            "temperature_c": 1000,
+            "effects": "Опіки 2-го ступеня",
+            "casualties": "Важкі опіки, потрібна госпіталізація",
+            "ignition": "Займання одягу, дерева",
+            "color": "#FF6347"
+        },
+        # Перший ступінь опіків
+        {
+            "type": "first_degree_burns",
+            "radius_km": round(r1, 2),
+            "temperature_c": 400,
+            "effects": "Опіки 1-го ступеня",
+            "casualties": "Болючі, але не небезпечні для життя",
+            "ignition": "Почервоніння шкіри",
+            "color": "#FFA07A"
+        },
+    ]
+
+
+# MMI шкала: описи та кольори зон
+SEISMIC_EFFECTS = {
+    12: ("Тотальне знищення, зміщення ґрунту", "#4B0082"),
+    10: ("Руйнування більшості споруд", "#8B008B"),
+    8:  ("Значні пошкодження будівель", "#9370DB"),
+    6:  ("Відчутні струси, тріщини", "#BA55D3"),
+    4:  ("Помітні коливання", "#DDA0DD"),
+}
+
+
+def seismic_zones(magnitude: float, radii_km: List[float]) -> List[Dict]:
+    """Сейсмічні MMI-зони з магнітуди та радіусів (у порядку SEISMIC_MMI)."""
+    zones = []
+    for mmi, R in zip(SEISMIC_MMI, radii_km):
+        effects, color = SEISMIC_EFFECTS[mmi]
+        zones.append({
+            "type": f"seismic_mmi_{mmi}",
+            "radius_km": round(R, 2),
+            "mmi": mmi,
+            "magnitude_richter": round(magnitude, 2),
+            "effects": effects,
+            "color": color
+        })
+    return zones
+
+
+def tsunami_result(
+    wave_speed_kmh: float,
+    wavelength_km: float,
+    initial_height_m: float,
+    radii_km: List[float],
+    arrival_min: List[float],
+) -> Dict:
+    """Словник цунамі з кільцями у порядку TSUNAMI_THRESHOLDS."""
+    zones: List[Dict] = []
+    for (label, H_thr, color, advice), R, eta_min in zip(TSUNAMI_THRESHOLDS, radii_km, arrival_min):
+        zones.append({
+            "type": label,
+            "radius_km": round(R, 1),
+            "wave_height_m": round(H_thr, 2),  # порогова офшорна висота на межі кільця
+            "arrival_time_min": round(eta_min, 1),
+            "advice": advice,
+            "color": color,
+        })
+    return {
+        "wave_speed_kmh": round(wave_speed_kmh, 1),
+        "wavelength_km": round(wavelength_km, 1),
+        "initial_height_m": round(initial_height_m, 2),
+        "zones": zones
+    }
+
+
+# ---------------------------------------------------------------------------
+# Скалярний API (сумісний зі старими викликами)
+# ---------------------------------------------------------------------------
+
+def calculate_energy(size: float, speed: float, material: str) -> Dict:
+    """
+    Кінетична енергія. size — діаметр м, speed — км/с.
+    Повертає старий формат, який у тебе вже споживається фронтом.
+    """
+    k = energy_kernel(size, speed, material_density(material))
+    energy_j = float(k["energy_j"])
+    energy_mt = float(k["energy_mt"])
+    mass = float(k["mass_kg"])
+
+    if trace_enabled():
+        log.debug("[ENERGY] d=%sм, v=%sкм/с, material=%s", size, speed, material)
+        log.debug("[ENERGY] mass=%.3eкг, volume=%.1fм³", mass, float(k["volume_m3"]))
+        log.debug("[ENERGY] E=%.3eДж = %.3fМт", energy_j, energy_mt)
+
+    return energy_result(energy_j, energy_mt, mass)
+
+def calculate_crater(
+    size: float,
+    speed: float,
+    angle: float,
+    rho_i: float = 3000,
+    rho_t: float = RHO_TARGET_DEFAULT,
+    g: float = G_DEFAULT,
+) -> Dict:
+    """
+    Розрахунок ФІНАЛЬНОГО простого кратера (rim-to-rim).
+    ПОВЕРТАЄ СТАРІ КЛЮЧІ:
+      - diameter_km (float)
+      - depth_km (float)
+      - ejecta_mass_kg (float)
+      - rim_height_m (float)
+    Плюс допоміжні: shape, width_km, length_km, energy_mt.
+    """
+    k = crater_kernel(size, speed, angle, rho_i, rho_t, g)
+    D_tr = float(k["transient_m"])
+    D_final = float(k["diameter_m"])
+    width_m = float(k["width_m"])
+    length_m = float(k["length_m"])
+    depth_m = float(k["depth_m"])
+    rim_h_m = float(k["rim_height_m"])
+    ejecta_mass = float(k["ejecta_mass_kg"])
+    E_mt = float(k["energy_mt"])
+    shape = "elliptical" if bool(k["elliptical"]) else "circular"
+
+    if trace_enabled():
+        log.debug("[CRATER] input: size=%sм, speed=%sкм/с, angle=%s°; rho_i=%s, rho_t=%s, g=%s",
+                  size, speed, angle, rho_i, rho_t, g)
+        log.debug("[CRATER] D_tr=%.1fм → D_final=%.1fм (%.3fкм), shape=%s", D_tr, D_final, D_final / 1000, shape)
+        if shape == "elliptical":
+            log.debug("[CRATER] width=%.1fм, length=%.1fм, elong≈%.2f", width_m, length_m, length_m / width_m)
+        log.debug("[CRATER] depth≈%.1fм (%.3fкм), rim≈%.1fм", depth_m, depth_m / 1000, rim_h_m)
+        log.debug("[CRATER] ejecta_mass≈%.3eкг; energy≈%.3fМт", ejecta_mass, E_mt)
+
+    return crater_result(width_m, length_m, depth_m, rim_h_m, ejecta_mass, E_mt, shape == "elliptical")
 
 def calculate_airblast(
     energy_mt: float,
@@ -167,219 +586,32 @@ def calculate_airblast(
       - Масштабування: R = R0 * E^(1/3).
       - Для повітряного підриву враховуємо «оптимальну висоту» (HOB), що найбільше розширює
         зони середніх/малих тисків (ефект Маха). Робимо це через просту гладку поправку.
+      Самі таблиці й формули — в airblast_kernel (AIRBLAST_*).
     """
-    # захист від нулів/некоректних значень
-    E_mt = max(float(energy_mt), 0.0)
-    E13 = (E_mt if E_mt > 1e-9 else 1e-9) ** (1/3)  # кубічний корінь для масштабування
-
-    # БАЗОВІ РАДІУСИ (км) для 1 Мт ПО-ЗЕМЛІ (surface burst)
-    # ці значення близькі до узагальнених ядерних таблиць для рівня землі
-    base_surface = {
-        100: 3.0,   # ≈14.5 psi
-        50:  4.5,   # ≈7.3  psi
-        20:  7.0,   # ≈2.9  psi
-        5:   12.0,  # ≈0.73 psi
-        1:   20.0,  # ≈0.15 psi
-    }
-
-    # ОПТИМАЛЬНА ВИСОТА ПОВІТРЯНОГО ПІДРИВУ (HOB) ДЛЯ МАКСИМУМУ РАДІУСУ певного тиску (на 1 Мт, у км)
-    # наближені значення: високі тиски нижче, малі тиски вище
-    opt_hob_km_1Mt = {
-        100: 0.5,
-        50:  1.0,
-        20:  1.8,
-        5:   3.0,
-        1:   7.0,
-    }
-
-    # "Посилення" радіуса від повітряного підриву поблизу оптимуму (множники при максимумі)
-    # для високих тисків ефект невеликий, для 5–1 кПа помітний.
-    # Також для 100 кПа ми навіть трохи "штрафуємо" — надвисокі тиски менші при HOB.
-    hob_peak_gain = {
-        100: 0.00,  # -0% (можна навіть -0.1, якщо хочеш)
-        50:  0.10,  # +10%
-        20:  0.20,  # +20%
-        5:   0.35,  # +35%
-        1:   0.25,  # +25%
-    }
-    # ширина "дзвоника" навколо оптимуму (скільки км в масштабі 1 Мт)
-    hob_sigma_km_1Mt = {
-        100: 0.6,
-        50:  1.0,
-        20:  1.6,
-        5:   2.5,
-        1:   4.0,
-    }
-
-    # Якщо в режимі "air" або "auto", нам потрібна висота. Якщо None — оберемо опт для 5 кПа.
-    # Масштабуємо оптимум з 1 Мт до потрібної енергії: H_opt(E) ~ H_opt(1Mt) * E^(1/3)
-    auto = (burst_mode in ("air", "auto"))
-    if auto and burst_height_m is None:
-        # максимізація зони важких руйнувань (5 кПа) — типова задача "оптимального HOB"
-        opt_h_km = opt_hob_km_1Mt[5] * E13
-        burst_height_m = opt_h_km * 1000.0
+    k = airblast_kernel(energy_mt, burst_mode=burst_mode, burst_height_m=burst_height_m)
+    H = k["burst_height_m"]
+    H = None if H is None else float(H)
+    radii = k["radius_km"].tolist()
+    mults = k["multiplier"].tolist()
 
-    # корисні допоміжні
-    def airburst_multiplier(pressure_kpa: int, H_m: float) -> float:
-        """
-        Гладка поправка для повітряного підриву: 1 + gain * exp(- (ΔH)^2 / (2σ^2)),
-        де ΔH — різниця між H і оптимальною HOB для цього тиску.
-        Якщо режим surface → множник = 1.
-        """
-        if burst_mode == "surface" or H_m is None:
-            return 1.0
-        # масштабовані параметри для поточного E
-        opt_km = opt_hob_km_1Mt[pressure_kpa] * E13
-        sigma_km = hob_sigma_km_1Mt[pressure_kpa]
-        gain = hob_peak_gain[pressure_kpa]
-        H_km = H_m / 1000.0
-        d = (H_km - opt_km)
-        # гаусів "дзвоник" навколо оптимуму
-        m = 1.0 + gain * math.exp(-0.5 * (d / sigma_km) ** 2)
-        return max(0.7, m)  # не даємо впасти нижче 0.7 × surface
-
-    # ШВИДКІСТЬ ВІТРУ при даному тиску (грубе наближення для пікової швидкості, м/с)
-    # Значення підібрані за довідковими кривими: 1 кПа ~ 35–45 м/с; 5 кПа ~ 70–110; 20 кПа ~150–190; 50 кПа ~220–260; 100 кПа ~280–320
-    wind_lookup = {
-        1:   (35, 45),
-        5:   (80, 110),
-        20:  (150, 190),
-        50:  (220, 260),
-        100: (280, 320),
-    }
-    def wind_mid_ms(p_kpa: int) -> int:
-        lo, hi = wind_lookup[p_kpa]
-        return int(round((lo + hi) / 2))
-
-    # ОПИС НАСЛІДКІВ — акуратний, реалістний
-    effects_map = {
-        100: ("Майже повне знищення будівель; бетон/цегла руйнуються.", "Дуже висока летальність"),
-        50:  ("Важкі руйнування: обвал стін, перекриттів; перекидання важкого транспорту.", "Високі втрати"),
-        20:  ("Серйозні пошкодження: частковий обвал, травми від уламків.", "Помірні–високі втрати"),
-        5:   ("Легкі–помірні пошкодження: вибиті вікна, пошкоджені дахи, травми осколками.", "Низькі–помірні втрати"),
-        1:   ("Масове биття скла; легкі поранення уламками скла.", "Низькі"),
-    }
-    color_map = {
-        100: "#8B0000",
-        50:  "#DC143C",
-        20:  "#FF4500",
-        5:   "#FFA500",
-        1:   "#FFD700",
-    }
+    if trace_enabled():
+        for p, R_surf, R_km, mult in zip(AIRBLAST_PRESSURES, k["surface_km"].tolist(), radii, mults):
+            lo, hi = AIRBLAST_WIND_MS[p]
+            log.debug("[AIRBLAST] %3d кПа: R_surf≈%.2f км → R≈%.2f км (mode=%s, mult=%.2f), wind~%d м/с",
+                      p, R_surf, R_km, burst_mode, mult, int(round((lo + hi) / 2)))
 
-    # РОЗРАХУНОК
-    pressures = [100, 50, 20, 5, 1]  # кПа
-    zones: List[Dict] = []
-    for p in pressures:
-        base_km = base_surface[p]
-        # поверхневий базовий радіус, масштабований по E^(1/3)
-        R_km_surface = base_km * E13
-        # мультиплікатор для airburst (якщо застосовний)
-        mult = airburst_multiplier(p, burst_height_m)
-        R_km = R_km_surface * mult
-
-        # запис зони (старі ключі збережені)
-        wind = wind_mid_ms(p)
-        eff_txt, cas_txt = effects_map[p]
-        zones.append({
-            "type": (
-                "total_destruction" if p == 100 else
-                "heavy_damage"      if p == 50  else
-                "moderate_damage"   if p == 20  else
-                "light_damage"      if p == 5   else
-                "glass_breakage"
-            ),
-            "radius_km": round(R_km, 2),
-            "pressure_kpa": p,
-            "effects": eff_txt,
-            "casualties": cas_txt,
-            "color": color_map[p],
-            # нові, не обов'язкові:
-            "wind_ms": wind,
-            "notes": (
-                "Поверхневий вибух" if burst_mode == "surface"
-                else f"Повітряний вибух, HOB≈{int(round((burst_height_m or 0)/1000))} км, множник {mult:.2f}"
-            ),
-        })
-
-        # DEBUG
-        print(f"[AIRBLAST] {p:>3} кПа: R_surf≈{R_km_surface:.2f} км → R≈{R_km:.2f} км "
-              f"(mode={burst_mode}, mult={mult:.2f}), wind~{wind} м/с")
-
-    return zones
+    return airblast_zones(radii, mults, burst_mode, H)
 
 
 def calculate_thermal(energy_mt: float, altitude_km: float = 0) -> List[Dict]:
     """Розрахунок теплового випромінювання"""
-    zones = []
-    
-    
-    # Третій ступінь опіків (повна товщина шкіри)
-    thermal_3rd = 0.6 * (energy_mt ** 0.41)
-    zones.append({
-        "type": "third_degree_burns",
-        "radius_km": round(thermal_3rd, 2),
-        "temperature_c": 2000,
-        "effects": "Опіки 3-го ступеня",
-        "casualties": "Критичні опіки, висока летальність",
-        "ignition": "Займання всього легкозаймистого",
-        "color": "#FF0000"
-    })
-    
-    # Другий ступінь опіків
-    thermal_2nd = 0.9 * (energy_mt ** 0.41)
-    zones.append({
-        "type": "second_degree_burns",
-        "radius_km": round(thermal_2nd, 2),
-        "temperature_c": 1000,
-        "effects": "Опіки 2-го ступеня",
-        "casualties": "Важкі опіки, потрібна госпіталізація",
-        "ignition": "Займання одягу, дерева",
-        "color": "#FF6347"
-    })
-    
-    # Перший ступінь опіків
-    thermal_1st = 1.5 * (energy_mt ** 0.41)
-    zones.append({
-        "type": "first_degree_burns",
-        "radius_km": round(thermal_1st, 2),
-        "temperature_c": 400,
-        "effects": "Опіки 1-го ступеня",
-        "casualties": "Болючі, але не небезпечні для життя",
-        "ignition": "Почервоніння шкіри",
-        "color": "#FFA07A"
-    })
-    
-    return zones
+    return thermal_zones(thermal_kernel(energy_mt).tolist())
 
 
 def calculate_seismic(energy_mt: float) -> List[Dict]:
     """Розрахунок сейсмічних ефектів"""
-    zones = []
-    
-    # Магнітуда землетрусу за шкалою Рихтера
-    magnitude = 0.67 * math.log10(energy_mt) + 4.87
-    
-    # MMI шкала на різних відстанях
-    mmi_zones = [
-        {"mmi": 12, "radius": 0.1 * (energy_mt ** 0.33), "effects": "Тотальне знищення, зміщення ґрунту", "color": "#4B0082"},
-        {"mmi": 10, "radius": 0.3 * (energy_mt ** 0.33), "effects": "Руйнування більшості споруд", "color": "#8B008B"},
-        {"mmi": 8, "radius": 0.6 * (energy_mt ** 0.33), "effects": "Значні пошкодження будівель", "color": "#9370DB"},
-        {"mmi": 6, "radius": 1.2 * (energy_mt ** 0.33), "effects": "Відчутні струси, тріщини", "color": "#BA55D3"},
-        {"mmi": 4, "radius": 2.5 * (energy_mt ** 0.33), "effects": "Помітні коливання", "color": "#DDA0DD"}
-    ]
-    
-    for zone in mmi_zones:
-        zones.append({
-            "type": f"seismic_mmi_{zone['mmi']}",
-            "radius_km": round(zone["radius"], 2),
-            "mmi": zone["mmi"],
-            "magnitude_richter": round(magnitude, 2),
-            "effects": zone["effects"],
-            "color": zone["color"]
-        })
-    
-    return zones
+    k = seismic_kernel(energy_mt)
+    return seismic_zones(float(k["magnitude"]), k["radius_km"].tolist())
 
 
 
@@ -392,90 +624,86 @@ def calculate_tsunami(
     Прості 'кільця цунамі' для мапи: радіуси за порогами офшорної висоти хвилі.
     БЕЗ пошуку узбереж, без складних шолінгів — тільки наочні зони.
     """
-    g = 9.81
-    E_mt = max(0.0, float(energy_mt))
+    k = tsunami_kernel(energy_mt, water_depth_m, period_min)
+    return tsunami_result(
+        float(k["wave_speed_kmh"]),
+        float(k["wavelength_km"]),
+        float(k["initial_height_m"]),
+        k["radius_km"].tolist(),
+        k["arrival_time_min"].tolist(),
+    )
 
-    # 1) Офшорна швидкість і довжина хвилі (інфо)
-    c_ms = math.sqrt(g * water_depth_m)
-    c_kmh = c_ms * 3.6
-    T_s = period_min * 60.0
-    wavelength_km = (c_ms * T_s) / 1000.0
 
-    # 2) Початкова офшорна висота біля епіцентра (проста енергетична оцінка)
-    K = 0.25
-    H0 = K * math.sqrt(E_mt)           # м
-    r0 = 10.0                          # км, стабілізація центру
-
-    # 3) Пороги офшорної висоти для кілець (м)
-    thresholds = [
-        ("tsunami_extreme",    30.0,   "#6b0000", "Immediate evacuation. High risk of flooding >10 m in coastal lowlands."),
-        ("tsunami_major",      15,   "#a50000", "Evacuate to heights >20 m. Multiple waves, strong currents."),
-        ("tsunami_moderate",   7,   "#d45500", "Avoid coastline, harbors, bridges. Increased caution."),
-        ("tsunami_minor",      3,   "#f6a800", "Possible flooding of lowlands, dangerous currents in ports."),
-        ("tsunami_information",0.0,   "#ffd166", "Weak sea level fluctuations, local currents."),
-    ]
-    # 4) Знаходження радіуса для порогу H_thr:
-    #    H(r) = H0 * sqrt(r0/(r+r0)) ⇒ r = r0 * (H0/H_thr)^2 - r0
-    def radius_for(H_thr: float) -> float:
-        if H_thr <= 0:
-            return 4.0 * r0  # просто велике зовнішнє кільце
-        if H0 <= 1e-9:
-            return 0.0
-        r = r0 * (H0 / H_thr)**2 - r0
-        return max(0.0, r)
+# Діапазон базової відстані між точками удару фрагментів (км, множиться на номер фрагмента)
+FRAGMENT_SEPARATION_KM = (2, 10)
 
-    zones: List[Dict] = []
-    prev_radius = 0.0
-    for label, H_thr, color, advice in thresholds:
-        R = radius_for(H_thr)
-        # монотонізуємо (щоб не було накладання при малих E)
-        R = max(R, prev_radius)
-        prev_radius = R
-
-        eta_min = (R / c_kmh) * 60.0 if c_kmh > 1e-6 else float('inf')
-        zones.append({
-            "type": label,
-            "radius_km": round(R, 1),
-            "wave_height_m": round(H_thr, 2),  # порогова офшорна висота на межі кільця
-            "arrival_time_min": round(eta_min, 1),
-            "advice": advice,
-            "color": color,
-        })
 
+def fragmentation_kernel(size, total_energy_mt, separation_draws, fragments: int = 3) -> Dict[str, np.ndarray]:
+    """
+    Векторний розподіл енергії між фрагментами.
+    separation_draws форми (fragments, ...) — базові відстані з FRAGMENT_SEPARATION_KM для кожного фрагмента.
+    Усі результати мають форму (fragments, ...).
+    """
+    size = np.asarray(size, dtype=float)
+    E = np.asarray(total_energy_mt, dtype=float)
+    draws = np.asarray(separation_draws, dtype=float)
+    i = np.arange(fragments, dtype=float).reshape((-1,) + (1,) * max(E.ndim, size.ndim, draws.ndim - 1))
+
+    # Розмір фрагмента (найбільший ~40%, інші менші)
+    size_factor = (fragments - i) / fragments
+    norm = float(((fragments - np.arange(fragments, dtype=float)) ** 1.5).sum())
+    frag_energy_mt = E * (size_factor ** 1.5) / norm
     return {
-        "wave_speed_kmh": round(c_kmh, 1),
-        "wavelength_km": round(wavelength_km, 1),
-        "initial_height_m": round(H0, 2),
-        "zones": zones
+        "size_m": size * (size_factor ** 0.7),
+        "energy_mt": frag_energy_mt,
+        # Відстань між точками удару (залежить від висоти розпаду)
+        "separation_km": draws * (i + 1),
+        "blast_radius_km": 0.5 * (frag_energy_mt ** (1/3)),
     }
 
 
-def calculate_fragmentation(size: float, speed: float, material: str, fragments: int = 3) -> Dict:
-    """Розрахунок для розколу на фрагменти"""
-    total_energy = calculate_energy(size, speed, material)
-    
+def fragmentation_result(
+    size: float,
+    total_energy_mt: float,
+    fragments: int = 3,
+    rng=None,
+    altitude_km: Optional[float] = None,
+) -> Dict:
+    """
+    Розподіл уже порахованої енергії між фрагментами.
+    rng — джерело випадковості з інтерфейсом random.Random (за замовчуванням глобальний random).
+    altitude_km — висота розпаду з моделі входу (entry.py); None — тіло не розпалось.
+    """
+    rng = rng or random
+    draws = [rng.uniform(*FRAGMENT_SEPARATION_KM) for _ in range(fragments)]
+    k = fragmentation_kernel(size, total_energy_mt, draws, fragments)
+
     # Розподіл енергії між фрагментами (більший отримує більше)
     fragment_data = []
-    
-    for i in range(fragments):
-        # Розмір фрагмента (найбільший ~40%, інші менші)
-        size_factor = (fragments - i) / fragments
-        frag_size = size * (size_factor ** 0.7)
-        frag_energy_mt = total_energy["energy_mt"] * (size_factor ** 1.5) / sum([(fragments - j) ** 1.5 for j in range(fragments)])
-        
-        # Відстань між точками удару (залежить від висоти розпаду)
-        separation_km = random.uniform(2, 10) * (i + 1)
-        
+    for i, (frag_size, frag_energy_mt, separation_km, blast_km) in enumerate(zip(
+        k["size_m"].tolist(), k["energy_mt"].tolist(),
+        k["separation_km"].tolist(), k["blast_radius_km"].tolist(),
+    )):
         fragment_data.append({
             "id": i + 1,
             "size_m": round(frag_size, 1),
             "energy_mt": round(frag_energy_mt, 3),
             "separation_km": round(separation_km, 1),
-            "blast_radius_km": round(0.5 * (frag_energy_mt ** (1/3)), 2)
+            "blast_radius_km": round(blast_km, 2)
         })
-    
+
     return {
         "fragments": fragment_data,
-        "total_energy_mt": total_energy["energy_mt"],
-        "fragmentation_altitude_km": round(20 + random.uniform(-5, 5), 1)
-    }
\ No newline at end of file
+        "total_energy_mt": total_energy_mt,
+        "fragmentation_altitude_km": altitude_km,
+    }
+
+
+def calculate_fragmentation(
+    size: float, speed: float, material: str, fragments: int = 3, rng=None, angle: float = 45.0
+) -> Dict:
+    """Розрахунок для розколу на фрагменти (висота розпаду — з моделі входу в атмосферу)"""
+    total_energy = calculate_energy(size, speed, material)
+    m = MATERIALS[material]
+    entry = calculate_entry(size, speed, angle, m["density"], m["strength"], profile=False)
+    return fragmentation_result(size, total_energy["energy_mt"], fragments, rng, entry["breakup_altitude_km"])
@@ -1,5 +1,12 @@
 import math
-from typing import Dict, List
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from population import get_population_backend
+from exposure import exposure_source, get_exposure_backend
+from probit import casualty_model, probit_casualties, probit_event_casualties
+from sites import get_city_index, get_site_index
 
 # Апроксимація густини населення по регіонах (люд/км²)
 POPULATION_DENSITY_REGIONS = {
@@ -26,35 +33,46 @@ INFRASTRUCTURE_VALUE = {
 }
 
 
-def estimate_population_density(lat: float, lon: float) -> Dict:
-    """Оцінка густини населення на основі координат"""
-    
-    # Великі міста світу (апроксимація)
-    major_cities = [
-        {"name": "Токіо", "lat": 35.6, "lon": 139.7, "density": 15000},
-        {"name": "Дакка", "lat": 23.8, "lon": 90.4, "density": 20000},
-        {"name": "Манхеттен", "lat": 40.7, "lon": -74.0, "density": 28000},
-        {"name": "Мумбаї", "lat": 19.0, "lon": 72.8, "density": 20000},
-        {"name": "Київ", "lat": 50.4, "lon": 30.5, "density": 3500},
-        {"name": "Лондон", "lat": 51.5, "lon": -0.1, "density": 5700},
-        {"name": "Париж", "lat": 48.8, "lon": 2.3, "density": 21000},
-        {"name": "Москва", "lat": 55.7, "lon": 37.6, "density": 4900},
-        {"name": "Шанхай", "lat": 31.2, "lon": 121.5, "density": 7700},
-    ]
-    
-    # Перевірка близькості до великих міст
-    for city in major_cities:
-        distance = calculate_distance(lat, lon, city["lat"], city["lon"])
-        if distance < 50:  # В радіусі 50 км від міста
-            decay_factor = max(0.1, 1 - (distance / 50))
-            return {
-                "area_type": "urban",
-                "density": int(city["density"] * decay_factor),
-                "nearest_city": city["name"],
-                "distance_km": round(distance, 1)
-            }
-    
-    # Базова оцінка по широті
+CITY_RADIUS_KM = 50  # В радіусі 50 км від міста
+
+# Ризики для об'єктів: рівні важкості та базовий рівень для зони ударної хвилі
+SEVERITY_LEVELS = ("critical", "high", "medium", "low")
+ZONE_SEVERITY_RANK = {
+    "total_destruction": 0,
+    "heavy_damage": 0,
+    "moderate_damage": 1,
+    "light_damage": 2,
+    "glass_breakage": 3,
+}
+# Об'єкти з вторинною небезпекою — на рівень вище
+HAZARDOUS_SITE_TYPES = {"nuclear", "chemical", "dam"}
+SITE_TYPE_LABELS = {
+    "nuclear": "АЕС",
+    "dam": "Дамба",
+    "chemical": "Хімічний завод",
+    "airport": "Аеропорт",
+    "power": "Електростанція",
+    "city": "Місто",
+    "other": "Об'єкт",
+}
+MAX_REPORTED_SITES = 200
+# Шаблони описів ризиків (поля підставляються з самого запису ризику; "site" — об'єкти з індексу)
+RISK_DESCRIPTIONS = {
+    "major_city": "Велике місто ({name}) в зоні ураження",
+    "industrial": "Ймовірність вторинних вибухів на підприємствах",
+    "site": "{label} {name} в зоні ураження ({distance_km:.1f} км)",
+}
+
+
+def risk_description(risk: Dict) -> str:
+    """Опис ризику за шаблоном RISK_DESCRIPTIONS"""
+    template = RISK_DESCRIPTIONS.get(risk["type"], RISK_DESCRIPTIONS["site"])
+    label = SITE_TYPE_LABELS.get(risk["type"], risk["type"])
+    return template.format(label=label, **risk)
+
+
+def _regional_density(lat: float, lon: float) -> Dict:
+    """Базова оцінка по широті (поза великими містами)"""
     abs_lat = abs(lat)
     
     # Екватор - тропіки (висока густота в Азії/Африці)
@@ -80,6 +98,82 @@ def estimate_population_density(lat: float, lon: float) -> Dict:
         return {"area_type": "rural", "density": 5, "nearest_city": "Remote region", "distance_km": 0}
 
 
+def estimate_population_density_batch(lats, lons) -> List[Dict]:
+    """Оцінка густини населення для масивів координат (найближче місто з індексу)"""
+    lats = np.asarray(lats, dtype=float)
+    lons = np.asarray(lons, dtype=float)
+    index = get_city_index()
+    nearest, dist = index.nearest_within_batch(lats, lons, CITY_RADIUS_KM)
+
+    result = []
+    for lat, lon, ci, d in zip(lats.tolist(), lons.tolist(), nearest.tolist(), dist.tolist()):
+        if ci >= 0 and d < CITY_RADIUS_KM:
+            city = index.sites[ci]
+            decay_factor = max(0.1, 1 - (d / CITY_RADIUS_KM))
+            result.append({
+                "area_type": "urban",
+                "density": int(city["density"] * decay_factor),
+                "nearest_city": city["name"],
+                "distance_km": round(d, 1)
+            })
+        else:
+            result.append(_regional_density(lat, lon))
+    return result
+
+
+def estimate_population_density(lat: float, lon: float) -> Dict:
+    """Оцінка густини населення на основі координат"""
+    return estimate_population_density_batch([lat], [lon])[0]
+
+
+class LocationContext:
+    """
+    Точка удару для всіх споживачів одного запиту (втрати, збитки, стратегічні ризики):
+    оцінка населення (пошук найближчого міста) робиться один раз — при першому зверненні
+    або заздалегідь (info), суми растру активів по колах запам'ятовуються за радіусом.
+    """
+
+    def __init__(self, lat: float, lon: float, info: Optional[Dict] = None):
+        self.lat = lat
+        self.lon = lon
+        self._info = info
+        self._asset_discs: Dict[float, float] = {}
+
+    @property
+    def info(self) -> Dict:
+        """Відповідь estimate_population_density (поле location у /impact)"""
+        if self._info is None:
+            self._info = estimate_population_density(self.lat, self.lon)
+        return self._info
+
+    @property
+    def density(self) -> float:
+        return self.info["density"]
+
+    def asset_value(self, radius_km: float) -> float:
+        """Вартість активів ($) у колі radius_km з растру ASSET_RASTER"""
+        if radius_km not in self._asset_discs:
+            self._asset_discs[radius_km] = get_exposure_backend().disc_population(self.lat, self.lon, radius_km)
+        return self._asset_discs[radius_km]
+
+
+def location_context(lat: float, lon: float) -> LocationContext:
+    """Контекст точки з уже порахованою оцінкою населення (для етапу population)"""
+    location = LocationContext(lat, lon)
+    location.info
+    return location
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Векторна відстань великого кола (км) з броадкастингом numpy"""
+    lat1 = np.radians(lat1)
+    lat2 = np.radians(lat2)
+    dlat = lat2 - lat1
+    dlon = np.radians(np.asarray(lon2) - np.asarray(lon1))
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2) ** 2
+    return 2 * 6371 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+
 def calculate_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
     """Відстань між двома точками (км)"""
     R = 6371  # Радіус Землі
@@ -92,158 +186,322 @@ def calculate_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> fl
     return R * c
 
 
-def calculate_casualties(airblast_zones: List[Dict], lat: float, lon: float) -> Dict:
-    """Розрахунок людських втрат"""
+# Коефіцієнти (смертність, травми) залежно від зони ударної хвилі
+CASUALTY_RATES = {
+    "total_destruction": (0.95, 0.05),
+    "heavy_damage":      (0.70, 0.25),
+    "moderate_damage":   (0.25, 0.60),
+    "light_damage":      (0.05, 0.50),
+    "glass_breakage":    (0.0,  0.15),
+}
+
+# Частка знищеної вартості інфраструктури в зоні (інші зони — 0.1)
+ECONOMIC_DAMAGE_FRACTION = {
+    "total_destruction": 1.0,   # 100% знищення
+    "heavy_damage":      0.7,   # 70% пошкодження
+    "moderate_damage":   0.4,   # 40% пошкодження
+}
+FIRE_DAMAGE_FRACTION = 0.3      # 30% додаткових збитків від пожеж
+INDUSTRIAL_MULTIPLIER = 1.5
+URBAN_INFRA_TYPES = ["megacity", "urban_dense", "urban"]
+
+
+def _zone_axis(values, ndim: int) -> np.ndarray:
+    """Стовпчик коефіцієнтів зон, що броадкаститься з масивом (Z, ...)"""
+    return np.asarray(values, dtype=float).reshape((-1,) + (1,) * (ndim - 1))
+
+
+def casualties_kernel(radii_km, density, zone_types: List[str], lat=None, lon=None, thermal_radii_km=None) -> Dict[str, np.ndarray]:
+    """
+    Векторні втрати: radii_km форми (Z, ...) у порядку zone_types, density/lat/lon броадкастяться з (...).
+    Населення зон дає поточне джерело населення (population.get_population_backend).
+    CASUALTY_MODEL=probit — неперервні поля тиску й тепла (thermal_radii_km (3, ...) або None).
+    Цілі значення (як int() у скалярному шляху) повертаються як float64 без дробової частини.
+    """
+    radii = np.asarray(radii_km, dtype=float)
+    if casualty_model() == "probit":
+        return probit_casualties(radii, density, zone_types, lat, lon, thermal_radii_km, get_population_backend())
+    population = get_population_backend().zone_populations_batch(lat, lon, radii, density)
+    return casualties_from_population(population, zone_types)
+
+
+def casualties_from_population(population, zone_types: List[str]) -> Dict[str, np.ndarray]:
+    """Втрати з населення зон форми (Z, ...) за коефіцієнтами CASUALTY_RATES"""
+    population = np.asarray(population, dtype=float)
+    rates = [CASUALTY_RATES.get(t, (0.0, 0.0)) for t in zone_types]
+    deaths = np.trunc(population * _zone_axis([r[0] for r in rates], population.ndim))
+    injuries = np.trunc(population * _zone_axis([r[1] for r in rates], population.ndim))
+    return {
+        "population": population,
+        "deaths": deaths,
+        "injuries": injuries,
+        "total_deaths": deaths.sum(axis=0),
+        "total_injuries": injuries.sum(axis=0),
+        "affected_population": population.sum(axis=0),
+    }
+
+
+def infrastructure_type(density: float) -> str:
+    """Визначення типу області для економічної оцінки"""
+    if density > 10000:
+        return "megacity"
+    elif density > 3000:
+        return "urban_dense"
+    elif density > 800:
+        return "urban"
+    elif density > 200:
+        return "suburban"
+    else:
+        return "rural"
+
+
+def economic_kernel(airblast_radii_km, zone_types: List[str], fire_radius_km, density, lat=None, lon=None) -> Dict[str, np.ndarray]:
+    """
+    Векторні економічні збитки. airblast_radii_km форми (Z, ...) — лише зони, що враховуються
+    (у скалярному шляху перші 3), fire_radius_km — радіус першої теплової зони або None.
+    З растром активів (ASSET_RASTER) і lat/lon вартість інтегрується по кільцях.
+    """
+    areas = [math.pi * (np.asarray(radius, dtype=float) ** 2) for radius in airblast_radii_km]
+    fire_area = None if fire_radius_km is None else math.pi * (np.asarray(fire_radius_km, dtype=float) ** 2)
+    exposure = get_exposure_backend()
+    if exposure is None or lat is None:
+        return economic_from_areas(areas, zone_types, fire_area, density)
+    radii = np.asarray(airblast_radii_km, dtype=float)
+    annuli = exposure.zone_populations_batch(lat, lon, radii)
+    fire_value = None
+    if fire_radius_km is not None:
+        fire_value = exposure.zone_populations_batch(lat, lon, np.asarray(fire_radius_km, dtype=float)[None])[0]
+    return economic_from_exposure(annuli, zone_types, fire_value, areas)
+
+
+def economic_from_exposure(annuli_usd, zone_types: List[str], fire_value_usd, areas_km2) -> Dict[str, np.ndarray]:
+    """
+    Економічні збитки з вартості активів кілець ($, форма (Z, ...)) і кола пожеж (або None).
+    Промисловий множник не застосовується — промислові активи вже в растрі.
+    base_value — середня вартість км² у найбільшому колі.
+    """
+    annuli = np.asarray(annuli_usd, dtype=float)
+    total = np.zeros(annuli.shape[1:])
+    affected = np.zeros_like(total)
+    for value, area_km2, zone_type in zip(annuli, areas_km2, zone_types):
+        total = total + value * ECONOMIC_DAMAGE_FRACTION.get(zone_type, 0.1)
+        affected = affected + area_km2
+
+    fire_damage = None
+    if fire_value_usd is not None:
+        fire_damage = np.asarray(fire_value_usd, dtype=float) * FIRE_DAMAGE_FRACTION
+        total = total + fire_damage
+
+    exposed = annuli.sum(axis=0)
+    largest = np.asarray(areas_km2[-1], dtype=float) if len(areas_km2) else np.zeros(())
+    with np.errstate(divide="ignore", invalid="ignore"):
+        base_value = np.where(largest > 0, exposed / largest, 0.0)
+    return {
+        "total_damage_usd": np.trunc(total),
+        "affected_area_km2": affected,
+        "fire_damage": fire_damage,
+        "base_value": base_value,
+        "exposed_value_usd": exposed,
+    }
+
+
+def economic_from_areas(areas_km2, zone_types: List[str], fire_area_km2, density) -> Dict[str, np.ndarray]:
+    """Економічні збитки з площ зон (км²) форми (Z, ...) і площі пожеж (або None)"""
+    density = np.asarray(density, dtype=float)
+    base_value = np.select(
+        [density > 10000, density > 3000, density > 800, density > 200],
+        [INFRASTRUCTURE_VALUE[t] for t in ("megacity", "urban_dense", "urban", "suburban")],
+        INFRASTRUCTURE_VALUE["rural"],
+    ).astype(float)
+
+    total = np.zeros(np.broadcast_shapes(np.shape(areas_km2)[1:], density.shape))
+    affected = np.zeros_like(total)
+    # послідовне додавання — той самий порядок операцій, що й у скалярному шляху
+    for area_km2, zone_type in zip(areas_km2, zone_types):
+        total = total + base_value * area_km2 * ECONOMIC_DAMAGE_FRACTION.get(zone_type, 0.1)
+        affected = affected + area_km2
+
+    fire_damage = None
+    if fire_area_km2 is not None:
+        fire_damage = base_value * fire_area_km2 * FIRE_DAMAGE_FRACTION
+        total = total + fire_damage
+
+    urban = density > 800
+    total = np.where(urban, total * INDUSTRIAL_MULTIPLIER, total)
+    return {
+        "total_damage_usd": np.trunc(total),
+        "affected_area_km2": affected,
+        "fire_damage": fire_damage,
+        "base_value": base_value,
+    }
+
+
+def calculate_casualties(
+    airblast_zones: List[Dict],
+    lat: float,
+    lon: float,
+    location: Optional[LocationContext] = None,
+    thermal_zones: Optional[List[Dict]] = None,
+) -> Dict:
+    """
+    Розрахунок людських втрат (location — спільний контекст точки запиту).
+    thermal_zones потрібні лише моделі probit (опіки від теплового імпульсу).
+    """
     
-    pop_info = estimate_population_density(lat, lon)
+    if location is None:
+        location = LocationContext(lat, lon)
+    pop_info = location.info
     base_density = pop_info["density"]
     
+    zone_types = [zone["type"] for zone in airblast_zones]
+    backend = get_population_backend()
+    radii = [zone["radius_km"] for zone in airblast_zones]
+    model = casualty_model()
+    if model == "probit":
+        thermal = [zone["radius_km"] for zone in thermal_zones] if thermal_zones else None
+        k = probit_event_casualties(radii, base_density, zone_types, lat, lon, thermal, backend)
+    else:
+        k = casualties_from_population(backend.zone_populations(lat, lon, radii, base_density), zone_types)
+        k = {key: k[key].tolist() for key in ("population", "deaths", "injuries")}
+    populations = [int(x) for x in k["population"]]
+    deaths = [int(x) for x in k["deaths"]]
+    injuries = [int(x) for x in k["injuries"]]
+    
     casualties = {
-        "total_deaths": 0,
-        "total_injuries": 0,
-        "affected_population": 0,
-        "zones": []
+        "total_deaths": sum(deaths),
+        "total_injuries": sum(injuries),
+        "affected_population": sum(populations),
+        "zones": [
+            {
+                "type": zone["type"],
+                "radius_km": zone["radius_km"],
+                "population": population,
+                "deaths": zone_deaths,
+                "injuries": zone_injuries
+            }
+            for zone, population, zone_deaths, zone_injuries
+            in zip(airblast_zones, populations, deaths, injuries)
+        ]
     }
     
-    for zone in airblast_zones:
-        area_km2 = math.pi * (zone["radius_km"] ** 2)
-        population = int(base_density * area_km2)
-        
-        # Коефіцієнти смертності залежно від зони
-        if zone["type"] == "total_destruction":
-            deaths = int(population * 0.95)
-            injuries = int(population * 0.05)
-        elif zone["type"] == "heavy_damage":
-            deaths = int(population * 0.70)
-            injuries = int(population * 0.25)
-        elif zone["type"] == "moderate_damage":
-            deaths = int(population * 0.25)
-            injuries = int(population * 0.60)
-        elif zone["type"] == "light_damage":
-            deaths = int(population * 0.05)
-            injuries = int(population * 0.50)
-        elif zone["type"] == "glass_breakage":
-            deaths = 0
-            injuries = int(population * 0.15)
-        else:
-            deaths = 0
-            injuries = 0
-        
-        casualties["total_deaths"] += deaths
-        casualties["total_injuries"] += injuries
-        casualties["affected_population"] += population
-        
-        casualties["zones"].append({
-            "type": zone["type"],
-            "radius_km": zone["radius_km"],
-            "population": population,
-            "deaths": deaths,
-            "injuries": injuries
-        })
-    
     casualties["population_density"] = base_density
     casualties["area_type"] = pop_info["area_type"]
     casualties["nearest_city"] = pop_info["nearest_city"]
+    casualties["population_source"] = backend.name
+    casualties["casualty_model"] = model
     
     return casualties
 
 
-def calculate_economic_damage(airblast_zones: List[Dict], thermal_zones: List[Dict], lat: float, lon: float) -> Dict:
-    """Розрахунок економічних збитків"""
+def calculate_economic_damage(
+    airblast_zones: List[Dict],
+    thermal_zones: List[Dict],
+    lat: float,
+    lon: float,
+    location: Optional[LocationContext] = None,
+) -> Dict:
+    """
+    Розрахунок економічних збитків. З растром активів (ASSET_RASTER) — вартість, проінтегрована
+    по кільцях ударної хвилі та колу пожеж; інакше — категорія INFRASTRUCTURE_VALUE × площа.
+    """
     
-    pop_info = estimate_population_density(lat, lon)
+    if location is None:
+        location = LocationContext(lat, lon)
     
-    # Визначення типу області для економічної оцінки
-    if pop_info["density"] > 10000:
-        infra_type = "megacity"
-    elif pop_info["density"] > 3000:
-        infra_type = "urban_dense"
-    elif pop_info["density"] > 800:
-        infra_type = "urban"
-    elif pop_info["density"] > 200:
-        infra_type = "suburban"
-    else:
-        infra_type = "rural"
+    infra_type = infrastructure_type(location.density)
     
-    base_value = INFRASTRUCTURE_VALUE[infra_type]
+    # Збитки від ударної хвилі — тільки перші 3 найсерйозніші зони,
+    # додатково пожежі від першої теплової зони
+    zones = airblast_zones[:3]
+    radii = [zone["radius_km"] for zone in zones]
+    zone_types = [zone["type"] for zone in zones]
+    fire_radius = thermal_zones[0]["radius_km"] if thermal_zones else None
+    exposure = get_exposure_backend()
+    if exposure is None:
+        k = economic_kernel(radii, zone_types, fire_radius, location.density)
+    else:
+        discs = np.array([location.asset_value(r) for r in radii], dtype=float)
+        k = economic_from_exposure(
+            np.maximum(np.diff(discs, prepend=0.0), 0.0),
+            zone_types,
+            None if fire_radius is None else location.asset_value(fire_radius),
+            [math.pi * r ** 2 for r in radii],
+        )
     
     damage = {
-        "total_damage_usd": 0,
+        "total_damage_usd": int(k["total_damage_usd"]),
         "by_type": {},
-        "affected_area_km2": 0
+        "affected_area_km2": float(k["affected_area_km2"]) if zones else 0
     }
+    if thermal_zones:
+        damage["by_type"]["fire_damage"] = float(k["fire_damage"])
     
-    # Збитки від ударної хвилі
-    for zone in airblast_zones[:3]:  # Тільки перші 3 найсерйозніші зони
-        area_km2 = math.pi * (zone["radius_km"] ** 2)
-        
-        if zone["type"] == "total_destruction":
-            zone_damage = base_value * area_km2 * 1.0  # 100% знищення
-        elif zone["type"] == "heavy_damage":
-            zone_damage = base_value * area_km2 * 0.7  # 70% пошкодження
-        elif zone["type"] == "moderate_damage":
-            zone_damage = base_value * area_km2 * 0.4  # 40% пошкодження
-        else:
-            zone_damage = base_value * area_km2 * 0.1
-        
-        damage["total_damage_usd"] += zone_damage
-        damage["affected_area_km2"] += area_km2
+    # Промислові об'єкти (якщо урбанізована зона); растр активів їх уже містить
+    if exposure is None and infra_type in URBAN_INFRA_TYPES:
+        damage["by_type"]["industrial_factor"] = INDUSTRIAL_MULTIPLIER
     
-    # Додаткові збитки від пожеж (теплове випромінювання)
-    if thermal_zones:
-        fire_area = math.pi * (thermal_zones[0]["radius_km"] ** 2)
-        fire_damage = base_value * fire_area * 0.3  # 30% додаткових збитків
-        damage["total_damage_usd"] += fire_damage
-        damage["by_type"]["fire_damage"] = fire_damage
-    
-    # Промислові об'єкти (якщо урбанізована зона)
-    if infra_type in ["megacity", "urban_dense", "urban"]:
-        industrial_multiplier = 1.5
-        damage["total_damage_usd"] *= industrial_multiplier
-        damage["by_type"]["industrial_factor"] = industrial_multiplier
-    
-    damage["total_damage_usd"] = int(damage["total_damage_usd"])
     damage["infrastructure_type"] = infra_type
-    damage["damage_per_km2"] = int(base_value)
+    damage["damage_per_km2"] = int(k["base_value"])
+    damage["exposure_source"] = exposure_source()
+    if exposure is not None:
+        damage["exposed_value_usd"] = int(k["exposed_value_usd"])
     
     return damage
 
 
-def calculate_strategic_risks(lat: float, lon: float, radius_km: float) -> List[Dict]:
-    """Оцінка ризиків для стратегічних об'єктів"""
+def calculate_strategic_risks(
+    lat: float,
+    lon: float,
+    radius_km: float,
+    location: Optional[LocationContext] = None,
+    zones: Optional[List[Dict]] = None,
+) -> List[Dict]:
+    """
+    Оцінка ризиків для стратегічних об'єктів.
+    zones — зони ударної хвилі (airblast); кожен об'єкт з індексу сайтів
+    відноситься до найменшої зони, що його накриває. Без zones — одна зона radius_km.
+    """
     
     risks = []
     
     # Великі міста в радіусі
-    pop_info = estimate_population_density(lat, lon)
+    if location is None:
+        location = LocationContext(lat, lon)
+    pop_info = location.info
     if pop_info["density"] > 3000:
-        risks.append({
-            "type": "major_city",
-            "description": f"Велике місто ({pop_info.get('nearest_city', 'невідоме')}) в зоні ураження",
-            "severity": "critical"
-        })
+        risk = {"type": "major_city", "name": pop_info.get("nearest_city") or "невідоме", "severity": "critical"}
+        risk["description"] = risk_description(risk)
+        risks.append(risk)
     
     # Промислові зони
     if pop_info["density"] > 1000:
-        risks.append({
-            "type": "industrial",
-            "description": "Ймовірність вторинних вибухів на підприємствах",
-            "severity": "high"
-        })
-    
-    # Ядерні об'єкти (спрощена оцінка по регіонах)
-    nuclear_regions = [
-        {"lat": 51.4, "lon": 30.1, "name": "Чорнобиль"},
-        {"lat": 47.5, "lon": 34.6, "name": "Запоріжжя"},
-    ]
-    
-    for nuc in nuclear_regions:
-        dist = calculate_distance(lat, lon, nuc["lat"], nuc["lon"])
-        if dist < radius_km:
-            risks.append({
-                "type": "nuclear",
-                "description": f"АЕС {nuc['name']} в зоні ураження ({dist:.1f} км)",
-                "severity": "critical"
-            })
+        risk = {"type": "industrial", "severity": "high"}
+        risk["description"] = risk_description(risk)
+        risks.append(risk)
+    
+    # Об'єкти з індексу (АЕС, дамби, хімзаводи, аеропорти, міста...) по кільцях ураження
+    if zones is None:
+        zones = [{"type": "total_destruction", "radius_km": radius_km}]
+    rings = sorted((z["radius_km"], z["type"]) for z in zones if "radius_km" in z)
+    if not rings:
+        return risks
+
+    found = []
+    for site, dist in get_site_index().within(lat, lon, rings[-1][0]):
+        zone_type = next(t for r, t in rings if dist <= r)
+        rank = ZONE_SEVERITY_RANK.get(zone_type, len(SEVERITY_LEVELS) - 1)
+        if site.get("type") in HAZARDOUS_SITE_TYPES:
+            rank = max(rank - 1, 0)
+        risk = {
+            "type": site.get("type", "other"),
+            "name": site.get("name", ""),
+            "severity": SEVERITY_LEVELS[rank],
+            "zone": zone_type,
+            "distance_km": round(dist, 1),
+        }
+        risk["description"] = risk_description(risk)
+        found.append((rank, dist, risk))
+    found.sort(key=lambda item: (item[0], item[1]))
+    risks.extend(risk for _, _, risk in found[:MAX_REPORTED_SITES])
     
-    return risks
\ No newline at end of file
+    return risks
@@ -0,0 +1,270 @@
+import csv
+import hashlib
+import math
+import os
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from constants import MATERIALS
+from calculations import AIRBLAST_PRESSURES, AIRBLAST_TYPES, airblast_kernel, energy_kernel, material_strength
+from casualties import casualties_from_population
+from entry import entry_kernel
+
+# Каталог NEO (експорт Sentry/CNEOS у CSV) і його колонкове сховище (.npz) з уже порахованими рядками
+NEO_CATALOG = os.environ.get("NEO_CATALOG")
+NEO_CATALOG_STORE = os.environ.get("NEO_CATALOG_STORE")  # за замовчуванням <NEO_CATALOG>.store.npz
+# Версія моделі: інша версія у сховищі — перерахунок усіх рядків
+CATALOG_MODEL_VERSION = 2
+
+# Припущення для тіл без відомих параметрів траєкторії та складу
+CATALOG_MATERIAL = "stone"
+CATALOG_ANGLE_DEG = 45.0          # найімовірніший кут входу
+EARTH_ESCAPE_KMS = 11.19          # v_imp = sqrt(v_inf² + v_esc²)
+# Діаметр з абсолютної зоряної величини H: D(км) = 1329 / sqrt(p) · 10^(-H/5), альбедо p у межах
+ALBEDO_RANGE = (0.05, 0.25)
+# Наслідки для випадкової точки удару: частка суходолу і середня густина населення суходолу (люди/км²)
+LAND_FRACTION = 0.29
+LAND_DENSITY = 54.0
+
+ZONE_TYPES = [AIRBLAST_TYPES[p] for p in AIRBLAST_PRESSURES]
+
+# Колонки входу та їхні назви у різних експортах (Sentry API, CNEOS CSV)
+INPUT_ALIASES = {
+    "designation": ("designation", "des", "object designation", "object", "fullname", "object name"),
+    "h_mag": ("h", "h (mag)", "h_mag"),
+    "diameter_km": ("diameter", "diameter_km", "estimated diameter (km)"),
+    "diameter_min_km": ("diameter_min", "diameter_min_km", "min diameter (km)"),
+    "diameter_max_km": ("diameter_max", "diameter_max_km", "max diameter (km)"),
+    "v_inf_kms": ("v_inf", "vinfinity (km/s)", "v_inf (km/s)"),
+    "impact_probability": ("ip", "impact probability (cumulative)", "impact_probability"),
+    "palermo_cum": ("ps_cum", "palermo scale (cum.)"),
+    "torino_max": ("ts_max", "torino scale (max.)"),
+}
+INPUT_COLUMNS = tuple(name for name in INPUT_ALIASES if name != "designation")
+# Виходи конвеєра у сховищі
+OUTPUT_COLUMNS = (
+    "diameter_m", "diameter_min_m", "diameter_max_m", "impact_speed_kms", "energy_mt",
+    "burst_altitude_km", "heavy_damage_radius_km", "glass_breakage_radius_km",
+    "deaths_if_impact", "expected_deaths",
+)
+SORT_COLUMNS = ("expected_deaths", "impact_probability", "energy_mt", "palermo_cum", "diameter_m")
+
+
+def read_catalog_csv(path: str) -> Dict[str, np.ndarray]:
+    """
+    CSV каталогу -> колонки (designation + INPUT_COLUMNS, nan — немає значення).
+    Рядки без діаметра (і без H), v_inf чи ймовірності пропускаються.
+    """
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        reader = csv.DictReader(f)
+        fields = {(name or "").strip().lower(): name for name in reader.fieldnames or ()}
+        source = {
+            column: next((fields[a] for a in aliases if a in fields), None)
+            for column, aliases in INPUT_ALIASES.items()
+        }
+        if source["designation"] is None:
+            raise ValueError("У каталозі немає колонки з позначенням об'єкта (designation)")
+        rows = []
+        for row in reader:
+            values = [_number(row.get(source[c])) if source[c] else math.nan for c in INPUT_COLUMNS]
+            rec = dict(zip(INPUT_COLUMNS, values))
+            has_size = not (math.isnan(rec["diameter_km"]) and math.isnan(rec["h_mag"])
+                            and math.isnan(rec["diameter_min_km"]))
+            if has_size and not math.isnan(rec["v_inf_kms"]) and not math.isnan(rec["impact_probability"]):
+                rows.append((row[source["designation"]].strip(), values))
+    columns = {"designation": np.array([d for d, _ in rows], dtype=str)}
+    values = np.array([v for _, v in rows], dtype=float).reshape(len(rows), len(INPUT_COLUMNS))
+    for i, name in enumerate(INPUT_COLUMNS):
+        columns[name] = values[:, i]
+    return columns
+
+
+def _number(text) -> float:
+    try:
+        return float(str(text).strip().lstrip("<>~"))
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def row_hashes(columns: Dict[str, np.ndarray]) -> np.ndarray:
+    """Хеш вмісту кожного рядка (позначення + вхідні параметри + версія моделі), uint64"""
+    values = np.stack([columns[c] for c in INPUT_COLUMNS], axis=1)
+    out = np.empty(len(values), dtype=np.uint64)
+    for i, (designation, row) in enumerate(zip(columns["designation"].tolist(), values)):
+        h = hashlib.blake2b(digest_size=8)
+        h.update(f"{CATALOG_MODEL_VERSION}|{designation}|".encode("utf-8"))
+        h.update(row.tobytes())
+        out[i] = int.from_bytes(h.digest(), "little")
+    return out
+
+
+def diameters_m(columns: Dict[str, np.ndarray]):
+    """(номінальний, мінімальний, максимальний) діаметр, м: з діапазону, з діаметра або з H і альбедо"""
+    d = columns["diameter_km"]
+    d_min, d_max = columns["diameter_min_km"], columns["diameter_max_km"]
+    h = columns["h_mag"]
+    from_h = 1329.0 * 10 ** (-h / 5)
+    h_min, h_max = from_h / math.sqrt(ALBEDO_RANGE[1]), from_h / math.sqrt(ALBEDO_RANGE[0])
+    lo = np.where(np.isfinite(d_min), d_min, np.where(np.isfinite(d), d, h_min))
+    hi = np.where(np.isfinite(d_max), d_max, np.where(np.isfinite(d), d, h_max))
+    nominal = np.where(np.isfinite(d), d, np.sqrt(lo * hi))
+    return nominal * 1000.0, lo * 1000.0, hi * 1000.0
+
+
+def consequence_kernel(columns: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """
+    Енергія, вхід в атмосферу, ударна хвиля і втрати для всіх рядків одним векторним проходом.
+    Тіла, що не дійшли до землі, — повітряний вибух на висоті піку виділення енергії
+    з енергією, виділеною в атмосфері (як airburst у /impact).
+    """
+    size, size_min, size_max = diameters_m(columns)
+    speed = np.sqrt(columns["v_inf_kms"] ** 2 + EARTH_ESCAPE_KMS ** 2)
+    material = MATERIALS[CATALOG_MATERIAL]
+    energy_mt = energy_kernel(size, speed, material["density"])["energy_mt"]
+
+    entry = entry_kernel(
+        size, speed, CATALOG_ANGLE_DEG, material["density"], material_strength(CATALOG_MATERIAL), profile=False
+    )
+    air = ~entry["reached_ground"]
+    radii = airblast_kernel(energy_mt)["radius_km"]
+    if air.any():
+        fraction = np.clip(np.nan_to_num(entry["deposited_fraction"][air], nan=1.0), 0.0, 1.0)
+        radii[:, air] = airblast_kernel(
+            energy_mt[air] * fraction, burst_mode="air", burst_height_m=entry["burst_altitude_km"][air] * 1000.0
+        )["radius_km"]
+
+    population = np.trunc(LAND_DENSITY * math.pi * radii ** 2)
+    deaths = casualties_from_population(population, ZONE_TYPES)["total_deaths"] * LAND_FRACTION
+    return {
+        "diameter_m": size,
+        "diameter_min_m": size_min,
+        "diameter_max_m": size_max,
+        "impact_speed_kms": speed,
+        "energy_mt": energy_mt,
+        "burst_altitude_km": np.where(air, entry["burst_altitude_km"], 0.0),
+        "heavy_damage_radius_km": radii[AIRBLAST_PRESSURES.index(50)],
+        "glass_breakage_radius_km": radii[AIRBLAST_PRESSURES.index(1)],
+        "deaths_if_impact": deaths,
+        "expected_deaths": deaths * columns["impact_probability"],
+    }
+
+
+class CatalogStore:
+    """
+    Колонкове сховище каталогу (.npz): вхідні колонки, хеші рядків і виходи конвеєра.
+    Новий файл каталогу — перераховуються лише рядки, чий хеш змінився або якого не було.
+    """
+
+    def __init__(self, columns: Dict[str, np.ndarray], source: Optional[str] = None):
+        self.columns = columns
+        self.source = source
+        self.recomputed = 0
+
+    def __len__(self) -> int:
+        return len(self.columns["designation"])
+
+    @classmethod
+    def load(cls, path: str) -> Optional["CatalogStore"]:
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                if int(data["model_version"]) != CATALOG_MODEL_VERSION:
+                    return None
+                columns = {name: data[name] for name in data.files if name != "model_version"}
+        except (OSError, KeyError, ValueError):
+            return None
+        return cls(columns)
+
+    def save(self, path: str) -> None:
+        tmp = path + ".tmp.npz"
+        np.savez(tmp, model_version=CATALOG_MODEL_VERSION, **self.columns)
+        os.replace(tmp, path)
+
+    @classmethod
+    def ingest(cls, inputs: Dict[str, np.ndarray], previous: Optional["CatalogStore"] = None) -> "CatalogStore":
+        """Нові вхідні колонки + попереднє сховище -> сховище; виходи змінених рядків рахуються заново"""
+        hashes = row_hashes(inputs)
+        n = len(hashes)
+        reuse = np.full(n, -1, dtype=np.intp)
+        if previous is not None and len(previous):
+            old = previous.columns["row_hash"]
+            order = np.argsort(old)
+            pos = np.minimum(np.searchsorted(old, hashes, sorter=order), len(old) - 1)
+            found = old[order[pos]] == hashes
+            reuse[found] = order[pos[found]]
+        changed = np.flatnonzero(reuse < 0)
+
+        columns = dict(inputs)
+        columns["row_hash"] = hashes
+        for name in OUTPUT_COLUMNS:
+            columns[name] = np.full(n, np.nan)
+        kept = reuse >= 0
+        if kept.any():
+            for name in OUTPUT_COLUMNS:
+                columns[name][kept] = previous.columns[name][reuse[kept]]
+        if changed.size:
+            fresh = consequence_kernel({c: inputs[c][changed] for c in INPUT_COLUMNS})
+            for name in OUTPUT_COLUMNS:
+                columns[name][changed] = fresh[name]
+        store = cls(columns)
+        store.recomputed = int(changed.size)
+        return store
+
+    def ranked(self, sort: str = "expected_deaths", limit: int = 50, offset: int = 0,
+               min_probability: float = 0.0) -> List[Dict]:
+        """Рядки за спаданням sort (nan — в кінці)"""
+        c = self.columns
+        idx = np.flatnonzero(~(c["impact_probability"] < min_probability))
+        key = np.nan_to_num(c[sort][idx], nan=-np.inf)
+        idx = idx[np.argsort(-key, kind="stable")][offset:offset + limit]
+        return [
+            {
+                "rank": offset + i + 1,
+                "designation": c["designation"][j],
+                **{name: _finite(c[name][j]) for name in ("impact_probability", "palermo_cum", "torino_max", "v_inf_kms")},
+                **{name: _finite(c[name][j]) for name in OUTPUT_COLUMNS},
+            }
+            for i, j in enumerate(idx.tolist())
+        ]
+
+    def totals(self) -> Dict:
+        return {
+            "expected_deaths": float(np.nansum(self.columns["expected_deaths"])),
+            "objects": len(self),
+        }
+
+
+def _finite(value) -> Optional[float]:
+    value = float(value)
+    return round(value, 6 if abs(value) < 1 else 3) if math.isfinite(value) else None
+
+
+def store_path(catalog_path: str) -> str:
+    return NEO_CATALOG_STORE or catalog_path + ".store.npz"
+
+
+_store: Optional[CatalogStore] = None
+_store_stamp = None
+_lock = threading.Lock()
+
+
+def get_catalog(path: Optional[str] = NEO_CATALOG) -> Optional[CatalogStore]:
+    """
+    Сховище для поточного файлу каталогу (None — NEO_CATALOG не задано).
+    Змінився файл (mtime/розмір) — інкрементальне оновлення сховища.
+    """
+    global _store, _store_stamp
+    if not path:
+        return None
+    stat = os.stat(path)
+    stamp = (path, stat.st_mtime_ns, stat.st_size)
+    with _lock:
+        if _store is None or _store_stamp != stamp:
+            previous = _store if _store is not None else CatalogStore.load(store_path(path))
+            store = CatalogStore.ingest(read_catalog_csv(path), previous)
+            store.source = os.path.basename(path)
+            if store.recomputed or previous is None or len(previous) != len(store):
+                store.save(store_path(path))
+            _store, _store_stamp = store, stamp
+        return _store
@@ -0,0 +1,148 @@
+import hashlib
+import json
+from typing import Dict, List, Optional
+
+from fastapi.responses import JSONResponse, Response
+
+from calculations import (
+    AIRBLAST_PRESSURES,
+    SEISMIC_MMI,
+    TSUNAMI_THRESHOLDS,
+    airblast_zones,
+    seismic_zones,
+    thermal_zones,
+    tsunami_result,
+)
+from casualties import RISK_DESCRIPTIONS, SEVERITY_LEVELS, SITE_TYPE_LABELS, risk_description
+from constants import FACTS, MATERIALS
+from impact import CRATER_COLOR, RESPONSE_FIELDS
+from models import ImpactRequest
+
+# Кодеки з requirements.txt: orjson — швидший JSON, msgpack — бінарний формат для пакетних клієнтів;
+# без них (мінімальна збірка) — stdlib json, а encoding=msgpack відповідає 422
+try:
+    import orjson
+except ImportError:  # pragma: no cover - залежить від середовища
+    orjson = None
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - залежить від середовища
+    msgpack = None
+
+MSGPACK_MEDIA_TYPES = ("application/msgpack", "application/x-msgpack")
+
+# Статичні текстові поля зон: у compact-режимі вони є лише у /dictionary
+ZONE_TEXT_FIELDS = ("effects", "casualties", "ignition", "advice", "color")
+
+
+def _zone_texts() -> Dict[str, Dict]:
+    """{тип зони: статичні поля} — з тих самих форматерів, що будують відповідь"""
+    zones = (
+        airblast_zones([1.0] * len(AIRBLAST_PRESSURES), [1.0] * len(AIRBLAST_PRESSURES))
+        + thermal_zones([1.0, 1.0, 1.0])
+        + seismic_zones(1.0, [1.0] * len(SEISMIC_MMI))
+        + tsunami_result(1.0, 1.0, 1.0, [1.0] * len(TSUNAMI_THRESHOLDS), [1.0] * len(TSUNAMI_THRESHOLDS))["zones"]
+    )
+    texts = {z["type"]: {f: z[f] for f in ZONE_TEXT_FIELDS if f in z} for z in zones}
+    texts["crater"] = {"color": CRATER_COLOR}
+    return texts
+
+
+def _build_dictionary() -> Dict:
+    content = {
+        "zones": _zone_texts(),
+        "materials": {code: m["name"] for code, m in MATERIALS.items()},
+        "facts": list(FACTS),
+        "risks": {
+            "templates": RISK_DESCRIPTIONS,
+            "site_types": SITE_TYPE_LABELS,
+            "severity_levels": list(SEVERITY_LEVELS),
+        },
+        "fields": list(RESPONSE_FIELDS),
+    }
+    # версія — хеш вмісту: змінюється лише разом із текстами
+    payload = json.dumps(content, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return {"version": hashlib.sha1(payload.encode("utf-8")).hexdigest()[:12], **content}
+
+
+DICTIONARY = _build_dictionary()
+DICTIONARY_VERSION = DICTIONARY["version"]
+DICTIONARY_ETAG = f'"{DICTIONARY_VERSION}"'
+
+_FACT_IDS = {fact: i for i, fact in enumerate(FACTS)}
+
+
+def _strip_zone(zone: Dict) -> Dict:
+    texts = DICTIONARY["zones"].get(zone.get("type"))
+    if not texts:
+        return zone
+    # прибираємо лише те, що збігається зі словником (динамічні тексти лишаються)
+    return {k: v for k, v in zone.items() if k not in texts or texts[k] != v}
+
+
+def _strip_layers(layers):
+    if isinstance(layers, dict):  # format=geojson
+        return {
+            **layers,
+            "features": [{**f, "properties": _strip_zone(f["properties"])} for f in layers.get("features", [])],
+        }
+    return [_strip_zone(z) for z in layers]
+
+
+def compact_result(result: Dict, req: ImpactRequest) -> Dict:
+    """
+    Компактна відповідь: зони — лише коди та числа, тексти — у /dictionary
+    (версія у dictionary_version); матеріал — кодом, факт — номером.
+    """
+    out = dict(result)
+    out["dictionary_version"] = DICTIONARY_VERSION
+    if "material" in out:
+        out["material"] = req.material
+    if "fun_fact" in out:
+        fact = out.pop("fun_fact")
+        out["fun_fact_id"] = _FACT_IDS.get(fact)
+    for name in ("airblast", "thermal", "seismic"):
+        if isinstance(out.get(name), list):
+            out[name] = [_strip_zone(z) for z in out[name]]
+    if isinstance(out.get("tsunami"), dict):
+        out["tsunami"] = {**out["tsunami"], "zones": [_strip_zone(z) for z in out["tsunami"]["zones"]]}
+    if "layers" in out:
+        out["layers"] = _strip_layers(out["layers"])
+    if "strategic_risks" in out:
+        out["strategic_risks"] = [
+            {k: v for k, v in r.items() if not (k == "description" and v == risk_description(r))}
+            for r in out["strategic_risks"]
+        ]
+    return out
+
+
+def wants_msgpack(accept: Optional[str], encoding: Optional[str]) -> bool:
+    """Явний ?encoding= важливіший за Accept; msgpack з Accept — лише якщо бібліотека є"""
+    if encoding is not None:
+        if encoding == "msgpack" and msgpack is None:
+            raise ValueError("msgpack encoding is not available on this server")
+        return encoding == "msgpack"
+    return msgpack is not None and any(t in (accept or "") for t in MSGPACK_MEDIA_TYPES)
+
+
+def encode_response(payload, use_msgpack: bool = False, headers: Optional[Dict[str, str]] = None) -> Response:
+    """MessagePack або JSON (через orjson, якщо встановлено)"""
+    if use_msgpack:
+        return Response(msgpack.packb(payload, use_bin_type=True), media_type="application/msgpack", headers=headers)
+    if orjson is not None:
+        return Response(json_bytes(payload), media_type="application/json", headers=headers)
+    return JSONResponse(payload, headers=headers)
+
+
+def json_bytes(payload) -> bytes:
+    """Компактний JSON у байтах (orjson, якщо встановлено)"""
+    if orjson is not None:
+        return orjson.dumps(payload, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def select_fields(results: List[Dict], fields: Optional[List[str]]) -> List[Dict]:
+    """Проєкція готових результатів на fields (для пакетного шляху)"""
+    if not fields:
+        return results
+    return [{name: r[name] for name in fields if name in r} for r in results]
@@ -5,6 +5,25 @@ MATERIALS = {
     "ice": {"density": 917, "strength": 0.3, "name": "Льодяний"}
 }
 
+# Великі міста світу (апроксимація густини, люд/км²)
+MAJOR_CITIES = [
+    {"name": "Токіо", "type": "city", "lat": 35.6, "lon": 139.7, "density": 15000},
+    {"name": "Дакка", "type": "city", "lat": 23.8, "lon": 90.4, "density": 20000},
+    {"name": "Манхеттен", "type": "city", "lat": 40.7, "lon": -74.0, "density": 28000},
+    {"name": "Мумбаї", "type": "city", "lat": 19.0, "lon": 72.8, "density": 20000},
+    {"name": "Київ", "type": "city", "lat": 50.4, "lon": 30.5, "density": 3500},
+    {"name": "Лондон", "type": "city", "lat": 51.5, "lon": -0.1, "density": 5700},
+    {"name": "Париж", "type": "city", "lat": 48.8, "lon": 2.3, "density": 21000},
+    {"name": "Москва", "type": "city", "lat": 55.7, "lon": 37.6, "density": 4900},
+    {"name": "Шанхай", "type": "city", "lat": 31.2, "lon": 121.5, "density": 7700},
+]
+
+# Стратегічні об'єкти за замовчуванням (доповнюються CSV з SITES_CSV)
+STRATEGIC_SITES = [
+    {"name": "Чорнобиль", "type": "nuclear", "lat": 51.4, "lon": 30.1},
+    {"name": "Запоріжжя", "type": "nuclear", "lat": 47.5, "lon": 34.6},
+]
+
 # Цікаві факти про астероїди
 FACTS = [
     "As of 2025-09-11 there are 39,123 known NEOs; 11,343 are >140 m, and 873 are >1 km.",
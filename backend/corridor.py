@@ -0,0 +1,215 @@
+import math
+import secrets
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from models import CorridorEllipse, CorridorRequest
+from constants import MATERIALS
+from calculations import material_density, material_strength
+from geo import EARTH_RADIUS_KM, destination
+from sweep import SweepGrid, evaluate_output, scenario_outputs
+
+# Коридор ризику: точки удару вибираються з розподілу вздовж траси (або в еліпсі невизначеності),
+# тіло одне — енергія і радіуси рахуються один раз, а населення для всіх точок — одним пакетним запитом.
+
+# Еліпс розбивається на смуги вздовж великої осі в межах ±ELLIPSE_SPAN_SIGMA σ (хвости — у крайніх смугах)
+ELLIPSE_SPAN_SIGMA = 3.0
+# Вихід, за яким обирається найгірша точка (за рівності — збитки)
+WORST_CASE_KEYS = ("casualties.total_deaths", "economic_damage.total_damage_usd")
+
+
+def _unit(lat, lon) -> np.ndarray:
+    phi = np.radians(lat)
+    lam = np.radians(lon)
+    return np.stack([np.cos(phi) * np.cos(lam), np.cos(phi) * np.sin(lam), np.sin(phi)], axis=-1)
+
+
+def _lat_lon(xyz: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    x, y, z = xyz[..., 0], xyz[..., 1], xyz[..., 2]
+    return np.degrees(np.arctan2(z, np.hypot(x, y))), np.degrees(np.arctan2(y, x))
+
+
+def corridor_outputs(scenario: str) -> List[str]:
+    """Виходи casualties.* і economic_damage.* сценарію (SWEEP_OUTPUTS)"""
+    names = [n for n in scenario_outputs(scenario) if n.split(".")[0] in ("casualties", "economic_damage")]
+    if not names:
+        raise ValueError(f"Сценарій {scenario} не має наслідків для населення — коридор не рахується")
+    return names
+
+
+def sample_track(
+    track: List[List[float]], weights: Optional[List[float]], cross_sigma_km: float, rng: np.random.Generator, n: int
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    n точок удару вздовж ламаної (дуги великого кола між вершинами). Густина ймовірності задана
+    у вершинах і лінійна між ними, тож маса відрізка = довжина × середня вага. Поперечне зміщення —
+    нормальне з σ = cross_sigma_km. Повертає (lat, lon, номер відрізка, ймовірність відрізків).
+    """
+    vertices = np.asarray(track, dtype=float)
+    w = np.ones(len(vertices)) if weights is None else np.asarray(weights, dtype=float)
+    a = _unit(vertices[:-1, 0], vertices[:-1, 1])
+    b = _unit(vertices[1:, 0], vertices[1:, 1])
+    omega = np.arccos(np.clip(np.einsum("ij,ij->i", a, b), -1.0, 1.0))
+    mass = omega * EARTH_RADIUS_KM * (w[:-1] + w[1:]) / 2
+    if mass.sum() <= 0:
+        raise ValueError("Траса має нульову ймовірнісну масу (нульова довжина або нульові ваги)")
+    probability = mass / mass.sum()
+
+    segment = rng.choice(len(mass), n, p=probability)
+    u = rng.random(n)
+    wa, wb = w[:-1][segment], w[1:][segment]
+    dw = wb - wa
+    # обернена функція розподілу лінійної густини на відрізку (u — за рівномірної)
+    linear = np.abs(dw) > 1e-12 * (wa + wb)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t = np.where(linear, (np.sqrt(wa * wa + dw * u * (wa + wb)) - wa) / dw, u)
+
+    # сферична інтерполяція між кінцями відрізка
+    om = omega[segment][:, None]
+    sin_om = np.sin(om)
+    short = sin_om < 1e-12
+    safe = np.where(short, 1.0, sin_om)
+    point = np.where(
+        short, a[segment],
+        (np.sin((1 - t[:, None]) * om) * a[segment] + np.sin(t[:, None] * om) * b[segment]) / safe,
+    )
+    if cross_sigma_km > 0:
+        # поворот у площині, перпендикулярній дузі: уздовж нормалі до її великого кола
+        normal = np.cross(a, b)[segment]
+        norm = np.linalg.norm(normal, axis=1, keepdims=True)
+        normal = np.where(norm > 0, normal / np.where(norm > 0, norm, 1.0), 0.0)
+        delta = rng.normal(0.0, cross_sigma_km, n)[:, None] / EARTH_RADIUS_KM
+        point = point * np.cos(delta) + normal * np.sin(delta)
+    lat, lon = _lat_lon(point)
+    return lat, lon, segment, probability
+
+
+def sample_ellipse(ellipse: CorridorEllipse, rng: np.random.Generator, n: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """n точок з двовимірного нормального розподілу еліпса; смуга — за проєкцією на велику вісь"""
+    along = rng.normal(0.0, ellipse.semi_major_km, n)
+    across = rng.normal(0.0, ellipse.semi_minor_km, n)
+    az = math.radians(ellipse.azimuth_deg)
+    north = along * math.cos(az) - across * math.sin(az)
+    east = along * math.sin(az) + across * math.cos(az)
+    lat, lon = destination(ellipse.lat, ellipse.lon, np.degrees(np.arctan2(east, north)), np.hypot(north, east))
+
+    edges = _ellipse_edges(ellipse)
+    segment = np.clip(np.searchsorted(edges, along, side="right") - 1, 0, ellipse.segments - 1)
+    # точна маса смуги (крайні смуги забирають хвости)
+    cdf = np.array([0.5 * (1 + math.erf(x / (ellipse.semi_major_km * math.sqrt(2)))) for x in edges])
+    cdf[0], cdf[-1] = 0.0, 1.0
+    return lat, lon, segment, np.diff(cdf)
+
+
+def _ellipse_edges(ellipse: CorridorEllipse) -> np.ndarray:
+    span = ELLIPSE_SPAN_SIGMA * ellipse.semi_major_km
+    return np.linspace(-span, span, ellipse.segments + 1)
+
+
+def _segment_geometry(req: CorridorRequest) -> List[Dict]:
+    if req.track is not None:
+        return [
+            {"from": [float(v) for v in req.track[i]], "to": [float(v) for v in req.track[i + 1]]}
+            for i in range(len(req.track) - 1)
+        ]
+    ellipse = req.ellipse
+    edges = _ellipse_edges(ellipse)
+    centers = (edges[:-1] + edges[1:]) / 2
+    lat, lon = destination(ellipse.lat, ellipse.lon, np.where(centers < 0, ellipse.azimuth_deg + 180, ellipse.azimuth_deg), np.abs(centers))
+    return [
+        {"along_km": [round(float(lo), 3), round(float(hi), 3)], "center": [round(float(la), 6), round(float(ln), 6)]}
+        for lo, hi, la, ln in zip(edges[:-1], edges[1:], lat, lon)
+    ]
+
+
+def evaluate_corridor(req: CorridorRequest, lat: np.ndarray, lon: np.ndarray) -> Dict[str, np.ndarray]:
+    """Наслідки удару в кожній точці: одна фізика тіла (вісь розміру 1) × n координат"""
+    base = req.base
+    inputs = {
+        "size": np.array([base.size], dtype=float),
+        "speed": np.array([base.speed], dtype=float),
+        "angle": np.array([base.angle], dtype=float),
+        "density": material_density(base.material),
+        "strength": material_strength(base.material),
+        "lat": lat,
+        "lon": lon,
+    }
+    grid = SweepGrid(base.scenario, (lat.size,), inputs)
+    return {name: evaluate_output(grid, name) for name in corridor_outputs(base.scenario)}
+
+
+def _stats(values: np.ndarray, percentiles: List[float], keys: List[str]) -> Dict[str, Optional[float]]:
+    values = values[np.isfinite(values)]
+    if not values.size:
+        return dict.fromkeys(keys + ["mean", "max"])
+    stats = dict(zip(keys, np.percentile(values, percentiles).tolist()))
+    stats["mean"] = float(values.mean())
+    stats["max"] = float(values.max())
+    return stats
+
+
+def run_corridor(req: CorridorRequest) -> Dict:
+    """
+    Коридор ризику: samples точок удару з розподілу вздовж траси або в еліпсі → очікувані
+    (× impact_probability) і найгірші наслідки, перцентилі за умови удару та розбивка за відрізками.
+    Внески відрізків у очікуване — суми їхніх вибірок / samples, тож у сумі дають загальне очікуване.
+    """
+    if req.base.material not in MATERIALS:
+        raise ValueError(f"Невідомий матеріал: {req.base.material}")
+    outputs = corridor_outputs(req.base.scenario)
+    seed = req.seed if req.seed is not None else secrets.randbits(63)
+    rng = np.random.default_rng(seed)
+    if req.track is not None:
+        lat, lon, segment, probability = sample_track(req.track, req.weights, req.cross_sigma_km, rng, req.samples)
+    else:
+        lat, lon, segment, probability = sample_ellipse(req.ellipse, rng, req.samples)
+
+    values = evaluate_corridor(req, lat, lon)
+    n = req.samples
+    ip = req.impact_probability
+    keys = [f"p{q:g}" for q in req.percentiles]
+
+    # найгірша точка: максимум загиблих, за рівності — збитків
+    order = np.lexsort(tuple(values[k].astype(float) for k in reversed(WORST_CASE_KEYS) if k in values))
+    worst = int(order[-1])
+
+    n_segments = len(probability)
+    counts = np.bincount(segment, minlength=n_segments)
+    sums = {name: np.bincount(segment, weights=values[name].astype(float), minlength=n_segments) for name in outputs}
+    maxima = {}
+    for name in outputs:
+        m = np.full(n_segments, -np.inf)
+        np.maximum.at(m, segment, values[name].astype(float))
+        maxima[name] = m
+
+    segments = []
+    for i, geometry in enumerate(_segment_geometry(req)):
+        k = int(counts[i])
+        segments.append({
+            "index": i,
+            **geometry,
+            "probability": float(ip * probability[i]),
+            "samples": k,
+            "expected": {name: float(ip * sums[name][i] / n) for name in outputs},
+            "conditional_mean": {name: (float(sums[name][i] / k) if k else None) for name in outputs},
+            "max": {name: (float(maxima[name][i]) if k else None) for name in outputs},
+        })
+
+    return {
+        "scenario": req.base.scenario,
+        "mode": "track" if req.track is not None else "ellipse",
+        "samples": n,
+        "seed": seed,
+        "impact_probability": ip,
+        "percentiles": keys,
+        "expected": {name: float(ip * values[name].astype(float).mean()) for name in outputs},
+        "conditional": {name: _stats(values[name].astype(float), req.percentiles, keys) for name in outputs},
+        "worst_case": {
+            "lat": round(float(lat[worst]), 6),
+            "lon": round(float(lon[worst]), 6),
+            "segment": int(segment[worst]),
+            "outputs": {name: float(values[name][worst]) for name in outputs},
+        },
+        "segments": segments,
+    }
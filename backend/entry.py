@@ -0,0 +1,362 @@
+import math
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# Модель входу в атмосферу: гальмування, абляція, розпад за міцністю і
+# "млинець" (pancake) після розпаду. Рівняння траєкторії інтегруються
+# одночасно для масиву тіл (numpy), тому модель однаково працює для одного
+# /impact, пакета сценаріїв і вибірки Monte Carlo.
+
+# Експоненційна атмосфера: ρ(h) = ρ0·exp(-h/H)
+ATMOSPHERE_RHO0 = 1.225            # кг/м³ на рівні моря
+ATMOSPHERE_SCALE_HEIGHT_M = 8000.0
+EARTH_RADIUS_M = 6.371e6
+G = 9.81
+
+ENTRY_START_ALTITUDE_M = 100_000.0
+ENTRY_DRAG_COEFF = 2.0             # C_D (Collins et al., 2005)
+ENTRY_HEAT_COEFF = 0.1             # C_H — частка потоку енергії, що йде на абляцію
+ENTRY_ABLATION_HEAT = 8e6          # Q, Дж/кг
+# Після розпаду радіус хмари уламків росте зі швидкістю v·sqrt(C·ρa/ρm) (Passey & Melosh);
+# C підібрано так, щоб Челябінськ (19 м, 19 км/с, 18°) вибухав на ~32 км, а Тунгуска (60 м, 15 км/с, 45°) — на ~12 км
+PANCAKE_SPREAD_COEFF = 0.3
+# Розплющення обмежене: радіус не більший за f_p · r0 (Collins et al., 2005)
+PANCAKE_MAX_FACTOR = 7.0
+# MATERIALS[...]["strength"] задано в МПа
+STRENGTH_PA_PER_UNIT = 1e6
+
+# Крок інтегрування: не більше ENTRY_MAX_DH_M по висоті і ENTRY_MAX_REL_CHANGE
+# відносної зміни швидкості, маси чи радіуса за крок (явний метод середньої точки)
+ENTRY_MAX_DH_M = 1000.0
+ENTRY_MAX_REL_CHANGE = 0.1
+# і не більше ENTRY_MAX_PATH_M уздовж траєкторії (пологі траєкторії, що майже не знижуються)
+ENTRY_MAX_PATH_M = 5000.0
+ENTRY_MAX_STEPS = 5000
+# Нижче цієї висоти тіло вважається таким, що досягло землі
+ENTRY_GROUND_M = 1.0
+# Тіло "згасло", коли лишилось менше цієї частки початкової кінетичної енергії
+ENTRY_KE_CUTOFF = 1e-3
+# Профіль виділення енергії: шари по 1 км від 0 до стартової висоти
+ENTRY_PROFILE_STEP_KM = 1.0
+ENTRY_PROFILE_BINS = int(ENTRY_START_ALTITUDE_M / 1000.0 / ENTRY_PROFILE_STEP_KM)
+# Скільки тіл інтегрувати за раз у векторному ядрі
+ENTRY_CHUNK_SIZE = 20_000
+
+TNT_J_PER_KT = 4.184e12
+
+
+class _ArrayOps:
+    """Операції кроку інтегрування на масивах numpy (векторне ядро)"""
+    exp, sin, cos, sqrt, log = np.exp, np.sin, np.cos, np.sqrt, np.log
+    maximum, minimum, abs, where = np.maximum, np.minimum, np.abs, np.where
+
+
+class _FloatOps:
+    """Ті самі операції на float (math): для одного тіла накладні витрати numpy на кожному кроці переважають арифметику"""
+    exp, sin, cos, sqrt, log = math.exp, math.sin, math.cos, math.sqrt, math.log
+    maximum, minimum, abs = max, min, abs
+
+    @staticmethod
+    def where(cond, a, b):
+        return a if cond else b
+
+
+def _air_density(h, xp=_ArrayOps):
+    return ATMOSPHERE_RHO0 * xp.exp(h * (-1.0 / ATMOSPHERE_SCALE_HEIGHT_M))
+
+
+def _derivatives(h, v, m, theta, r, rho_m, spreading, xp=_ArrayOps):
+    """Похідні (dh, dv, dm, dθ, dr) за часом; spreading — 1.0 для тіл, що розплющуються, інакше 0.0"""
+    rho_a = _air_density(h, xp)
+    v2 = v * v
+    drag = (0.5 * math.pi) * rho_a * r * r * v2
+    sin_t = xp.sin(theta)
+    cos_t = xp.cos(theta)
+    dv = G * sin_t - ENTRY_DRAG_COEFF * drag / m
+    dm = (-ENTRY_HEAT_COEFF / ENTRY_ABLATION_HEAT) * drag * v
+    dtheta = cos_t * (G / v - v / (EARTH_RADIUS_M + h))
+    dh = -v * sin_t
+    dr = spreading * v * xp.sqrt(PANCAKE_SPREAD_COEFF * rho_a / rho_m)
+    return dh, dv, dm, dtheta, dr
+
+
+def _breakup_altitude(h, ram, strength_pa, xp=_ArrayOps):
+    # точка перетину всередині кроку: ρa·v² ∝ exp(-h/H) при майже сталій v
+    return h + ATMOSPHERE_SCALE_HEIGHT_M * xp.log(ram / strength_pa)
+
+
+def _step(h, v, m, theta, r, rho_m, spreading, r_max, xp=_ArrayOps):
+    """Крок методу середньої точки (RK2) з адаптивним dt для кожного тіла; новий стан (h, v, m, θ, r)"""
+    dh, dv, dm, dtheta, dr = _derivatives(h, v, m, theta, r, rho_m, spreading, xp)
+    rate = xp.maximum(xp.maximum(xp.abs(dv) / v, xp.abs(dm) / m), dr / r)
+    dt = xp.minimum(
+        ENTRY_MAX_REL_CHANGE / xp.maximum(rate, 1e-12),
+        xp.minimum(ENTRY_MAX_DH_M, h) / xp.maximum(-dh, 1e-3),
+    )
+    dt = xp.minimum(dt, ENTRY_MAX_PATH_M / v)
+
+    half = 0.5 * dt
+    dh, dv, dm, dtheta, dr = _derivatives(
+        h + half * dh,
+        xp.maximum(v + half * dv, 1.0),
+        xp.maximum(m + half * dm, 1e-9 * m),
+        theta + half * dtheta,
+        r + half * dr,
+        rho_m, spreading, xp,
+    )
+    nh = h + dt * dh
+    return (
+        xp.where(nh < ENTRY_GROUND_M, 0.0, nh),
+        xp.maximum(v + dt * dv, 0.0),
+        xp.maximum(m + dt * dm, 0.0),
+        theta + dt * dtheta,
+        xp.minimum(r + dt * dr, r_max),
+    )
+
+
+def _deposit(h, v, m, nh, nv, nm, peak_rate, peak_h, xp=_ArrayOps):
+    """
+    Енергія, виділена за крок (іде в шар середньої висоти кроку), і пік dE/dh.
+    Повертає (ke після кроку, de, середню висоту кроку, peak_rate, peak_h).
+    """
+    ke = 0.5 * nm * nv * nv
+    de = 0.5 * m * v * v - ke
+    mid = 0.5 * (h + nh)
+    de_dh = de / xp.maximum(h - nh, 1e-6)
+    better = de_dh > peak_rate
+    return ke, de, mid, xp.where(better, de_dh, peak_rate), xp.where(better, mid, peak_h)
+
+
+def _flying(h, ke, ke0):
+    """Тіло ще летить: не на землі, не згасло і не вилетіло з атмосфери (масиви або float)"""
+    return (h > 0) & (ke > ENTRY_KE_CUTOFF * ke0) & (h <= ENTRY_START_ALTITUDE_M)
+
+
+def entry_kernel(size, speed, angle, density, strength, profile: bool = True) -> Dict[str, np.ndarray]:
+    """
+    Вхід тіл в атмосферу для масивів діаметрів (м), швидкостей (км/с), кутів до горизонту
+    (градуси), густин (кг/м³) і міцностей (МПа, як у MATERIALS); масиви броадкастяться.
+
+    Інтегрує dv/dt, dm/dt, dθ/dt, dh/dt (і dr/dt після розпаду) від ENTRY_START_ALTITUDE_M
+    до землі або до згасання. Розпад — коли динамічний тиск ρa·v² перевищує міцність.
+    Тіла рахуються частинами по ENTRY_CHUNK_SIZE, тож пам'ять не росте з розміром сітки;
+    одне тіло — тими самими _step/_deposit на float (_integrate_one).
+    Повертає масиви форми броадкасту:
+      breakup_altitude_km — висота розпаду (nan, якщо тіло не розпалось),
+      burst_altitude_km   — висота піку виділення енергії dE/dh (висота "вибуху"),
+      deposited_fraction  — частка початкової кінетичної енергії, виділена в атмосфері,
+      impact_speed_kms    — швидкість біля землі (0, якщо тіло згасло в повітрі),
+      reached_ground      — чи дійшло тіло до землі,
+    і, якщо profile, deposition_kt форми (ENTRY_PROFILE_BINS, *shape) — енергія (кт) у шарах по ENTRY_PROFILE_STEP_KM.
+    """
+    size, speed, angle, density, strength = np.broadcast_arrays(
+        *(np.asarray(x, dtype=float) for x in (size, speed, angle, density, strength))
+    )
+    shape = size.shape
+    n = size.size
+    columns = [x.ravel() for x in (size, speed, angle, density, strength)]
+
+    out = {key: np.empty(n) for key in ("breakup_altitude_km", "burst_altitude_km", "deposited_fraction", "impact_speed_kms")}
+    out["reached_ground"] = np.empty(n, dtype=bool)
+    if profile:
+        out["deposition_kt"] = np.empty((ENTRY_PROFILE_BINS, n))
+    # одне тіло (/impact) — ті самі кроки на float, без накладних витрат numpy
+    integrate = _integrate_one if n == 1 else _integrate
+    for start in range(0, n, ENTRY_CHUNK_SIZE):
+        part = slice(start, min(start + ENTRY_CHUNK_SIZE, n))
+        for key, value in integrate(*(c[part] for c in columns), profile).items():
+            out[key][..., part] = value
+    return {key: value.reshape(value.shape[:-1] + shape) for key, value in out.items()}
+
+
+def _integrate(size, speed, angle, density, strength, profile: bool) -> Dict[str, np.ndarray]:
+    """entry_kernel для одновимірних масивів однієї частини"""
+    n = size.size
+    r0 = 0.5 * size
+    rho_m = density.copy()
+    strength_pa = strength * STRENGTH_PA_PER_UNIT
+    r_max = PANCAKE_MAX_FACTOR * r0
+
+    v0 = speed * 1000.0
+    m0 = rho_m * (4.0 / 3.0) * math.pi * r0 ** 3
+    ke0 = 0.5 * m0 * v0 * v0
+
+    # кінцевий стан кожного тіла (записується, коли тіло виходить з інтегрування)
+    h_end = np.full(n, ENTRY_START_ALTITUDE_M)
+    v_end = v0.copy()
+    m_end = m0.copy()
+    breakup_h = np.full(n, np.nan)
+    peak_h = np.zeros(n)
+    deposition = np.zeros((ENTRY_PROFILE_BINS, n)) if profile else None
+
+    # фізично некоректні входи (нульовий розмір, від'ємний кут) не інтегруємо — результат nan
+    valid = (r0 > 0) & (v0 > 0) & (rho_m > 0) & (angle > 0) & np.isfinite(strength_pa)
+
+    # стан активних тіл тримаємо стиснутим; idx — їхні номери у вихідних масивах
+    idx = np.flatnonzero(valid)
+    h = h_end[idx]
+    v = v0[idx]
+    m = m0[idx]
+    theta = np.radians(angle[idx])
+    r = r0[idx]
+    a_rho, a_rmax, a_strength, a_ke0 = rho_m[idx], r_max[idx], strength_pa[idx], ke0[idx]
+    broken = np.zeros(idx.size, dtype=bool)
+    peak_rate = np.zeros(idx.size)
+    a_peak_h = np.zeros(idx.size)
+
+    for _ in range(ENTRY_MAX_STEPS):
+        if idx.size == 0:
+            break
+        # розпад: динамічний тиск перевищив міцність
+        ram = _air_density(h) * v * v
+        newly = ~broken & (ram >= a_strength)
+        if newly.any():
+            broken |= newly
+            breakup_h[idx[newly]] = _breakup_altitude(h[newly], ram[newly], a_strength[newly])
+
+        spreading = (broken & (r < a_rmax)).astype(float)
+        nh, nv, nm, theta, r = _step(h, v, m, theta, r, a_rho, spreading, a_rmax)
+        ke, de, mid, peak_rate, a_peak_h = _deposit(h, v, m, nh, nv, nm, peak_rate, a_peak_h)
+        if profile:
+            bins = np.minimum((mid * (1e-3 / ENTRY_PROFILE_STEP_KM)).astype(np.intp), ENTRY_PROFILE_BINS - 1)
+            deposition[bins, idx] += de  # кожне тіло раз на крок — індекси не повторюються
+        h, v, m = nh, nv, nm
+
+        # далі рахуємо лише тих, хто ще летить
+        alive = _flying(nh, ke, a_ke0)
+        if not alive.all():
+            done = ~alive
+            j = idx[done]
+            h_end[j], v_end[j], m_end[j], peak_h[j] = h[done], v[done], m[done], a_peak_h[done]
+            idx = idx[alive]
+            h, v, m, theta, r = h[alive], v[alive], m[alive], theta[alive], r[alive]
+            a_rho, a_rmax, a_strength, a_ke0 = a_rho[alive], a_rmax[alive], a_strength[alive], a_ke0[alive]
+            broken, peak_rate, a_peak_h = broken[alive], peak_rate[alive], a_peak_h[alive]
+    # тіла, яким не вистачило ENTRY_MAX_STEPS, — з поточним станом
+    h_end[idx], v_end[idx], m_end[idx], peak_h[idx] = h, v, m, a_peak_h
+
+    reached_ground = valid & (h_end <= 0)
+    ke_end = 0.5 * m_end * v_end * v_end
+    with np.errstate(invalid="ignore", divide="ignore"):
+        deposited = np.where(valid, 1.0 - ke_end / ke0, np.nan)
+    result = {
+        "breakup_altitude_km": breakup_h / 1000.0,
+        "burst_altitude_km": np.where(valid, peak_h / 1000.0, np.nan),
+        "deposited_fraction": deposited,
+        "impact_speed_kms": np.where(reached_ground, v_end / 1000.0, 0.0),
+        "reached_ground": reached_ground,
+    }
+    if profile:
+        result["deposition_kt"] = deposition / TNT_J_PER_KT
+    return result
+
+
+def _integrate_one(size, speed, angle, density, strength, profile: bool) -> Dict[str, np.ndarray]:
+    """_integrate для одного тіла (масиви довжини 1): ті самі _step і _deposit, але на float"""
+    size, speed, angle, density, strength = (float(x[0]) for x in (size, speed, angle, density, strength))
+    r0 = 0.5 * size
+    strength_pa = strength * STRENGTH_PA_PER_UNIT
+    v0 = speed * 1000.0
+    deposition = np.zeros((ENTRY_PROFILE_BINS, 1)) if profile else None
+    nan = float("nan")
+
+    if r0 > 0 and v0 > 0 and density > 0 and angle > 0 and math.isfinite(strength_pa):
+        r_max = PANCAKE_MAX_FACTOR * r0
+        m0 = density * (4.0 / 3.0) * math.pi * r0 ** 3
+        ke0 = 0.5 * m0 * v0 * v0
+        h, v, m, theta, r = ENTRY_START_ALTITUDE_M, v0, m0, math.radians(angle), r0
+        breakup_h = nan
+        broken = False
+        peak_rate = peak_h = 0.0
+        for _ in range(ENTRY_MAX_STEPS):
+            ram = _air_density(h, _FloatOps) * v * v
+            if not broken and ram >= strength_pa:
+                broken = True
+                breakup_h = _breakup_altitude(h, ram, strength_pa, _FloatOps)
+
+            spreading = 1.0 if broken and r < r_max else 0.0
+            nh, nv, nm, theta, r = _step(h, v, m, theta, r, density, spreading, r_max, _FloatOps)
+            ke, de, mid, peak_rate, peak_h = _deposit(h, v, m, nh, nv, nm, peak_rate, peak_h, _FloatOps)
+            if profile:
+                deposition[min(int(mid * (1e-3 / ENTRY_PROFILE_STEP_KM)), ENTRY_PROFILE_BINS - 1), 0] += de
+            h, v, m = nh, nv, nm
+            if not _flying(nh, ke, ke0):
+                break
+
+        reached_ground = h <= 0
+        row = (breakup_h / 1000.0, peak_h / 1000.0, 1.0 - 0.5 * m * v * v / ke0,
+               v / 1000.0 if reached_ground else 0.0, reached_ground)
+    else:
+        # фізично некоректні входи — як у _integrate
+        row = (nan, nan, nan, 0.0, False)
+
+    keys = ("breakup_altitude_km", "burst_altitude_km", "deposited_fraction", "impact_speed_kms", "reached_ground")
+    result = {key: np.array([value]) for key, value in zip(keys, row)}
+    if profile:
+        result["deposition_kt"] = deposition / TNT_J_PER_KT
+    return result
+
+
+def _rounded(value: float, digits: int):
+    # nan (тіло не розпалось або некоректні входи) -> None у JSON
+    return None if math.isnan(value) else round(value, digits)
+
+
+def entry_result(
+    breakup_km: float,
+    burst_km: float,
+    deposited_fraction: float,
+    impact_speed_kms: float,
+    reached_ground: bool,
+    deposition_kt: Optional[List[float]],
+) -> Dict:
+    """Секція entry відповіді /impact для одного тіла (профіль — лише шари з помітним внеском; None — без профілю)"""
+    result = {
+        "breakup_altitude_km": _rounded(breakup_km, 1),
+        "burst_altitude_km": _rounded(burst_km, 1),
+        "energy_deposited_fraction": _rounded(deposited_fraction, 3),
+        "impact_speed_kms": round(impact_speed_kms, 2),
+        "reached_ground": bool(reached_ground),
+    }
+    if deposition_kt is not None:
+        total = sum(deposition_kt)
+        result["deposition_profile"] = [
+            {
+                "altitude_km": round((i + 0.5) * ENTRY_PROFILE_STEP_KM, 1),
+                "energy_kt": round(e, 3),
+            }
+            for i, e in reversed(list(enumerate(deposition_kt)))
+            if total > 0 and e >= 1e-3 * total
+        ]
+    return result
+
+
+def entry_results(k: Dict[str, np.ndarray]) -> List[Dict]:
+    """Форматування результату entry_kernel для одновимірного масиву тіл"""
+    return [
+        entry_result(*row)
+        for row in zip(
+            k["breakup_altitude_km"].tolist(),
+            k["burst_altitude_km"].tolist(),
+            k["deposited_fraction"].tolist(),
+            k["impact_speed_kms"].tolist(),
+            k["reached_ground"].tolist(),
+            k["deposition_kt"].T.tolist(),
+        )
+    ]
+
+
+def calculate_entry(
+    size: float, speed: float, angle: float, density: float, strength: float, profile: bool = True
+) -> Dict:
+    """Вхід в атмосферу одного тіла (strength — у МПа, як у MATERIALS); profile=False — без deposition_profile"""
+    k = entry_kernel(size, speed, angle, density, strength, profile)
+    return entry_result(
+        float(k["breakup_altitude_km"]),
+        float(k["burst_altitude_km"]),
+        float(k["deposited_fraction"]),
+        float(k["impact_speed_kms"]),
+        bool(k["reached_ground"]),
+        k["deposition_kt"].tolist() if profile else None,
+    )
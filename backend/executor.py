@@ -0,0 +1,337 @@
+import asyncio
+import ipaddress
+import multiprocessing
+import os
+import time
+from contextlib import asynccontextmanager
+from concurrent.futures import ProcessPoolExecutor
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+import anyio
+
+from cache import get_impact_cache
+from impact import resolve_fields, simulate_impact
+from metrics import (
+    IMPACT_COALESCED,
+    IMPACT_QUEUE_WAIT,
+    IMPACT_REJECTED,
+    collect_stages,
+    record_stages,
+    register_collector,
+)
+from models import ImpactRequest
+from population import RasterPopulation, get_population_backend
+from exposure import get_exposure_backend
+
+# Одночасних розрахунків (потоки + процеси) і скільки ще може чекати в черзі
+IMPACT_MAX_CONCURRENCY = int(os.environ.get("IMPACT_MAX_CONCURRENCY", os.cpu_count() or 1))
+IMPACT_MAX_QUEUE = int(os.environ.get("IMPACT_MAX_QUEUE", 64))
+# Одночасних розрахунків, запущених одним клієнтом (IP; за довіреним проксі — з X-Forwarded-For)
+IMPACT_PER_CLIENT = int(os.environ.get("IMPACT_PER_CLIENT", 8))
+# Проксі, яким довіряємо X-Forwarded-For: IP або мережі через кому (127.0.0.1,10.0.0.0/8)
+TRUSTED_PROXIES = [
+    ipaddress.ip_network(p.strip(), strict=False)
+    for p in os.environ.get("IMPACT_TRUSTED_PROXIES", "").split(",") if p.strip()
+]
+IMPACT_RETRY_AFTER_S = int(os.environ.get("IMPACT_RETRY_AFTER_S", 1))
+# Процеси для важких сценаріїв; 0 — усе рахується у пулі потоків
+IMPACT_PROCESS_WORKERS = int(os.environ.get("IMPACT_PROCESS_WORKERS", 0))
+# Сценарії, які завжди вважаються важкими (через кому)
+HEAVY_SCENARIOS = {s for s in os.environ.get("IMPACT_HEAVY_SCENARIOS", "").split(",") if s}
+# Тривіальні запити (див. is_trivial) рахуються прямо в event loop: швидше, ніж перехід у потік
+IMPACT_INLINE = os.environ.get("IMPACT_INLINE", "1") == "1"
+# Поля, без яких запит тривіальний: контекст точки (населення, об'єкти) і модель входу —
+# сотні мікросекунд і більше; решта секцій — десятки
+NON_TRIVIAL_FIELDS = ("location", "entry")
+
+
+class Overloaded(Exception):
+    """Запит не прийнято: черга повна або клієнт перевищив ліміт (-> 429)"""
+
+    def __init__(self, reason: str, retry_after: int = IMPACT_RETRY_AFTER_S):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+def compute_impact(req: ImpactRequest, fields: Optional[List[str]] = None) -> Tuple[Dict, Dict[str, float]]:
+    """Розрахунок з таймерами етапів (верхній рівень модуля — щоб працював і в процесі-воркері)"""
+    with collect_stages() as stages:
+        result = simulate_impact(req, fields)
+    return result, stages
+
+
+def is_heavy(req: ImpactRequest) -> bool:
+    """Важкий: явно вказаний сценарій або населення чи активи з растра (інтеграли по кільцях)"""
+    return (
+        req.scenario in HEAVY_SCENARIOS
+        or isinstance(get_population_backend(), RasterPopulation)
+        or get_exposure_backend() is not None
+    )
+
+
+def is_trivial(req: ImpactRequest, fields: Optional[List[str]] = None) -> bool:
+    """Тривіальний: вибрані поля (із залежностями) не потребують ні точки удару, ні моделі входу"""
+    needed = resolve_fields(fields)
+    return needed is not None and not needed.intersection(NON_TRIVIAL_FIELDS) and not is_heavy(req)
+
+
+class ImpactExecutor:
+    """
+    Виконання /impact поза event loop:
+      - тривіальні запити — одразу в event loop, легкі — пул потоків AnyIO,
+        важкі — пул процесів (якщо IMPACT_PROCESS_WORKERS > 0);
+      - не більше max_concurrency розрахунків одночасно, решта чекає в черзі до max_queue,
+        далі — Overloaded (429 + Retry-After);
+      - ліміт одночасних розрахунків на клієнта;
+      - однакові запити, що вже рахуються, чекають на той самий розрахунок (single-flight);
+      - інші важкі endpoint-и (run, iterate) — під тими ж лімітами і в тій самій черзі.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = IMPACT_MAX_CONCURRENCY,
+        max_queue: int = IMPACT_MAX_QUEUE,
+        per_client: int = IMPACT_PER_CLIENT,
+        process_workers: int = IMPACT_PROCESS_WORKERS,
+    ):
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queue = max(0, max_queue)
+        self.per_client = max(1, per_client)
+        self.process_workers = process_workers
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._loop = None
+        self._sem: Optional[asyncio.Semaphore] = None
+        self._wide: Optional[asyncio.Lock] = None
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._clients: Dict[str, int] = {}
+        self.pending = 0   # прийняті розрахунки: у черзі + виконуються
+        self.running = 0
+
+    def _bind_loop(self) -> None:
+        # семафор і задачі прив'язані до event loop; новий loop (тести, перезапуск) — новий стан
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._sem = asyncio.Semaphore(self.max_concurrency)
+            self._wide = asyncio.Lock()
+            self._inflight = {}
+            self._clients = {}
+            self.pending = self.running = 0
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn: сервер уже має потоки (логи, прогрів), fork з потоками ризикований
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.process_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._pool
+
+    async def impact(self, req: ImpactRequest, client: str, fields: Optional[List[str]] = None) -> Dict:
+        """
+        Відповідь /impact: кеш -> спільний розрахунок у польоті -> новий розрахунок.
+        fields — лише вибрані поля (див. impact.parse_fields); окремий запис у кеші.
+        """
+        self._bind_loop()
+        cache = get_impact_cache()
+        if cache.shared is None:
+            key, target, result = cache.lookup(req, ",".join(fields or ()))
+        else:
+            # спільний кеш — файловий I/O SQLite: у потоці, не в event loop
+            key, target, result = await anyio.to_thread.run_sync(cache.lookup, req, ",".join(fields or ()))
+        if result is not None:
+            return cache.respond(req, result)
+
+        task = self._inflight.get(key) if key is not None else None
+        leader = task is None
+        if leader:
+            # ліміти — лише для нових розрахунків; очікування на спільний нічого не коштує
+            self._reserve(client)
+            task = asyncio.ensure_future(self._execute(target, fields))
+            task.add_done_callback(lambda t, key=key, client=client: self._finished(key, client, t))
+            if key is not None:
+                self._inflight[key] = task
+        else:
+            IMPACT_COALESCED.inc()
+        # shield: відключення одного клієнта не скасовує спільний розрахунок
+        result, stages = await asyncio.shield(task)
+
+        # етапи спільного розрахунку рахує лише запит, що його запустив
+        if leader:
+            record_stages(stages)
+        return cache.respond(req, result)
+
+    async def _execute(self, req: ImpactRequest, fields: Optional[List[str]] = None) -> Tuple[Dict, Dict[str, float]]:
+        if IMPACT_INLINE and is_trivial(req, fields):
+            # мікросекунди: без черги і без переходу в потік
+            IMPACT_QUEUE_WAIT.observe(0.0, "inline")
+            return compute_impact(req, fields)
+        heavy = self.process_workers > 0 and is_heavy(req)
+        lane = "process" if heavy else "thread"
+        async with self._slots(lane):
+            if heavy:
+                return await asyncio.get_running_loop().run_in_executor(
+                    self._get_pool(), compute_impact, req, fields
+                )
+            return await anyio.to_thread.run_sync(compute_impact, req, fields)
+
+    @asynccontextmanager
+    async def _slots(self, lane: str, slots: int = 1):
+        """
+        Місця під семафором розрахунків. Кілька місць (розрахунок із власним пулом процесів) беруться
+        під замком: два такі запити не тримають по частині місць, чекаючи одне на одного.
+        """
+        slots = min(max(1, slots), self.max_concurrency)
+        queued_at = time.perf_counter()
+        acquired = 0
+        try:
+            if slots == 1:
+                await self._sem.acquire()
+                acquired = 1
+            else:
+                async with self._wide:
+                    while acquired < slots:
+                        await self._sem.acquire()
+                        acquired += 1
+            IMPACT_QUEUE_WAIT.observe(time.perf_counter() - queued_at, lane)
+            self.running += 1
+            try:
+                yield
+            finally:
+                self.running -= 1
+        finally:
+            for _ in range(acquired):
+                self._sem.release()
+
+    @asynccontextmanager
+    async def admit(self, client: str):
+        """
+        Місце для потокового розрахунку (/impact/stream) з тими ж лімітами, що й новий /impact;
+        етапи всередині виконуються через run_stage.
+        """
+        self._bind_loop()
+        self._reserve(client)
+        try:
+            yield
+        finally:
+            self._release(client)
+
+    async def run_stage(self, fn, *args, lane: str = "stream", slots: int = 1):
+        """Один етап розрахунку в пулі потоків під спільним семафором (slots місць — див. _slots)"""
+        async with self._slots(lane, slots):
+            # потік не переривається: скасування чекає завершення етапу, а довгі етапи
+            # перевіряють свій cancel-прапорець самі
+            return await anyio.to_thread.run_sync(fn, *args)
+
+    async def run(self, client: str, fn, *args, slots: int = 1):
+        """
+        Важкий endpoint (/sweep, /impact/montecarlo, /impact/corridor...) з тими ж лімітами, що й новий
+        /impact: допуск клієнта, черга, fn(*args) у пулі потоків. Overloaded — до початку розрахунку.
+        """
+        async with self.admit(client):
+            return await self.run_stage(fn, *args, lane="endpoint", slots=slots)
+
+    async def iterate(self, client: str, chunks: Iterator) -> AsyncIterator:
+        """
+        Потокова відповідь (/sweep, /impact/points): кожен шматок синхронного генератора рахується
+        як окремий етап. Перший шматок — після допуску (Overloaded — до нього, як у /impact/stream).
+        """
+        async with self.admit(client):
+            try:
+                while True:
+                    chunk = await self.run_stage(next, chunks, None, lane="endpoint")
+                    if chunk is None:
+                        return
+                    yield chunk
+            finally:
+                chunks.close()
+
+    def _reserve(self, client: str) -> None:
+        if self._clients.get(client, 0) >= self.per_client:
+            IMPACT_REJECTED.inc("client_limit")
+            raise Overloaded("too many concurrent requests from this client")
+        if self.pending >= self.max_concurrency + self.max_queue:
+            IMPACT_REJECTED.inc("queue_full")
+            raise Overloaded("impact queue is full")
+        self.pending += 1
+        self._clients[client] = self._clients.get(client, 0) + 1
+
+    def _release(self, client: str) -> None:
+        self.pending -= 1
+        self._clients[client] -= 1
+        if not self._clients[client]:
+            del self._clients[client]
+
+    def _finished(self, key: Optional[str], client: str, task: asyncio.Task) -> None:
+        self._release(client)
+        if key is not None and self._inflight.get(key) is task:
+            del self._inflight[key]
+        if task.cancelled():
+            return
+        if task.exception() is None and key is not None:
+            cache = get_impact_cache()
+            if cache.shared is None:
+                cache.store(key, task.result()[0])
+            else:
+                # запис у SQLite — у пулі потоків, не в event loop
+                self._loop.run_in_executor(None, cache.store, key, task.result()[0])
+
+    def info(self) -> Dict:
+        return {
+            "queue_depth": self.pending - self.running,
+            "running": self.running,
+            "inflight_keys": len(self._inflight),
+            "clients": len(self._clients),
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "per_client": self.per_client,
+            "process_workers": self.process_workers,
+        }
+
+
+def _is_trusted(host: Optional[str]) -> bool:
+    try:
+        address = ipaddress.ip_address(host)
+    except ValueError:
+        return False
+    return any(address in network for network in TRUSTED_PROXIES)
+
+
+def client_id(headers, host: Optional[str]) -> str:
+    """
+    Ключ клієнта для лімітів: IP з'єднання. X-Forwarded-For враховується, лише якщо з'єднання
+    від довіреного проксі (IMPACT_TRUSTED_PROXIES): тоді клієнт — найправіша адреса не з довірених
+    (ліві значення клієнт може дописати сам).
+    """
+    if host and _is_trusted(host):
+        forwarded = [a.strip() for a in headers.get("x-forwarded-for", "").split(",") if a.strip()]
+        for address in reversed(forwarded):
+            if not _is_trusted(address):
+                return address
+        if forwarded:
+            return forwarded[0]
+    return host or "unknown"
+
+
+_executor: Optional[ImpactExecutor] = None
+
+
+def get_executor() -> ImpactExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ImpactExecutor()
+    return _executor
+
+
+def _executor_metrics():
+    if _executor is None:
+        return []
+    info = _executor.info()
+    return [
+        ("impact_queue_depth", "gauge", "/impact computations waiting for a worker", [({}, info["queue_depth"])]),
+        ("impact_running", "gauge", "/impact computations in progress", [({}, info["running"])]),
+    ]
+
+
+register_collector(_executor_metrics)
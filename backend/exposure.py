@@ -0,0 +1,43 @@
+import os
+from typing import Optional
+
+from population import RasterPopulation
+
+class AssetRaster(RasterPopulation):
+    """
+    Вартість активів ($ на клітинку) у тій самій піраміді префіксних сум, що й растр населення:
+    сума кола — одна різниця на рядок, memory-map без копіювання в пам'ять.
+    zone_populations / zone_populations_batch повертають вартість кілець у доларах.
+    """
+    name = "asset_raster"
+
+
+_backend: Optional[AssetRaster] = None
+_loaded = False
+
+
+def get_exposure_backend() -> Optional[AssetRaster]:
+    """
+    Растр вартості активів (експозиції) або None (категорії INFRASTRUCTURE_VALUE за густиною населення).
+    ASSET_RASTER=<шлях до .npy/.tif> — долари на клітинку з тією ж геоприв'язкою, що й растр населення
+    (<raster>.json); ASSET_CACHE_DIR — каталог піраміди префіксних сум.
+    """
+    global _backend, _loaded
+    if not _loaded:
+        path = os.environ.get("ASSET_RASTER")
+        _backend = AssetRaster(path, os.environ.get("ASSET_CACHE_DIR")) if path else None
+        _loaded = True
+    return _backend
+
+
+def set_exposure_backend(backend: Optional[AssetRaster]) -> None:
+    """Підмінити растр активів (None — без растру)"""
+    global _backend, _loaded
+    _backend = backend
+    _loaded = True
+
+
+def exposure_source() -> str:
+    """Джерело вартості для збитків: regional (категорії за густиною) або назва растру активів"""
+    backend = get_exposure_backend()
+    return "regional" if backend is None else backend.name
@@ -0,0 +1,188 @@
+import math
+import secrets
+from typing import Dict, List
+
+import numpy as np
+
+from models import FragmentFieldRequest
+from constants import MATERIALS
+from calculations import AIRBLAST_PRESSURES, AIRBLAST_TYPES, airblast_kernel, calculate_energy, thermal_kernel
+from casualties import casualties_from_population, economic_from_areas, estimate_population_density, infrastructure_type
+from entry import calculate_entry
+from geo import EARTH_RADIUS_KM, rasterize_discs
+
+# Маси уламків: усічений степеневий розподіл N(>m) ∝ m^-b на [FRAGMENT_MIN_MASS_RATIO, 1] × m_max
+FRAGMENT_MASS_INDEX = 0.8
+FRAGMENT_MIN_MASS_RATIO = 1e-4
+# Поле розсіювання: дрібні уламки гальмують одразу після розпаду і падають під точкою розпаду,
+# найбільші летять майже до точки удару; довжина поля — проєкція траєкторії від висоти розпаду
+FRAGMENT_FIELD_MIN_LENGTH_KM = 1.0
+FRAGMENT_ALONG_JITTER = 0.05    # розкид уздовж траси, частка довжини поля
+FRAGMENT_CROSS_SPREAD = 0.1     # розкид поперек траси, частка довжини поля
+# Растр об'єднання зон: не більше клітинок уздовж довшої сторони
+FRAGMENT_RASTER_SIDE = 1024
+# Скільки найбільших уламків показувати у відповіді
+LARGEST_REPORTED = 10
+
+ZONE_TYPES = [AIRBLAST_TYPES[p] for p in AIRBLAST_PRESSURES]
+# Економіка, як і в /impact, — лише перші 3 зони
+ECONOMIC_ZONES = 3
+
+
+def sample_masses(n: int, rng: np.random.Generator) -> np.ndarray:
+    """Відносні маси n уламків (сума 1), від найбільшого до найменшого"""
+    a, b = FRAGMENT_MIN_MASS_RATIO, FRAGMENT_MASS_INDEX
+    # обернена функція розподілу усіченого Парето
+    x = a * (1.0 - rng.random(n) * (1.0 - a ** b)) ** (-1.0 / b)
+    x = np.sort(x)[::-1]
+    return x / x.sum()
+
+
+def strewn_field(shares: np.ndarray, length_km: float, azimuth_deg: float, rng: np.random.Generator):
+    """Зміщення уламків (схід, північ), км від точки удару; траса йде з боку, протилежного azimuth"""
+    n = shares.size
+    along = -length_km * (1.0 - np.cbrt(shares / shares[0]))
+    along = along + rng.normal(0.0, FRAGMENT_ALONG_JITTER * length_km, n)
+    cross = rng.normal(0.0, FRAGMENT_CROSS_SPREAD * length_km, n)
+    az = math.radians(azimuth_deg)
+    east = along * math.sin(az) + cross * math.cos(az)
+    north = along * math.cos(az) - cross * math.sin(az)
+    return east, north
+
+
+def union_areas(east, north, radii: List[np.ndarray]) -> Dict:
+    """
+    Площі об'єднань кругів (км²) для кожного набору радіусів — спільний растр для всіх наборів.
+    radii — список масивів (N,); повертає {"areas_km2": [...], "cell_km": ...}.
+    """
+    reach = np.max(np.stack(radii), axis=0)
+    x0, x1 = float(np.min(east - reach)), float(np.max(east + reach))
+    y0, y1 = float(np.min(north - reach)), float(np.max(north + reach))
+    cell = max(x1 - x0, y1 - y0) / FRAGMENT_RASTER_SIDE
+    if cell <= 0:
+        return {"areas_km2": [0.0] * len(radii), "cell_km": 0.0}
+    shape = (int(math.ceil((y1 - y0) / cell)), int(math.ceil((x1 - x0) / cell)))
+    areas = [
+        float(np.count_nonzero(rasterize_discs(east, north, r, x0, y0, cell, shape))) * cell * cell
+        for r in radii
+    ]
+    return {"areas_km2": areas, "cell_km": cell}
+
+
+def simulate_fragment_field(req: FragmentFieldRequest) -> Dict:
+    """
+    Поле уламків: маси, точки падіння, ударна хвиля кожного уламка і растрове
+    об'єднання зон — втрати та збитки рахуються з площ об'єднання (перекриття не подвоюються).
+    """
+    base = req.base
+    material = MATERIALS[base.material]
+    energy = calculate_energy(base.size, base.speed, base.material)
+    entry = calculate_entry(
+        base.size, base.speed, base.angle, material["density"], material["strength"], profile=False
+    )
+    breakup_km = entry["breakup_altitude_km"]
+    if breakup_km is None:
+        raise ValueError("Тіло не руйнується в атмосфері — поле уламків не утворюється")
+
+    seed = req.seed if req.seed is not None else secrets.randbits(63)
+    rng = np.random.default_rng(seed)
+    n = req.fragments
+
+    shares = sample_masses(n, rng)
+    frag_energy = energy["energy_mt"] * shares
+    frag_size = base.size * np.cbrt(shares)
+    length_km = max(breakup_km / math.tan(math.radians(base.angle)), FRAGMENT_FIELD_MIN_LENGTH_KM)
+    east, north = strewn_field(shares, length_km, req.azimuth, rng)
+
+    # радіуси форми (Z, N) у порядку AIRBLAST_PRESSURES; пожежі — перша теплова зона
+    blast = airblast_kernel(frag_energy)["radius_km"]
+    fire = thermal_kernel(frag_energy)[0]
+    union = union_areas(east, north, list(blast) + [fire])
+    zone_areas = union["areas_km2"][:-1]
+    fire_area = union["areas_km2"][-1]
+    # зони вкладені, тож смуга зони — різниця об'єднань сусідніх порогів
+    bands = np.diff(np.concatenate([[0.0], zone_areas]))
+
+    pop_info = estimate_population_density(base.lat, base.lon)
+    density = pop_info["density"]
+    k = casualties_from_population(np.trunc(density * bands), ZONE_TYPES)
+    econ = economic_from_areas(bands[:ECONOMIC_ZONES], ZONE_TYPES[:ECONOMIC_ZONES], fire_area, density)
+
+    lat, lon = _offset_to_latlon(base.lat, base.lon, east, north)
+    top = slice(0, LARGEST_REPORTED)
+    largest = [
+        {
+            "id": i + 1,
+            "lat": round(la, 5),
+            "lon": round(lo, 5),
+            "size_m": round(s, 2),
+            "energy_mt": round(e, 6),
+            "heavy_damage_radius_km": round(r, 3),
+        }
+        for i, (la, lo, s, e, r) in enumerate(zip(
+            lat[top], lon[top], frag_size[top].tolist(), frag_energy[top].tolist(), blast[1, top].tolist()
+        ))
+    ]
+    result = {
+        "scenario": "fragment_field",
+        "seed": seed,
+        "fragments": n,
+        "azimuth": req.azimuth,
+        "energy": energy,
+        "breakup_altitude_km": breakup_km,
+        "strewn_field": {
+            "length_km": round(length_km, 2),
+            "width_km": round(4 * FRAGMENT_CROSS_SPREAD * length_km, 2),  # ±2σ поперек траси
+        },
+        "largest_fragments": largest,
+        "footprint": {
+            "cell_km": round(union["cell_km"], 4),
+            "zones": [
+                {
+                    "type": t,
+                    "pressure_kpa": p,
+                    "union_area_km2": round(area, 2),
+                    # сума площ окремих кругів — для порівняння з об'єднанням
+                    "sum_of_discs_km2": round(float(math.pi * np.sum(r ** 2)), 2),
+                }
+                for t, p, area, r in zip(ZONE_TYPES, AIRBLAST_PRESSURES, zone_areas, blast)
+            ],
+            "fire_area_km2": round(fire_area, 2),
+        },
+        "casualties": {
+            "total_deaths": int(k["total_deaths"]),
+            "total_injuries": int(k["total_injuries"]),
+            "affected_population": int(k["affected_population"]),
+            "zones": [
+                {"type": t, "area_km2": round(float(a), 2), "population": int(p), "deaths": int(d), "injuries": int(i)}
+                for t, a, p, d, i in zip(ZONE_TYPES, bands, k["population"], k["deaths"], k["injuries"])
+            ],
+            "population_density": density,
+            "area_type": pop_info["area_type"],
+            "nearest_city": pop_info["nearest_city"],
+        },
+        "economic_damage": {
+            "total_damage_usd": int(econ["total_damage_usd"]),
+            "affected_area_km2": round(float(econ["affected_area_km2"]), 2),
+            "fire_damage": float(econ["fire_damage"]),
+            "infrastructure_type": infrastructure_type(density),
+        },
+    }
+    if req.include_fragments:
+        # колонки по всіх уламках (для мапи)
+        result["fragment_data"] = {
+            "lat": np.round(lat, 5).tolist(),
+            "lon": np.round(lon, 5).tolist(),
+            "size_m": np.round(frag_size, 2).tolist(),
+            "energy_mt": frag_energy.tolist(),
+            "airblast_radius_km": {t: np.round(r, 3).tolist() for t, r in zip(ZONE_TYPES, blast)},
+        }
+    return result
+
+
+def _offset_to_latlon(lat: float, lon: float, east_km, north_km):
+    """Локальні зміщення (км) -> координати (рівнопроміжна проєкція навколо точки удару)"""
+    lat_out = lat + np.degrees(np.asarray(north_km) / EARTH_RADIUS_KM)
+    lon_out = lon + np.degrees(np.asarray(east_km) / (EARTH_RADIUS_KM * max(math.cos(math.radians(lat)), 1e-6)))
+    lon_out = (lon_out + 180.0) % 360.0 - 180.0
+    return lat_out.tolist(), lon_out.tolist()
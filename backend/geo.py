@@ -0,0 +1,291 @@
+import math
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0
+
+# Кількість вершин кільця: похибка хорди не більша за ~RING_TOLERANCE_PX пікселів на zoom
+DEFAULT_ZOOM = 8
+RING_TOLERANCE_PX = 0.5
+MIN_RING_VERTICES = 16
+MAX_RING_VERTICES = 720
+# Метрів на піксель на екваторі при zoom 0 (тайли 512 px, як у MapLibre)
+METERS_PER_PX_Z0 = 78271.517
+
+# Знаків після коми в координатах: 5 ≈ 1 м
+DEFAULT_PRECISION = 5
+
+Ring = List[List[float]]
+Polygon = List[Ring]
+
+WORLD_RING: Ring = [[-180.0, -90.0], [180.0, -90.0], [180.0, 90.0], [-180.0, 90.0], [-180.0, -90.0]]
+
+
+def ring_vertex_count(radius_km: float, lat: float, zoom: float = DEFAULT_ZOOM) -> int:
+    """
+    Вершин на кільце, щоб відхилення хорди від дуги (r·π²/2n²) було меншим
+    за RING_TOLERANCE_PX на заданому zoom. Кратне 4, у межах MIN..MAX.
+    """
+    meters_per_px = METERS_PER_PX_Z0 * max(math.cos(math.radians(lat)), 0.05) / (2 ** zoom)
+    tolerance_km = RING_TOLERANCE_PX * meters_per_px / 1000
+    n = math.pi * math.sqrt(max(radius_km, 0.0) / (2 * tolerance_km))
+    n = int(math.ceil(n / 4)) * 4
+    return max(MIN_RING_VERTICES, min(MAX_RING_VERTICES, n))
+
+
+def destination_points(lat: float, lon: float, radius_km: float, n: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Точки на відстані radius_km по n азимутах (за годинниковою стрілкою від півночі), градуси"""
+    phi1 = math.radians(lat)
+    lam1 = math.radians(lon)
+    delta = radius_km / EARTH_RADIUS_KM
+    theta = np.linspace(0.0, 2 * np.pi, n, endpoint=False)
+
+    sin_phi2 = math.sin(phi1) * math.cos(delta) + math.cos(phi1) * math.sin(delta) * np.cos(theta)
+    phi2 = np.arcsin(np.clip(sin_phi2, -1.0, 1.0))
+    lam2 = lam1 + np.arctan2(
+        np.sin(theta) * math.sin(delta) * math.cos(phi1),
+        math.cos(delta) - math.sin(phi1) * sin_phi2,
+    )
+    return np.degrees(phi2), np.degrees(lam2)
+
+
+def destination(lat, lon, bearing_deg, distance_km) -> Tuple[np.ndarray, np.ndarray]:
+    """Точки на відстані distance_km за азимутом bearing_deg від (lat, lon); масиви броадкастяться, градуси"""
+    phi1 = np.radians(lat)
+    lam1 = np.radians(lon)
+    theta = np.radians(bearing_deg)
+    delta = np.asarray(distance_km, dtype=float) / EARTH_RADIUS_KM
+
+    sin_phi2 = np.sin(phi1) * np.cos(delta) + np.cos(phi1) * np.sin(delta) * np.cos(theta)
+    phi2 = np.arcsin(np.clip(sin_phi2, -1.0, 1.0))
+    lam2 = lam1 + np.arctan2(np.sin(theta) * np.sin(delta) * np.cos(phi1), np.cos(delta) - np.sin(phi1) * sin_phi2)
+    return np.degrees(phi2), (np.degrees(lam2) + 540.0) % 360.0 - 180.0
+
+
+def _clip_half_plane(points: np.ndarray, x0: float, keep_greater: bool) -> np.ndarray:
+    """Sutherland–Hodgman по вертикальній прямій lon = x0 (замкнене кільце без повтору першої точки)"""
+    if len(points) == 0:
+        return points
+    out = []
+    prev = points[-1]
+    prev_in = prev[0] >= x0 if keep_greater else prev[0] <= x0
+    for cur in points:
+        cur_in = cur[0] >= x0 if keep_greater else cur[0] <= x0
+        if cur_in != prev_in:
+            t = (x0 - prev[0]) / (cur[0] - prev[0])
+            out.append([x0, prev[1] + t * (cur[1] - prev[1])])
+        if cur_in:
+            out.append(cur)
+        prev, prev_in = cur, cur_in
+    return np.array(out, dtype=float).reshape(-1, 2)
+
+
+def _split_antimeridian(lons: np.ndarray, lats: np.ndarray) -> List[Tuple[int, np.ndarray]]:
+    """
+    Кільце з неперервними (розгорнутими) довготами -> шматки в межах [-180, 180].
+    Повертає [(номер смуги, точки)], щоб дірки потрапили до свого шматка.
+    """
+    points = np.column_stack([lons, lats])
+    pieces = []
+    for k in range(int(math.floor((lons.min() + 180) / 360)), int(math.floor((lons.max() + 180) / 360)) + 1):
+        lo, hi = -180.0 + 360 * k, 180.0 + 360 * k
+        part = _clip_half_plane(_clip_half_plane(points, lo, True), hi, False)
+        if len(part) >= 3:
+            part[:, 0] -= 360 * k
+            pieces.append((k, part))
+    return pieces
+
+
+def _pole_polyline(lons: np.ndarray, lats: np.ndarray) -> np.ndarray:
+    """Кільце навколо полюса -> лінія від lon=-180 до lon=180 (з інтерполяцією на краях)"""
+    wrapped = (lons + 180.0) % 360.0 - 180.0
+    order = np.argsort(wrapped, kind="stable")
+    x, y = wrapped[order], lats[order]
+    # шов між останньою та першою точками (через антимеридіан)
+    gap = x[0] + 360.0 - x[-1]
+    t = (180.0 - x[-1]) / gap if gap > 0 else 0.5
+    edge_lat = y[-1] + t * (y[0] - y[-1])
+    return np.vstack([[-180.0, edge_lat], np.column_stack([x, y]), [180.0, edge_lat]])
+
+
+class Disc:
+    """
+    Геодезичний круг, розкладений для GeoJSON:
+      kind="simple" — pieces: [(смуга, кільце)] (1 або 2 шматки через антимеридіан);
+      kind="pole"   — polyline від -180 до 180 і pole (+1/-1), круг містить полюс;
+      kind="both"   — круг містить обидва полюси: світ мінус complement (простий круг навколо антиподу);
+      kind="world"  — радіус не менший за півколо Землі.
+    """
+
+    def __init__(self, lat: float, lon: float, radius_km: float, n: int):
+        self.kind = "simple"
+        self.pieces: List[Tuple[int, np.ndarray]] = []
+        self.polyline: Optional[np.ndarray] = None
+        self.pole = 0
+        self.complement: Optional["Disc"] = None
+
+        ang = math.degrees(radius_km / EARTH_RADIUS_KM)
+        contains_north = ang > 90.0 - lat
+        contains_south = ang > 90.0 + lat
+        if ang >= 180.0:
+            self.kind = "world"
+        elif contains_north and contains_south:
+            self.kind = "both"
+            anti_lon = lon + 180.0 if lon <= 0 else lon - 180.0
+            self.complement = Disc(-lat, anti_lon, math.pi * EARTH_RADIUS_KM - radius_km, n)
+        else:
+            lats, lons = destination_points(lat, lon, radius_km, n)
+            if contains_north or contains_south:
+                self.kind = "pole"
+                self.pole = 1 if contains_north else -1
+                self.polyline = _pole_polyline(lons, lats)
+            else:
+                # розгортаємо довготи навколо центру, щоб кільце було неперервним
+                center = (lon + 180.0) % 360.0 - 180.0
+                lons = center + ((lons - center + 180.0) % 360.0 - 180.0)
+                self.pieces = _split_antimeridian(lons, lats)
+
+    def cap_ring(self, pole: int) -> np.ndarray:
+        """Полігон "лінія + полюс" для kind=pole; pole — який полюс замикає (може бути протилежним)"""
+        y = 90.0 * pole
+        return np.vstack([self.polyline, [[180.0, y], [-180.0, y]]])
+
+
+def _signed_area(ring: np.ndarray) -> float:
+    x, y = ring[:, 0], ring[:, 1]
+    return 0.5 * float(np.sum(x * np.roll(y, -1) - np.roll(x, -1) * y))
+
+
+def _finish_ring(points, ccw: bool, precision: int) -> Ring:
+    """Орієнтація за RFC 7946 (зовнішні — проти годинникової), квантування, замикання"""
+    ring = np.round(np.asarray(points, dtype=float), precision)
+    keep = np.ones(len(ring), dtype=bool)
+    keep[1:] = np.any(ring[1:] != ring[:-1], axis=1)
+    ring = ring[keep]
+    if len(ring) > 1 and np.all(ring[0] == ring[-1]):
+        ring = ring[:-1]
+    if (_signed_area(ring) > 0) != ccw:
+        ring = ring[::-1]
+    out = ring.tolist()
+    out.append(out[0])
+    return out
+
+
+def _polygons(outer: Disc, inner: Optional[Disc], precision: int) -> List[Polygon]:
+    """Кільцева зона outer мінус inner (inner лежить усередині outer) як список полігонів"""
+    def ext(points):
+        return _finish_ring(points, True, precision)
+
+    def hole(points):
+        return _finish_ring(points, False, precision)
+
+    def simple_holes(disc: Optional[Disc], band: Optional[int] = None) -> List[Ring]:
+        if disc is None or disc.kind != "simple":
+            return []
+        return [hole(p) for k, p in disc.pieces if band is None or k == band]
+
+    if outer.kind == "simple":
+        return [[ext(p)] + simple_holes(inner, k) for k, p in outer.pieces]
+
+    if outer.kind == "pole":
+        if inner is not None and inner.kind == "pole":
+            # смуга між двома лініями навколо одного полюса
+            band = np.vstack([outer.polyline, inner.polyline[::-1]])
+            return [[ext(band)]]
+        return [[ext(outer.cap_ring(outer.pole))] + simple_holes(inner)]
+
+    # outer містить обидва полюси (або весь світ): світ мінус круг навколо антиподу
+    outer_holes = simple_holes(outer.complement) if outer.kind == "both" else []
+    if inner is None or inner.kind == "simple":
+        return [[_finish_ring(WORLD_RING, True, precision)] + outer_holes + simple_holes(inner)]
+    if inner.kind == "pole":
+        # усе по інший бік від лінії inner, мінус антиподний круг
+        return [[ext(inner.cap_ring(-inner.pole))] + outer_holes]
+    if inner.kind == "both":
+        # обидва доповнення прості: зона між ними навколо антиподу
+        if outer.kind == "world":
+            return [[ext(p)] for _, p in inner.complement.pieces]
+        return _polygons(inner.complement, outer.complement, precision)
+    return []  # inner теж увесь світ — порожня зона
+
+
+def layers_feature_collection(
+    lat: float,
+    lon: float,
+    layers: List[Dict],
+    zoom: float = DEFAULT_ZOOM,
+    precision: int = DEFAULT_PRECISION,
+) -> Dict:
+    """
+    Шари /impact ({type, radius_km, color}) -> один FeatureCollection кільцевих зон.
+    Кожна зона — від свого радіуса до наступного меншого; порядок — від найбільшої
+    до найменшої (так їх і малювати).
+    """
+    ordered = sorted((l for l in layers if l.get("radius_km", 0) > 0), key=lambda l: -l["radius_km"])
+    discs = [
+        Disc(lat, lon, float(l["radius_km"]), ring_vertex_count(float(l["radius_km"]), lat, zoom))
+        for l in ordered
+    ]
+    features = []
+    for i, (layer, disc) in enumerate(zip(ordered, discs)):
+        inner = discs[i + 1] if i + 1 < len(discs) else None
+        # після квантування дрібні кільця можуть виродитись — відкидаємо їх
+        polygons = [
+            [ring for ring in poly if len(ring) >= 4]
+            for poly in _polygons(disc, inner, precision)
+            if len(poly[0]) >= 4
+        ]
+        if not polygons:
+            continue
+        geometry = (
+            {"type": "Polygon", "coordinates": polygons[0]}
+            if len(polygons) == 1
+            else {"type": "MultiPolygon", "coordinates": polygons}
+        )
+        features.append({
+            "type": "Feature",
+            "geometry": geometry,
+            "properties": {
+                "type": layer["type"],
+                "color": layer.get("color"),
+                "radius_km": layer["radius_km"],
+                "inner_radius_km": ordered[i + 1]["radius_km"] if inner is not None else 0,
+                "order": i,
+            },
+        })
+    return {"type": "FeatureCollection", "features": features}
+
+
+def rasterize_discs(cx_km, cy_km, radii_km, x0_km: float, y0_km: float, cell_km: float, shape: Tuple[int, int]) -> np.ndarray:
+    """
+    Скільки кругів накриває кожну клітинку сітки на локальній площині (км).
+    cx/cy/radii — масиви (N,); (x0, y0) — кут клітинки [0, 0]; рядки йдуть уздовж y.
+    Клітинка накрита, якщо її центр усередині круга. Кожен круг розкладається на відрізки
+    рядків [c0, c1); усі відрізки додаються у різницевий масив одним bincount, а покриття —
+    префіксна сума вздовж рядка, тож ціна пропорційна кількості відрізків, а не N × клітинки.
+    """
+    rows, cols = shape
+    cx = np.asarray(cx_km, dtype=float).ravel()
+    cy = np.asarray(cy_km, dtype=float).ravel()
+    r = np.broadcast_to(np.asarray(radii_km, dtype=float), cx.shape)
+
+    # рядки, центри яких (y0 + (i + 0.5)·cell) лежать у [cy - r, cy + r]
+    row_lo = np.clip(np.ceil((cy - r - y0_km) / cell_km - 0.5), 0, rows).astype(np.intp)
+    row_hi = np.clip(np.floor((cy + r - y0_km) / cell_km - 0.5) + 1, 0, rows).astype(np.intp)
+    counts = np.maximum(row_hi - row_lo, 0)
+    disc = np.repeat(np.arange(cx.size), counts)
+    first = np.cumsum(counts) - counts
+    row = row_lo[disc] + (np.arange(disc.size) - first[disc])
+
+    dy = y0_km + (row + 0.5) * cell_km - cy[disc]
+    half = np.sqrt(np.maximum(r[disc] ** 2 - dy ** 2, 0.0))
+    c0 = np.clip(np.ceil((cx[disc] - half - x0_km) / cell_km - 0.5), 0, cols).astype(np.intp)
+    c1 = np.clip(np.floor((cx[disc] + half - x0_km) / cell_km - 0.5) + 1, 0, cols).astype(np.intp)
+    keep = c1 > c0
+    row, c0, c1 = row[keep], c0[keep], c1[keep]
+
+    width = cols + 1
+    size = rows * width
+    diff = np.bincount(row * width + c0, minlength=size) - np.bincount(row * width + c1, minlength=size)
+    return np.cumsum(diff.reshape(rows, width), axis=1)[:, :cols]
@@ -0,0 +1,123 @@
+from typing import Dict, Optional
+
+import numpy as np
+
+from calculations import AIRBLAST_PRESSURES, AIRBLAST_WIND_MS, TSUNAMI_R0_KM
+
+# Неперервні поля ураження як функції відстані до епіцентру. Пороги зон calculate_airblast/
+# calculate_thermal/calculate_seismic — вузли; між ними поле інтерполюється лінійно за log r
+# (закони масштабування степеневі — тоді й значення в log), поза вузлами — продовження крайніх відрізків.
+
+# Порогові флюенси теплових зон, кал/см² (опіки 3-го, 2-го і 1-го ступеня)
+THERMAL_FLUENCE_CAL_CM2 = {
+    "third_degree_burns": 10.0,
+    "second_degree_burns": 6.0,
+    "first_degree_burns": 3.0,
+}
+# Пікова швидкість вітру на порогах тиску — середина діапазону AIRBLAST_WIND_MS
+WIND_AT_PRESSURE_MS = {p: sum(AIRBLAST_WIND_MS[p]) / 2 for p in AIRBLAST_PRESSURES}
+MMI_RANGE = (1.0, 12.0)
+# Ближче за цю частку найменшого радіуса поле не зростає (степенева екстраполяція до нуля розходиться)
+HAZARD_NEAR_FRACTION = 0.1
+
+# Поле -> (секція фізики, поле значення в зоні, інтерполяція в log значення)
+HAZARD_FIELDS = {
+    "overpressure": ("airblast", "pressure_kpa", True),
+    "thermal": ("thermal", None, True),
+    "seismic": ("seismic", "mmi", False),
+    "tsunami": ("tsunami", "wave_height_m", True),
+}
+
+
+def hazard_profile(name: str, physics: Dict) -> Optional[Dict]:
+    """
+    Вузли поля з фізики сценарію: radius_km і value (за зростанням радіуса), color — колір зони.
+    None — секція для сценарію не рахується.
+    """
+    section, key, log_values = HAZARD_FIELDS[name]
+    data = physics.get(section)
+    if data is None:
+        return None
+    zones = data["zones"] if section == "tsunami" else data
+    points = [
+        (z["radius_km"], THERMAL_FLUENCE_CAL_CM2[z["type"]] if key is None else z[key], z["color"])
+        for z in zones
+    ]
+    points = sorted((p for p in points if p[0] > 0 and (p[1] > 0 or not log_values)), key=lambda p: p[0])
+    if not points:
+        return None
+    return {
+        "radius_km": np.array([p[0] for p in points], dtype=float),
+        "value": np.array([p[1] for p in points], dtype=float),
+        "color": [p[2] for p in points],
+        "log_values": log_values,
+    }
+
+
+def profile_values(profile: Dict, distance_km, beyond: bool = True) -> np.ndarray:
+    """
+    Значення поля на відстанях distance_km (будь-якої форми).
+    beyond=False — за найбільшим радіусом nan (поле не визначене), інакше — продовження.
+    """
+    radii = profile["radius_km"]
+    log_r = np.log(radii)
+    v = np.log(profile["value"]) if profile["log_values"] else profile["value"]
+    d = np.asarray(distance_km, dtype=float)
+    x = np.log(np.maximum(d, HAZARD_NEAR_FRACTION * radii[0]))
+    out = np.interp(x, log_r, v)
+    if log_r.size > 1:
+        inner = (v[1] - v[0]) / (log_r[1] - log_r[0])
+        outer = (v[-1] - v[-2]) / (log_r[-1] - log_r[-2])
+        out = np.where(x < log_r[0], v[0] + inner * (x - log_r[0]), out)
+        if beyond:
+            out = np.where(x > log_r[-1], v[-1] + outer * (x - log_r[-1]), out)
+    if profile["log_values"]:
+        out = np.exp(out)
+    if not beyond:
+        out = np.where(d <= radii[-1], out, np.nan)
+    return out
+
+
+def overpressure_kpa(physics: Dict, distance_km) -> Optional[np.ndarray]:
+    profile = hazard_profile("overpressure", physics)
+    return None if profile is None else profile_values(profile, distance_km)
+
+
+def wind_ms(pressure_kpa) -> np.ndarray:
+    """Пікова швидкість вітру за надлишковим тиском (log-log між порогами AIRBLAST_WIND_MS)"""
+    p = np.array(sorted(WIND_AT_PRESSURE_MS), dtype=float)
+    u = np.array([WIND_AT_PRESSURE_MS[k] for k in sorted(WIND_AT_PRESSURE_MS)], dtype=float)
+    log_p, log_u = np.log(p), np.log(u)
+    x = np.log(np.maximum(np.asarray(pressure_kpa, dtype=float), 1e-12))
+    out = np.interp(x, log_p, log_u)
+    lo = (log_u[1] - log_u[0]) / (log_p[1] - log_p[0])
+    hi = (log_u[-1] - log_u[-2]) / (log_p[-1] - log_p[-2])
+    out = np.where(x < log_p[0], log_u[0] + lo * (x - log_p[0]), out)
+    out = np.where(x > log_p[-1], log_u[-1] + hi * (x - log_p[-1]), out)
+    return np.exp(out)
+
+
+def thermal_fluence(physics: Dict, distance_km) -> Optional[np.ndarray]:
+    profile = hazard_profile("thermal", physics)
+    return None if profile is None else profile_values(profile, distance_km)
+
+
+def mmi(physics: Dict, distance_km) -> Optional[np.ndarray]:
+    profile = hazard_profile("seismic", physics)
+    return None if profile is None else np.clip(profile_values(profile, distance_km), *MMI_RANGE)
+
+
+def tsunami_height_m(physics: Dict, distance_km) -> Optional[np.ndarray]:
+    """Офшорна висота хвилі H(r) = H0 · sqrt(r0 / (r + r0)) — та сама модель, що й кільця calculate_tsunami"""
+    tsunami = physics.get("tsunami")
+    if tsunami is None:
+        return None
+    r = np.maximum(np.asarray(distance_km, dtype=float), 0.0)
+    return tsunami["initial_height_m"] * np.sqrt(TSUNAMI_R0_KM / (r + TSUNAMI_R0_KM))
+
+
+def tsunami_arrival_min(physics: Dict, distance_km) -> Optional[np.ndarray]:
+    tsunami = physics.get("tsunami")
+    if tsunami is None or tsunami["wave_speed_kmh"] <= 0:
+        return None
+    return np.asarray(distance_km, dtype=float) / tsunami["wave_speed_kmh"] * 60.0
@@ -0,0 +1,461 @@
+import random
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from models import ImpactRequest
+from constants import MATERIALS, FACTS
+from calculations import (
+    calculate_energy,
+    calculate_crater,
+    calculate_airblast,
+    calculate_thermal,
+    calculate_seismic,
+    calculate_tsunami,
+    material_density,
+    energy_kernel,
+    crater_kernel,
+    airblast_kernel,
+    thermal_kernel,
+    seismic_kernel,
+    tsunami_kernel,
+    energy_result,
+    crater_result,
+    airblast_zones,
+    thermal_zones,
+    seismic_zones,
+    tsunami_result,
+    fragmentation_result,
+    material_strength,
+)
+from entry import calculate_entry, entry_kernel, entry_results
+from casualties import (
+    calculate_casualties,
+    calculate_economic_damage,
+    calculate_strategic_risks,
+    estimate_population_density_batch,
+    LocationContext,
+)
+from metrics import stage
+
+# Фізичні секції кожного сценарію у порядку появи у відповіді
+# та частка енергії, яку отримує секція (None — секція не залежить від частки).
+# Одна таблиця для одиночного і batch-шляху, щоб вони не розходились.
+SCENARIO_PHYSICS = {
+    "ground": (
+        ("crater", None),
+        ("airblast", 1.0),
+        ("thermal", 1.0),
+        ("seismic", 1.0),
+    ),
+    "water": (
+        ("tsunami", 1.0),
+        ("thermal", 1.0),
+        ("airblast", 0.5),  # над водою слабше
+    ),
+    "airburst": (
+        ("entry", None),
+        ("airburst_altitude_km", None),
+        ("airblast", 1.0),
+        ("thermal", 1.0),
+        ("seismic", 0.3),
+    ),
+    "fragmentation": (
+        ("entry", None),
+        ("fragmentation", None),
+        ("airblast", 1.0),
+    ),
+}
+
+# Поля відповіді /impact, які можна вибрати через fields=
+RESPONSE_FIELDS = (
+    "energy", "material", "scenario", "fun_fact", "location",
+    "crater", "entry", "airburst_altitude_km", "fragmentation", "airblast", "thermal", "seismic", "tsunami",
+    "casualties", "economic_damage", "strategic_risks", "layers",
+)
+# Від чого залежить поле: з fields= рахуються лише вибрані поля та їхні залежності
+FIELD_DEPENDENCIES = {
+    "casualties": ("airblast", "thermal", "location"),
+    "economic_damage": ("airblast", "thermal", "location"),
+    "strategic_risks": ("airblast", "location"),
+    "layers": ("airblast", "crater", "tsunami"),
+    "thermal": ("airburst_altitude_km",),
+    "airblast": ("airburst_altitude_km",),
+    "airburst_altitude_km": ("entry",),
+    "fragmentation": ("entry",),
+}
+
+# Зони ударної хвилі, які малюються на мапі для наземних сценаріїв
+MAP_BLAST_TYPES = ["total_destruction", "heavy_damage", "moderate_damage"]
+CRATER_COLOR = "#000000"
+
+
+def airburst_energy_fraction(entry: Dict) -> Optional[float]:
+    """
+    Частка енергії повітряного підриву airburst — виділена в атмосфері (energy_deposited_fraction).
+    None — тіло долетіло до землі: ударна хвиля наземного удару на повну енергію (як у catalog).
+    """
+    if entry["reached_ground"]:
+        return None
+    fraction = entry["energy_deposited_fraction"]
+    return 1.0 if fraction is None else min(max(fraction, 0.0), 1.0)
+
+
+def request_rng(req: ImpactRequest):
+    """Джерело випадковості запиту: random.Random(seed), якщо seed задано, інакше глобальний random"""
+    return random.Random(req.seed) if req.seed is not None else random
+
+
+def burst_height_m(altitude_km: Optional[float]) -> Optional[float]:
+    """Висота підриву (м) для calculate_airblast з висоти airburst (км)"""
+    return None if altitude_km is None else altitude_km * 1000.0
+
+
+def parse_fields(text: Optional[str]) -> Optional[List[str]]:
+    """fields=crater,airblast -> список у порядку RESPONSE_FIELDS (однаковий для кешу); порожньо — None"""
+    names = {name.strip() for name in (text or "").split(",") if name.strip()}
+    if not names:
+        return None
+    resolve_fields(list(names))
+    return [name for name in RESPONSE_FIELDS if name in names]
+
+
+def resolve_fields(fields: Optional[List[str]]) -> Optional[Set[str]]:
+    """Вибрані поля разом із залежностями; None — потрібно все"""
+    if not fields:
+        return None
+    unknown = sorted(set(fields) - set(RESPONSE_FIELDS))
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}; allowed: {', '.join(RESPONSE_FIELDS)}")
+    needed: Set[str] = set()
+    stack = list(fields)
+    while stack:
+        name = stack.pop()
+        if name not in needed:
+            needed.add(name)
+            stack.extend(FIELD_DEPENDENCIES.get(name, ()))
+    return needed
+
+
+def compute_physics(req: ImpactRequest, energy: Dict, rng=None, needed: Optional[Set[str]] = None) -> Dict:
+    """Фізичні секції одного сценарію через скалярні calculate_* (лише needed, якщо задано)"""
+    rng = rng or random
+    E = energy["energy_mt"]
+    physics = {}
+    for section, factor in SCENARIO_PHYSICS.get(req.scenario, ()):
+        if needed is not None and section not in needed:
+            continue
+        # таймер етапу на кожну секцію (для /metrics і Server-Timing)
+        with stage(section):
+            _compute_section(physics, section, factor, req, E, rng)
+    return physics
+
+
+def _compute_section(physics: Dict, section: str, factor, req: ImpactRequest, E: float, rng) -> None:
+    """Одна фізична секція; результат записується в physics"""
+    if section == "crater":
+        physics["crater"] = calculate_crater(
+            req.size,           # діаметр метеорита (м)
+            req.speed,          # швидкість (км/с)
+            req.angle,          # кут падіння (градуси)
+            MATERIALS[req.material]["density"]  # густина матеріалу (кг/м³)
+        )
+    elif section == "entry":
+        m = MATERIALS[req.material]
+        physics[section] = calculate_entry(req.size, req.speed, req.angle, m["density"], m["strength"])
+    elif section == "airburst_altitude_km":
+        # висота вибуху — пік виділення енергії в моделі входу
+        physics[section] = physics["entry"]["burst_altitude_km"]
+    elif section == "fragmentation":
+        altitude_km = physics["entry"]["breakup_altitude_km"]
+        physics[section] = fragmentation_result(req.size, E, rng=rng, altitude_km=altitude_km)
+    elif section == "airblast":
+        fraction = airburst_energy_fraction(physics["entry"]) if "airburst_altitude_km" in physics else None
+        if fraction is not None:
+            height_m = burst_height_m(physics["airburst_altitude_km"])
+            physics[section] = calculate_airblast(E * factor * fraction, burst_mode="air", burst_height_m=height_m)
+        else:
+            physics[section] = calculate_airblast(E * factor)
+    elif section == "thermal":
+        physics[section] = calculate_thermal(E * factor, physics.get("airburst_altitude_km", 0))
+    elif section == "seismic":
+        physics[section] = calculate_seismic(E * factor)
+    elif section == "tsunami":
+        physics[section] = calculate_tsunami(E * factor)
+
+
+def impact_layers(scenario: str, physics: Dict) -> List[Dict]:
+    """Шари для мапи: кратер -> сильні руйнування -> середні (або кільця цунамі для води)"""
+    if scenario == "water":
+        # Цунамі-зони мають radius_km і type (tsunami_extreme/major/...)
+        tsunami_layers = [
+            {
+                "type": z.get("type", f"tsunami_{i}"),
+                "radius_km": float(z["radius_km"]),
+                "color": z.get("color", "#0077BE"),
+            }
+            for i, z in enumerate(physics["tsunami"]["zones"])
+            if "radius_km" in z
+        ]
+        # Додаємо бласт-зони (залишаємо як є)
+        airblast_layers = [
+            {
+                "type": z["type"],
+                "radius_km": float(z["radius_km"]),
+                "color": z["color"],
+            }
+            for z in physics["airblast"]
+            if "radius_km" in z
+        ]
+        return tsunami_layers + airblast_layers
+
+    layers = [
+        {"type": z["type"], "radius_km": z["radius_km"], "color": z["color"]}
+        for z in physics["airblast"]
+        if z["type"] in MAP_BLAST_TYPES
+    ]
+    if scenario == "ground":
+        layers.insert(0, {"type": "crater", "radius_km": physics["crater"]["diameter_km"]/2, "color": CRATER_COLOR})
+    return layers
+
+
+def build_impact_result(
+    req: ImpactRequest,
+    energy: Dict,
+    physics: Dict,
+    location: LocationContext,
+    fun_fact: Optional[str] = None,
+    fields: Optional[List[str]] = None,
+) -> Dict:
+    """
+    Збирає відповідь /impact з енергії, фізичних секцій та наслідків для локації.
+    location — один контекст точки на запит для всіх наслідків.
+    fields — лише ці поля (наслідки, від яких вони не залежать, не рахуються).
+    """
+    needed = resolve_fields(fields)
+    result = {
+        "energy": energy,
+        "material": MATERIALS[req.material]["name"],
+        "scenario": req.scenario,
+        "fun_fact": fun_fact if fun_fact is not None else random.choice(FACTS),
+        "location": location.info if needed is None or "location" in needed else None
+    }
+    result.update(physics)
+
+    if req.scenario not in SCENARIO_PHYSICS:
+        return _select(result, fields)
+
+    result.update(location_impacts(req, physics, location, needed))
+    if needed is None or "layers" in needed:
+        with stage("layers"):
+            result["layers"] = impact_layers(req.scenario, physics)
+    return _select(result, fields)
+
+
+def location_impacts(
+    req: ImpactRequest,
+    physics: Dict,
+    location: LocationContext,
+    needed: Optional[Set[str]] = None,
+) -> Dict:
+    """Наслідки, що залежать від точки удару: втрати, збитки, стратегічні об'єкти (спільний location)"""
+    out: Dict = {}
+    if req.scenario not in SCENARIO_PHYSICS:
+        return out
+
+    def wanted(name: str) -> bool:
+        return needed is None or name in needed
+
+    # Втрати та збитки тільки для наземних сценаріїв (не для води)
+    if req.scenario != "water" and wanted("casualties"):
+        with stage("casualties"):
+            out["casualties"] = calculate_casualties(
+                physics["airblast"], req.lat, req.lon, location, physics.get("thermal")
+            )
+    if req.scenario != "water" and wanted("economic_damage"):
+        with stage("economics"):
+            out["economic_damage"] = calculate_economic_damage(
+                physics["airblast"],
+                physics.get("thermal", []),
+                req.lat,
+                req.lon,
+                location
+            )
+    if req.scenario == "ground" and wanted("strategic_risks"):
+        with stage("strategic_risks"):
+            out["strategic_risks"] = calculate_strategic_risks(
+                req.lat,
+                req.lon,
+                physics["airblast"][0]["radius_km"],
+                location,
+                physics["airblast"]
+            )
+    return out
+
+
+def _select(result: Dict, fields: Optional[List[str]]) -> Dict:
+    if not fields:
+        return result
+    return {name: result[name] for name in fields if name in result}
+
+
+def simulate_physics(req: ImpactRequest, needed: Optional[Set[str]] = None) -> Dict:
+    """
+    Частина розрахунку, що не залежить від lat/lon: енергія, факт і фізичні секції.
+    {"energy", "fun_fact", "physics"} — спільні для будь-якої точки удару з тими ж параметрами.
+    """
+    # Базова енергія
+    with stage("energy"):
+        energy = calculate_energy(req.size, req.speed, req.material)
+    rng = request_rng(req)
+    # факт вибирається завжди — далі той самий порядок випадкових викликів, що й без fields
+    fun_fact = rng.choice(FACTS)
+    physics = compute_physics(req, energy, rng, needed)
+    return {"energy": energy, "fun_fact": fun_fact, "physics": physics}
+
+
+def simulate_impact(req: ImpactRequest, fields: Optional[List[str]] = None) -> Dict:
+    """Повний розрахунок одного сценарію (скалярний шлях); fields — лише вибрані поля"""
+    needed = resolve_fields(fields)
+    state = simulate_physics(req, needed)
+    # Інформація про населення — один раз на запит, спільна для всіх наслідків
+    location = LocationContext(req.lat, req.lon)
+    if needed is None or "location" in needed:
+        with stage("population"):
+            location.info
+    return build_impact_result(req, state["energy"], state["physics"], location, state["fun_fact"], fields)
+
+
+def compute_physics_batch(reqs: List[ImpactRequest], rngs: Optional[List] = None) -> Tuple[List[Dict], List[Dict]]:
+    """
+    Енергія та фізичні секції для багатьох сценаріїв одним проходом векторних ядер.
+    rngs — джерело випадковості для кожного сценарію (за замовчуванням глобальний random).
+    Повертає (energies, physics) — списки у тому ж форматі, що й скалярний шлях.
+    """
+    n = len(reqs)
+    if rngs is None:
+        rngs = [random] * n
+    size = np.fromiter((r.size for r in reqs), dtype=float, count=n)
+    speed = np.fromiter((r.speed for r in reqs), dtype=float, count=n)
+    angle = np.fromiter((r.angle for r in reqs), dtype=float, count=n)
+    materials = [r.material for r in reqs]
+    density = material_density(materials)
+
+    ek = energy_kernel(size, speed, density)
+    energies = [
+        energy_result(j, mt, m)
+        for j, mt, m in zip(ek["energy_j"].tolist(), ek["energy_mt"].tolist(), ek["mass_kg"].tolist())
+    ]
+    # як і в одиночному шляху, далі працюємо з округленою energy_mt
+    E = np.fromiter((e["energy_mt"] for e in energies), dtype=float, count=n)
+
+    # Хто яку секцію потребує і з якою часткою енергії
+    wanted: Dict[str, List] = {}
+    for i, r in enumerate(reqs):
+        for section, factor in SCENARIO_PHYSICS.get(r.scenario, ()):
+            wanted.setdefault(section, []).append((i, factor))
+
+    computed: Dict[str, Dict[int, object]] = {}
+    # порядок RESPONSE_FIELDS: entry раніше за airburst_altitude_km/fragmentation, ті — раніше за airblast
+    for section in sorted(wanted, key=RESPONSE_FIELDS.index):
+        items = wanted[section]
+        idx = np.array([i for i, _ in items], dtype=np.intp)
+        if section == "entry":
+            strength = material_strength([materials[i] for i in idx.tolist()])
+            values = entry_results(entry_kernel(size[idx], speed[idx], angle[idx], density[idx], strength))
+        elif section == "crater":
+            k = crater_kernel(size[idx], speed[idx], angle[idx], density[idx])
+            values = [
+                crater_result(*row)
+                for row in zip(
+                    k["width_m"].tolist(), k["length_m"].tolist(), k["depth_m"].tolist(),
+                    k["rim_height_m"].tolist(), k["ejecta_mass_kg"].tolist(),
+                    k["energy_mt"].tolist(), k["elliptical"].tolist(),
+                )
+            ]
+        elif section == "airburst_altitude_km":
+            values = [computed["entry"][i]["burst_altitude_km"] for i, _ in items]
+        elif section == "fragmentation":
+            values = [
+                fragmentation_result(
+                    reqs[i].size, float(E[i]), rng=rngs[i], altitude_km=computed["entry"][i]["breakup_altitude_km"]
+                )
+                for i, _ in items
+            ]
+        else:
+            e = E[idx] * np.array([f for _, f in items], dtype=float)
+            if section == "airblast":
+                values = _airblast_batch(
+                    e, [i for i, _ in items], computed.get("airburst_altitude_km", {}), computed.get("entry", {})
+                )
+            elif section == "thermal":
+                values = [thermal_zones(radii) for radii in thermal_kernel(e).T.tolist()]
+            elif section == "seismic":
+                k = seismic_kernel(e)
+                values = [
+                    seismic_zones(mag, radii)
+                    for mag, radii in zip(k["magnitude"].tolist(), k["radius_km"].T.tolist())
+                ]
+            elif section == "tsunami":
+                k = tsunami_kernel(e)
+                c_kmh = float(k["wave_speed_kmh"])
+                wavelength = float(k["wavelength_km"])
+                values = [
+                    tsunami_result(c_kmh, wavelength, h0, radii, eta)
+                    for h0, radii, eta in zip(
+                        k["initial_height_m"].tolist(),
+                        k["radius_km"].T.tolist(),
+                        k["arrival_time_min"].T.tolist(),
+                    )
+                ]
+        computed[section] = dict(zip((i for i, _ in items), values))
+
+    physics = [
+        {section: computed[section][i] for section, _ in SCENARIO_PHYSICS.get(r.scenario, ())}
+        for i, r in enumerate(reqs)
+    ]
+    return energies, physics
+
+
+def _airblast_batch(
+    e: np.ndarray, rows: List[int], altitudes: Dict[int, Optional[float]], entries: Dict[int, Dict]
+) -> List[Dict]:
+    """
+    Зони ударної хвилі пакета: повітряний підрив на частку енергії airburst_energy_fraction для рядків
+    з висотою airburst, решта (і тіла, що долетіли до землі) — поверхневий
+    """
+    values: List[Optional[List[Dict]]] = [None] * len(rows)
+    fractions = {i: airburst_energy_fraction(entries[i]) for i in altitudes}
+    surface = [j for j, i in enumerate(rows) if fractions.get(i) is None]
+    air = [j for j, i in enumerate(rows) if fractions.get(i) is not None and altitudes[i] is not None]
+    # висота None (некоректні входи) — оптимальна HOB, як у calculate_airblast
+    optimal = [j for j, i in enumerate(rows) if fractions.get(i) is not None and altitudes[i] is None]
+    e = e.copy()
+    for j in air + optimal:
+        e[j] *= fractions[rows[j]]
+    for group, mode, heights in (
+        (surface, "surface", None),
+        (air, "air", np.array([burst_height_m(altitudes[rows[j]]) for j in air])),
+        (optimal, "air", None),
+    ):
+        if not group:
+            continue
+        k = airblast_kernel(e[group], burst_mode=mode, burst_height_m=heights)
+        H = k["burst_height_m"]
+        H = [None] * len(group) if H is None else np.broadcast_to(H, (len(group),)).tolist()
+        for j, h, radii, mults in zip(group, H, k["radius_km"].T.tolist(), k["multiplier"].T.tolist()):
+            values[j] = airblast_zones(radii, mults, mode, h)
+    return values
+
+
+def simulate_impact_batch(reqs: List[ImpactRequest]) -> List[Dict]:
+    """Повний розрахунок пакета сценаріїв; кожен елемент — як відповідь /impact"""
+    rngs = [request_rng(r) for r in reqs]
+    # факт вибираємо до фізики — той самий порядок випадкових викликів, що й в simulate_impact
+    fun_facts = [rng.choice(FACTS) for rng in rngs]
+    energies, physics = compute_physics_batch(reqs, rngs)
+    locations = estimate_population_density_batch([r.lat for r in reqs], [r.lon for r in reqs])
+    return [
+        build_impact_result(r, e, p, LocationContext(r.lat, r.lon, loc), fact)
+        for r, e, p, loc, fact in zip(reqs, energies, physics, locations, fun_facts)
+    ]
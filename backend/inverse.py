@@ -0,0 +1,127 @@
+import math
+from typing import Dict, List
+
+import numpy as np
+
+from models import InverseRequest
+from calculations import material_density, material_strength
+from sweep import SWEEP_OUTPUTS, SweepGrid, evaluate_output, scenario_outputs
+
+# Межі пошуку за замовчуванням: діаметр (м), швидкість (км/с), кут (градуси)
+INVERSE_BOUNDS = {
+    "size": (0.1, 100_000.0),
+    "speed": (11.0, 72.0),
+    "angle": (1.0, 90.0),
+}
+# Максимальна кількість точок кривої в одному запиті
+MAX_INVERSE_POINTS = 100_000
+
+
+def validate_inverse(req: InverseRequest) -> None:
+    """Перевірка виходу та розміру кривої; ValueError з поясненням"""
+    if req.output not in SWEEP_OUTPUTS:
+        raise ValueError(f"Невідомий вихід: {req.output}. Доступні: {', '.join(SWEEP_OUTPUTS)}")
+    if req.output not in scenario_outputs(req.base.scenario):
+        raise ValueError(f"Вихід {req.output} не рахується для сценарію {req.base.scenario}")
+    low, high = _bounds(req)
+    if low >= high:
+        raise ValueError("low має бути < high")
+    if req.curve is not None and len(req.curve.grid()) > MAX_INVERSE_POINTS:
+        raise ValueError(f"Забагато точок кривої (максимум {MAX_INVERSE_POINTS})")
+
+
+def _bounds(req: InverseRequest):
+    default_low, default_high = INVERSE_BOUNDS[req.free]
+    return (
+        req.low if req.low is not None else default_low,
+        req.high if req.high is not None else default_high,
+    )
+
+
+def _base_grid(req: InverseRequest) -> SweepGrid:
+    """Одновимірна сітка вздовж curve (або з однієї точки) з фіксованими входами base"""
+    base = req.base
+    inputs = {
+        "size": np.float64(base.size),
+        "speed": np.float64(base.speed),
+        "angle": np.float64(base.angle),
+        "lat": np.float64(base.lat),
+        "lon": np.float64(base.lon),
+        "density": material_density(base.material),
+        "strength": material_strength(base.material),
+    }
+    n = 1
+    if req.curve is not None:
+        values = req.curve.grid()
+        n = len(values)
+        if req.curve.field == "material":
+            inputs["density"] = material_density(values)
+            inputs["strength"] = material_strength(values)
+        else:
+            inputs[req.curve.field] = np.asarray(values, dtype=float)
+    return SweepGrid(base.scenario, (n,), inputs)
+
+
+def solve_inverse(req: InverseRequest) -> Dict:
+    """
+    Бісекція з брекетом [low, high] для всіх точок кривої одночасно.
+    Виходи монотонні за size/speed (масштабування через енергію), тому напрям
+    визначається значеннями на межах; крок — геометричний (межі додатні),
+    зупинка — коли відносна ширина брекета менша за rtol у всіх точках.
+    Розв'язок — найменше free, за якого вихід досягає target (для спадних виходів — опускається до target).
+    """
+    validate_inverse(req)
+    grid = _base_grid(req)
+    n = grid.shape[0]
+    low, high = _bounds(req)
+
+    def evaluate(x: np.ndarray) -> np.ndarray:
+        # та сама сітка з новим free: густина населення рахується один раз
+        nonlocal grid
+        grid = grid.replace(**{req.free: x})
+        return evaluate_output(grid, req.output).astype(float)
+
+    lo = np.full(n, low)
+    hi = np.full(n, high)
+    f_lo = evaluate(lo)
+    f_hi = evaluate(hi)
+    increasing = f_hi >= f_lo
+
+    def reached(values: np.ndarray) -> np.ndarray:
+        return np.where(increasing, values >= req.target, values <= req.target)
+
+    at_low = reached(f_lo)
+    solvable = reached(f_hi)
+    # уже на нижній межі або недосяжно — ці точки далі не уточнюються
+    active = solvable & ~at_low
+    hi = np.where(at_low, lo, hi)
+
+    iterations = 0
+    while active.any() and iterations < req.max_iter:
+        mid = np.sqrt(lo * hi)
+        ok = reached(evaluate(mid))
+        hi = np.where(active & ok, mid, hi)
+        lo = np.where(active & ~ok, mid, lo)
+        active &= (hi - lo) > req.rtol * hi
+        iterations += 1
+
+    achieved = evaluate(hi)
+    status = np.where(at_low, "at_lower_bound", np.where(solvable, "ok", "unreachable"))
+    return {
+        "scenario": req.base.scenario,
+        "output": req.output,
+        "target": req.target,
+        "free": req.free,
+        "bounds": [low, high],
+        "curve": {"field": req.curve.field, "values": req.curve.grid()} if req.curve is not None else None,
+        "solution": _nullable(np.where(solvable, hi, np.nan)),
+        "achieved": _nullable(np.where(solvable, achieved, np.nan)),
+        "direction": np.where(increasing, "increasing", "decreasing").tolist(),
+        "status": status.tolist(),
+        "iterations": iterations,
+        "converged": not active.any(),
+    }
+
+
+def _nullable(values: np.ndarray) -> List:
+    return [x if math.isfinite(x) else None for x in values.tolist()]
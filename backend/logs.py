@@ -0,0 +1,158 @@
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import time
+import uuid
+from contextvars import ContextVar
+from typing import Optional
+from urllib.parse import parse_qs
+
+# Налаштування з оточення
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.environ.get("LOG_FORMAT", "json")  # "json" | "text"
+# Частка запитів з повним debug-трейсом фізики (0.001 — кожен тисячний)
+LOG_TRACE_SAMPLE = float(os.environ.get("LOG_TRACE_SAMPLE", 0.0))
+# Трейс поза HTTP-запитами (скрипти, консоль)
+LOG_TRACE_DEFAULT = os.environ.get("LOG_TRACE", "0") == "1"
+
+# Увімкнення трейсу на запит: заголовок або ?trace=1
+TRACE_HEADER = b"x-debug-trace"
+TRACE_QUERY_PARAM = "trace"
+REQUEST_ID_HEADER = b"x-request-id"
+
+_request_id: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+_trace: ContextVar[bool] = ContextVar("trace", default=LOG_TRACE_DEFAULT)
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def trace_enabled() -> bool:
+    """Чи писати debug-трейс фізики для поточного запиту (дешева перевірка перед log.debug)"""
+    return _trace.get()
+
+
+def current_request_id() -> Optional[str]:
+    return _request_id.get()
+
+
+class RequestContextFilter(logging.Filter):
+    """Додає request_id поточного запиту до кожного запису"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = _request_id.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """Один JSON-об'єкт на рядок; повідомлення форматується тут, уже у потоці запису"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", None),
+            "msg": record.getMessage(),
+        }
+        fields = getattr(record, "fields", None)
+        if fields:
+            entry.update(fields)
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class _LazyQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler без форматування у потоці запиту: стандартний prepare()
+    викликає getMessage() одразу, а тут це робить слухач.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def setup_logging() -> None:
+    """
+    Кореневий логер пише у чергу (запит не чекає на I/O),
+    окремий потік QueueListener форматує і виводить у stdout.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    stream = logging.StreamHandler(sys.stdout)
+    if LOG_FORMAT == "json":
+        stream.setFormatter(JsonFormatter())
+    else:
+        stream.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s"))
+
+    q: "queue.SimpleQueue" = queue.SimpleQueue()
+    handler = _LazyQueueHandler(q)
+    handler.addFilter(RequestContextFilter())
+
+    root = logging.getLogger()
+    root.setLevel(LOG_LEVEL)
+    root.addHandler(handler)
+    # debug фізики проходить лише для трасованих запитів (див. trace_enabled)
+    logging.getLogger("physics").setLevel(logging.DEBUG)
+    logging.getLogger("api").setLevel(logging.DEBUG)
+
+    _listener = logging.handlers.QueueListener(q, stream, respect_handler_level=True)
+    _listener.start()
+
+
+def shutdown_logging() -> None:
+    """Дописує чергу і зупиняє потік виводу"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+class RequestContextMiddleware:
+    """
+    ASGI-middleware: request_id (з X-Request-ID або новий) і рішення про трейс
+    (X-Debug-Trace: 1, ?trace=1 або вибірка LOG_TRACE_SAMPLE) для всього запиту.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or ())
+        request_id = headers.get(REQUEST_ID_HEADER, b"").decode("latin-1") or uuid.uuid4().hex[:16]
+        query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+        trace = (
+            headers.get(TRACE_HEADER, b"") in (b"1", b"true")
+            or query.get(TRACE_QUERY_PARAM, [""])[0] in ("1", "true")
+            or (LOG_TRACE_SAMPLE > 0 and random.random() < LOG_TRACE_SAMPLE)
+        )
+        rid_token = _request_id.set(request_id)
+        trace_token = _trace.set(trace)
+        started = time.perf_counter()
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [(REQUEST_ID_HEADER, request_id.encode("latin-1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            if trace:
+                logging.getLogger("api").debug(
+                    "%s %s done in %.1f ms", scope.get("method"), scope.get("path"),
+                    (time.perf_counter() - started) * 1e3,
+                )
+            _trace.reset(trace_token)
+            _request_id.reset(rid_token)
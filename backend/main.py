@@ -1,26 +1,131 @@
-from fastapi import FastAPI
+import os
+import threading
+from contextlib import asynccontextmanager
+from typing import Literal, Optional
+
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-import random
-
-from models import ImpactRequest
-from constants import MATERIALS, FACTS
-from calculations import (
-    calculate_energy,
-    calculate_crater,
-    calculate_airblast,
-    calculate_thermal,
-    calculate_seismic,
-    calculate_tsunami,
-    calculate_fragmentation
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+
+from models import (
+    ImpactRequest,
+    ImpactBatchRequest,
+    SweepRequest,
+    MonteCarloRequest,
+    InverseRequest,
+    FragmentFieldRequest,
+    PointsRequest,
+    CorridorRequest,
+)
+from impact import SCENARIO_PHYSICS, location_impacts, parse_fields, simulate_impact_batch
+from casualties import location_context
+from constants import MATERIALS
+from sweep import validate_sweep, stream_sweep_json, stream_sweep_binary
+from montecarlo import mc_slots, run_monte_carlo, shutdown_mc_pool
+from corridor import run_corridor
+from inverse import solve_inverse
+from fragments import simulate_fragment_field
+from catalog import NEO_CATALOG, get_catalog
+from points import stream_points_binary, stream_points_json, validate_points
+from tsunami_sim import (
+    TSUNAMI_DURATION_MIN,
+    get_bathymetry,
+    simulate_tsunami,
+    stream_tsunami_binary,
+    tsunami_json,
+)
+from calculations import calculate_energy, calculate_tsunami
+from population import get_population_backend
+from exposure import get_exposure_backend
+from sites import get_site_index
+from cache import get_impact_cache, get_physics_cache, request_from_token
+from streaming import get_stream_registry, impact_events, parse_products, sse_stream, validate_stream
+from tiles import TILE_MAX_AGE_S, get_tile, tile_etag, tile_key, tile_template
+from executor import Overloaded, client_id, get_executor
+from compact import (
+    DICTIONARY,
+    DICTIONARY_ETAG,
+    compact_result,
+    encode_response,
+    select_fields,
+    wants_msgpack,
 )
-from casualties import (
-    calculate_casualties,
-    calculate_economic_damage,
-    calculate_strategic_risks,
-    estimate_population_density
+from geo import DEFAULT_PRECISION, DEFAULT_ZOOM, layers_feature_collection
+from logs import setup_logging, shutdown_logging, RequestContextMiddleware
+from metrics import (
+    MetricsMiddleware,
+    collect_stages,
+    observe_stages,
+    render_metrics,
+    server_timing_header,
+    stage,
 )
 
-app = FastAPI(title="Asteroid Impact Simulator API")
+# Server-Timing для всіх відповідей /impact (інакше — лише на запит)
+SERVER_TIMING = os.environ.get("SERVER_TIMING", "0") == "1"
+# /dictionary змінюється лише з новою версією — клієнти можуть тримати його довго
+DICTIONARY_MAX_AGE_S = int(os.environ.get("DICTIONARY_MAX_AGE_S", 86400))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Логи йдуть через чергу: потік запиту не чекає на запис у stdout
+    setup_logging()
+    # Растр населення відкривається одразу (memory-map), а піраміда добудовується у фоні
+    threading.Thread(target=get_population_backend().warm_up, daemon=True).start()
+    if get_exposure_backend() is not None:
+        threading.Thread(target=get_exposure_backend().warm_up, daemon=True).start()
+    # Індекс стратегічних об'єктів (вбудовані + SITES_CSV) будується один раз
+    threading.Thread(target=get_site_index, daemon=True).start()
+    yield
+    shutdown_mc_pool()
+    shutdown_logging()
+
+
+app = FastAPI(title="Asteroid Impact Simulator API", lifespan=lifespan)
+
+
+def _client(request: Request) -> str:
+    return client_id(request.headers, request.client.host if request.client else None)
+
+
+def _overloaded(e: Overloaded) -> HTTPException:
+    return HTTPException(status_code=429, detail=e.reason, headers={"Retry-After": str(e.retry_after)})
+
+
+async def run_heavy(request: Request, fn, *args, slots: int = 1):
+    """
+    Важкий endpoint через ImpactExecutor: ті самі ліміти клієнта, черга й 429, що й у /impact,
+    розрахунок — у пулі потоків, а не в пулі AnyIO повз ліміти. Помилки fn (ValueError) — як є.
+    """
+    try:
+        return await get_executor().run(_client(request), fn, *args, slots=slots)
+    except Overloaded as e:
+        raise _overloaded(e)
+
+
+async def stream_heavy(request: Request, chunks, media_type: str) -> StreamingResponse:
+    """Потокова відповідь (/sweep, /impact/points), шматки якої рахуються через ImpactExecutor"""
+    chunks = get_executor().iterate(_client(request), chunks)
+    try:
+        first = await chunks.__anext__()
+    except Overloaded as e:
+        raise _overloaded(e)
+    except StopAsyncIteration:
+        first = None
+
+    async def body():
+        try:
+            if first is None:
+                return
+            yield first
+            async for chunk in chunks:
+                yield chunk
+        finally:
+            await chunks.aclose()
+
+    return StreamingResponse(body(), media_type=media_type)
 
 app.add_middleware(
     CORSMiddleware,
@@ -28,152 +133,376 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Request-ID", "Server-Timing"],
 )
+# request_id і debug-трейс (X-Debug-Trace: 1 або ?trace=1) для кожного запиту
+app.add_middleware(RequestContextMiddleware)
+# лічильники запитів, запити в обробці, латентність за маршрутом
+app.add_middleware(MetricsMiddleware)
 
 
 @app.post("/impact")
-def calculate_impact(req: ImpactRequest):
-    """Головний endpoint для розрахунку наслідків удару астероїда"""
-    
-    # Базова енергія
-    energy = calculate_energy(req.size, req.speed, req.material)
-    
-    # Інформація про населення
-    pop_info = estimate_population_density(req.lat, req.lon)
-    
-    # Отримуємо густину матеріалу з constants
-    material_density = MATERIALS[req.material]["density"]
-    
+async def calculate_impact(
+    req: ImpactRequest,
+    request: Request,
+    format: Literal["json", "geojson"] = "json",
+    zoom: float = Query(DEFAULT_ZOOM, ge=0, le=22),
+    precision: int = Query(DEFAULT_PRECISION, ge=0, le=8),
+    fields: Optional[str] = None,
+    compact: bool = False,
+    encoding: Optional[Literal["json", "msgpack"]] = None,
+):
+    """
+    Головний endpoint для розрахунку наслідків удару астероїда.
+    Розрахунок іде через ImpactExecutor (пул потоків/процесів, черга, single-flight);
+    при перевантаженні — 429 з Retry-After.
+    format=geojson — layers приходять одним FeatureCollection геодезичних кільцевих зон
+    (кількість вершин під zoom, координати з precision знаками).
+    fields=crater,airblast — лише ці поля (інші не рахуються);
+    compact=true — без статичних текстів (вони у /dictionary);
+    encoding=msgpack або Accept: application/msgpack — MessagePack замість JSON.
+    """
+    try:
+        selected = parse_fields(fields)
+        use_msgpack = wants_msgpack(request.headers.get("accept"), encoding)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    with collect_stages() as stages:
+        try:
+            result = await get_executor().impact(req, _client(request), selected)
+        except Overloaded as e:
+            raise _overloaded(e)
+        if format == "geojson" and "layers" in result:
+            with stage("geojson"):
+                result["layers"] = await run_in_threadpool(
+                    layers_feature_collection, req.lat, req.lon, result["layers"], zoom, precision
+                )
+        with stage("serialize"):
+            if compact:
+                result = compact_result(result, req)
+            response = encode_response(result, use_msgpack)
+    observe_stages(req.scenario, stages)
+    # Server-Timing лише на запит (?timing=1 або X-Server-Timing: 1) — DevTools показують розбивку
+    if SERVER_TIMING or request.query_params.get("timing") == "1" or request.headers.get("x-server-timing") == "1":
+        response.headers["Server-Timing"] = server_timing_header(stages)
+    return response
+
+
+@app.post("/impact/stream")
+async def impact_stream(
+    req: ImpactRequest,
+    request: Request,
+    products: Optional[str] = None,
+    stream_id: Optional[str] = None,
+    zoom: float = Query(DEFAULT_ZOOM, ge=0, le=22),
+    precision: int = Query(DEFAULT_PRECISION, ge=0, le=8),
+):
+    """
+    Потоковий /impact (Server-Sent Events): кожна частина відповіді — окрема подія, щойно готова
+    (energy, layers, фізичні секції, location, casualties, economic_damage, strategic_risks, done).
+    products=geojson,tsunami — ще й дорогі продукти (layers_geojson, tsunami_simulation).
+    stream_id — новий потік з тим самим stream_id від того ж клієнта скасовує попередній.
+    """
+    try:
+        validate_stream(req)
+        selected = parse_products(products)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    client = _client(request)
+    registry = get_stream_registry()
+    key = (client, stream_id) if stream_id else None
+    cancel = registry.open(key)
+    events = impact_events(req, client, cancel, selected, zoom, precision)
+    try:
+        first = await events.__anext__()
+    except Overloaded as e:
+        registry.close(key, cancel)
+        raise _overloaded(e)
+    return StreamingResponse(
+        sse_stream(first, events, lambda: registry.close(key, cancel)),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.post("/impact/physics")
+async def impact_physics(req: ImpactRequest, request: Request, compact: bool = False):
+    """
+    Частина /impact, що не залежить від точки удару (енергія, кратер, хвилі, шари)
+    і physics_token для /impact/{token}/at — перерахунку лише наслідків для нової точки.
+    """
+    return await run_heavy(request, _impact_physics, req, compact)
+
+
+def _impact_physics(req: ImpactRequest, compact: bool) -> Response:
+    token, req, state = get_physics_cache().prepare(req)
     result = {
-        "energy": energy,
+        "physics_token": token,
+        "energy": state["energy"],
         "material": MATERIALS[req.material]["name"],
         "scenario": req.scenario,
-        "fun_fact": random.choice(FACTS),
-        "location": pop_info
+        "fun_fact": state["fun_fact"],
+        **state["physics"],
+        "layers": state["layers"],
+        # растрові плитки полів ураження для цієї точки удару
+        "tiles": tile_template(token, req.lat, req.lon),
     }
-    
-    # Розрахунки залежно від сценарію
-    if req.scenario == "ground":
-        # ВИПРАВЛЕНО: передаємо густину матеріалу замість енергії
-        result["crater"] = calculate_crater(
-            req.size,           # діаметр метеорита (м)
-            req.speed,          # швидкість (км/с)
-            req.angle,          # кут падіння (градуси)
-            material_density    # густина матеріалу (кг/м³) - 3000 для stone, 7800 для iron, 917 для ice
-        )
-        
-        result["airblast"] = calculate_airblast(energy["energy_mt"])
-        result["thermal"] = calculate_thermal(energy["energy_mt"])
-        result["seismic"] = calculate_seismic(energy["energy_mt"])
-        
-        # Втрати та збитки тільки для наземного удару
-        result["casualties"] = calculate_casualties(result["airblast"], req.lat, req.lon)
-        result["economic_damage"] = calculate_economic_damage(
-            result["airblast"], 
-            result["thermal"], 
-            req.lat, 
-            req.lon
-        )
-        result["strategic_risks"] = calculate_strategic_risks(
-            req.lat, 
-            req.lon, 
-            result["airblast"][0]["radius_km"]
-        )
-        
-        # Для мапи: кратер -> сильні руйнування -> середні
-        result["layers"] = (
-            [{"type": "crater", "radius_km": result["crater"]["diameter_km"]/2, "color": "#000000"}] +
-            [{"type": z["type"], "radius_km": z["radius_km"], "color": z["color"]} 
-             for z in result["airblast"] 
-             if z["type"] in ["total_destruction", "heavy_damage", "moderate_damage"]]
-        )
-        
-    elif req.scenario == "water":
-        # 1) Енергія (якщо не порахована вище)
-        if "energy" not in result:
-            result["energy"] = calculate_energy(req.size, req.speed, req.material)
-        energy = result["energy"]
-
-        # 2) Ефекти
-        result["tsunami"]  = calculate_tsunami(energy["energy_mt"])
-        result["thermal"]  = calculate_thermal(energy["energy_mt"])
-        result["airblast"] = calculate_airblast(energy["energy_mt"] * 0.5)  # над водою слабше
-
-        # 3) Для water не рахуємо ці поля
-        result.pop("casualties", None)
-        result.pop("economic_damage", None)
-
-        # 4) Шари для мапи:
-        #    Тепер цунамі-зони мають radius_km і type (tsunami_extreme/major/...)
-        tsunami_layers = [
-            {
-                "type": z.get("type", f"tsunami_{i}"),
-                "radius_km": float(z["radius_km"]),
-                "color": z.get("color", "#0077BE"),
-            }
-            for i, z in enumerate(result["tsunami"]["zones"])
-            if "radius_km" in z
-        ]
+    return encode_response(compact_result(result, req) if compact else result)
 
-        #    Додаємо бласт-зони (залишаємо як є)
-        airblast_layers = [
-            {
-                "type": z["type"],
-                "radius_km": float(z["radius_km"]),
-                "color": z["color"],
-            }
-            for z in result["airblast"]
-            if "radius_km" in z
-        ]
 
-        #    Якщо хочеш обмежити кількість кілець цунамі – розкоментуй наступний рядок:
-        # tsunami_layers = tsunami_layers[:4]  # extreme..minor
-
-        result["layers"] = tsunami_layers + airblast_layers
-
-            
-    elif req.scenario == "airburst":
-        result["airburst_altitude_km"] = round(15 + random.uniform(-5, 10), 1)
-        result["airblast"] = calculate_airblast(energy["energy_mt"])
-        result["thermal"] = calculate_thermal(energy["energy_mt"], result["airburst_altitude_km"])
-        result["seismic"] = calculate_seismic(energy["energy_mt"] * 0.3)
-        
-        # Втрати та збитки для airburst
-        result["casualties"] = calculate_casualties(result["airblast"], req.lat, req.lon)
-        result["economic_damage"] = calculate_economic_damage(
-            result["airblast"], 
-            result["thermal"], 
-            req.lat, 
-            req.lon
-        )
-        
-        # Для мапи: руйнування без кратера
-        result["layers"] = [
-            {"type": z["type"], "radius_km": z["radius_km"], "color": z["color"]} 
-            for z in result["airblast"] 
-            if z["type"] in ["total_destruction", "heavy_damage", "moderate_damage"]
-        ]
-        
-    elif req.scenario == "fragmentation":
-        result["fragmentation"] = calculate_fragmentation(req.size, req.speed, req.material)
-        result["airblast"] = calculate_airblast(energy["energy_mt"])
-        
-        # Втрати та збитки для fragmentation
-        result["casualties"] = calculate_casualties(result["airblast"], req.lat, req.lon)
-        result["economic_damage"] = calculate_economic_damage(
-            result["airblast"], 
-            [], 
-            req.lat, 
-            req.lon
-        )
-        
-        result["layers"] = [
-            {"type": z["type"], "radius_km": z["radius_km"], "color": z["color"]} 
-            for z in result["airblast"]
-            if z["type"] in ["total_destruction", "heavy_damage", "moderate_damage"]
-        ]
-    
-    return result
+@app.get("/impact/{token}/at")
+async def impact_at(
+    token: str,
+    request: Request,
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    format: Literal["json", "geojson"] = "json",
+    zoom: float = Query(DEFAULT_ZOOM, ge=0, le=22),
+    precision: int = Query(DEFAULT_PRECISION, ge=0, le=8),
+    compact: bool = False,
+):
+    """
+    Наслідки для нової точки удару з уже порахованою фізикою (перетягування точки на мапі):
+    location, casualties, economic_damage, strategic_risks; format=geojson — ще й layers навколо точки.
+    """
+    try:
+        req = request_from_token(token, lat, lon)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    with collect_stages() as stages:
+        # етапи з потоку потрапляють у stages: контекст копіюється разом зі словником
+        response = await run_heavy(request, _impact_at, token, req, format, zoom, precision, compact)
+    if SERVER_TIMING or request.query_params.get("timing") == "1" or request.headers.get("x-server-timing") == "1":
+        response.headers["Server-Timing"] = server_timing_header(stages)
+    return response
+
+
+def _impact_at(token: str, req: ImpactRequest, format: str, zoom: float, precision: int, compact: bool) -> Response:
+    state = get_physics_cache().get(token, req)
+    with stage("population"):
+        location = location_context(req.lat, req.lon)
+    result = {"location": location.info, **location_impacts(req, state["physics"], location)}
+    if format == "geojson":
+        with stage("geojson"):
+            result["layers"] = layers_feature_collection(req.lat, req.lon, state["layers"], zoom, precision)
+    with stage("serialize"):
+        return encode_response(compact_result(result, req) if compact else result)
+
+
+@app.get("/tiles/{scenario_id}/{layer}/{z}/{x}/{y}.png")
+def damage_tile(
+    scenario_id: str,
+    layer: str,
+    z: int,
+    x: int,
+    y: int,
+    request: Request,
+    encoding: Literal["color", "value"] = "color",
+):
+    """
+    Растрова плитка поля ураження (Web Mercator XYZ, 256×256): overpressure, thermal, seismic, tsunami.
+    scenario_id = "{physics_token}@{lat},{lon}" (шаблон — поле tiles у /impact/physics).
+    encoding=value — значення поля в RGB (R·65536 + G·256 + B) · 0.001, альфа 0 — поза полем.
+    """
+    try:
+        _, digest = tile_key(scenario_id, layer, encoding, z, x, y)
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    # вміст плитки визначається ключем — повторний запит браузера не потребує навіть кешу
+    headers = {"ETag": tile_etag(digest), "Cache-Control": f"public, max-age={TILE_MAX_AGE_S}, immutable"}
+    if headers["ETag"] in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+    try:
+        png = get_tile(scenario_id, layer, z, x, y, encoding)
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return Response(content=png, media_type="image/png", headers=headers)
+
+
+@app.get("/dictionary")
+def dictionary(request: Request):
+    """
+    Статичні тексти для compact-відповідей: описи та кольори зон, матеріали, факти, шаблони ризиків.
+    ETag — версія словника (dictionary_version у compact-відповідях).
+    """
+    headers = {"ETag": DICTIONARY_ETAG, "Cache-Control": f"public, max-age={DICTIONARY_MAX_AGE_S}"}
+    if DICTIONARY_ETAG in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+    return encode_response(DICTIONARY, headers=headers)
+
+
+@app.get("/impact/cache")
+def impact_cache_stats():
+    """Лічильники кешу /impact: влучання, промахи, витіснення"""
+    return get_impact_cache().info()
+
+
+@app.get("/impact/executor")
+def impact_executor_stats():
+    """Стан черги розрахунків /impact: глибина, виконуються, ліміти"""
+    return get_executor().info()
+
+
+@app.get("/metrics")
+def metrics():
+    """Метрики у форматі Prometheus: запити, латентність етапів /impact, кеш"""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
+@app.post("/impact/batch")
+async def calculate_impact_batch(
+    batch: ImpactBatchRequest,
+    request: Request,
+    fields: Optional[str] = None,
+    compact: bool = False,
+    encoding: Optional[Literal["json", "msgpack"]] = None,
+):
+    """
+    Пакетний розрахунок: той самий формат, що й /impact, для кожного сценарію.
+    fields, compact і encoding — як у /impact (поля тут вибираються з готових результатів).
+    """
+    try:
+        selected = parse_fields(fields)
+        use_msgpack = wants_msgpack(request.headers.get("accept"), encoding)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return await run_heavy(request, _impact_batch, batch.to_requests(), selected, compact, use_msgpack)
+
+
+def _impact_batch(reqs, selected, compact: bool, use_msgpack: bool) -> Response:
+    results = select_fields(simulate_impact_batch(reqs), selected)
+    if compact:
+        results = [compact_result(r, req) for r, req in zip(results, reqs)]
+    # результати вже з простих python-типів — віддаємо без jsonable_encoder
+    return encode_response({"count": len(results), "results": results}, use_msgpack)
+
+
+@app.post("/impact/montecarlo")
+async def impact_monte_carlo(req: MonteCarloRequest, request: Request):
+    """Monte Carlo: перцентилі всіх радіусів, втрат і збитків за розподілами невизначених входів"""
+    try:
+        return await run_heavy(request, run_monte_carlo, req, slots=mc_slots(req))
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+
+@app.post("/impact/corridor")
+async def impact_corridor(req: CorridorRequest, request: Request):
+    """
+    Коридор ризику: тисячі точок удару вздовж траси ймовірності (або в еліпсі невизначеності) →
+    очікувані й найгірші втрати та збитки з розбивкою за відрізками траси
+    """
+    try:
+        return await run_heavy(request, run_corridor, req)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+
+@app.post("/impact/fragments")
+async def impact_fragments(req: FragmentFieldRequest, request: Request):
+    """Поле уламків: тисячі фрагментів, ударна хвиля кожного і втрати з об'єднання зон"""
+    try:
+        return await run_heavy(request, simulate_fragment_field, req)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+
+@app.post("/sweep")
+async def sweep(req: SweepRequest, request: Request):
+    """Декартова сітка параметрів з колонковою відповіддю (для теплових карт чутливості)"""
+    try:
+        validate_sweep(req)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    if req.format == "binary":
+        return await stream_heavy(request, stream_sweep_binary(req), "application/octet-stream")
+    return await stream_heavy(request, stream_sweep_json(req), "application/json")
+
+
+@app.post("/impact/points")
+async def impact_points(req: PointsRequest, request: Request):
+    """
+    Поля ураження в довільних точках (лікарні, школи, підстанції): відстань, надлишковий тиск,
+    вітер, теплова флюенса, MMI, висота й час приходу цунамі — колонками у порядку точок.
+    format=binary — заголовок JSON + сирі float64 масиви (як у /sweep).
+    """
+    try:
+        validate_points(req)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    if req.format == "binary":
+        return await stream_heavy(request, stream_points_binary(req), "application/octet-stream")
+    return await stream_heavy(request, stream_points_json(req), "application/json")
+
+
+@app.get("/catalog")
+def catalog(
+    sort: Literal["expected_deaths", "impact_probability", "energy_mt", "palermo_cum", "diameter_m"] = "expected_deaths",
+    limit: int = Query(50, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+    min_probability: float = Query(0.0, ge=0, le=1),
+):
+    """
+    Рейтинг об'єктів каталогу NEO (NEO_CATALOG, експорт Sentry/CNEOS) за очікуваними наслідками:
+    енергія, висота вибуху, радіуси ударної хвилі, загиблі при ударі у випадкову точку
+    та expected_deaths = ймовірність удару × загиблі. Новий файл каталогу — перерахунок лише змінених рядків.
+    """
+    try:
+        store = get_catalog(NEO_CATALOG)
+    except (OSError, ValueError) as e:
+        raise HTTPException(status_code=503, detail=f"Каталог недоступний: {e}")
+    if store is None:
+        raise HTTPException(status_code=404, detail="Каталог NEO не налаштовано (NEO_CATALOG)")
+    return encode_response({
+        "source": store.source,
+        "recomputed": store.recomputed,
+        "sort": sort,
+        **store.totals(),
+        "rows": store.ranked(sort, limit, offset, min_probability),
+    })
+
+
+@app.post("/tsunami")
+async def tsunami(
+    req: ImpactRequest,
+    request: Request,
+    format: Literal["json", "binary"] = "json",
+    duration_min: float = Query(TSUNAMI_DURATION_MIN, gt=0, le=1440),
+):
+    """
+    Поширення цунамі за рельєфом дна (TSUNAMI_BATHYMETRY): растри максимальної висоти
+    та часу приходу і значення в прибережних клітинках. Без рельєфу, на суходолі
+    чи поза растром — миттєва кільцева модель (engine="rings").
+    """
+    return await run_heavy(request, _tsunami, req, format, duration_min)
+
+
+def _tsunami(req: ImpactRequest, format: str, duration_min: float):
+    factor = dict(SCENARIO_PHYSICS["water"])["tsunami"]
+    energy_mt = calculate_energy(req.size, req.speed, req.material)["energy_mt"] * factor
+    bathymetry = get_bathymetry()
+    result = None
+    if bathymetry is not None:
+        result = simulate_tsunami(bathymetry, req.lat, req.lon, energy_mt, duration_min)
+    if result is None:
+        return {"engine": "rings", **calculate_tsunami(energy_mt)}
+    if format == "binary":
+        return StreamingResponse(stream_tsunami_binary(result), media_type="application/octet-stream")
+    return encode_response(tsunami_json(result))
+
+
+@app.post("/inverse")
+async def inverse(req: InverseRequest, request: Request):
+    """
+    Обернена задача: найменше size/speed/angle, за якого вихід (як у /sweep) досягає target.
+    З curve — розв'язок для кожної точки іншої осі одним запитом (поріг size від speed тощо).
+    """
+    try:
+        return await run_heavy(request, solve_inverse, req)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
 
 
 @app.get("/")
@@ -185,8 +514,26 @@ def root():
         "features": [
             "Детальні зони ураження",
             "Цунамі розрахунки",
+            "Модель входу в атмосферу: розпад, профіль виділення енергії, висота вибуху",
             "Оцінка людських втрат",
             "Економічні збитки",
-            "Стратегічні ризики"
+            "Стратегічні ризики",
+            "Пакетні розрахунки (/impact/batch)",
+            "Сітки параметрів (/sweep)",
+            "Monte Carlo невизначеності (/impact/montecarlo)",
+            "Коридор ризику вздовж траси ймовірності удару (/impact/corridor)",
+            "Кеш повторних запитів (/impact/cache)",
+            "Метрики Prometheus (/metrics)",
+            "GeoJSON-шари геодезичних зон (/impact?format=geojson)",
+            "Поширення цунамі за рельєфом дна (/tsunami)",
+            "Обернена задача: параметри для цільового ефекту (/inverse)",
+            "Перерахунок для нової точки без фізики (/impact/physics, /impact/{token}/at)",
+            "Рейтинг каталогу NEO за очікуваними наслідками з інкрементальним перерахунком (/catalog)",
+            "Поля ураження в довільних точках, колонками (/impact/points)",
+            "Потокові результати /impact через Server-Sent Events зі скасуванням (/impact/stream)",
+            "Растрові плитки полів ураження з кешем у пам'яті та на диску (/tiles)",
+            "Економічні збитки з растру вартості активів по кільцях ураження (ASSET_RASTER)",
+            "Неперервна probit-модель втрат з таблицями доза-ефект для тиску й теплового потоку (CASUALTY_MODEL=probit)",
+            "Компактні відповіді, вибір полів і MessagePack (/impact?compact=true&fields=..., /dictionary)"
         ]
     }
\ No newline at end of file
@@ -0,0 +1,218 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# Межі кошиків гістограм латентності (секунди)
+LATENCY_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+    0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+# Семпл для рендера: (мітки, значення)
+Sample = Tuple[Dict[str, str], float]
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    body = ",".join(
+        '{}="{}"'.format(k, str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for k, v in labels.items()
+    )
+    return "{" + body + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = labelnames
+        self._values: Dict[Tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = list(self._values.items())
+        for labels, value in items:
+            lines.append(f"{self.name}{_format_labels(dict(zip(self.labelnames, labels)))} {_format_value(value)}")
+        return lines
+
+
+class Gauge(Counter):
+    def dec(self, *labels, amount: float = 1.0) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        lines[1] = f"# TYPE {self.name} gauge"
+        return lines
+
+
+class Histogram:
+    """Гістограма у форматі Prometheus (кумулятивні кошики рахуються лише при рендері)"""
+
+    def __init__(self, name: str, help_text: str, labelnames: Tuple[str, ...] = (), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        # мітки -> [лічильники кошиків (+Inf останній), сума]
+        self._series: Dict[Tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels) -> None:
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][i] += 1
+            series[1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = [(labels, list(counts), total) for labels, (counts, total) in self._series.items()]
+        for labels, counts, total in items:
+            base = dict(zip(self.labelnames, labels))
+            cumulative = 0
+            for le, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels({**base, 'le': _format_value(le)})} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(base)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(base)} {cumulative}")
+        return lines
+
+
+HTTP_REQUESTS = Counter("http_requests_total", "HTTP requests", ("method", "path", "status"))
+HTTP_IN_FLIGHT = Gauge("http_requests_in_flight", "HTTP requests being processed")
+HTTP_DURATION = Histogram("http_request_duration_seconds", "HTTP request latency", ("method", "path"))
+IMPACT_STAGE = Histogram("impact_stage_seconds", "Time spent in each /impact stage", ("stage", "scenario"))
+IMPACT_QUEUE_WAIT = Histogram("impact_queue_wait_seconds", "Time /impact computations wait for a worker", ("lane",))
+IMPACT_REJECTED = Counter("impact_rejected_total", "/impact requests rejected with 429", ("reason",))
+IMPACT_COALESCED = Counter("impact_coalesced_total", "/impact requests served by an identical in-flight computation")
+
+_METRICS = [HTTP_REQUESTS, HTTP_IN_FLIGHT, HTTP_DURATION, IMPACT_STAGE, IMPACT_QUEUE_WAIT, IMPACT_REJECTED, IMPACT_COALESCED]
+
+# Колектори — функції, що під час рендера повертають
+# [(ім'я, тип, опис, [(мітки, значення), ...])] (наприклад, лічильники кешу)
+_collectors: List[Callable[[], Iterable[Tuple[str, str, str, List[Sample]]]]] = []
+
+
+def register_collector(fn: Callable[[], Iterable[Tuple[str, str, str, List[Sample]]]]) -> None:
+    _collectors.append(fn)
+
+
+def render_metrics() -> str:
+    """Текстовий формат експозиції Prometheus 0.0.4"""
+    lines: List[str] = []
+    for metric in _METRICS:
+        lines.extend(metric.render())
+    for collect in _collectors:
+        for name, kind, help_text, samples in collect():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(f"{name}{_format_labels(labels)} {_format_value(value)}" for labels, value in samples)
+    return "\n".join(lines) + "\n"
+
+
+# --- Таймери етапів ----------------------------------------------------------
+
+_stages: ContextVar[Optional[Dict[str, float]]] = ContextVar("impact_stages", default=None)
+
+
+class stage:
+    """
+    Таймер етапу: with stage("airblast"): ...
+    Час додається до словника етапів поточного запиту (якщо він збирається),
+    інакше коштує лише два виклики perf_counter.
+    """
+    __slots__ = ("name", "_t0")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        stages = _stages.get()
+        if stages is not None:
+            stages[self.name] = stages.get(self.name, 0.0) + time.perf_counter() - self._t0
+        return False
+
+
+@contextmanager
+def collect_stages():
+    """Збирає {етап: секунди} для коду всередині блоку (один запит)"""
+    stages: Dict[str, float] = {}
+    token = _stages.set(stages)
+    try:
+        yield stages
+    finally:
+        _stages.reset(token)
+
+
+def record_stages(stages: Dict[str, float]) -> None:
+    """Додає етапи, виміряні деінде (потік чи процес-воркер), до етапів поточного запиту"""
+    current = _stages.get()
+    if current is not None:
+        for name, seconds in stages.items():
+            current[name] = current.get(name, 0.0) + seconds
+
+
+def observe_stages(scenario: str, stages: Dict[str, float]) -> None:
+    for name, seconds in stages.items():
+        IMPACT_STAGE.observe(seconds, name, scenario)
+
+
+def server_timing_header(stages: Dict[str, float]) -> str:
+    """Server-Timing: energy;dur=0.012, airblast;dur=0.034 (мілісекунди)"""
+    return ", ".join(f"{name};dur={seconds * 1e3:.3f}" for name, seconds in stages.items())
+
+
+class MetricsMiddleware:
+    """ASGI-middleware: кількість запитів, запити в обробці та латентність за шаблоном маршруту"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = {"code": 500}
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        method = scope.get("method", "")
+        HTTP_IN_FLIGHT.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            # шаблон маршруту (/impact/{token}), а не сирий шлях — обмежена кардинальність
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            HTTP_DURATION.observe(time.perf_counter() - started, method, path)
+            HTTP_REQUESTS.inc(method, path, str(status["code"]))
@@ -1,5 +1,22 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field, model_validator
+from typing import List, Literal, Optional, Union
+
+import numpy as np
+
+from constants import MATERIALS
+
+# Максимальна кількість сценаріїв в одному пакеті
+MAX_BATCH_SIZE = 100_000
+# Максимальна кількість вибірок Monte Carlo
+MAX_MC_SAMPLES = 1_000_000
+# Максимальна кількість фрагментів у полі уламків
+MAX_FIELD_FRAGMENTS = 20_000
+# Максимальна кількість точок у /impact/points
+MAX_POINTS = 1_000_000
+# Максимальна кількість вибірок коридору ризику і вершин траси
+MAX_CORRIDOR_SAMPLES = 200_000
+MAX_CORRIDOR_VERTICES = 10_000
+
 
 class ImpactRequest(BaseModel):
     """Модель запиту для симуляції удару"""
@@ -9,4 +26,322 @@ class ImpactRequest(BaseModel):
     speed: float
     angle: float
     material: Optional[str] = "stone"
-    scenario: Optional[str] = "ground"
\ No newline at end of file
+    scenario: Optional[str] = "ground"
+    # Зерно для випадкових частин (розліт фрагментів, факт) — відтворюваний результат
+    seed: Optional[int] = None
+
+
+class ImpactBatchRequest(BaseModel):
+    """
+    Пакет сценаріїв для /impact/batch.
+    Або список items, або колонки lat/lon/size/speed/angle однакової довжини
+    (material/scenario — колонка або відсутні, тоді значення за замовчуванням).
+    """
+    items: Optional[List[ImpactRequest]] = None
+    lat: Optional[List[float]] = None
+    lon: Optional[List[float]] = None
+    size: Optional[List[float]] = None
+    speed: Optional[List[float]] = None
+    angle: Optional[List[float]] = None
+    material: Optional[List[str]] = None
+    scenario: Optional[List[str]] = None
+
+    @model_validator(mode="after")
+    def check_shape(self):
+        columns = {
+            name: getattr(self, name)
+            for name in ("lat", "lon", "size", "speed", "angle", "material", "scenario")
+        }
+        given = {name: col for name, col in columns.items() if col is not None}
+        if self.items is not None:
+            if given:
+                raise ValueError("Передай або items, або колонки, але не обидва")
+            n = len(self.items)
+            materials = {r.material for r in self.items}
+        else:
+            missing = [name for name in ("lat", "lon", "size", "speed", "angle") if name not in given]
+            if missing:
+                raise ValueError(f"Бракує колонок: {', '.join(missing)}")
+            lengths = {len(col) for col in given.values()}
+            if len(lengths) != 1:
+                raise ValueError("Колонки мають бути однакової довжини")
+            n = lengths.pop()
+            materials = set(self.material or ["stone"])
+        if n > MAX_BATCH_SIZE:
+            raise ValueError(f"Забагато сценаріїв у пакеті (максимум {MAX_BATCH_SIZE})")
+        unknown = materials - MATERIALS.keys()
+        if unknown:
+            raise ValueError(f"Невідомі матеріали: {', '.join(sorted(unknown))}")
+        return self
+
+    def to_requests(self) -> List[ImpactRequest]:
+        """Пакет як список ImpactRequest (колонки без повторної валідації)"""
+        if self.items is not None:
+            return self.items
+        n = len(self.lat)
+        material = self.material or ["stone"] * n
+        scenario = self.scenario or ["ground"] * n
+        return [
+            ImpactRequest.model_construct(
+                lat=lat, lon=lon, size=size, speed=speed, angle=angle,
+                material=m, scenario=sc, seed=None,
+            )
+            for lat, lon, size, speed, angle, m, sc in zip(
+                self.lat, self.lon, self.size, self.speed, self.angle, material, scenario
+            )
+        ]
+
+
+class SweepAxis(BaseModel):
+    """
+    Вісь сітки для /sweep: поле ImpactRequest і або явні values,
+    або діапазон start..stop з num точок (log=True — логарифмічний крок).
+    """
+    field: Literal["size", "speed", "angle", "material", "lat", "lon"]
+    values: Optional[List[Union[float, str]]] = None
+    start: Optional[float] = None
+    stop: Optional[float] = None
+    num: Optional[int] = None
+    log: bool = False
+
+    @model_validator(mode="after")
+    def check_range(self):
+        if self.values is None:
+            if self.start is None or self.stop is None or not self.num:
+                raise ValueError(f"Вісь {self.field}: потрібні values або start/stop/num")
+            if self.num < 1:
+                raise ValueError(f"Вісь {self.field}: num має бути >= 1")
+            if self.log and (self.start <= 0 or self.stop <= 0):
+                raise ValueError(f"Вісь {self.field}: log-діапазон лише для додатних меж")
+        elif not self.values:
+            raise ValueError(f"Вісь {self.field}: порожній список values")
+        if self.field == "material":
+            if self.values is None:
+                raise ValueError("Вісь material задається лише через values")
+            unknown = set(map(str, self.values)) - MATERIALS.keys()
+            if unknown:
+                raise ValueError(f"Невідомі матеріали: {', '.join(sorted(unknown))}")
+        elif self.values is not None and any(isinstance(v, str) for v in self.values):
+            raise ValueError(f"Вісь {self.field}: values мають бути числами")
+        return self
+
+    def grid(self) -> list:
+        """Значення осі як список"""
+        if self.values is not None:
+            return list(self.values)
+        if self.log:
+            return np.geomspace(self.start, self.stop, self.num).tolist()
+        return np.linspace(self.start, self.stop, self.num).tolist()
+
+
+class SweepRequest(BaseModel):
+    """
+    Запит /sweep: базовий сценарій, осі декартової сітки та список виходів
+    (наприклад "airblast.total_destruction.radius_km", "crater.diameter_km",
+    "casualties.total_deaths"). format: "json" (колонковий) або "binary".
+    """
+    base: ImpactRequest
+    axes: List[SweepAxis]
+    outputs: List[str]
+    format: Literal["json", "binary"] = "json"
+
+    @model_validator(mode="after")
+    def check_axes(self):
+        fields = [axis.field for axis in self.axes]
+        if len(set(fields)) != len(fields):
+            raise ValueError("Кожне поле може бути лише однією віссю")
+        if not self.outputs:
+            raise ValueError("Порожній список outputs")
+        return self
+
+
+class InverseRequest(BaseModel):
+    """
+    Запит /inverse: найменше значення free у межах low..high, за якого output
+    (назва виходу /sweep, наприклад "airblast.total_destruction.radius_km") досягає target.
+    curve — необов'язкова вісь іншого поля: розв'язок для кожної її точки
+    (наприклад поріг size для ряду швидкостей).
+    """
+    base: ImpactRequest
+    output: str
+    target: float
+    free: Literal["size", "speed", "angle"] = "size"
+    low: Optional[float] = Field(None, gt=0)
+    high: Optional[float] = Field(None, gt=0)
+    curve: Optional[SweepAxis] = None
+    rtol: float = Field(1e-4, gt=0, le=0.1)
+    max_iter: int = Field(100, ge=1, le=200)
+
+    @model_validator(mode="after")
+    def check_free(self):
+        if self.curve is not None and self.curve.field == self.free:
+            raise ValueError("curve має бути іншим полем, ніж free")
+        if self.low is not None and self.high is not None and self.low >= self.high:
+            raise ValueError("low має бути < high")
+        return self
+
+
+class FragmentFieldRequest(BaseModel):
+    """
+    Запит /impact/fragments: розпад base на fragments уламків, розкиданих уздовж
+    напрямку руху (azimuth — градуси від півночі за годинниковою стрілкою).
+    Точка base.lat/lon — куди впав би неподрібнений метеорит (там падає найбільший уламок).
+    seed робить поле відтворюваним; без seed сервер вибере його сам і поверне у відповіді.
+    """
+    base: ImpactRequest
+    fragments: int = Field(1000, ge=1, le=MAX_FIELD_FRAGMENTS)
+    azimuth: float = Field(90.0, ge=0, lt=360)
+    seed: Optional[int] = Field(None, ge=0)
+    include_fragments: bool = False
+
+
+class PointsRequest(BaseModel):
+    """
+    Запит /impact/points: один удар і колонки координат точок (лікарні, школи, підстанції).
+    outputs — поля для кожної точки (за замовчуванням усі, що рахуються у сценарії).
+    """
+    impact: ImpactRequest
+    lat: List[float]
+    lon: List[float]
+    outputs: Optional[List[str]] = None
+    format: Literal["json", "binary"] = "json"
+
+    @model_validator(mode="after")
+    def check_shape(self):
+        if len(self.lat) != len(self.lon):
+            raise ValueError("Колонки lat і lon мають бути однакової довжини")
+        if len(self.lat) > MAX_POINTS:
+            raise ValueError(f"Забагато точок (максимум {MAX_POINTS})")
+        return self
+
+
+class Distribution(BaseModel):
+    """
+    Розподіл невизначеного параметра для Monte Carlo:
+      fixed(value), uniform(low, high), triangular(low, mode, high),
+      normal(mean, std), lognormal(median, sigma).
+    Для normal/lognormal low/high (якщо задані) обрізають вибірку.
+    """
+    dist: Literal["fixed", "uniform", "triangular", "normal", "lognormal"]
+    value: Optional[float] = None
+    low: Optional[float] = None
+    high: Optional[float] = None
+    mode: Optional[float] = None
+    mean: Optional[float] = None
+    std: Optional[float] = None
+    median: Optional[float] = None
+    sigma: Optional[float] = None
+
+    @model_validator(mode="after")
+    def check_params(self):
+        required = {
+            "fixed": ("value",),
+            "uniform": ("low", "high"),
+            "triangular": ("low", "mode", "high"),
+            "normal": ("mean", "std"),
+            "lognormal": ("median", "sigma"),
+        }[self.dist]
+        missing = [name for name in required if getattr(self, name) is None]
+        if missing:
+            raise ValueError(f"Розподіл {self.dist}: бракує параметрів {', '.join(missing)}")
+        if self.low is not None and self.high is not None and self.low > self.high:
+            raise ValueError("low має бути <= high")
+        return self
+
+    def sample(self, rng: np.random.Generator, n: int) -> np.ndarray:
+        """n значень з генератора rng"""
+        if self.dist == "fixed":
+            return np.full(n, self.value, dtype=float)
+        if self.dist == "uniform":
+            return rng.uniform(self.low, self.high, n)
+        if self.dist == "triangular":
+            return rng.triangular(self.low, self.mode, self.high, n)
+        if self.dist == "normal":
+            values = rng.normal(self.mean, self.std, n)
+        else:
+            values = self.median * np.exp(rng.normal(0.0, self.sigma, n))
+        if self.low is not None or self.high is not None:
+            values = np.clip(values, self.low, self.high)
+        return values
+
+
+class MonteCarloRequest(BaseModel):
+    """
+    Запит /impact/montecarlo: базовий сценарій і розподіли невизначених входів
+    (не задані — фіксовані з base або стандартна модель сценарію).
+    seed робить результат відтворюваним; без seed сервер вибере його сам і поверне у відповіді.
+    """
+    base: ImpactRequest
+    samples: int = Field(10_000, ge=1, le=MAX_MC_SAMPLES)
+    seed: Optional[int] = Field(None, ge=0)
+    size: Optional[Distribution] = None
+    speed: Optional[Distribution] = None
+    angle: Optional[Distribution] = None
+    density: Optional[Distribution] = None
+    airburst_altitude_km: Optional[Distribution] = None
+    fragment_separation_km: Optional[Distribution] = None
+    percentiles: List[float] = [5, 50, 95]
+
+    @model_validator(mode="after")
+    def check_percentiles(self):
+        if not self.percentiles or any(not 0 <= q <= 100 for q in self.percentiles):
+            raise ValueError("percentiles мають бути в межах 0..100")
+        return self
+
+
+class CorridorEllipse(BaseModel):
+    """
+    Еліпс невизначеності точки удару: двовимірний нормальний розподіл з центром (lat, lon),
+    півосями 1σ (км) і азимутом великої півосі (градуси від півночі за годинниковою стрілкою).
+    Розбивка — segments смуг уздовж великої осі в межах ±3σ.
+    """
+    lat: float = Field(..., ge=-90, le=90)
+    lon: float
+    semi_major_km: float = Field(..., gt=0)
+    semi_minor_km: float = Field(..., ge=0)
+    azimuth_deg: float = 0.0
+    segments: int = Field(12, ge=1, le=1000)
+
+    @model_validator(mode="after")
+    def check_axes(self):
+        if self.semi_minor_km > self.semi_major_km:
+            raise ValueError("semi_minor_km має бути <= semi_major_km")
+        return self
+
+
+class CorridorRequest(BaseModel):
+    """
+    Запит /impact/corridor: тіло (base; lat/lon ігноруються) і розподіл точки удару —
+    або траса track ([[lat, lon], ...]) з густиною ймовірності weights у вершинах (лінійно
+    між ними, за замовчуванням рівномірно по довжині) і поперечним розкидом cross_sigma_km,
+    або ellipse. impact_probability множить очікувані наслідки (ймовірність удару взагалі).
+    """
+    base: ImpactRequest
+    track: Optional[List[List[float]]] = None
+    weights: Optional[List[float]] = None
+    cross_sigma_km: float = Field(0.0, ge=0)
+    ellipse: Optional[CorridorEllipse] = None
+    impact_probability: float = Field(1.0, gt=0, le=1)
+    samples: int = Field(5000, ge=1, le=MAX_CORRIDOR_SAMPLES)
+    seed: Optional[int] = Field(None, ge=0)
+    percentiles: List[float] = [50, 95, 99]
+
+    @model_validator(mode="after")
+    def check_shape(self):
+        if (self.track is None) == (self.ellipse is None):
+            raise ValueError("Потрібна або траса track, або ellipse")
+        if self.track is not None:
+            if not 2 <= len(self.track) <= MAX_CORRIDOR_VERTICES:
+                raise ValueError(f"Траса має містити від 2 до {MAX_CORRIDOR_VERTICES} вершин")
+            if any(len(v) != 2 or not -90 <= v[0] <= 90 for v in self.track):
+                raise ValueError("Вершини траси — пари [lat, lon], lat у межах -90..90")
+            if self.weights is not None:
+                if len(self.weights) != len(self.track):
+                    raise ValueError("weights мають бути по одному на вершину траси")
+                if any(w < 0 for w in self.weights) or not any(w > 0 for w in self.weights):
+                    raise ValueError("weights мають бути невід'ємні й не всі нульові")
+        elif self.weights is not None:
+            raise ValueError("weights задаються лише разом із track")
+        if not self.percentiles or any(not 0 <= q <= 100 for q in self.percentiles):
+            raise ValueError("percentiles мають бути в межах 0..100")
+        return self
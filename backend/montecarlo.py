@@ -0,0 +1,144 @@
+import math
+import multiprocessing
+import os
+import secrets
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional
+
+import numpy as np
+
+from models import Distribution, MonteCarloRequest
+from calculations import (
+    material_density,
+    material_strength,
+    fragmentation_kernel,
+    FRAGMENT_SEPARATION_KM,
+)
+from sweep import SweepGrid, evaluate_output, scenario_outputs
+from executor import IMPACT_MAX_CONCURRENCY
+
+# Розмір шматка вибірки. Кожен шматок має власний потік RNG (SeedSequence.spawn),
+# тому результат залежить лише від seed і кількості вибірок, а не від кількості процесів.
+MC_CHUNK_SIZE = 20_000
+# Кількість процесів для великих вибірок (1 — рахувати в поточному процесі). Кожен процес займає
+# місце в черзі розрахунків (mc_slots), тож їх не більше за IMPACT_MAX_CONCURRENCY
+MC_WORKERS = max(1, min(int(os.environ.get("MC_WORKERS", os.cpu_count() or 1)), IMPACT_MAX_CONCURRENCY))
+MC_FRAGMENTS = 3
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # spawn: сервер уже має потоки (логи, прогрів), fork з потоками ризикований
+        _pool = ProcessPoolExecutor(max_workers=MC_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+
+def shutdown_mc_pool() -> None:
+    """Зупинити пул процесів (під час завершення сервера)"""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(cancel_futures=True)
+        _pool = None
+
+
+def mc_slots(req: MonteCarloRequest) -> int:
+    """Скільки процесів займе run_monte_carlo — стільки місць у черзі розрахунків ImpactExecutor"""
+    n_chunks = math.ceil(req.samples / MC_CHUNK_SIZE)
+    return 1 if n_chunks == 1 or MC_WORKERS <= 1 else min(MC_WORKERS, n_chunks)
+
+
+def _default_uniform(low: float, high: float) -> Distribution:
+    return Distribution(dist="uniform", low=low, high=high)
+
+
+def _draw(dist: Optional[Distribution], default, rng: np.random.Generator, n: int) -> np.ndarray:
+    if dist is None:
+        if isinstance(default, Distribution):
+            return default.sample(rng, n)
+        return np.full(n, default, dtype=float)
+    return dist.sample(rng, n)
+
+
+def sample_chunk(req: MonteCarloRequest, seed_seq: np.random.SeedSequence, n: int) -> Dict[str, np.ndarray]:
+    """Вибірка одного шматка: n сценаріїв і всі їхні виходи (масиви довжини n)"""
+    rng = np.random.default_rng(seed_seq)
+    base = req.base
+
+    # Порядок вибірки фіксований — від нього залежить відтворюваність
+    size = _draw(req.size, base.size, rng, n)
+    speed = _draw(req.speed, base.speed, rng, n)
+    angle = _draw(req.angle, base.angle, rng, n)
+    density = _draw(req.density, material_density(base.material), rng, n)
+
+    inputs = {
+        "size": size,
+        "speed": speed,
+        "angle": angle,
+        "density": density,
+        "strength": material_strength(base.material),
+        "lat": np.float64(base.lat),
+        "lon": np.float64(base.lon),
+    }
+    # без розподілу висота airburst береться з моделі входу для кожної вибірки
+    if base.scenario == "airburst" and req.airburst_altitude_km is not None:
+        inputs["burst_altitude_km"] = req.airburst_altitude_km.sample(rng, n)
+    grid = SweepGrid(base.scenario, (n,), inputs)
+    out = {"input.size": size, "input.speed": speed, "input.angle": angle, "input.density": density}
+    for name in scenario_outputs(base.scenario):
+        out[name] = evaluate_output(grid, name)
+
+    if base.scenario == "fragmentation":
+        separation_default = _default_uniform(*FRAGMENT_SEPARATION_KM)
+        draws = np.stack([
+            _draw(req.fragment_separation_km, separation_default, rng, n) for _ in range(MC_FRAGMENTS)
+        ])
+        k = fragmentation_kernel(size, np.round(grid.energy()["energy_mt"], 3), draws, MC_FRAGMENTS)
+        for i in range(MC_FRAGMENTS):
+            for key in ("energy_mt", "separation_km", "blast_radius_km"):
+                out[f"fragmentation.fragment_{i + 1}.{key}"] = k[key][i]
+    return out
+
+
+def _percentile_key(q: float) -> str:
+    return f"p{q:g}"
+
+
+def run_monte_carlo(req: MonteCarloRequest) -> Dict:
+    """
+    N вибірок невизначених входів → перцентилі (і середнє) кожного виходу /impact.
+    Великі вибірки діляться на шматки і рахуються паралельно в пулі процесів.
+    """
+    seed = req.seed if req.seed is not None else secrets.randbits(63)
+    n_chunks = math.ceil(req.samples / MC_CHUNK_SIZE)
+    seeds = np.random.SeedSequence(seed).spawn(n_chunks)
+    sizes = [min(MC_CHUNK_SIZE, req.samples - i * MC_CHUNK_SIZE) for i in range(n_chunks)]
+
+    if n_chunks == 1 or MC_WORKERS <= 1:
+        chunks = [sample_chunk(req, s, n) for s, n in zip(seeds, sizes)]
+    else:
+        chunks = list(_get_pool().map(sample_chunk, [req] * n_chunks, seeds, sizes))
+
+    keys = [_percentile_key(q) for q in req.percentiles]
+    outputs: Dict[str, Dict[str, Optional[float]]] = {}
+    for name in chunks[0]:
+        values = np.concatenate([chunk[name] for chunk in chunks]).astype(float)
+        # нефізичні вибірки (наприклад, від'ємний кут) дають nan — їх не враховуємо
+        values = values[np.isfinite(values)]
+        if values.size:
+            stats = dict(zip(keys, np.percentile(values, req.percentiles).tolist()))
+            stats["mean"] = float(values.mean())
+        else:
+            stats = dict.fromkeys(keys + ["mean"])
+        outputs[name] = stats
+
+    return {
+        "samples": req.samples,
+        "seed": seed,
+        "scenario": req.base.scenario,
+        "percentiles": keys,
+        "outputs": outputs,
+    }
+
@@ -0,0 +1,108 @@
+import json
+from typing import Dict, Iterator, List, Tuple
+
+import numpy as np
+
+from models import PointsRequest
+from constants import MATERIALS
+from impact import SCENARIO_PHYSICS
+from cache import get_physics_cache
+from casualties import haversine_km
+from compact import json_bytes
+from hazards import mmi, overpressure_kpa, thermal_fluence, tsunami_arrival_min, tsunami_height_m, wind_ms
+
+# Виходи /impact/points: назва -> фізична секція, без якої вихід не рахується (None — завжди)
+POINT_OUTPUTS = {
+    "distance_km": None,
+    "overpressure_kpa": "airblast",
+    "wind_ms": "airblast",
+    "thermal_cal_cm2": "thermal",
+    "mmi": "seismic",
+    "tsunami_height_m": "tsunami",
+    "tsunami_arrival_min": "tsunami",
+}
+
+
+def point_outputs(scenario: str) -> List[str]:
+    """Виходи, що рахуються для сценарію"""
+    sections = {section for section, _ in SCENARIO_PHYSICS.get(scenario, ())}
+    return [name for name, section in POINT_OUTPUTS.items() if section is None or section in sections]
+
+
+def validate_points(req: PointsRequest) -> None:
+    """Перевірка сценарію та виходів; ValueError з поясненням"""
+    if req.impact.scenario not in SCENARIO_PHYSICS:
+        raise ValueError(f"Невідомий сценарій: {req.impact.scenario}")
+    if req.impact.material not in MATERIALS:
+        raise ValueError(f"Невідомий матеріал: {req.impact.material}")
+    unknown = [name for name in req.outputs or () if name not in POINT_OUTPUTS]
+    if unknown:
+        raise ValueError(f"Невідомі виходи: {', '.join(unknown)}. Доступні: {', '.join(POINT_OUTPUTS)}")
+    available = point_outputs(req.impact.scenario)
+    missing = [name for name in req.outputs or () if name not in available]
+    if missing:
+        raise ValueError(f"Виходи {', '.join(missing)} не рахуються для сценарію {req.impact.scenario}")
+
+
+def _evaluate(physics: Dict, distance: np.ndarray, name: str, cache: Dict[str, np.ndarray]) -> np.ndarray:
+    if name == "distance_km":
+        return distance
+    if name in ("overpressure_kpa", "wind_ms"):
+        # тиск потрібен і для вітру — рахується один раз
+        if "overpressure_kpa" not in cache:
+            cache["overpressure_kpa"] = overpressure_kpa(physics, distance)
+        return cache["overpressure_kpa"] if name == "overpressure_kpa" else wind_ms(cache["overpressure_kpa"])
+    if name == "thermal_cal_cm2":
+        return thermal_fluence(physics, distance)
+    if name == "mmi":
+        return mmi(physics, distance)
+    if name == "tsunami_height_m":
+        return tsunami_height_m(physics, distance)
+    return tsunami_arrival_min(physics, distance)
+
+
+def evaluate_points(req: PointsRequest) -> Tuple[Dict, Iterator[Tuple[str, np.ndarray]]]:
+    """
+    (заголовок, ітератор (вихід, масив форми (N,))): відстані великого кола рахуються один раз,
+    кожен вихід — окремим векторним проходом по всіх точках.
+    """
+    token, impact, state = get_physics_cache().prepare(req.impact)
+    physics = state["physics"]
+    outputs = req.outputs or point_outputs(impact.scenario)
+    lat = np.asarray(req.lat, dtype=float)
+    lon = np.asarray(req.lon, dtype=float)
+    distance = haversine_km(impact.lat, impact.lon, lat, lon)
+    header = {
+        "scenario": impact.scenario,
+        "physics_token": token,
+        "energy_mt": state["energy"]["energy_mt"],
+        "points": int(lat.size),
+        "outputs": outputs,
+    }
+    cache: Dict[str, np.ndarray] = {}
+    return header, ((name, _evaluate(physics, distance, name, cache)) for name in outputs)
+
+
+def stream_points_json(req: PointsRequest) -> Iterator[bytes]:
+    """Колонковий JSON: {..., "columns": {name: [значення у порядку точок]}}; кожен вихід — окремий шматок"""
+    header, columns = evaluate_points(req)
+    yield json.dumps(header, ensure_ascii=False).encode()[:-1] + b', "columns": {'
+    for i, (name, values) in enumerate(columns):
+        yield (b"" if i == 0 else b", ") + json.dumps(name).encode() + b": " + json_bytes(values.tolist())
+    yield b"}}"
+
+
+def stream_points_binary(req: PointsRequest) -> Iterator[bytes]:
+    """
+    Бінарний формат (як у /sweep): рядок JSON-заголовка з dtype/offset/nbytes кожного виходу + "\\n",
+    далі сирі little-endian float64 масиви виходів один за одним.
+    """
+    header, columns = evaluate_points(req)
+    nbytes = header["points"] * 8
+    header["columns"] = [
+        {"name": name, "dtype": "<f8", "offset": i * nbytes, "nbytes": nbytes}
+        for i, name in enumerate(header["outputs"])
+    ]
+    yield json.dumps(header, ensure_ascii=False).encode() + b"\n"
+    for _, values in columns:
+        yield np.ascontiguousarray(values, dtype="<f8").tobytes()
@@ -0,0 +1,482 @@
+import json
+import math
+import os
+from typing import Dict, List, Optional
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0
+
+# Скільки рядків растру максимум читаємо на одне коло: великі кільця беруть грубший рівень піраміди
+MAX_DISC_ROWS = 256
+# Коло, менше за стільки клітинок у радіусі, рахується як густина клітинки × площа
+SMALL_DISC_CELLS = 2
+# Кількість радіусів радіального профілю для пакетних розрахунків (sweep / Monte Carlo)
+RADIAL_PROFILE_POINTS = 64
+# Скільки кіл рахувати за раз у векторному disc_populations (пари коло × рядок — до ~MAX_DISC_ROWS на коло)
+DISC_BATCH = 4096
+
+try:  # GeoTIFF — опційно, потрібен rasterio
+    import rasterio
+except ImportError:  # pragma: no cover - залежить від середовища
+    rasterio = None
+
+
+class PopulationBackend:
+    """
+    Джерело населення для кілець ураження.
+    zone_populations повертає кількість людей у кожній зоні; радіуси зон вкладені
+    й ідуть від найменшого до найбільшого (як зони calculate_airblast).
+    """
+    name = "base"
+
+    def warm_up(self) -> None:
+        """Підготовка важких структур (викликається у фоні під час старту сервера)"""
+
+    def fingerprint(self) -> str:
+        """Відбиток даних джерела для ключів кешу (за замовчуванням — назва моделі)"""
+        return self.name
+
+    def zone_populations(self, lat: float, lon: float, radii_km: List[float], density: float) -> np.ndarray:
+        raise NotImplementedError
+
+    def zone_populations_batch(self, lat, lon, radii_km, density) -> np.ndarray:
+        """
+        Пакетний варіант: radii_km форми (Z, ...), lat/lon/density броадкастяться з (...).
+        Повертає масив форми (Z, ...).
+        """
+        raise NotImplementedError
+
+    def disc_populations_batch(self, lat, lon, radii_km, density) -> np.ndarray:
+        """Населення повних кіл (без округлення) для radii_km форми (K, ...) — для тонких кілець інтегрування"""
+        raise NotImplementedError
+
+
+class RegionalPopulation(PopulationBackend):
+    """
+    Стара модель: одна густина (місто зі списку або широтний пояс) × площа кола π·r².
+    Кожна зона рахується як повне коло, тому цифри збігаються з попередніми версіями API.
+    """
+    name = "regional"
+
+    def zone_populations(self, lat, lon, radii_km, density):
+        return self.zone_populations_batch(lat, lon, np.asarray(radii_km, dtype=float), density)
+
+    def zone_populations_batch(self, lat, lon, radii_km, density):
+        return np.trunc(self.disc_populations_batch(lat, lon, radii_km, density))
+
+    def disc_populations_batch(self, lat, lon, radii_km, density):
+        radii = np.asarray(radii_km, dtype=float)
+        return density * (math.pi * (radii ** 2))
+
+
+class RasterPopulation(PopulationBackend):
+    """
+    Населення з растру (люди на клітинку) у форматі .npy або GeoTIFF.
+
+    Растр відкривається через memory-map, тому старт швидкий, а RSS не росте.
+    Для кожного рівня піраміди (рівень L — клітинки 2^L × 2^L вихідних) зберігаються
+    префіксні суми вздовж рядків: сума кола — це по одній різниці cum[row, c1] - cum[row, c0]
+    на кожен рядок, що перетинає коло. Рівні будуються один раз і кешуються на диску
+    поруч із растром (<raster>.cache/), наступні старти їх лише відкривають.
+
+    Геоприв'язка: <raster>.json з {"lat_max", "lon_min", "cell_deg"}; без нього
+    растр вважається глобальним (90..-90, -180..180).
+    """
+    name = "raster"
+
+    def __init__(self, path: str, cache_dir: Optional[str] = None):
+        self.path = path
+        self.cache_dir = cache_dir or path + ".cache"
+        # шлях і mtime файлу на момент відкриття: інший або оновлений растр — інші відповіді в кеші
+        self._fingerprint = f"{self.name}:{os.path.abspath(path)}:{os.stat(path).st_mtime_ns}"
+        self.grid, meta = self._open(path)
+        rows, cols = self.grid.shape
+        self.lat_max = float(meta.get("lat_max", 90.0))
+        self.lon_min = float(meta.get("lon_min", -180.0))
+        self.cell_deg = float(meta.get("cell_deg", 180.0 / rows))
+        self.rows, self.cols = rows, cols
+        self.is_global = abs(cols * self.cell_deg - 360.0) < 1e-6
+        self._levels: Dict[int, np.ndarray] = {}
+
+    def fingerprint(self) -> str:
+        return self._fingerprint
+
+    @staticmethod
+    def _open(path: str):
+        meta_path = os.path.splitext(path)[0] + ".json"
+        meta = {}
+        if os.path.exists(meta_path):
+            with open(meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+
+        if path.lower().endswith((".tif", ".tiff")):
+            npy_path = path + ".npy"
+            if not os.path.exists(npy_path):
+                if rasterio is None:
+                    raise RuntimeError("Для GeoTIFF-растру населення потрібен пакет rasterio")
+                with rasterio.open(path) as src:
+                    data = src.read(1, masked=True).filled(0).astype(np.float32)
+                    t = src.transform
+                    meta = {"lat_max": t.f, "lon_min": t.c, "cell_deg": t.a}
+                np.save(npy_path, data)
+                with open(meta_path, "w", encoding="utf-8") as f:
+                    json.dump(meta, f)
+            path = npy_path
+        return np.load(path, mmap_mode="r"), meta
+
+    # --- рівні піраміди -------------------------------------------------
+
+    def _level_path(self, level: int) -> str:
+        return os.path.join(self.cache_dir, f"rowcum_l{level}.npy")
+
+    def max_level(self) -> int:
+        """Найгрубший потрібний рівень: коло на пів планети вміщується в MAX_DISC_ROWS рядків"""
+        level = 0
+        while (self.rows >> level) > MAX_DISC_ROWS:
+            level += 1
+        return level
+
+    def _build_levels(self, up_to: int) -> None:
+        """Будує відсутні рівні 0..up_to; кожен наступний — сума блоків 2×2 попереднього"""
+        grid = None
+        for level in range(up_to + 1):
+            if grid is None:
+                grid = np.nan_to_num(np.asarray(self.grid, dtype=np.float64))
+            else:
+                r, c = grid.shape
+                grid = np.pad(grid, ((0, r % 2), (0, c % 2)))
+                grid = grid.reshape(grid.shape[0] // 2, 2, grid.shape[1] // 2, 2).sum(axis=(1, 3))
+            if level in self._levels:
+                continue
+            path = self._level_path(level)
+            if os.path.exists(path):
+                self._levels[level] = np.load(path, mmap_mode="r")
+                continue
+            cum = np.zeros((grid.shape[0], grid.shape[1] + 1))
+            np.cumsum(grid, axis=1, out=cum[:, 1:])
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                np.save(path, cum)
+                cum = np.load(path, mmap_mode="r")
+            except OSError:
+                pass  # кеш на диск не обов'язковий
+            self._levels[level] = cum
+
+    def warm_up(self) -> None:
+        self._build_levels(self.max_level())
+
+    def row_cumsum(self, level: int) -> np.ndarray:
+        """Префіксні суми рядків рівня L з нульовим першим стовпчиком, форма (rows_L, cols_L + 1)"""
+        if level not in self._levels:
+            path = self._level_path(level)
+            if os.path.exists(path):
+                self._levels[level] = np.load(path, mmap_mode="r")
+            else:
+                self._build_levels(level)
+        return self._levels[level]
+
+    def _level_for(self, radius_km: float) -> int:
+        cell_km = math.radians(self.cell_deg) * EARTH_RADIUS_KM
+        rows = 2 * radius_km / cell_km
+        level = 0
+        while rows > MAX_DISC_ROWS and (self.rows >> (level + 1)) > 0:
+            rows /= 2
+            level += 1
+        return level
+
+    # --- геометрія кола -------------------------------------------------
+
+    def disc_population(self, lat: float, lon: float, radius_km: float) -> float:
+        """Населення всіх клітинок, чиї центри лежать у колі великого кола радіуса radius_km"""
+        if radius_km <= 0:
+            return 0.0
+        level = self._level_for(radius_km)
+        cum = self.row_cumsum(level)
+        cell = self.cell_deg * (1 << level)
+        n_rows, n_cols = cum.shape[0], cum.shape[1] - 1
+
+        # Коло в кілька клітинок завширшки: вибірка центрів клітинок надто груба,
+        # беремо густину клітинки × площу
+        if radius_km < SMALL_DISC_CELLS * math.radians(cell) * EARTH_RADIUS_KM:
+            return self.cell_density(lat, lon, level) * math.pi * radius_km ** 2
+
+        ang = radius_km / EARTH_RADIUS_KM
+        dlat = math.degrees(ang)
+        r0 = max(0, int(math.floor((self.lat_max - (lat + dlat)) / cell)))
+        r1 = min(n_rows, int(math.ceil((self.lat_max - (lat - dlat)) / cell)) + 1)
+        if r0 >= r1:
+            return 0.0
+        rows = np.arange(r0, r1)
+        row_lat = np.radians(self.lat_max - (rows + 0.5) * cell)
+        phi0 = math.radians(lat)
+
+        # Півширина кола по довготі на широті рядка (сферична геометрія)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            cos_dlon = (math.cos(ang) - math.sin(phi0) * np.sin(row_lat)) / (math.cos(phi0) * np.cos(row_lat))
+        full = cos_dlon <= -1.0            # коло охоплює всю паралель (біля полюса)
+        inside = cos_dlon < 1.0
+        half = np.degrees(np.arccos(np.clip(cos_dlon, -1.0, 1.0)))
+
+        rows, half, full = rows[inside], half[inside], full[inside]
+        if rows.size == 0:
+            return 0.0
+
+        total = float(cum[rows[full], n_cols].sum()) if self.is_global else 0.0
+        part = ~full | (not self.is_global)
+        rows, half = rows[part], half[part]
+
+        # Клітинка c має центр lon_min + (c + 0.5)·cell; беремо центри в межах [lon - half, lon + half]
+        c0 = np.ceil((lon - half - self.lon_min) / cell - 0.5).astype(np.int64)
+        c1 = np.floor((lon + half - self.lon_min) / cell - 0.5).astype(np.int64) + 1
+        if self.is_global:
+            # перехід через антимеридіан: розбиваємо на два відрізки
+            shift = np.floor_divide(c0, n_cols) * n_cols
+            c0 -= shift
+            c1 -= shift
+            c1 = np.minimum(c1, c0 + n_cols)
+            wrap = c1 > n_cols
+            total += float((cum[rows, np.minimum(c1, n_cols)] - cum[rows, c0]).sum())
+            if wrap.any():
+                total += float(cum[rows[wrap], c1[wrap] - n_cols].sum())
+        else:
+            c0 = np.clip(c0, 0, n_cols)
+            c1 = np.clip(c1, 0, n_cols)
+            ok = c1 > c0
+            total += float((cum[rows[ok], c1[ok]] - cum[rows[ok], c0[ok]]).sum())
+        return total
+
+    def disc_populations(self, lat, lon, radii_km) -> np.ndarray:
+        """
+        disc_population для багатьох кіл одразу (lat, lon, radii_km броадкастяться в один вимір):
+        кола групуються за рівнем піраміди, а різниці префіксних сум усіх рядків усіх кіл
+        рахуються одним векторним проходом на рівень, без циклу Python по колах.
+        """
+        lat, lon, radii = (a.ravel() for a in np.broadcast_arrays(
+            *(np.asarray(x, dtype=float) for x in (lat, lon, radii_km))
+        ))
+        out = np.zeros(radii.size)
+        positive = radii > 0
+        # рівень піраміди — як у _level_for: півзменшення, доки коло не вміститься в MAX_DISC_ROWS рядків
+        rows = 2 * radii / (math.radians(self.cell_deg) * EARTH_RADIUS_KM)
+        levels = np.zeros(radii.size, dtype=np.intp)
+        while True:
+            coarser = (rows > MAX_DISC_ROWS) & ((self.rows >> (levels + 1)) > 0)
+            if not coarser.any():
+                break
+            rows[coarser] /= 2
+            levels[coarser] += 1
+        for level in np.unique(levels[positive]).tolist():
+            sel = np.flatnonzero(positive & (levels == level))
+            for start in range(0, sel.size, DISC_BATCH):
+                part = sel[start:start + DISC_BATCH]
+                out[part] = self._discs_at_level(level, lat[part], lon[part], radii[part])
+        out[np.isnan(radii)] = np.nan
+        return out
+
+    def _discs_at_level(self, level: int, lat: np.ndarray, lon: np.ndarray, radius: np.ndarray) -> np.ndarray:
+        """Векторний disc_population для кіл одного рівня піраміди"""
+        cum = self.row_cumsum(level)
+        cell = self.cell_deg * (1 << level)
+        n_rows, n_cols = cum.shape[0], cum.shape[1] - 1
+        total = np.zeros(radius.size)
+
+        small = radius < SMALL_DISC_CELLS * math.radians(cell) * EARTH_RADIUS_KM
+        if small.any():
+            total[small] = self._cell_densities(lat[small], lon[small], level) * math.pi * radius[small] ** 2
+        big = np.flatnonzero(~small)
+        if big.size == 0:
+            return total
+
+        ang = radius[big] / EARTH_RADIUS_KM
+        dlat = np.degrees(ang)
+        r0 = np.maximum(0, np.floor((self.lat_max - (lat[big] + dlat)) / cell).astype(np.int64))
+        r1 = np.minimum(n_rows, np.ceil((self.lat_max - (lat[big] - dlat)) / cell).astype(np.int64) + 1)
+        counts = np.maximum(r1 - r0, 0)
+        # пари (коло, рядок): номер кола disc і рядок растру rows
+        disc = np.repeat(np.arange(big.size), counts)
+        rows = r0[disc] + (np.arange(disc.size) - np.repeat(np.cumsum(counts) - counts, counts))
+        row_lat = np.radians(self.lat_max - (rows + 0.5) * cell)
+        phi0 = np.radians(lat[big])[disc]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            cos_dlon = (np.cos(ang)[disc] - np.sin(phi0) * np.sin(row_lat)) / (np.cos(phi0) * np.cos(row_lat))
+        full = cos_dlon <= -1.0
+        inside = cos_dlon < 1.0
+        half = np.degrees(np.arccos(np.clip(cos_dlon, -1.0, 1.0)))
+        disc, rows, half, full = disc[inside], rows[inside], half[inside], full[inside]
+
+        sums = np.zeros(big.size)
+        if self.is_global:
+            np.add.at(sums, disc[full], cum[rows[full], n_cols])
+            part = ~full
+            disc, rows, half = disc[part], rows[part], half[part]
+        c = lon[big][disc]
+        c0 = np.ceil((c - half - self.lon_min) / cell - 0.5).astype(np.int64)
+        c1 = np.floor((c + half - self.lon_min) / cell - 0.5).astype(np.int64) + 1
+        if self.is_global:
+            shift = np.floor_divide(c0, n_cols) * n_cols
+            c0 -= shift
+            c1 -= shift
+            c1 = np.minimum(c1, c0 + n_cols)
+            wrap = c1 > n_cols
+            values = cum[rows, np.minimum(c1, n_cols)] - cum[rows, c0]
+            values[wrap] += cum[rows[wrap], c1[wrap] - n_cols]
+        else:
+            c0 = np.clip(c0, 0, n_cols)
+            c1 = np.clip(c1, 0, n_cols)
+            values = np.where(c1 > c0, cum[rows, c1] - cum[rows, c0], 0.0)
+        sums += np.bincount(disc, weights=values, minlength=big.size)
+        total[big] = sums
+        return total
+
+    def _cell_densities(self, lat: np.ndarray, lon: np.ndarray, level: int) -> np.ndarray:
+        """Векторний cell_density"""
+        cum = self.row_cumsum(level)
+        cell = self.cell_deg * (1 << level)
+        n_rows, n_cols = cum.shape[0], cum.shape[1] - 1
+        r = ((self.lat_max - lat) / cell).astype(np.int64)
+        c = ((lon - self.lon_min) / cell).astype(np.int64)
+        if self.is_global:
+            c %= n_cols
+        ok = (r >= 0) & (r < n_rows) & (c >= 0) & (c < n_cols)
+        r, c = np.where(ok, r, 0), np.where(ok, c, 0)
+        people = cum[r, c + 1] - cum[r, c]
+        top = np.radians(self.lat_max - r * cell)
+        bottom = np.radians(self.lat_max - (r + 1) * cell)
+        area = EARTH_RADIUS_KM ** 2 * math.radians(cell) * np.abs(np.sin(top) - np.sin(bottom))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(ok & (area > 0), people / area, 0.0)
+
+    def cell_density(self, lat: float, lon: float, level: int = 0) -> float:
+        """Густина (люд/км²) клітинки рівня L, що містить точку"""
+        cum = self.row_cumsum(level)
+        cell = self.cell_deg * (1 << level)
+        n_rows, n_cols = cum.shape[0], cum.shape[1] - 1
+        r = int((self.lat_max - lat) / cell)
+        c = int((lon - self.lon_min) / cell)
+        if self.is_global:
+            c %= n_cols
+        if not (0 <= r < n_rows and 0 <= c < n_cols):
+            return 0.0
+        people = float(cum[r, c + 1] - cum[r, c])
+        top = math.radians(self.lat_max - r * cell)
+        bottom = math.radians(self.lat_max - (r + 1) * cell)
+        area = EARTH_RADIUS_KM ** 2 * math.radians(cell) * abs(math.sin(top) - math.sin(bottom))
+        return people / area if area > 0 else 0.0
+
+    # --- кільця ---------------------------------------------------------
+
+    def zone_populations(self, lat, lon, radii_km, density=None):
+        """Населення кожного кільця (анулюса) між сусідніми радіусами; радіуси — за зростанням"""
+        discs = np.array([self.disc_population(lat, lon, r) for r in radii_km])
+        return np.trunc(_annuli(discs, axis=0))
+
+    def zone_populations_batch(self, lat, lon, radii_km, density=None):
+        return np.trunc(_annuli(self.disc_populations_batch(lat, lon, radii_km, density), axis=0))
+
+    def disc_populations_batch(self, lat, lon, radii_km, density=None):
+        """
+        Кола для radii_km форми (K, ...) з усіма точками одним пакетом. Точка, що має не більше
+        RADIAL_PROFILE_POINTS радіусів (коридор, /impact/points), рахується точно; для решти
+        (сітки з віссю розміру) кола беруться з радіального профілю точки — теж одним пакетом.
+        """
+        radii = np.asarray(radii_km, dtype=float)
+        # унікальні точки — у власній формі lat/lon (без осей розміру, швидкості тощо), номер точки броадкаститься
+        lat_b, lon_b = np.broadcast_arrays(np.asarray(lat, dtype=float), np.asarray(lon, dtype=float))
+        uniq, inverse = np.unique(np.stack([lat_b.ravel(), lon_b.ravel()], axis=1), axis=0, return_inverse=True)
+        radii_b, inverse = np.broadcast_arrays(radii, inverse.reshape(lat_b.shape)[None])
+        inverse = inverse[0].ravel()
+        flat = radii_b.reshape(radii_b.shape[0], -1)
+        discs = np.zeros_like(flat)
+
+        per_loc = np.bincount(inverse, minlength=len(uniq)) * flat.shape[0]
+        exact = (per_loc <= RADIAL_PROFILE_POINTS)[inverse]
+        if exact.any():
+            r = flat[:, exact]
+            discs[:, exact] = self.disc_populations(
+                uniq[inverse[exact], 0][None], uniq[inverse[exact], 1][None], r
+            ).reshape(r.shape)
+        if not exact.all():
+            cols = np.flatnonzero(~exact)
+            discs[:, cols] = self._profile_discs(uniq, inverse[cols], flat[:, cols])
+        return discs.reshape(radii_b.shape)
+
+    def _profile_discs(self, uniq: np.ndarray, loc: np.ndarray, r: np.ndarray) -> np.ndarray:
+        """
+        Кола з радіальних профілів: для кожної точки — RADIAL_PROFILE_POINTS кіл на log-сітці від
+        найменшого до найбільшого її радіуса, далі лінійна інтерполяція в (log r, населення);
+        до першого вузла — пропорційно площі.
+        """
+        used = np.flatnonzero(np.bincount(loc, minlength=len(uniq)))
+        n = len(used)
+        loc = np.searchsorted(used, loc)
+        positive = np.where(r > 0, r, np.inf)
+        r_min = np.full(n, np.inf)
+        r_max = np.zeros(n)
+        np.minimum.at(r_min, loc, positive.min(axis=0))
+        np.maximum.at(r_max, loc, r.max(axis=0))
+        has = np.isfinite(r_min)
+        r_max = np.where(has, r_max, 1.0)
+        r_min = np.maximum(np.minimum(np.where(has, r_min, 1.0), r_max), 1e-3)
+        grid_r = np.geomspace(r_min, np.maximum(r_max, r_min), RADIAL_PROFILE_POINTS)  # (P, n)
+        grid_pop = self.disc_populations(uniq[used, 0][None], uniq[used, 1][None], grid_r).reshape(grid_r.shape)
+        grid_pop[:, ~has] = 0.0
+
+        with np.errstate(divide="ignore"):
+            ln_r = np.log(np.maximum(r, 1e-12))
+        if n == 1:
+            # одна точка (сітка без осей lat/lon) — звичайна інтерполяція
+            pops = np.interp(ln_r, np.log(grid_r[:, 0]), grid_pop[:, 0])
+        else:
+            pops = _interp_profiles(ln_r, loc, grid_r, grid_pop)
+        first = grid_r[0][loc]
+        small = r < first
+        pops = np.where(small, grid_pop[0][loc] * (r / first) ** 2, pops)
+        return np.where(np.isnan(r), np.nan, pops)
+
+
+def _interp_profiles(ln_r: np.ndarray, loc: np.ndarray, grid_r: np.ndarray, grid_pop: np.ndarray) -> np.ndarray:
+    """
+    np.interp для багатьох профілів одразу: вузли профілю рівні в log r, тому номер вузла — арифметикою,
+    а пара (вузол, точка loc) — один індекс у плоских масивах профілів форми (RADIAL_PROFILE_POINTS, n).
+    """
+    n = grid_r.shape[1]
+    ln_lo = np.log(grid_r[0])
+    step = (np.log(grid_r[-1]) - ln_lo) / (RADIAL_PROFILE_POINTS - 1)
+    inv_step = np.where(step > 0, 1.0 / np.where(step > 0, step, 1.0), 0.0)
+    pos = np.clip(np.nan_to_num((ln_r - ln_lo[loc]) * inv_step[loc]), 0.0, RADIAL_PROFILE_POINTS - 1)
+    i = np.minimum(pos.astype(np.intp), RADIAL_PROFILE_POINTS - 2)
+    pos -= i
+    flat = i * n + loc
+    slopes = np.diff(grid_pop, axis=0, append=grid_pop[-1:])
+    return grid_pop.ravel().take(flat) + pos * slopes.ravel().take(flat)
+
+
+def _annuli(discs: np.ndarray, axis: int = 0) -> np.ndarray:
+    """Населення кілець з населення вкладених кіл (кола — за зростанням радіуса)"""
+    rings = np.diff(discs, axis=axis, prepend=0.0)
+    return np.maximum(rings, 0.0)
+
+
+_backend: Optional[PopulationBackend] = None
+
+
+def get_population_backend() -> PopulationBackend:
+    """
+    Поточне джерело населення. POPULATION_RASTER=<шлях до .npy/.tif> вмикає растр,
+    інакше — регіональна модель (міста + широтні пояси).
+    """
+    global _backend
+    if _backend is None:
+        path = os.environ.get("POPULATION_RASTER")
+        if path:
+            _backend = RasterPopulation(path, os.environ.get("POPULATION_CACHE_DIR"))
+        else:
+            _backend = RegionalPopulation()
+    return _backend
+
+
+def set_population_backend(backend: Optional[PopulationBackend]) -> None:
+    """Підмінити джерело населення (None — повернутися до налаштувань з оточення)"""
+    global _backend
+    _backend = backend
@@ -0,0 +1,438 @@
+import math
+import os
+from array import array
+from statistics import NormalDist
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from population import RegionalPopulation
+from calculations import AIRBLAST_BASE_SURFACE_KM, AIRBLAST_PRESSURES, AIRBLAST_TYPES, THERMAL_COEFFS
+from hazards import THERMAL_FLUENCE_CAL_CM2
+
+# Неперервна модель втрат: надлишковий тиск і теплова флюенса як гладкі функції масштабованої
+# відстані, частка загиблих і травмованих — probit від дози, інтеграл по тонких кільцях з населенням.
+# Криві й probit-CDF зведені в таблиці при імпорті, розрахунок — лише вибірка з таблиць.
+
+# zones — ступінчасті коефіцієнти CASUALTY_RATES по кільцях (як у попередніх версіях API), probit — ця модель
+CASUALTY_MODEL = os.environ.get("CASUALTY_MODEL", "zones")
+
+# Probit ударної хвилі Y = a + b·ln(P, кПа), частка = Φ(Y − 5). Підібрані найменшими квадратами
+# під CASUALTY_RATES на порогах зон: загибель (0.95/0.70/0.25/0.05), травма або загибель (0.99/0.95/0.85/0.55/0.15)
+BLAST_PROBIT = {"death": (1.41, 1.08), "injury": (3.95, 0.71)}
+# Опіки: логнормальна доза-відповідь за флюенсою (кал/см²) — медіана і σ ln; загибель — вдвічі
+# більша флюенса, ніж поріг опіків 3-го ступеня, травма — поріг опіків 2-го ступеня
+THERMAL_PROBIT = {
+    "death": (2 * THERMAL_FLUENCE_CAL_CM2["third_degree_burns"], 0.4),
+    "injury": (THERMAL_FLUENCE_CAL_CM2["second_degree_burns"], 0.4),
+}
+# Частка людей на відкритому просторі (без укриття від теплового імпульсу)
+THERMAL_EXPOSED_FRACTION = 0.25
+
+# Кільця інтегрування: кожна зона ударної хвилі ділиться на ZONE_RINGS кілець, рівних у log r;
+# найменша зона — від RING_INNER_FRACTION свого радіуса (всередині — ще одне коло-ядро)
+ZONE_RINGS = 12
+RING_INNER_FRACTION = 1e-3
+# Вузлів таблиць за ln масштабованої відстані
+TABLE_POINTS = 2048
+# Скільки точок (подій) рахувати за раз: масиви (зони × кільця, chunk) не ростуть із розміром сітки
+EVENT_CHUNK = 20_000
+# Таблиці часток зон для рівномірної густини: вузли за зсувом теплової відстані s і шириною зони w = ln(r/r_prev)
+ZONE_TABLE_S_POINTS = 512
+ZONE_TABLE_W_POINTS = 128
+
+_PHI = NormalDist()
+
+
+def _pchip(x: np.ndarray, y: np.ndarray, grid: np.ndarray) -> np.ndarray:
+    """
+    Монотонний кубічний сплайн (Fritsch–Carlson) через вузли (x, y) на сітці grid,
+    поза вузлами — лінійне продовження крайніх відрізків (похідна неперервна).
+    """
+    h = np.diff(x)
+    delta = np.diff(y) / h
+    d = np.empty_like(y)
+    d[0], d[-1] = delta[0], delta[-1]
+    for k in range(1, len(x) - 1):
+        if delta[k - 1] * delta[k] > 0:
+            w1, w2 = 2 * h[k] + h[k - 1], h[k] + 2 * h[k - 1]
+            d[k] = (w1 + w2) / (w1 / delta[k - 1] + w2 / delta[k])
+        else:
+            d[k] = 0.0
+    k = np.clip(np.searchsorted(x, grid) - 1, 0, len(x) - 2)
+    t = (grid - x[k]) / h[k]
+    inside = (t >= 0) & (t <= 1)
+    t = np.clip(t, 0.0, 1.0)
+    hermite = (
+        (2 * t ** 3 - 3 * t ** 2 + 1) * y[k] + (t ** 3 - 2 * t ** 2 + t) * h[k] * d[k]
+        + (-2 * t ** 3 + 3 * t ** 2) * y[k + 1] + (t ** 3 - t ** 2) * h[k] * d[k + 1]
+    )
+    below = y[0] + d[0] * (grid - x[0])
+    above = y[-1] + d[-1] * (grid - x[-1])
+    return np.where(inside, hermite, np.where(grid < x[0], below, above))
+
+
+def _normal_cdf(z: np.ndarray) -> np.ndarray:
+    return np.array([_PHI.cdf(v) for v in z.tolist()])
+
+
+def _build_tables() -> Dict[str, np.ndarray]:
+    """Таблиці частки загиблих/травмованих від ln масштабованої відстані для ударної хвилі й тепла"""
+    tables = {}
+    # Ударна хвиля: Z = r / E^(1/3) (км/Мт^(1/3)) для наземного вибуху
+    ln_z = np.log([AIRBLAST_BASE_SURFACE_KM[p] for p in AIRBLAST_PRESSURES])
+    ln_p = np.log(AIRBLAST_PRESSURES, dtype=float)
+    grid = np.linspace(ln_z[0] - 10.0, ln_z[-1] + 2.0, TABLE_POINTS)
+    blast_ln_p = _pchip(ln_z, ln_p, grid)
+    tables["blast_ln_z"] = grid
+    for outcome, (a, b) in BLAST_PROBIT.items():
+        tables[f"blast_{outcome}"] = _normal_cdf(a + b * blast_ln_p - 5.0)
+
+    # Тепло: r / E^THERMAL_EXPONENT; вузли — коефіцієнти зон і порогові флюенси
+    thermal_types = ("third_degree_burns", "second_degree_burns", "first_degree_burns")
+    ln_zt = np.log(THERMAL_COEFFS)
+    ln_q = np.log([THERMAL_FLUENCE_CAL_CM2[t] for t in thermal_types])
+    grid = np.linspace(ln_zt[0] - 10.0, ln_zt[-1] + 6.0, TABLE_POINTS)
+    thermal_ln_q = _pchip(ln_zt, ln_q, grid)
+    tables["thermal_ln_z"] = grid
+    for outcome, (median, sigma) in THERMAL_PROBIT.items():
+        tables[f"thermal_{outcome}"] = THERMAL_EXPOSED_FRACTION * _normal_cdf((thermal_ln_q - math.log(median)) / sigma)
+    return tables
+
+
+TABLES = _build_tables()
+# Приріст таблиці до наступного вузла (остання точка — нуль)
+_SLOPES = {name: np.diff(table, append=table[-1]) for name, table in TABLES.items()}
+# Межі й середини кілець усередині зони (частка відрізка ln r між сусідніми радіусами зон)
+_V_EDGES = np.linspace(0.0, 1.0, ZONE_RINGS + 1)
+_V_MID = ((_V_EDGES[:-1] + _V_EDGES[1:]) / 2)[:, None]
+_LN_INNER = math.log(RING_INNER_FRACTION)
+# середина ядра (коло всередині найменшої зони) у ln r відносно радіуса зони
+_LN_CORE = _LN_INNER + math.log(0.5)
+# ln Z вузлів ударної хвилі за типом зони (наземний вибух)
+_BLAST_LN_Z = {AIRBLAST_TYPES[p]: math.log(AIRBLAST_BASE_SURFACE_KM[p]) for p in AIRBLAST_PRESSURES}
+
+
+def _lookup(x, grid: np.ndarray, *names: str) -> List[np.ndarray]:
+    """
+    Лінійна інтерполяція таблиць TABLES[name] на рівномірній сітці grid: індекс і вага рахуються
+    арифметикою, без пошуку, один раз для всіх таблиць; приріст між вузлами береться з _SLOPES.
+    """
+    pos = np.clip(np.nan_to_num((np.asarray(x, dtype=float) - grid[0]) / (grid[1] - grid[0])), 0.0, len(grid) - 1.000001)
+    i = pos.astype(np.intp)
+    pos -= i
+    return [TABLES[name].take(i) + pos * _SLOPES[name].take(i) for name in names]
+
+
+@lru_cache(maxsize=8)
+def _blast_fractions(zone_types: Tuple[str, ...]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Частки (загибель, травма або загибель) від ударної хвилі в кільцях кожної зони, форма (Z, ZONE_RINGS, 2),
+    і в ядрі, форма (2,). Радіуси зон події — вузли кривої тиску, а кільця рівні в log r між ними,
+    тому масштабована відстань кільця не залежить від події: частки сталі й рахуються раз на набір зон.
+    Усередині найменшої зони тиск продовжується з нахилом наземного вибуху.
+    """
+    nodes = np.array([_BLAST_LN_Z[t] for t in zone_types])
+    prev = np.concatenate([[nodes[0] + _LN_INNER], nodes[:-1]])
+    s = prev[:, None] + _V_MID[:, 0][None] * (nodes - prev)[:, None]
+    core = _lookup(nodes[0] + _LN_INNER + math.log(0.5), TABLES["blast_ln_z"], "blast_death", "blast_injury")
+    return np.stack(_lookup(s, TABLES["blast_ln_z"], "blast_death", "blast_injury"), axis=-1), np.array(core)
+
+
+# Найширша зона — найменша, від RING_INNER_FRACTION свого радіуса; s нижче сітки — всі кільця перед початком
+# теплової таблиці, вище — після кінця (опіків немає), тож обрізання s і w на краях сітки точне
+_W_GRID = np.linspace(0.0, -_LN_INNER, ZONE_TABLE_W_POINTS)
+_S_GRID = np.linspace(TABLES["thermal_ln_z"][0] + _LN_INNER, TABLES["thermal_ln_z"][-1], ZONE_TABLE_S_POINTS)
+
+
+@lru_cache(maxsize=8)
+def _zone_fraction_tables(zone_types: Tuple[str, ...]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Частки загиблих і травмованих (або загиблих) у зоні за рівномірної густини — середні за площею
+    ZONE_RINGS кілець зони, — від теплового зсуву s (ln масштабованої теплової відстані внутрішнього краю)
+    і ширини w. Плоскі масиви форми (Z · ZONE_TABLE_S_POINTS · ZONE_TABLE_W_POINTS,) для _zone_fractions.
+    """
+    blast, _ = _blast_fractions(zone_types)
+    x = _S_GRID[:, None, None] + _V_MID[:, 0][None, None] * _W_GRID[None, :, None]
+    burn_death, burn_hurt = _lookup(x, TABLES["thermal_ln_z"], "thermal_death", "thermal_injury")
+    # частка площі кільця в зоні: (e^{2v₁w} − e^{2v₀w}) / (e^{2w} − 1), при w → 0 — частка відрізка v
+    with np.errstate(invalid="ignore", divide="ignore"):
+        area = np.diff(np.expm1(2 * _V_EDGES[None] * _W_GRID[:, None]), axis=1) / np.expm1(2 * _W_GRID)[:, None]
+    area[0] = np.diff(_V_EDGES)
+    deaths, hurts = [], []
+    for z in range(len(zone_types)):
+        death = blast[z, :, 0] + (1 - blast[z, :, 0]) * burn_death
+        hurt = np.maximum(blast[z, :, 1] + (1 - blast[z, :, 1]) * burn_hurt, death)
+        deaths.append((death * area).sum(axis=-1))
+        hurts.append((hurt * area).sum(axis=-1))
+    return np.stack(deaths).ravel(), np.stack(hurts).ravel()
+
+
+def _zone_fractions(zone_types: Tuple[str, ...], s: np.ndarray, w: np.ndarray) -> List[np.ndarray]:
+    """Білінійна вибірка з _zone_fraction_tables для s, w форми (Z, N) — (загибель, травма або загибель)"""
+    n_s, n_w = ZONE_TABLE_S_POINTS, ZONE_TABLE_W_POINTS
+    ps = np.clip(np.nan_to_num((s - _S_GRID[0]) / (_S_GRID[1] - _S_GRID[0])), 0.0, n_s - 1.000001)
+    pw = np.clip(np.nan_to_num((w - _W_GRID[0]) / (_W_GRID[1] - _W_GRID[0])), 0.0, n_w - 1.000001)
+    i_s = ps.astype(np.intp)
+    i_w = pw.astype(np.intp)
+    ps -= i_s
+    pw -= i_w
+    corner = (np.arange(len(zone_types))[:, None] * n_s + i_s) * n_w + i_w
+    out = []
+    for table in _zone_fraction_tables(zone_types):
+        low = table.take(corner)
+        low += pw * (table.take(corner + 1) - low)
+        high = table.take(corner + n_w)
+        high += pw * (table.take(corner + n_w + 1) - high)
+        low += ps * (high - low)
+        out.append(low)
+    return out
+
+
+_zone_fraction_tables(tuple(AIRBLAST_TYPES[p] for p in AIRBLAST_PRESSURES))
+
+
+def probit_casualties(
+    radii_km,
+    density,
+    zone_types: List[str],
+    lat=None,
+    lon=None,
+    thermal_radii_km=None,
+    backend=None,
+) -> Dict[str, np.ndarray]:
+    """
+    Втрати з неперервних полів: radii_km (Z, ...) — радіуси зон ударної хвилі за зростанням
+    (типи zone_types), thermal_radii_km (3, ...) або None. Населення тонких кілець дає backend
+    (population.get_population_backend). Повертає те саме, що casualties_from_population:
+    population/deaths/injuries по зонах (кільця між радіусами зон) і підсумки.
+    """
+    radii = np.asarray(radii_km, dtype=float)
+    thermal = None if thermal_radii_km is None else np.asarray(thermal_radii_km, dtype=float)
+    shape = np.broadcast_shapes(
+        radii.shape[1:], np.shape(density), np.shape(lat), np.shape(lon),
+        () if thermal is None else thermal.shape[1:],
+    )
+    n_zones = radii.shape[0]
+    flat_radii = np.broadcast_to(radii, (n_zones,) + shape).reshape(n_zones, -1)
+    flat = [np.broadcast_to(np.asarray(v, dtype=float), shape).reshape(-1) for v in (density, lat, lon)]
+    flat_thermal = None if thermal is None else np.broadcast_to(thermal, thermal.shape[:1] + shape).reshape(thermal.shape[0], -1)
+
+    total = flat[0].size
+    out = {key: np.zeros((n_zones, total)) for key in ("population", "deaths", "injuries")}
+    chunk = _regional_chunk if isinstance(backend, RegionalPopulation) else _probit_chunk
+    for start in range(0, total, EVENT_CHUNK):
+        part = slice(start, start + EVENT_CHUNK)
+        zones = chunk(
+            flat_radii[:, part], zone_types, *(v[part] for v in flat),
+            None if flat_thermal is None else flat_thermal[:, part], backend,
+        )
+        for key in out:
+            out[key][:, part] = zones[key]
+
+    result = {key: np.trunc(value).reshape((n_zones,) + shape) for key, value in out.items()}
+    result["total_deaths"] = result["deaths"].sum(axis=0)
+    result["total_injuries"] = result["injuries"].sum(axis=0)
+    result["affected_population"] = result["population"].sum(axis=0)
+    return result
+
+
+def _probit_chunk(radii, zone_types, density, lat, lon, thermal, backend) -> Dict[str, np.ndarray]:
+    n_zones = radii.shape[0]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ln_r = np.log(radii)
+    ln_prev = np.concatenate([ln_r[:1] + _LN_INNER, ln_r[:-1]])
+    width = ln_r - ln_prev
+    edges = np.exp(ln_prev[:, None] + _V_EDGES[None, :, None] * width[:, None])
+    discs = backend.disc_populations_batch(lat, lon, edges.reshape(n_zones * (ZONE_RINGS + 1), -1), density)
+    discs = np.nan_to_num(discs.reshape(edges.shape))
+    rings = np.maximum(np.diff(discs, axis=1), 0.0)
+    core = discs[0, 0]
+
+    blast, blast_core = _blast_fractions(tuple(zone_types))
+    death, hurt = blast[..., 0, None], blast[..., 1, None]
+    core_death, core_hurt = blast_core
+    if thermal is not None:
+        # масштабована відстань тепла — через найбільший тепловий радіус (коефіцієнти зон сталі)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            shift = math.log(THERMAL_COEFFS[-1]) - np.log(thermal[-1])
+        ln_mid = ln_prev[:, None] + _V_MID[None] * width[:, None]
+        burn_death, burn_hurt = _lookup(ln_mid + shift, TABLES["thermal_ln_z"], "thermal_death", "thermal_injury")
+        # 1 − (1 − a)(1 − b) = a + (1 − a)·b, на місці поверх масивів опіків
+        burn_death *= 1 - death
+        burn_death += death
+        burn_hurt *= 1 - hurt
+        burn_hurt += hurt
+        death, hurt = burn_death, burn_hurt
+        core_ln = ln_r[0] + _LN_CORE + shift
+        core_burn_death, core_burn_hurt = _lookup(core_ln, TABLES["thermal_ln_z"], "thermal_death", "thermal_injury")
+        core_death = core_death + (1 - core_death) * core_burn_death
+        core_hurt = core_hurt + (1 - core_hurt) * core_burn_hurt
+    hurt = np.maximum(hurt, death)
+    core_hurt = np.maximum(core_hurt, core_death)
+
+    population = rings.sum(axis=1)
+    deaths = (rings * death).sum(axis=1)
+    injuries = (rings * hurt).sum(axis=1) - deaths
+    population[0] += core
+    deaths[0] += core * core_death
+    injuries[0] += core * (core_hurt - core_death)
+    return {"population": population, "deaths": np.nan_to_num(deaths), "injuries": np.nan_to_num(injuries)}
+
+
+def _regional_chunk(radii, zone_types, density, lat, lon, thermal, backend) -> Dict[str, np.ndarray]:
+    """
+    _probit_chunk для рівномірної густини: населення кільця — density·π·(r² − r_prev²), а частки
+    зони, усереднені за площею її кілець, беруться з _zone_fraction_tables — одна вибірка на зону.
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ln_r = np.log(radii)
+    ln_prev = np.concatenate([ln_r[:1] + _LN_INNER, ln_r[:-1]])
+    if thermal is None:
+        s = np.full_like(ln_prev, _S_GRID[-1])
+    else:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            shift = math.log(THERMAL_COEFFS[-1]) - np.log(thermal[-1])
+        s = ln_prev + shift
+    with np.errstate(invalid="ignore"):
+        width = ln_r - ln_prev
+    death, hurt = _zone_fractions(tuple(zone_types), s, width)
+
+    discs = np.nan_to_num(backend.disc_populations_batch(lat, lon, radii, density))
+    core = discs[0] * RING_INNER_FRACTION ** 2
+    population = np.diff(discs, axis=0, prepend=0.0)
+    population[0] -= core
+    np.maximum(population, 0.0, out=population)
+
+    _, (core_death, core_hurt) = _blast_fractions(tuple(zone_types))
+    if thermal is not None:
+        core_ln = ln_r[0] + _LN_CORE + shift
+        core_burn_death, core_burn_hurt = _lookup(core_ln, TABLES["thermal_ln_z"], "thermal_death", "thermal_injury")
+        core_death = core_death + (1 - core_death) * core_burn_death
+        core_hurt = np.maximum(core_hurt + (1 - core_hurt) * core_burn_hurt, core_death)
+
+    deaths = population * death
+    injuries = population * hurt - deaths
+    population[0] += core
+    deaths[0] += core * core_death
+    injuries[0] += core * (core_hurt - core_death)
+    return {"population": population, "deaths": np.nan_to_num(deaths), "injuries": np.nan_to_num(injuries)}
+
+
+# Ті самі сітки як float — для скалярного probit_event_casualties
+_S0, _S_STEP, _S_END = float(_S_GRID[0]), float(_S_GRID[1] - _S_GRID[0]), float(_S_GRID[-1])
+_W0, _W_STEP = float(_W_GRID[0]), float(_W_GRID[1] - _W_GRID[0])
+_T0 = float(TABLES["thermal_ln_z"][0])
+_T_STEP = float(TABLES["thermal_ln_z"][1] - TABLES["thermal_ln_z"][0])
+_LN_THERMAL_REF = math.log(THERMAL_COEFFS[-1])
+
+
+def _position(x: float, x0: float, step: float, n: int) -> float:
+    """Положення x на рівномірній сітці — як у _lookup/_zone_fractions (nan -> 0, обрізання на краях)"""
+    pos = (x - x0) / step
+    if pos != pos:
+        return 0.0
+    return min(max(pos, 0.0), n - 1.000001)
+
+
+def _thermal_scalar(x: float) -> Tuple[float, float]:
+    pos = _position(x, _T0, _T_STEP, TABLE_POINTS)
+    i = int(pos)
+    pos -= i
+    return (
+        TABLES["thermal_death"].item(i) + pos * _SLOPES["thermal_death"].item(i),
+        TABLES["thermal_injury"].item(i) + pos * _SLOPES["thermal_injury"].item(i),
+    )
+
+
+@lru_cache(maxsize=8)
+def _event_tables(zone_types: Tuple[str, ...]) -> Tuple[array, array, float, float]:
+    """Таблиці часток зон як array('d') (швидкий доступ до елемента з Python) і частки ядра"""
+    death_table, hurt_table = _zone_fraction_tables(zone_types)
+    _, (core_death, core_hurt) = _blast_fractions(zone_types)
+    return array("d", death_table.tobytes()), array("d", hurt_table.tobytes()), float(core_death), float(core_hurt)
+
+
+def probit_event_casualties(
+    radii_km: List[float],
+    density: float,
+    zone_types: List[str],
+    lat: float,
+    lon: float,
+    thermal_radii_km: Optional[List[float]] = None,
+    backend=None,
+) -> Dict[str, List[int]]:
+    """
+    probit_casualties для однієї події (скалярний /impact): population/deaths/injuries по зонах списками.
+    За рівномірної густини — ті самі таблиці й порядок дій, що й _regional_chunk, але на float і math:
+    для п'яти зон накладні витрати numpy переважають саму арифметику.
+    """
+    if not isinstance(backend, RegionalPopulation):
+        k = probit_casualties(radii_km, density, zone_types, lat, lon, thermal_radii_km, backend)
+        return {key: [int(x) for x in k[key].tolist()] for key in ("population", "deaths", "injuries")}
+
+    death_table, hurt_table, core_death, core_hurt = _event_tables(tuple(zone_types))
+    n_s, n_w = ZONE_TABLE_S_POINTS, ZONE_TABLE_W_POINTS
+    inf = float("inf")
+    ln_prev = None
+    shift = None
+    if thermal_radii_km:
+        t = thermal_radii_km[-1]
+        shift = _LN_THERMAL_REF - (math.log(t) if t > 0 else -inf)
+
+    populations, deaths, injuries = [], [], []
+    prev_disc = 0.0
+    for z, r in enumerate(radii_km):
+        ln_r = math.log(r) if r > 0 else -inf
+        if ln_prev is None:
+            ln_prev = ln_r + _LN_INNER
+        # положення на сітках — як _position, розгорнуто
+        ps = ((_S_END if shift is None else ln_prev + shift) - _S0) / _S_STEP
+        ps = 0.0 if ps != ps else min(max(ps, 0.0), n_s - 1.000001)
+        pw = (ln_r - ln_prev - _W0) / _W_STEP
+        pw = 0.0 if pw != pw else min(max(pw, 0.0), n_w - 1.000001)
+        i_s, i_w = int(ps), int(pw)
+        ps -= i_s
+        pw -= i_w
+        corner = (z * n_s + i_s) * n_w + i_w
+        low = death_table[corner]
+        low += pw * (death_table[corner + 1] - low)
+        high = death_table[corner + n_w]
+        high += pw * (death_table[corner + n_w + 1] - high)
+        death = low + ps * (high - low)
+        low = hurt_table[corner]
+        low += pw * (hurt_table[corner + 1] - low)
+        high = hurt_table[corner + n_w]
+        high += pw * (hurt_table[corner + n_w + 1] - high)
+        hurt = low + ps * (high - low)
+
+        disc = density * (math.pi * (r ** 2)) if r == r else 0.0
+        population = disc - prev_disc
+        prev_disc = disc
+        if z == 0:
+            core = disc * RING_INNER_FRACTION ** 2
+            population = max(population - core, 0.0)
+            zone_deaths = population * death
+            zone_injuries = population * hurt - zone_deaths
+            if shift is not None:
+                burn_death, burn_hurt = _thermal_scalar(ln_r + _LN_CORE + shift)
+                core_death = core_death + (1 - core_death) * burn_death
+                core_hurt = max(core_hurt + (1 - core_hurt) * burn_hurt, core_death)
+            population += core
+            zone_deaths += core * core_death
+            zone_injuries += core * (core_hurt - core_death)
+        else:
+            population = max(population, 0.0)
+            zone_deaths = population * death
+            zone_injuries = population * hurt - zone_deaths
+        populations.append(math.trunc(population))
+        deaths.append(math.trunc(zone_deaths) if zone_deaths == zone_deaths else 0)
+        injuries.append(math.trunc(zone_injuries) if zone_injuries == zone_injuries else 0)
+        ln_prev = ln_r
+    return {"population": populations, "deaths": deaths, "injuries": injuries}
+
+
+def casualty_model() -> str:
+    """Поточна модель втрат: zones або probit"""
+    return "probit" if CASUALTY_MODEL == "probit" else "zones"
@@ -0,0 +1,233 @@
+import csv
+import math
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from constants import MAJOR_CITIES, STRATEGIC_SITES
+
+EARTH_RADIUS_KM = 6371.0
+
+# Розмір клітинки індексу (градуси): 180 × 360 клітинок
+CELL_DEG = 1.0
+N_ROWS = int(round(180 / CELL_DEG))
+N_COLS = int(round(360 / CELL_DEG))
+
+# Числові колонки CSV, які перетворюємо на float
+NUMERIC_FIELDS = ("lat", "lon", "density", "population", "capacity_mw")
+
+
+class SiteIndex:
+    """
+    Просторовий індекс точкових об'єктів (міста, АЕС, дамби, аеропорти...).
+
+    Об'єкти розкладені по клітинках CELL_DEG × CELL_DEG (як geohash) і відсортовані
+    за номером клітинки, тож сусідні по довготі клітинки одного ряду — це один
+    неперервний відрізок масиву. Запит "усе в радіусі R" бере по одному відрізку
+    на ряд клітинок і фільтрує кандидатів точною відстанню через хорду
+    одиничної сфери (XYZ).
+    """
+
+    def __init__(self, sites: List[Dict]):
+        lat = np.array([float(s["lat"]) for s in sites], dtype=float).reshape(-1)
+        lon = np.array([float(s["lon"]) for s in sites], dtype=float).reshape(-1)
+        cell = _cell_id(lat, lon)
+        order = np.argsort(cell, kind="stable")
+
+        self.sites = [sites[i] for i in order.tolist()]
+        self.lat = lat[order]
+        self.lon = lon[order]
+        self.xyz = _unit_xyz(self.lat, self.lon)
+        # offsets[c]..offsets[c + 1] — об'єкти клітинки c
+        self.offsets = np.searchsorted(cell[order], np.arange(N_ROWS * N_COLS + 1))
+
+    def __len__(self) -> int:
+        return len(self.sites)
+
+    def _candidates(self, lat: float, lon: float, radius_km: float) -> np.ndarray:
+        """Індекси об'єктів у клітинках, що перетинають коло (надмножина результату)"""
+        ang = radius_km / EARTH_RADIUS_KM
+        if ang >= math.pi / 2:
+            return np.arange(len(self.sites))
+        dlat = math.degrees(ang)
+        lat_top, lat_bottom = min(90.0, lat + dlat), max(-90.0, lat - dlat)
+        r0 = _row(lat_top)
+        r1 = _row(lat_bottom)
+
+        # Півширина кола по довготі: максимальна на найближчій до полюса широті смуги
+        phi_max = math.radians(max(abs(lat_top), abs(lat_bottom)))
+        if lat_top >= 90.0 or lat_bottom <= -90.0 or math.sin(ang) >= math.cos(phi_max):
+            half = 180.0
+        else:
+            half = math.degrees(math.asin(math.sin(ang) / math.cos(phi_max)))
+
+        slices = []
+        if half >= 180.0:
+            slices.append((r0 * N_COLS, (r1 + 1) * N_COLS))
+        else:
+            c0 = int(math.floor((lon - half + 180.0) / CELL_DEG))
+            c1 = int(math.floor((lon + half + 180.0) / CELL_DEG))
+            if c1 - c0 + 1 >= N_COLS:
+                slices.append((r0 * N_COLS, (r1 + 1) * N_COLS))
+            else:
+                c0 %= N_COLS
+                c1 %= N_COLS
+                for r in range(r0, r1 + 1):
+                    if c0 <= c1:
+                        slices.append((r * N_COLS + c0, r * N_COLS + c1 + 1))
+                    else:  # через антимеридіан
+                        slices.append((r * N_COLS + c0, (r + 1) * N_COLS))
+                        slices.append((r * N_COLS, r * N_COLS + c1 + 1))
+
+        parts = [np.arange(self.offsets[a], self.offsets[b]) for a, b in slices if self.offsets[b] > self.offsets[a]]
+        return np.concatenate(parts) if parts else np.empty(0, dtype=np.intp)
+
+    def _distances(self, idx: np.ndarray, lat: float, lon: float) -> np.ndarray:
+        chord = np.linalg.norm(self.xyz[idx] - _unit_xyz(lat, lon), axis=-1)
+        return 2 * EARTH_RADIUS_KM * np.arcsin(np.minimum(chord / 2, 1.0))
+
+    def within(self, lat: float, lon: float, radius_km: float) -> List[Tuple[Dict, float]]:
+        """Усі об'єкти в радіусі radius_km: [(site, distance_km)] за зростанням відстані"""
+        idx = self._candidates(lat, lon, radius_km)
+        if idx.size == 0:
+            return []
+        dist = self._distances(idx, lat, lon)
+        keep = dist <= radius_km
+        idx, dist = idx[keep], dist[keep]
+        order = np.argsort(dist, kind="stable")
+        return [(self.sites[i], d) for i, d in zip(idx[order].tolist(), dist[order].tolist())]
+
+    def nearest(self, lat: float, lon: float, max_km: Optional[float] = None) -> Optional[Tuple[Dict, float]]:
+        """Найближчий об'єкт (не далі max_km) або None"""
+        if not self.sites:
+            return None
+        limit = max_km if max_km is not None else math.pi * EARTH_RADIUS_KM
+        radius = min(50.0, limit)
+        while True:
+            idx = self._candidates(lat, lon, radius)
+            if idx.size:
+                dist = self._distances(idx, lat, lon)
+                best = int(np.argmin(dist))
+                if dist[best] <= radius:
+                    return self.sites[idx[best]], float(dist[best])
+            if radius >= limit:
+                return None
+            radius = min(radius * 4, limit)
+
+    def nearest_within_batch(self, lats, lons, max_km: float) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Найближчий об'єкт не далі max_km для масивів точок.
+        Повертає (індекси в self.sites або -1, відстані км або inf).
+        Точки групуються по клітинках: кандидати шукаються раз на клітинку.
+        """
+        lats = np.asarray(lats, dtype=float).reshape(-1)
+        lons = np.asarray(lons, dtype=float).reshape(-1)
+        best_idx = np.full(lats.shape, -1, dtype=np.intp)
+        best_dist = np.full(lats.shape, np.inf)
+        if not self.sites or lats.size == 0:
+            return best_idx, best_dist
+
+        cells, groups = np.unique(_cell_id(lats, lons), return_inverse=True)
+        groups = groups.reshape(-1)
+        order = np.argsort(groups, kind="stable")
+        bounds = np.searchsorted(groups[order], np.arange(len(cells) + 1))
+        # від центру клітинки до її кута — не більше пів діагоналі клітинки
+        cell_half_diag_km = math.radians(CELL_DEG) * EARTH_RADIUS_KM * math.sqrt(2) / 2
+        for g, cell in enumerate(cells.tolist()):
+            members = order[bounds[g]:bounds[g + 1]]
+            r, c = divmod(cell, N_COLS)
+            center_lat = 90.0 - (r + 0.5) * CELL_DEG
+            center_lon = -180.0 + (c + 0.5) * CELL_DEG
+            idx = self._candidates(center_lat, center_lon, max_km + cell_half_diag_km / max(math.cos(math.radians(center_lat)), 0.01))
+            if idx.size == 0:
+                continue
+            q = _unit_xyz(lats[members], lons[members])
+            chord = np.linalg.norm(q[:, None, :] - self.xyz[idx][None, :, :], axis=-1)
+            dist = 2 * EARTH_RADIUS_KM * np.arcsin(np.minimum(chord / 2, 1.0))
+            j = np.argmin(dist, axis=1)
+            d = dist[np.arange(len(members)), j]
+            hit = d <= max_km
+            best_idx[members[hit]] = idx[j[hit]]
+            best_dist[members[hit]] = d[hit]
+        return best_idx, best_dist
+
+
+def _row(lat):
+    return np.clip(np.floor((90.0 - np.asarray(lat)) / CELL_DEG), 0, N_ROWS - 1).astype(np.int64)
+
+
+def _cell_id(lat, lon) -> np.ndarray:
+    col = np.floor((np.asarray(lon) + 180.0) / CELL_DEG).astype(np.int64) % N_COLS
+    return _row(lat) * N_COLS + col
+
+
+def _unit_xyz(lat, lon) -> np.ndarray:
+    phi = np.radians(lat)
+    lam = np.radians(lon)
+    return np.stack([np.cos(phi) * np.cos(lam), np.cos(phi) * np.sin(lam), np.sin(phi)], axis=-1)
+
+
+def load_sites_csv(path: str) -> List[Dict]:
+    """
+    Об'єкти з CSV: обов'язкові колонки name, type, lat, lon;
+    додаткові (density, population, capacity_mw, country...) зберігаються як є.
+    """
+    sites = []
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            site = {k: v for k, v in row.items() if k is not None and v not in (None, "")}
+            for key in NUMERIC_FIELDS:
+                if key in site:
+                    site[key] = float(site[key])
+            site["type"] = site.get("type", "other").strip().lower()
+            sites.append(site)
+    return sites
+
+
+_lock = threading.Lock()
+_site_index: Optional[SiteIndex] = None
+_city_index: Optional[SiteIndex] = None
+_fingerprint: Optional[str] = None
+
+
+def _load_all_sites(paths: List[str]) -> List[Dict]:
+    sites = list(MAJOR_CITIES) + list(STRATEGIC_SITES)
+    for path in paths:
+        sites.extend(load_sites_csv(path))
+    return sites
+
+
+def _build() -> None:
+    global _site_index, _city_index, _fingerprint
+    with _lock:
+        if _site_index is None:
+            paths = list(filter(None, os.environ.get("SITES_CSV", "").split(os.pathsep)))
+            sites = _load_all_sites(paths)
+            _fingerprint = ";".join(
+                ["builtin"] + [f"{os.path.abspath(p)}:{os.stat(p).st_mtime_ns}" for p in paths]
+            )
+            _city_index = SiteIndex([s for s in sites if s.get("type") == "city" and s.get("density", 0) > 0])
+            _site_index = SiteIndex(sites)
+
+
+def get_site_index() -> SiteIndex:
+    """Індекс усіх об'єктів (вбудовані + SITES_CSV), будується один раз"""
+    if _site_index is None:
+        _build()
+    return _site_index
+
+
+def site_fingerprint() -> str:
+    """Відбиток набору об'єктів для ключів кешу: вбудовані + шляхи й mtime файлів SITES_CSV"""
+    if _fingerprint is None:
+        _build()
+    return _fingerprint
+
+
+def get_city_index() -> SiteIndex:
+    """Індекс міст із відомою густиною населення — для estimate_population_density"""
+    if _city_index is None:
+        _build()
+    return _city_index
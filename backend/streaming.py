@@ -0,0 +1,216 @@
+import asyncio
+import threading
+import time
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from models import ImpactRequest
+from constants import MATERIALS
+from calculations import calculate_energy
+from casualties import location_context
+from impact import SCENARIO_PHYSICS, location_impacts
+from cache import get_physics_cache
+from compact import json_bytes
+from executor import get_executor
+from geo import layers_feature_collection
+from metrics import collect_stages, observe_stages, record_stages, register_collector
+from tiles import tile_template
+from tsunami_sim import get_bathymetry, simulate_tsunami, tsunami_json
+
+# Потокова відповідь /impact/stream (Server-Sent Events): кожна подія — частина відповіді /impact,
+# клієнт зливає data подій в один об'єкт. Порядок: energy -> layers -> фізичні секції -> location ->
+# casualties / economic_damage / strategic_risks (у порядку готовності) -> продукти -> done.
+
+# Наслідки для точки удару — окремі етапи, рахуються паралельно після населення
+LOCATION_FIELDS = ("casualties", "economic_damage", "strategic_risks")
+# Дорогі продукти, лише на запит (?products=geojson,tsunami)
+STREAM_PRODUCTS = ("geojson", "tsunami")
+
+
+def parse_products(text: Optional[str]) -> List[str]:
+    names = [name.strip() for name in (text or "").split(",") if name.strip()]
+    unknown = sorted(set(names) - set(STREAM_PRODUCTS))
+    if unknown:
+        raise ValueError(f"Unknown products: {', '.join(unknown)}; allowed: {', '.join(STREAM_PRODUCTS)}")
+    return [name for name in STREAM_PRODUCTS if name in names]
+
+
+def validate_stream(req: ImpactRequest) -> None:
+    if req.scenario not in SCENARIO_PHYSICS:
+        raise ValueError(f"Unknown scenario: {req.scenario}")
+    if req.material not in MATERIALS:
+        raise ValueError(f"Unknown material: {req.material}")
+
+
+class StreamRegistry:
+    """
+    Активні потоки за (клієнт, stream_id): новий потік з тим самим ключем скасовує попередній
+    (користувач зсунув повзунок — старий розрахунок більше не потрібен).
+    """
+
+    def __init__(self):
+        self._streams: Dict[Tuple[str, str], threading.Event] = {}
+        self._lock = threading.Lock()
+        self.superseded = 0
+
+    def open(self, key: Optional[Tuple[str, str]]) -> threading.Event:
+        cancel = threading.Event()
+        if key is None:
+            return cancel
+        with self._lock:
+            previous = self._streams.get(key)
+            if previous is not None:
+                previous.set()
+                self.superseded += 1
+            self._streams[key] = cancel
+        return cancel
+
+    def close(self, key: Optional[Tuple[str, str]], cancel: threading.Event) -> None:
+        if key is None:
+            return
+        with self._lock:
+            if self._streams.get(key) is cancel:
+                del self._streams[key]
+
+    def __len__(self) -> int:
+        return len(self._streams)
+
+
+_registry: Optional[StreamRegistry] = None
+
+
+def get_stream_registry() -> StreamRegistry:
+    global _registry
+    if _registry is None:
+        _registry = StreamRegistry()
+    return _registry
+
+
+def _timed(fn, *args):
+    """Етап у потоці разом з його таймерами (contextvars потоку не видно запиту)"""
+    with collect_stages() as stages:
+        result = fn(*args)
+    return result, stages
+
+
+def _stream_tsunami(lat: float, lon: float, energy_mt: float, cancel: threading.Event) -> Dict:
+    bathymetry = get_bathymetry()
+    if bathymetry is None:
+        return {"engine": "unavailable"}
+    factor = dict(SCENARIO_PHYSICS["water"])["tsunami"]
+    result = simulate_tsunami(bathymetry, lat, lon, energy_mt * factor, cancel=cancel)
+    return {"engine": "rings"} if result is None else tsunami_json(result)
+
+
+async def impact_events(
+    req: ImpactRequest,
+    client: str,
+    cancel: threading.Event,
+    products: Optional[List[str]] = None,
+    zoom: float = 8,
+    precision: int = 5,
+) -> AsyncIterator[Tuple[str, Dict]]:
+    """
+    Події потокового /impact: (назва, частина відповіді). Перша подія — після допуску в
+    ImpactExecutor (Overloaded — до неї). Незалежні етапи йдуть паралельно; після cancel
+    (новий потік того ж клієнта або відключення) нові етапи не запускаються, а поточні
+    довгі (tsunami) зупиняються на наступному кроці.
+    """
+    executor = get_executor()
+    products = products or []
+    started = time.perf_counter()
+    stages: Dict[str, float] = {}
+    pending: Dict[asyncio.Future, str] = {}
+
+    def spawn(name: str, fn, *args) -> None:
+        pending[asyncio.ensure_future(executor.run_stage(_timed, fn, *args))] = name
+
+    async with executor.admit(client):
+        try:
+            # енергія — мікросекунди, до будь-якої черги
+            yield "energy", {
+                "energy": calculate_energy(req.size, req.speed, req.material),
+                "material": MATERIALS[req.material]["name"],
+                "scenario": req.scenario,
+            }
+            (token, req, state), physics_stages = await executor.run_stage(_timed, get_physics_cache().prepare, req)
+            stages.update(physics_stages)
+            physics = state["physics"]
+            yield "layers", {
+                "physics_token": token,
+                "tiles": tile_template(token, req.lat, req.lon),
+                "fun_fact": state["fun_fact"],
+                "layers": state["layers"],
+            }
+            for section in physics:
+                yield section, {section: physics[section]}
+
+            spawn("location", location_context, req.lat, req.lon)
+            if "geojson" in products:
+                spawn("geojson", layers_feature_collection, req.lat, req.lon, state["layers"], zoom, precision)
+            if "tsunami" in products and req.scenario == "water":
+                spawn("tsunami_simulation", _stream_tsunami, req.lat, req.lon, state["energy"]["energy_mt"], cancel)
+
+            while pending:
+                if cancel.is_set():
+                    yield "cancelled", {"cancelled": True}
+                    return
+                done, _ = await asyncio.wait(pending, timeout=0.25, return_when=asyncio.FIRST_COMPLETED)
+                for future in done:
+                    name = pending.pop(future)
+                    try:
+                        result, stage_times = future.result()
+                    except Exception as e:
+                        if cancel.is_set():
+                            continue
+                        yield "error", {"error": {"stage": name, "detail": str(e)}}
+                        continue
+                    stages.update(stage_times)
+                    if name == "location":
+                        yield "location", {"location": result.info}
+                        for field in LOCATION_FIELDS:
+                            spawn(field, location_impacts, req, physics, result, {field})
+                    elif name == "geojson":
+                        yield "layers_geojson", {"layers_geojson": result}
+                    elif result:
+                        # location_impacts повертає {} для полів, що не рахуються у сценарії
+                        yield name, result if name in LOCATION_FIELDS else {name: result}
+
+            record_stages(stages)
+            observe_stages(req.scenario, stages)
+            yield "done", {
+                "elapsed_ms": round((time.perf_counter() - started) * 1000, 2),
+                "stages_ms": {name: round(seconds * 1000, 3) for name, seconds in stages.items()},
+            }
+        finally:
+            # відключення клієнта або supersede: етапи, що ще чекають семафор, знімаються
+            cancel.set()
+            for future in pending:
+                future.cancel()
+
+
+def sse_event(name: str, data: Dict) -> bytes:
+    return b"event: " + name.encode("ascii") + b"\ndata: " + json_bytes(data) + b"\n\n"
+
+
+async def sse_stream(first: Tuple[str, Dict], events: AsyncIterator[Tuple[str, Dict]], on_close=None) -> AsyncIterator[bytes]:
+    """Кодування подій у text/event-stream; on_close — після останньої події або відключення"""
+    try:
+        yield sse_event(*first)
+        async for name, data in events:
+            yield sse_event(name, data)
+    finally:
+        await events.aclose()
+        if on_close is not None:
+            on_close()
+
+
+def _stream_metrics():
+    if _registry is None:
+        return []
+    return [
+        ("impact_streams_open", "gauge", "/impact/stream streams with a stream_id", [({}, len(_registry))]),
+        ("impact_streams_superseded_total", "counter", "Streams cancelled by a newer stream with the same stream_id", [({}, _registry.superseded)]),
+    ]
+
+
+register_collector(_stream_metrics)
@@ -0,0 +1,344 @@
+import json
+import math
+from typing import Callable, Dict, Iterator, List, Tuple
+
+import numpy as np
+
+from models import SweepRequest
+from calculations import (
+    material_density,
+    material_strength,
+    energy_kernel,
+    crater_kernel,
+    airblast_kernel,
+    thermal_kernel,
+    seismic_kernel,
+    tsunami_kernel,
+    AIRBLAST_PRESSURES,
+    AIRBLAST_TYPES,
+    SEISMIC_MMI,
+    TSUNAMI_THRESHOLDS,
+)
+from casualties import (
+    casualties_kernel,
+    economic_kernel,
+    estimate_population_density_batch,
+)
+from entry import entry_kernel
+from impact import SCENARIO_PHYSICS
+
+# Максимальна кількість точок сітки в одному запиті
+MAX_SWEEP_POINTS = 2_000_000
+
+AIRBLAST_ZONE_TYPES = [AIRBLAST_TYPES[p] for p in AIRBLAST_PRESSURES]
+THERMAL_ZONE_TYPES = ["third_degree_burns", "second_degree_burns", "first_degree_burns"]
+
+
+class SweepGrid:
+    """
+    Набір точок для векторного розрахунку виходів /impact.
+    Для декартової сітки кожне поле зберігається як масив, що броадкаститься
+    вздовж "своєї" осі, тому проміжні величини мають форму лише тих осей,
+    від яких реально залежать (енергія не має осі angle, теплові радіуси
+    не мають осей lat/lon тощо). Monte Carlo передає сюди одновимірні вибірки.
+    """
+
+    def __init__(self, scenario: str, shape: Tuple[int, ...], inputs: Dict[str, np.ndarray]):
+        # inputs: size, speed, angle, lat, lon, density, strength — скаляри або масиви, що броадкастяться до shape;
+        # необов'язковий burst_altitude_km замінює висоту airburst з моделі входу
+        self.scenario = scenario
+        self.shape = shape
+        self.inputs = inputs
+        self._cache: Dict[str, object] = {}
+
+    @classmethod
+    def from_request(cls, req: SweepRequest) -> "SweepGrid":
+        """Сітка з осей SweepRequest: кожна вісь — окремий вимір"""
+        shape = tuple(len(axis.grid()) for axis in req.axes)
+        ndim = len(shape)
+
+        base = req.base
+        inputs = {
+            "size": np.float64(base.size),
+            "speed": np.float64(base.speed),
+            "angle": np.float64(base.angle),
+            "lat": np.float64(base.lat),
+            "lon": np.float64(base.lon),
+            "density": material_density(base.material),
+            "strength": material_strength(base.material),
+        }
+        for dim, axis in enumerate(req.axes):
+            values = axis.grid()
+            axis_shape = (1,) * dim + (-1,) + (1,) * (ndim - dim - 1)
+            if axis.field == "material":
+                inputs["density"] = material_density(values).reshape(axis_shape)
+                inputs["strength"] = material_strength(values).reshape(axis_shape)
+            else:
+                inputs[axis.field] = np.asarray(values, dtype=float).reshape(axis_shape)
+        return cls(base.scenario, shape, inputs)
+
+    def replace(self, **inputs) -> "SweepGrid":
+        """Та сама сітка з іншими входами; густина населення переноситься, якщо lat/lon не змінились"""
+        grid = SweepGrid(self.scenario, self.shape, {**self.inputs, **inputs})
+        if "lat" not in inputs and "lon" not in inputs and "density" in self._cache:
+            grid._cache["density"] = self._cache["density"]
+        return grid
+
+    def _cached(self, key: str, fn: Callable):
+        if key not in self._cache:
+            self._cache[key] = fn()
+        return self._cache[key]
+
+    def energy(self) -> Dict[str, np.ndarray]:
+        return self._cached("energy", lambda: energy_kernel(
+            self.inputs["size"], self.inputs["speed"], self.inputs["density"]
+        ))
+
+    def energy_mt(self, section: str) -> np.ndarray:
+        """Енергія секції (округлена energy_mt × частка сценарію), як у /impact"""
+        factor = dict(SCENARIO_PHYSICS[self.scenario])[section]
+        return np.round(self.energy()["energy_mt"], 3) * factor
+
+    def per_unique_energy(self, section: str, fn: Callable[[np.ndarray], np.ndarray]) -> np.ndarray:
+        """
+        Рахує fn(E) -> (Z, U) лише для унікальних енергій секції і розкладає назад на сітку.
+        Так величини, що залежать тільки від energy_mt, рахуються один раз на енергію.
+        """
+        def compute():
+            E = self.energy_mt(section)
+            uniq, inverse = np.unique(E, return_inverse=True)
+            values = fn(uniq)
+            return values[:, inverse.reshape(E.shape)]
+        return self._cached(f"per_energy:{section}", compute)
+
+    def entry(self) -> Dict[str, np.ndarray]:
+        # профіль виділення енергії сітці не потрібен (виходи entry.* — скаляри), частини — в entry_kernel
+        return self._cached("entry", lambda: entry_kernel(
+            self.inputs["size"], self.inputs["speed"], self.inputs["angle"],
+            self.inputs["density"], self.inputs["strength"], profile=False,
+        ))
+
+    def burst_altitude_km(self) -> np.ndarray:
+        """Висота airburst (км): задана у входах або пік виділення енергії (округлений, як у /impact)"""
+        if "burst_altitude_km" in self.inputs:
+            return np.asarray(self.inputs["burst_altitude_km"], dtype=float)
+        return np.round(self.entry()["burst_altitude_km"], 1)
+
+    def airblast_radii(self) -> np.ndarray:
+        if "airburst_altitude_km" not in dict(SCENARIO_PHYSICS[self.scenario]):
+            return self.per_unique_energy("airblast", lambda E: airblast_kernel(E)["radius_km"])
+        # повітряний підрив: радіуси залежать і від висоти, тому без per_unique_energy
+        return self._cached("airblast", self._airburst_radii)
+
+    def _airburst_radii(self) -> np.ndarray:
+        """
+        Як impact.airburst_energy_fraction: підрив на частку енергії, виділену в атмосфері (округлену,
+        як у /impact), а тіла, що долетіли до землі, — поверхневий удар на повну енергію.
+        Задана у входах висота (Monte Carlo) — підрив на повну енергію.
+        """
+        E = self.energy_mt("airblast")
+        height_m = self.burst_altitude_km() * 1000.0
+        if "burst_altitude_km" in self.inputs:
+            return airblast_kernel(E, burst_mode="air", burst_height_m=height_m)["radius_km"]
+        entry = self.entry()
+        fraction = np.clip(np.round(entry["deposited_fraction"], 3), 0.0, 1.0)
+        fraction = np.where(np.isnan(fraction), 1.0, fraction)
+        radii = airblast_kernel(E * fraction, burst_mode="air", burst_height_m=height_m)["radius_km"]
+        ground = entry["reached_ground"]
+        if ground.any():
+            radii = np.where(ground, airblast_kernel(E)["radius_km"], radii)
+        return radii
+
+    def thermal_radii(self) -> np.ndarray:
+        return self.per_unique_energy("thermal", thermal_kernel)
+
+    def seismic(self) -> np.ndarray:
+        # рядок 0 — магнітуда, далі радіуси MMI-зон
+        def fn(E):
+            k = seismic_kernel(E)
+            return np.concatenate([k["magnitude"][None, :], k["radius_km"]])
+        return self.per_unique_energy("seismic", fn)
+
+    def tsunami(self) -> np.ndarray:
+        # рядок 0 — початкова висота, далі радіуси, далі час приходу
+        def fn(E):
+            k = tsunami_kernel(E)
+            return np.concatenate([k["initial_height_m"][None, :], k["radius_km"], k["arrival_time_min"]])
+        return self.per_unique_energy("tsunami", fn)
+
+    def crater(self) -> Dict[str, np.ndarray]:
+        return self._cached("crater", lambda: crater_kernel(
+            self.inputs["size"], self.inputs["speed"], self.inputs["angle"], self.inputs["density"]
+        ))
+
+    def population_density(self) -> np.ndarray:
+        """Густина населення для кожної комбінації lat/lon сітки (одним пакетним запитом)"""
+        def compute():
+            lat, lon = np.broadcast_arrays(self.inputs["lat"], self.inputs["lon"])
+            pop = estimate_population_density_batch(lat.ravel(), lon.ravel())
+            return np.array([p["density"] for p in pop], dtype=float).reshape(lat.shape)
+        return self._cached("density", compute)
+
+    def casualties(self) -> Dict[str, np.ndarray]:
+        # як і в /impact, втрати рахуються з округлених радіусів зон
+        def compute():
+            thermal = None
+            if "thermal" in dict(SCENARIO_PHYSICS[self.scenario]):
+                thermal = np.round(self.thermal_radii(), 2)
+            return casualties_kernel(
+                np.round(self.airblast_radii(), 2), self.population_density(), AIRBLAST_ZONE_TYPES,
+                self.inputs["lat"], self.inputs["lon"], thermal,
+            )
+        return self._cached("casualties", compute)
+
+    def economic(self) -> Dict[str, np.ndarray]:
+        def compute():
+            fire = None
+            if "thermal" in dict(SCENARIO_PHYSICS[self.scenario]):
+                fire = np.round(self.thermal_radii()[0], 2)
+            return economic_kernel(
+                np.round(self.airblast_radii()[:3], 2), AIRBLAST_ZONE_TYPES[:3], fire, self.population_density(),
+                self.inputs["lat"], self.inputs["lon"],
+            )
+        return self._cached("economic", compute)
+
+
+def _build_outputs() -> Dict[str, Tuple[str, Callable[[SweepGrid], np.ndarray]]]:
+    """Реєстр вихідних величин: назва -> (секція відповіді /impact, функція над сіткою)"""
+    outputs = {}
+    for key in ("energy_j", "energy_mt", "mass_kg"):
+        outputs[f"energy.{key}"] = ("energy", lambda g, k=key: g.energy()[k])
+    outputs["energy.hiroshima_eq"] = ("energy", lambda g: g.energy()["energy_mt"] / 0.015)
+
+    for key, src, scale in (
+        ("diameter_km", "width_m", 1000.0),
+        ("width_km", "width_m", 1000.0),
+        ("length_km", "length_m", 1000.0),
+        ("depth_km", "depth_m", 1000.0),
+        ("rim_height_m", "rim_height_m", 1.0),
+        ("ejecta_mass_kg", "ejecta_mass_kg", 1.0),
+    ):
+        outputs[f"crater.{key}"] = ("crater", lambda g, s=src, d=scale: g.crater()[s] / d)
+
+    for key in ("breakup_altitude_km", "burst_altitude_km", "impact_speed_kms"):
+        outputs[f"entry.{key}"] = ("entry", lambda g, k=key: g.entry()[k])
+    outputs["entry.energy_deposited_fraction"] = ("entry", lambda g: g.entry()["deposited_fraction"])
+    outputs["airburst_altitude_km"] = ("airburst_altitude_km", lambda g: g.burst_altitude_km())
+    outputs["fragmentation.fragmentation_altitude_km"] = (
+        "fragmentation", lambda g: np.round(g.entry()["breakup_altitude_km"], 1)
+    )
+
+    for i, zone_type in enumerate(AIRBLAST_ZONE_TYPES):
+        outputs[f"airblast.{zone_type}.radius_km"] = ("airblast", lambda g, i=i: g.airblast_radii()[i])
+    for i, zone_type in enumerate(THERMAL_ZONE_TYPES):
+        outputs[f"thermal.{zone_type}.radius_km"] = ("thermal", lambda g, i=i: g.thermal_radii()[i])
+
+    outputs["seismic.magnitude_richter"] = ("seismic", lambda g: g.seismic()[0])
+    for i, mmi in enumerate(SEISMIC_MMI):
+        outputs[f"seismic.seismic_mmi_{mmi}.radius_km"] = ("seismic", lambda g, i=i: g.seismic()[1 + i])
+
+    n_rings = len(TSUNAMI_THRESHOLDS)
+    outputs["tsunami.initial_height_m"] = ("tsunami", lambda g: g.tsunami()[0])
+    for i, (label, _, _, _) in enumerate(TSUNAMI_THRESHOLDS):
+        outputs[f"tsunami.{label}.radius_km"] = ("tsunami", lambda g, i=i: g.tsunami()[1 + i])
+        outputs[f"tsunami.{label}.arrival_time_min"] = (
+            "tsunami", lambda g, i=i: g.tsunami()[1 + n_rings + i]
+        )
+
+    for key in ("total_deaths", "total_injuries", "affected_population"):
+        outputs[f"casualties.{key}"] = ("casualties", lambda g, k=key: g.casualties()[k])
+    for key in ("total_damage_usd", "affected_area_km2"):
+        outputs[f"economic_damage.{key}"] = ("economic_damage", lambda g, k=key: g.economic()[k])
+    return outputs
+
+
+SWEEP_OUTPUTS = _build_outputs()
+
+# Секції /impact, що залежать від локації (рахуються для всіх сценаріїв, крім water)
+_LOCATION_SECTIONS = ("casualties", "economic_damage")
+
+
+def scenario_outputs(scenario: str) -> List[str]:
+    """Назви виходів SWEEP_OUTPUTS, які має відповідь /impact для сценарію"""
+    sections = {s for s, _ in SCENARIO_PHYSICS.get(scenario, ())}
+    if not sections:
+        raise ValueError(f"Невідомий сценарій: {scenario}")
+    sections.add("energy")
+    if scenario != "water":
+        sections.update(_LOCATION_SECTIONS)
+    return [name for name, (section, _) in SWEEP_OUTPUTS.items() if section in sections]
+
+
+def validate_sweep(req: SweepRequest) -> None:
+    """Перевірка виходів і розміру сітки; ValueError з поясненням"""
+    available = scenario_outputs(req.base.scenario)
+    for name in req.outputs:
+        if name not in SWEEP_OUTPUTS:
+            raise ValueError(f"Невідомий вихід: {name}. Доступні: {', '.join(SWEEP_OUTPUTS)}")
+        if name not in available:
+            raise ValueError(f"Вихід {name} не рахується для сценарію {req.base.scenario}")
+
+    points = math.prod(len(axis.grid()) for axis in req.axes)
+    if points > MAX_SWEEP_POINTS:
+        raise ValueError(f"Забагато точок сітки: {points} (максимум {MAX_SWEEP_POINTS})")
+
+
+def is_integral(name: str) -> bool:
+    """Чи є вихід цілим лічильником (люди, долари)"""
+    return name.split(".")[0] == "casualties" or name == "economic_damage.total_damage_usd"
+
+
+def evaluate_output(grid: SweepGrid, name: str) -> np.ndarray:
+    """Вихід на повній сітці (C-порядок), int64 для лічильників, float64 для решти"""
+    values = np.broadcast_to(SWEEP_OUTPUTS[name][1](grid), grid.shape)
+    return values.astype(np.int64 if is_integral(name) else np.float64)
+
+
+def _header(req: SweepRequest, grid: SweepGrid) -> Dict:
+    return {
+        "scenario": grid.scenario,
+        "shape": list(grid.shape),
+        "axes": {axis.field: axis.grid() for axis in req.axes},
+    }
+
+
+def stream_sweep_json(req: SweepRequest) -> Iterator[str]:
+    """
+    Колонковий JSON: {"shape", "axes", "outputs": {name: [плоский масив у C-порядку]}}.
+    Кожен вихід рахується й віддається окремим шматком.
+    """
+    grid = SweepGrid.from_request(req)
+    header = _header(req, grid)
+    yield json.dumps(header, ensure_ascii=False)[:-1] + ', "outputs": {'
+    for i, name in enumerate(req.outputs):
+        values = evaluate_output(grid, name)
+        flat = values.ravel().tolist()
+        if values.dtype == np.float64 and not np.isfinite(values).all():
+            flat = [x if math.isfinite(x) else None for x in flat]
+        yield ("" if i == 0 else ", ") + json.dumps(name) + ": " + json.dumps(flat)
+    yield "}}"
+
+
+def stream_sweep_binary(req: SweepRequest) -> Iterator[bytes]:
+    """
+    Бінарний формат: рядок JSON-заголовка (з dtype/offset/nbytes кожного виходу) + "\\n",
+    далі сирі little-endian масиви виходів у C-порядку один за одним.
+    """
+    grid = SweepGrid.from_request(req)
+    header = _header(req, grid)
+    points = math.prod(grid.shape)
+    offset = 0
+    header["outputs"] = []
+    for name in req.outputs:
+        nbytes = points * 8
+        header["outputs"].append({
+            "name": name,
+            "dtype": "<i8" if is_integral(name) else "<f8",
+            "offset": offset,
+            "nbytes": nbytes,
+        })
+        offset += nbytes
+    yield json.dumps(header, ensure_ascii=False).encode() + b"\n"
+    for name in req.outputs:
+        values = evaluate_output(grid, name)
+        yield values.astype(values.dtype.newbyteorder("<"), copy=False).tobytes()
@@ -0,0 +1,271 @@
+import hashlib
+import math
+import os
+import struct
+import threading
+import zlib
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from cache import CacheStats, MemoryCache, get_physics_cache, request_from_token
+from geo import EARTH_RADIUS_KM
+from hazards import HAZARD_FIELDS, hazard_profile, profile_values
+from metrics import register_collector
+
+# Растрові плитки полів ураження (Web Mercator, XYZ): /tiles/{scenario_id}/{layer}/{z}/{x}/{y}.png
+# scenario_id = "{physics_token}@{lat},{lon}" — фізика з токена (/impact/physics) і точка удару.
+TILE_SIZE = 256
+TILE_MAX_ZOOM = 18
+# Версія рендера: входить у ключ кешу, тож зміна рендера чи фізики не віддасть старих плиток з диска
+TILE_VERSION = 2
+TILE_CACHE_SIZE = int(os.environ.get("TILE_CACHE_SIZE", 4096))     # плиток у пам'яті
+TILE_CACHE_TTL_S = float(os.environ.get("TILE_CACHE_TTL_S", 86400))
+TILE_CACHE_DIR = os.environ.get("TILE_CACHE_DIR")                   # дисковий кеш; не задано — лише пам'ять
+TILE_MAX_AGE_S = int(os.environ.get("TILE_MAX_AGE_S", 86400))       # Cache-Control для браузера
+TILE_PNG_LEVEL = 6
+
+# Прозорість кольорових плиток: від зовнішньої межі поля до найсильнішої зони
+TILE_ALPHA_MIN = 60
+TILE_ALPHA_MAX = 200
+# value-плитки: значення = (R·65536 + G·256 + B) · TILE_VALUE_SCALE, альфа 0 — поза полем
+TILE_VALUE_SCALE = 0.001
+
+# Шари плиток — неперервні поля hazards.py
+TILE_LAYERS = tuple(HAZARD_FIELDS)
+
+_PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+
+def scenario_id(token: str, lat: float, lon: float) -> str:
+    return f"{token}@{lat:.5f},{lon:.5f}"
+
+
+def parse_scenario_id(sid: str) -> Tuple[str, float, float]:
+    """"{token}@{lat},{lon}" -> (token, lat, lon); ValueError — не розбирається"""
+    try:
+        token, point = sid.rsplit("@", 1)
+        lat_text, lon_text = point.split(",")
+        lat, lon = round(float(lat_text), 5), round(float(lon_text), 5)
+    except ValueError as e:
+        raise ValueError("Некоректний ідентифікатор сценарію") from e
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180) or not token:
+        raise ValueError("Некоректний ідентифікатор сценарію")
+    return token, lat, lon
+
+
+def tile_template(token: str, lat: float, lon: float) -> str:
+    """Шаблон URL плиток для клієнта (MapLibre raster source)"""
+    return f"/tiles/{scenario_id(token, lat, lon)}/{{layer}}/{{z}}/{{x}}/{{y}}.png"
+
+
+def layer_profile(layer: str, physics: Dict) -> Optional[Dict]:
+    """Вузли поля шару (hazard_profile) з RGB кольорів зон; None — шар для сценарію не рахується"""
+    profile = hazard_profile(layer, physics)
+    if profile is not None:
+        profile["rgb"] = np.array([_hex_rgb(c) for c in profile["color"]], dtype=np.uint8)
+    return profile
+
+
+def _hex_rgb(color: str) -> Tuple[int, int, int]:
+    color = color.lstrip("#")
+    return int(color[0:2], 16), int(color[2:4], 16), int(color[4:6], 16)
+
+
+def tile_distances(lat: float, lon: float, z: int, x: int, y: int) -> np.ndarray:
+    """Відстані (км) від точки удару до центрів пікселів плитки (великий круг), форма (TILE_SIZE, TILE_SIZE)"""
+    n = TILE_SIZE * 2 ** z
+    px = (x * TILE_SIZE + np.arange(TILE_SIZE) + 0.5) / n
+    py = (y * TILE_SIZE + np.arange(TILE_SIZE) + 0.5) / n
+    lons = np.radians(px * 360.0 - 180.0)[None, :]
+    lats = np.arctan(np.sinh(np.pi * (1.0 - 2.0 * py)))[:, None]
+    phi0, lam0 = math.radians(lat), math.radians(lon)
+    a = np.sin((lats - phi0) / 2) ** 2 + math.cos(phi0) * np.cos(lats) * np.sin((lons - lam0) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def render_tile(profile: Dict, distance_km: np.ndarray, encoding: str) -> np.ndarray:
+    """RGBA-масив плитки: колір зони з прозорістю за значенням поля або закодоване значення"""
+    values = profile_values(profile, distance_km, beyond=False)
+    inside = np.isfinite(values)
+    rgba = np.zeros(distance_km.shape + (4,), dtype=np.uint8)
+    if encoding == "value":
+        code = np.clip(np.round(np.where(inside, values, 0.0) / TILE_VALUE_SCALE), 0, 2 ** 24 - 1).astype(np.uint32)
+        rgba[..., 0] = code >> 16
+        rgba[..., 1] = (code >> 8) & 0xFF
+        rgba[..., 2] = code & 0xFF
+        rgba[..., 3] = np.where(inside, 255, 0)
+        return rgba
+
+    # зона пікселя — найменший радіус, що його накриває
+    zone = np.minimum(np.searchsorted(profile["radius_km"], distance_km), len(profile["radius_km"]) - 1)
+    rgba[..., :3] = profile["rgb"][zone]
+    # прозорість — положення значення між зовнішнім і внутрішнім порогом
+    lo, hi = profile["value"][-1], profile["value"][0]
+    if profile["log_values"]:
+        t = (np.log(np.where(inside, values, lo)) - math.log(lo)) / max(math.log(hi) - math.log(lo), 1e-9)
+    else:
+        t = (np.where(inside, values, lo) - lo) / max(hi - lo, 1e-9)
+    alpha = TILE_ALPHA_MIN + (TILE_ALPHA_MAX - TILE_ALPHA_MIN) * np.clip(t, 0.0, 1.0)
+    rgba[..., 3] = np.where(inside, alpha, 0).astype(np.uint8)
+    return rgba
+
+
+def encode_png(rgba: np.ndarray) -> bytes:
+    """RGBA (H, W, 4) uint8 -> PNG (без фільтрів рядків, zlib)"""
+    h, w, _ = rgba.shape
+    raw = np.zeros((h, w * 4 + 1), dtype=np.uint8)
+    raw[:, 1:] = rgba.reshape(h, w * 4)
+
+    def chunk(tag: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF)
+
+    return (
+        _PNG_SIGNATURE
+        + chunk(b"IHDR", struct.pack(">IIBBBBB", w, h, 8, 6, 0, 0, 0))
+        + chunk(b"IDAT", zlib.compress(raw.tobytes(), TILE_PNG_LEVEL))
+        + chunk(b"IEND", b"")
+    )
+
+
+EMPTY_TILE = encode_png(np.zeros((TILE_SIZE, TILE_SIZE, 4), dtype=np.uint8))
+
+
+class TileCache:
+    """Готові PNG за ключем плитки: LRU у пам'яті (MemoryCache) + необов'язковий каталог на диску"""
+
+    def __init__(self, max_entries: int = TILE_CACHE_SIZE, ttl_s: float = TILE_CACHE_TTL_S, directory: Optional[str] = TILE_CACHE_DIR):
+        self.stats = CacheStats()
+        self.memory = MemoryCache(max(1, max_entries), ttl_s, self.stats)
+        self.directory = directory
+        self.disk_hits = 0
+        self._lock = threading.Lock()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.directory, digest[:2], digest + ".png")
+
+    def get(self, key: str, digest: str) -> Optional[bytes]:
+        png = self.memory.get(key)
+        if png is None and self.directory:
+            try:
+                with open(self._path(digest), "rb") as f:
+                    png = f.read()
+            except OSError:
+                png = None
+            if png is not None:
+                self.memory.put(key, png)
+                with self._lock:
+                    self.disk_hits += 1
+        with self._lock:
+            if png is None:
+                self.stats.misses += 1
+            else:
+                self.stats.hits += 1
+        return png
+
+    def put(self, key: str, digest: str, png: bytes) -> None:
+        self.memory.put(key, png)
+        if not self.directory:
+            return
+        path = self._path(digest)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # атомарний запис: інший воркер або бачить цілий файл, або не бачить нічого
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(png)
+        os.replace(tmp, path)
+
+    def info(self) -> Dict:
+        return {
+            **self.stats.as_dict(),
+            "disk_hits": self.disk_hits,
+            "entries": len(self.memory),
+            "max_entries": self.memory.max_entries,
+            "directory": self.directory,
+        }
+
+
+_tile_cache: Optional[TileCache] = None
+
+
+def get_tile_cache() -> TileCache:
+    global _tile_cache
+    if _tile_cache is None:
+        _tile_cache = TileCache()
+    return _tile_cache
+
+
+def tile_key(sid: str, layer: str, encoding: str, z: int, x: int, y: int) -> Tuple[str, str]:
+    """
+    (ключ кешу, хеш ключа — ім'я файлу та ETag); вміст плитки повністю визначається ключем.
+    LookupError — невідомий шар або ідентифікатор сценарію не розбирається; ValueError — некоректні z/x/y.
+    """
+    validate_tile(layer, z, x, y)
+    try:
+        token, lat, lon = parse_scenario_id(sid)
+    except ValueError as e:
+        raise LookupError(str(e)) from e
+    key = f"{TILE_VERSION}:{scenario_id(token, lat, lon)}:{layer}:{encoding}:{z}/{x}/{y}"
+    return key, hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+
+def tile_etag(digest: str) -> str:
+    return f'"{digest[:20]}"'
+
+
+def validate_tile(layer: str, z: int, x: int, y: int) -> None:
+    if layer not in TILE_LAYERS:
+        raise LookupError(f"Невідомий шар: {layer}. Доступні: {', '.join(TILE_LAYERS)}")
+    if not 0 <= z <= TILE_MAX_ZOOM:
+        raise ValueError(f"z має бути в межах 0..{TILE_MAX_ZOOM}")
+    if not (0 <= x < 2 ** z and 0 <= y < 2 ** z):
+        raise ValueError("x/y плитки поза межами для цього z")
+
+
+def get_tile(sid: str, layer: str, z: int, x: int, y: int, encoding: str = "color") -> bytes:
+    """
+    PNG плитки з кешу або розрахований (і збережений у кеш).
+    LookupError — невідомий токен або шар, якого немає у сценарії; ValueError — некоректні z/x/y.
+    """
+    key, digest = tile_key(sid, layer, encoding, z, x, y)
+    cache = get_tile_cache()
+    png = cache.get(key, digest)
+    if png is not None:
+        return png
+
+    token, lat, lon = parse_scenario_id(sid)
+    try:
+        req = request_from_token(token, lat, lon)
+    except ValueError as e:
+        raise LookupError(str(e)) from e
+    physics = get_physics_cache().get(token, req)["physics"]
+    profile = layer_profile(layer, physics)
+    if profile is None:
+        raise LookupError(f"Шар {layer} не рахується для сценарію {req.scenario}")
+
+    distance = tile_distances(lat, lon, z, x, y)
+    if distance.min() > profile["radius_km"][-1]:
+        png = EMPTY_TILE
+    else:
+        png = encode_png(render_tile(profile, distance, encoding))
+    cache.put(key, digest, png)
+    return png
+
+
+def _tile_metrics():
+    """Лічильники кешу плиток для /metrics"""
+    cache = _tile_cache
+    if cache is None:
+        return []
+    return [
+        ("tile_cache_hits_total", "counter", "Tile cache hits (memory or disk)", [({}, cache.stats.hits)]),
+        ("tile_cache_disk_hits_total", "counter", "Tile cache hits served from disk", [({}, cache.disk_hits)]),
+        ("tile_cache_misses_total", "counter", "Tiles rendered", [({}, cache.stats.misses)]),
+        ("tile_cache_evictions_total", "counter", "Tile cache LRU evictions", [({}, cache.stats.evictions)]),
+        ("tile_cache_entries", "gauge", "Tiles in the in-process cache", [({}, len(cache.memory))]),
+    ]
+
+
+register_collector(_tile_metrics)
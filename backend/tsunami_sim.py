@@ -0,0 +1,429 @@
+import json
+import math
+import os
+import threading
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from calculations import tsunami_kernel, TSUNAMI_R0_KM
+
+EARTH_RADIUS_KM = 6371.0
+G = 9.81
+
+# Рельєф дна: .npy / сирий бінарний (.bin, .f32, .i16 + .json з rows/cols/dtype) / .nc
+TSUNAMI_BATHYMETRY = os.environ.get("TSUNAMI_BATHYMETRY")
+# Крок розрахункової сітки (рельєф усереднюється блоками до нього) і радіус області
+TSUNAMI_CELL_KM = float(os.environ.get("TSUNAMI_CELL_KM", 4.0))
+TSUNAMI_DOMAIN_KM = float(os.environ.get("TSUNAMI_DOMAIN_KM", 2000.0))
+TSUNAMI_DURATION_MIN = float(os.environ.get("TSUNAMI_DURATION_MIN", 240.0))
+# Число Куранта: dt = CFL · dx_min / sqrt(g · h_max) у поточному активному вікні
+TSUNAMI_CFL = 0.7
+# Мілкіші клітинки — суходіл (відбивна стінка)
+TSUNAMI_MIN_DEPTH_M = 10.0
+# Висота, з якої хвиля вважається такою, що прийшла (для растру часу приходу)
+TSUNAMI_ARRIVAL_M = float(os.environ.get("TSUNAMI_ARRIVAL_M", 0.05))
+# Поглинальний шар біля меж області (клітинок)
+TSUNAMI_SPONGE_CELLS = 12
+# Активне вікно росте кроками по стільки клітинок (і тоді ж перераховується dt)
+WINDOW_STEP_CELLS = 16
+# Тайли по рядках для пулу потоків: NumPy відпускає GIL на великих масивах
+TSUNAMI_WORKERS = int(os.environ.get("TSUNAMI_WORKERS", os.cpu_count() or 1))
+TILE_ROWS = 128
+TILE_MIN_CELLS = 250_000
+MAX_COASTAL_POINTS = 500
+
+try:  # NetCDF — опційно, потрібен netCDF4
+    import netCDF4
+except ImportError:  # pragma: no cover - залежить від середовища
+    netCDF4 = None
+
+
+class Bathymetry:
+    """
+    Рельєф (висота в метрах; море — від'ємна), відкритий через memory-map.
+    Геоприв'язка — <файл>.json з {"lat_max", "lon_min", "cell_deg"} (як у растра населення);
+    для сирого бінарного файлу там же "rows", "cols" і "dtype" (за замовчуванням <f4).
+    NetCDF (змінна elevation/z/depth, осі lat/lon) один раз конвертується у .npy поруч.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.grid, meta = self._open(path)
+        rows, cols = self.grid.shape
+        self.lat_max = float(meta.get("lat_max", 90.0))
+        self.lon_min = float(meta.get("lon_min", -180.0))
+        self.cell_deg = float(meta.get("cell_deg", 180.0 / rows))
+        self.rows, self.cols = rows, cols
+        self.is_global = abs(cols * self.cell_deg - 360.0) < 1e-6
+
+    @staticmethod
+    def _open(path: str):
+        meta_path = os.path.splitext(path)[0] + ".json"
+        meta = {}
+        if os.path.exists(meta_path):
+            with open(meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+
+        lower = path.lower()
+        if lower.endswith(".npy"):
+            return np.load(path, mmap_mode="r"), meta
+        if lower.endswith(".nc"):
+            npy_path = path + ".npy"
+            if not os.path.exists(npy_path):
+                meta = _convert_netcdf(path, npy_path, meta_path)
+            return np.load(npy_path, mmap_mode="r"), meta
+        if "rows" not in meta or "cols" not in meta:
+            raise RuntimeError(f"Для бінарного рельєфу {path} потрібен {meta_path} з rows/cols")
+        grid = np.memmap(path, dtype=np.dtype(meta.get("dtype", "<f4")), mode="r",
+                         shape=(int(meta["rows"]), int(meta["cols"])))
+        return grid, meta
+
+    def depth_at(self, lat: float, lon: float) -> float:
+        """Глибина (м, додатна в морі) в клітинці точки; 0 — суходіл або поза растром"""
+        r = int((self.lat_max - lat) / self.cell_deg)
+        c = int((lon - self.lon_min) / self.cell_deg)
+        if self.is_global:
+            c %= self.cols
+        if not (0 <= r < self.rows and 0 <= c < self.cols):
+            return 0.0
+        return max(0.0, -float(self.grid[r, c]))
+
+    def window(self, lat: float, lon: float, radius_km: float, cell_km: float) -> Tuple[np.ndarray, float, float, float]:
+        """
+        Глибини (м, float32) навколо точки, усереднені блоками до ~cell_km.
+        Повертає (depth, lat_max, lon_min, cell_deg) вікна; читається лише потрібний шматок memory-map.
+        """
+        native_km = math.radians(self.cell_deg) * EARTH_RADIUS_KM
+        block = max(1, int(round(cell_km / native_km)))
+        dlat = math.degrees(radius_km / EARTH_RADIUS_KM)
+        dlon = min(180.0, dlat / max(math.cos(math.radians(lat)), 0.05))
+
+        r0 = max(0, int(math.floor((self.lat_max - (lat + dlat)) / self.cell_deg)))
+        r1 = min(self.rows, int(math.ceil((self.lat_max - (lat - dlat)) / self.cell_deg)))
+        c0 = int(math.floor((lon - dlon - self.lon_min) / self.cell_deg))
+        c1 = int(math.ceil((lon + dlon - self.lon_min) / self.cell_deg))
+        if not self.is_global:
+            c0, c1 = max(0, c0), min(self.cols, c1)
+        r1 = r0 + (r1 - r0) // block * block
+        c1 = c0 + (c1 - c0) // block * block
+        if r1 <= r0 or c1 <= c0:
+            return np.zeros((0, 0), np.float32), lat, lon, self.cell_deg * block
+
+        if self.is_global and (c0 < 0 or c1 > self.cols):
+            elev = np.take(self.grid[r0:r1], np.arange(c0, c1) % self.cols, axis=1)
+        else:
+            elev = self.grid[r0:r1, c0:c1]
+        depth = np.maximum(-np.asarray(elev, dtype=np.float32), 0.0)
+        if block > 1:
+            depth = depth.reshape(depth.shape[0] // block, block, depth.shape[1] // block, block).mean(axis=(1, 3))
+        return (
+            depth.astype(np.float32),
+            self.lat_max - r0 * self.cell_deg,
+            self.lon_min + c0 * self.cell_deg,
+            self.cell_deg * block,
+        )
+
+
+def _convert_netcdf(path: str, npy_path: str, meta_path: str) -> Dict:
+    """NetCDF -> .npy + .json (рядки з півночі на південь, як решта растрів)"""
+    if netCDF4 is None:
+        raise RuntimeError("Для NetCDF-рельєфу потрібен пакет netCDF4")
+    with netCDF4.Dataset(path) as ds:
+        name = next(n for n in ("elevation", "z", "depth", "Band1") if n in ds.variables)
+        lat_name = next(n for n in ("lat", "latitude", "y") if n in ds.variables)
+        lon_name = next(n for n in ("lon", "longitude", "x") if n in ds.variables)
+        data = np.asarray(ds.variables[name][:], dtype=np.float32)
+        lats = np.asarray(ds.variables[lat_name][:], dtype=float)
+        lons = np.asarray(ds.variables[lon_name][:], dtype=float)
+    if name == "depth":
+        data = -data  # глибина додатна — переводимо у висоту
+    if lats[0] < lats[-1]:
+        data, lats = data[::-1], lats[::-1]
+    cell = float(abs(lons[1] - lons[0]))
+    meta = {"lat_max": float(lats[0]) + cell / 2, "lon_min": float(lons[0]) - cell / 2, "cell_deg": cell}
+    np.save(npy_path, data)
+    with open(meta_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    return meta
+
+
+class ShallowWaterSolver:
+    """
+    Лінійні рівняння мілкої води на сфері (сітка Аракави C, схема вперед-назад):
+        M_t = -g h/(R cosφ) η_λ,   N_t = -g h/R η_φ,
+        η_t = -(M_λ + (N cosφ)_φ) / (R cosφ).
+    η — у центрах клітинок, M/N — потоки на гранях; грані із суходолом закриті (відбиття),
+    біля меж області — поглинальний шар. Рахується лише активне вікно, куди хвиля
+    могла дійти за час t; dt — з умови CFL для максимальної глибини у вікні.
+    """
+
+    def __init__(self, depth: np.ndarray, lat_max: float, cell_deg: float, workers: int = TSUNAMI_WORKERS):
+        self.depth = depth
+        self.ny, self.nx = depth.shape
+        self.workers = max(1, workers)
+        ny, nx = self.ny, self.nx
+        d = math.radians(cell_deg)
+        R = EARTH_RADIUS_KM * 1000.0
+
+        lat_c = np.radians(lat_max - (np.arange(ny) + 0.5) * cell_deg)
+        lat_v = np.radians(lat_max - np.arange(ny + 1) * cell_deg)
+        cos_c = np.maximum(np.cos(lat_c), 1e-3)
+        cos_v = np.maximum(np.cos(lat_v), 0.0)
+        self.dx = (R * cos_c * d).astype(np.float32)  # м, по рядках
+        self.dy = np.float32(R * d)
+
+        wet = depth >= TSUNAMI_MIN_DEPTH_M
+        self.wet = wet.astype(np.float32)
+        h = np.where(wet, depth, 0.0).astype(np.float32)
+        # глибина на гранях: менша із сусідніх, 0 якщо хоч одна — суходіл
+        h_u = np.zeros((ny, nx + 1), np.float32)
+        h_u[:, 1:-1] = np.minimum(h[:, 1:], h[:, :-1])
+        h_v = np.zeros((ny + 1, nx), np.float32)
+        h_v[1:-1] = np.minimum(h[1:], h[:-1])
+        self.cu = G * h_u / self.dx[:, None]
+        self.cv = G * h_v / self.dy
+        self.ex = (1.0 / self.dx)[:, None].astype(np.float32)
+        # N — потік у напрямку зростання номера рядка (на південь)
+        self.es = (cos_v[1:] / (self.dy * cos_c))[:, None].astype(np.float32)
+        self.en = (cos_v[:-1] / (self.dy * cos_c))[:, None].astype(np.float32)
+        self.sponge = _sponge(ny, nx, TSUNAMI_SPONGE_CELLS)
+        self.c_max = float(math.sqrt(G * max(float(h.max()), TSUNAMI_MIN_DEPTH_M)))
+
+        self.eta = np.zeros((ny, nx), np.float32)
+        self.M = np.zeros((ny, nx + 1), np.float32)
+        self.N = np.zeros((ny + 1, nx), np.float32)
+
+    def _momentum(self, dt: float, a: int, b: int, c0: int, c1: int) -> None:
+        eta = self.eta
+        self.M[a:b, c0 + 1:c1] -= dt * self.cu[a:b, c0 + 1:c1] * (eta[a:b, c0 + 1:c1] - eta[a:b, c0:c1 - 1])
+        a1 = max(a, 1)
+        self.N[a1:b, c0:c1] -= dt * self.cv[a1:b, c0:c1] * (eta[a1:b, c0:c1] - eta[a1 - 1:b - 1, c0:c1])
+
+    def _continuity(self, dt: float, a: int, b: int, c0: int, c1: int) -> None:
+        M, N = self.M, self.N
+        div = (
+            self.ex[a:b] * (M[a:b, c0 + 1:c1 + 1] - M[a:b, c0:c1])
+            + self.es[a:b] * N[a + 1:b + 1, c0:c1]
+            - self.en[a:b] * N[a:b, c0:c1]
+        )
+        eta = self.eta[a:b, c0:c1]
+        eta -= dt * div
+        eta *= self.wet[a:b, c0:c1] * self.sponge[a:b, c0:c1]
+
+    def run(
+        self,
+        source_rc: Tuple[float, float],
+        eta0: np.ndarray,
+        duration_s: float,
+        arrival_m: float = TSUNAMI_ARRIVAL_M,
+        source_radius_cells: float = 0.0,
+        cancel: Optional[threading.Event] = None,
+    ) -> Dict:
+        """
+        Інтегрує до duration_s; повертає растри максимальної висоти та часу приходу (с, NaN — не прийшла).
+        cancel — прапорець скасування, перевіряється щокроку (CancelledError).
+        """
+        self.eta[:] = eta0 * self.wet
+        max_eta = self.eta.copy()
+        arrival = np.full((self.ny, self.nx), np.nan, np.float32)
+        arrival[self.eta > arrival_m] = 0.0
+
+        sr, sc = source_rc
+        dx_min = float(self.dx.min())
+        margin = source_radius_cells * 3 + WINDOW_STEP_CELLS
+        pool = ThreadPoolExecutor(self.workers) if self.workers > 1 and self.ny * self.nx >= TILE_MIN_CELLS else None
+
+        t, steps = 0.0, 0
+        window = None
+        dt = dt_min = dt_max = 0.0
+        try:
+            while t < duration_s:
+                if cancel is not None and cancel.is_set():
+                    raise CancelledError("tsunami simulation cancelled")
+                # вікно: куди фронт міг дійти (c_max · t) плюс запас; росте кроками
+                reach = self.c_max * t
+                dr = int(math.ceil(reach / float(self.dy) + margin))
+                dc = int(math.ceil(reach / dx_min + margin))
+                dr = -(-dr // WINDOW_STEP_CELLS) * WINDOW_STEP_CELLS
+                dc = -(-dc // WINDOW_STEP_CELLS) * WINDOW_STEP_CELLS
+                new = (
+                    max(0, int(sr) - dr), min(self.ny, int(sr) + dr + 1),
+                    max(0, int(sc) - dc), min(self.nx, int(sc) + dc + 1),
+                )
+                if new != window:
+                    window = new
+                    r0, r1, c0, c1 = window
+                    h_max = max(float(self.depth[r0:r1, c0:c1].max()), TSUNAMI_MIN_DEPTH_M)
+                    dx_w = min(float(self.dx[r0:r1].min()), float(self.dy))
+                    dt = TSUNAMI_CFL * dx_w / math.sqrt(G * h_max)
+                dt_step = min(dt, duration_s - t)
+                r0, r1, c0, c1 = window
+
+                self._phase(pool, self._momentum, dt_step, window)
+                self._phase(pool, self._continuity, dt_step, window)
+                t += dt_step
+                steps += 1
+                dt_min = dt_step if dt_min == 0 else min(dt_min, dt_step)
+                dt_max = max(dt_max, dt_step)
+
+                eta = self.eta[r0:r1, c0:c1]
+                np.maximum(max_eta[r0:r1, c0:c1], eta, out=max_eta[r0:r1, c0:c1])
+                arr = arrival[r0:r1, c0:c1]
+                arr[(eta > arrival_m) & np.isnan(arr)] = t
+        finally:
+            if pool is not None:
+                pool.shutdown()
+        return {
+            "max_height_m": max_eta,
+            "arrival_s": arrival,
+            "steps": steps,
+            "dt_s": [dt_min, dt_max],
+        }
+
+    def _phase(self, pool, fn, dt: float, window) -> None:
+        r0, r1, c0, c1 = window
+        if pool is None or r1 - r0 <= TILE_ROWS:
+            fn(dt, r0, r1, c0, c1)
+            return
+        # тайли по рядках: кожна фаза пише лише свої рядки й читає дані попередньої фази
+        tiles = [(a, min(a + TILE_ROWS, r1)) for a in range(r0, r1, TILE_ROWS)]
+        for future in [pool.submit(fn, dt, a, b, c0, c1) for a, b in tiles]:
+            future.result()
+
+
+def _sponge(ny: int, nx: int, width: int) -> np.ndarray:
+    """Множник загасання біля меж області (1 усередині, квадратично менше до краю)"""
+    def ramp(n):
+        d = np.minimum(np.arange(n), np.arange(n)[::-1]).astype(np.float32)
+        w = min(width, max(1, n // 4))
+        return np.where(d < w, 1.0 - 0.1 * ((w - d) / w) ** 2, 1.0).astype(np.float32)
+    return ramp(ny)[:, None] * ramp(nx)[None, :]
+
+
+def coastal_points(depth: np.ndarray, max_eta: np.ndarray, arrival_s: np.ndarray,
+                   lat_max: float, lon_min: float, cell_deg: float,
+                   limit: int = MAX_COASTAL_POINTS) -> List[Dict]:
+    """Морські клітинки, що межують із суходолом, — від найвищої хвилі"""
+    wet = depth >= TSUNAMI_MIN_DEPTH_M
+    land = ~wet
+    near_land = np.zeros_like(wet)
+    near_land[1:] |= land[:-1]
+    near_land[:-1] |= land[1:]
+    near_land[:, 1:] |= land[:, :-1]
+    near_land[:, :-1] |= land[:, 1:]
+    rows, cols = np.nonzero(wet & near_land & ~np.isnan(arrival_s))
+    if rows.size == 0:
+        return []
+    heights = max_eta[rows, cols]
+    order = np.argsort(-heights, kind="stable")[:limit]
+    return [
+        {
+            "lat": round(lat_max - (r + 0.5) * cell_deg, 4),
+            "lon": round(lon_min + (c + 0.5) * cell_deg, 4),
+            "depth_m": round(float(depth[r, c]), 1),
+            "max_height_m": round(float(max_eta[r, c]), 3),
+            "arrival_min": round(float(arrival_s[r, c]) / 60.0, 1),
+        }
+        for r, c in zip(rows[order].tolist(), cols[order].tolist())
+    ]
+
+
+def simulate_tsunami(
+    bathymetry: Bathymetry,
+    lat: float,
+    lon: float,
+    energy_mt: float,
+    duration_min: float = TSUNAMI_DURATION_MIN,
+    domain_km: float = TSUNAMI_DOMAIN_KM,
+    cell_km: float = TSUNAMI_CELL_KM,
+    cancel: Optional[threading.Event] = None,
+) -> Optional[Dict]:
+    """
+    Розрахунок поширення цунамі від удару в точці. None — точка на суходолі
+    або поза рельєфом (тоді лишається кільцева модель calculate_tsunami).
+    Початкова висота — та сама, що й у кільцевій моделі (H0 = K·sqrt(E)), форма — гаусів горб.
+    """
+    depth, w_lat_max, w_lon_min, cell_deg = bathymetry.window(lat, lon, domain_km, cell_km)
+    if depth.size == 0:
+        return None
+    ny, nx = depth.shape
+    sr = (w_lat_max - lat) / cell_deg - 0.5
+    sc = (lon - w_lon_min) / cell_deg - 0.5
+    ri, ci = int(round(sr)), int(round(sc))
+    if not (0 <= ri < ny and 0 <= ci < nx) or depth[ri, ci] < TSUNAMI_MIN_DEPTH_M:
+        return None
+
+    h0 = float(tsunami_kernel(energy_mt)["initial_height_m"])
+    cell_km_real = math.radians(cell_deg) * EARTH_RADIUS_KM
+    r0_km = max(TSUNAMI_R0_KM, 2 * cell_km_real)
+    lat_c = w_lat_max - (np.arange(ny) + 0.5) * cell_deg
+    dy_km = (lat_c - lat)[:, None] * (math.pi / 180.0) * EARTH_RADIUS_KM
+    dx_km = ((np.arange(nx) + 0.5) * cell_deg + w_lon_min - lon)[None, :] * (math.pi / 180.0) \
+        * EARTH_RADIUS_KM * math.cos(math.radians(lat))
+    eta0 = (h0 * np.exp(-(dx_km ** 2 + dy_km ** 2) / r0_km ** 2)).astype(np.float32)
+
+    solver = ShallowWaterSolver(depth, w_lat_max, cell_deg)
+    out = solver.run((sr, sc), eta0, duration_min * 60.0, source_radius_cells=r0_km / cell_km_real, cancel=cancel)
+    arrival_min = out["arrival_s"] / 60.0
+    return {
+        "engine": "shallow_water",
+        "grid": {
+            "lat_max": w_lat_max,
+            "lon_min": w_lon_min,
+            "cell_deg": cell_deg,
+            "rows": ny,
+            "cols": nx,
+        },
+        "initial_height_m": round(h0, 2),
+        "source_depth_m": round(float(depth[ri, ci]), 1),
+        "duration_min": duration_min,
+        "steps": out["steps"],
+        "dt_s": [round(x, 3) for x in out["dt_s"]],
+        "max_height_m": out["max_height_m"],
+        "arrival_min": arrival_min,
+        "coastal_points": coastal_points(depth, out["max_height_m"], out["arrival_s"], w_lat_max, w_lon_min, cell_deg),
+    }
+
+
+_bathymetry: Optional[Bathymetry] = None
+
+
+def get_bathymetry() -> Optional[Bathymetry]:
+    """Рельєф з TSUNAMI_BATHYMETRY (None — не налаштовано, працює лише кільцева модель)"""
+    global _bathymetry
+    if _bathymetry is None and TSUNAMI_BATHYMETRY:
+        _bathymetry = Bathymetry(TSUNAMI_BATHYMETRY)
+    return _bathymetry
+
+
+def _raster_list(values: np.ndarray, decimals: int) -> List[List]:
+    rounded = np.round(values.astype(np.float64), decimals)
+    return [[x if math.isfinite(x) else None for x in row] for row in rounded.tolist()]
+
+
+def tsunami_json(result: Dict) -> Dict:
+    """Растри як вкладені списки (рядки з півночі на південь, NaN -> null)"""
+    out = dict(result)
+    if "max_height_m" in out:
+        out["max_height_m"] = _raster_list(out["max_height_m"], 3)
+        out["arrival_min"] = _raster_list(out["arrival_min"], 1)
+    return out
+
+
+def stream_tsunami_binary(result: Dict):
+    """
+    Як /sweep format=binary: рядок JSON-заголовка (з dtype/offset/nbytes растрів) + "\\n",
+    далі растри float32 little-endian у C-порядку (час приходу NaN — хвиля не дійшла).
+    """
+    header = {k: v for k, v in result.items() if k not in ("max_height_m", "arrival_min")}
+    header["rasters"] = []
+    offset = 0
+    for name in ("max_height_m", "arrival_min"):
+        nbytes = result[name].size * 4
+        header["rasters"].append({"name": name, "dtype": "<f4", "offset": offset, "nbytes": nbytes})
+        offset += nbytes
+    yield json.dumps(header, ensure_ascii=False).encode() + b"\n"
+    for name in ("max_height_m", "arrival_min"):
+        yield np.ascontiguousarray(result[name], dtype="<f4").tobytes()
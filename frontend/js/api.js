@@ -4,9 +4,16 @@ const API_URL = window.location.hostname === 'localhost'
     ? 'http://localhost:8000'
     : 'https://uptight-nita-znai-018677b1.koyeb.app';
 
+// Кількість вершин кілець GeoJSON — під поточний zoom карти
+function currentZoom() {
+    return Math.ceil(window.APP_STATE?.map?.getZoom?.() ?? 8);
+}
+
 export async function callImpactAPI(params) {
+    // Фізика (не залежить від точки) + наслідки для точки: при перетягуванні маркера
+    // з physics_token перераховується лише друга частина (callLocationAPI)
     try {
-        const response = await fetch(`${API_URL}/impact`, {
+        const response = await fetch(`${API_URL}/impact/physics`, {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json'
@@ -18,10 +25,22 @@ export async function callImpactAPI(params) {
             throw new Error('Помилка сервера');
         }
         
-        return await response.json();
+        const physics = await response.json();
+        const location = await callLocationAPI(physics.physics_token, params.lat, params.lon);
+        return { ...physics, ...location };
         
     } catch (err) {
         console.error('API Error:', err);
         throw new Error('Не вдалося підключитися до бекенду. Переконайся, що сервер запущений.');
     }
+}
+
+export async function callLocationAPI(token, lat, lon) {
+    // Наслідки для точки удару: населення, втрати, збитки, об'єкти та шари навколо точки
+    const query = new URLSearchParams({ lat, lon, format: 'geojson', zoom: currentZoom() });
+    const response = await fetch(`${API_URL}/impact/${token}/at?${query}`);
+    if (!response.ok) {
+        throw new Error('Помилка сервера');
+    }
+    return await response.json();
 }
\ No newline at end of file
@@ -1,4 +1,7 @@
 // Модуль мапи з реальними шарами густини населення
+import { callLocationAPI } from './api.js';
+import { showResults } from './results-panel.js';
+
 export function initMap() {
     const map = new maplibregl.Map({
         container: 'map',
@@ -260,14 +263,19 @@ function handleMapClick(e) {
         window.APP_STATE.marker.remove();
     }
     
-    window.APP_STATE.marker = new maplibregl.Marker({color: '#EF4444'})
+    window.APP_STATE.marker = new maplibregl.Marker({color: '#EF4444', draggable: true})
         .setLngLat([e.lngLat.lng, e.lngLat.lat])
         .addTo(window.APP_STATE.map);
     
-    const coordsEl = document.getElementById('selectedCoords');
-    if (coordsEl) {
-        coordsEl.textContent = `📍 ${e.lngLat.lat.toFixed(2)}°, ${e.lngLat.lng.toFixed(2)}°`;
-    }
+    // Перетягування: фізика та сама, перераховуються лише наслідки для нової точки
+    const marker = window.APP_STATE.marker;
+    marker.on('drag', () => updateImpactLocation(marker.getLngLat()));
+    marker.on('dragend', () => {
+        window.APP_STATE.selectedCoords = marker.getLngLat();
+        showSelectedCoords(marker.getLngLat());
+    });
+    
+    showSelectedCoords(e.lngLat);
     
     const impactBtn = document.getElementById('impactBtn');
     if (impactBtn) {
@@ -275,62 +283,85 @@ function handleMapClick(e) {
     }
 }
 
-export function drawImpactEffects(layers) {
+function showSelectedCoords(lngLat) {
+    const coordsEl = document.getElementById('selectedCoords');
+    if (coordsEl) {
+        coordsEl.textContent = `📍 ${lngLat.lat.toFixed(2)}°, ${lngLat.lng.toFixed(2)}°`;
+    }
+}
+
+// Не більше одного запиту за раз: поки він іде, запам'ятовуємо лише останню точку
+let locationInFlight = false;
+let pendingLngLat = null;
+
+async function updateImpactLocation(lngLat) {
+    const impact = window.APP_STATE.currentImpact;
+    if (!impact?.physics_token) return;
+    if (locationInFlight) {
+        pendingLngLat = lngLat;
+        return;
+    }
+    locationInFlight = true;
+    try {
+        const location = await callLocationAPI(impact.physics_token, lngLat.lat, lngLat.lng);
+        const result = { ...window.APP_STATE.currentImpact, ...location };
+        window.APP_STATE.currentImpact = result;
+        drawImpactEffects(result.layers);
+        showResults(result);
+    } catch (err) {
+        console.error('Location update error:', err);
+    } finally {
+        locationInFlight = false;
+        if (pendingLngLat) {
+            const next = pendingLngLat;
+            pendingLngLat = null;
+            updateImpactLocation(next);
+        }
+    }
+}
+
+export function drawImpactEffects(zones) {
     const map = window.APP_STATE.map;
-    const coords = window.APP_STATE.selectedCoords;
     
-    removeAllImpactLayers(map);
+    // Зони вже на мапі (наприклад, під час перетягування) — лише нові дані
+    const source = map.getSource('impact_zones');
+    if (source) {
+        source.setData(zones);
+        return;
+    }
     
-    // Сортуємо: кратер -> сильні руйнування -> середні
-    const orderedLayers = [];
+    removeAllImpactLayers(map);
     
-    // Спочатку кратер
-    const crater = layers.find(l => l.type === 'crater');
-    if (crater) orderedLayers.push(crater);
+    // Бекенд (/impact?format=geojson) віддає один FeatureCollection кільцевих зон:
+    // геодезичні кільця, вже розрізані по антимеридіану — одне джерело на всі зони
+    map.addSource('impact_zones', {
+        type: 'geojson',
+        data: zones
+    });
     
-    // Потім руйнування від найсильніших до слабких
-    const damages = layers.filter(l => 
-        l.type === 'total_destruction' || 
-        l.type === 'heavy_damage' || 
-        l.type === 'moderate_damage'
-    ).sort((a, b) => b.radius_km - a.radius_km);
+    // Для кратера - чорний
+    const isCrater = ['==', ['get', 'type'], 'crater'];
+    const zoneColor = ['case', isCrater, '#000000', ['get', 'color']];
     
-    orderedLayers.push(...damages);
+    map.addLayer({
+        id: 'impact_zones_fill',
+        type: 'fill',
+        source: 'impact_zones',
+        paint: {
+            'fill-color': zoneColor,
+            'fill-opacity': ['case', isCrater, 0.5, 0.25]
+        }
+    });
     
-    // Малюємо від найбільшого до найменшого
-    orderedLayers.reverse().forEach((layer, index) => {
-        const circle = createCircle(coords, layer.radius_km);
-        const layerId = `impact_${layer.type}_${index}`;
-        
-        map.addSource(layerId, {
-            type: 'geojson',
-            data: circle
-        });
-        
-        // Для кратера - чорний/сірий
-        const fillColor = layer.type === 'crater' ? '#000000' : layer.color;
-        const fillOpacity = layer.type === 'crater' ? 0.5 : 0.25;
-        
-        map.addLayer({
-            id: layerId,
-            type: 'fill',
-            source: layerId,
-            paint: {
-                'fill-color': fillColor,
-                'fill-opacity': fillOpacity
-            }
-        });
-        
-        map.addLayer({
-            id: layerId + '_outline',
-            type: 'line',
-            source: layerId,
-            paint: {
-                'line-color': fillColor,
-                'line-width': layer.type === 'crater' ? 3 : 2,
-                'line-opacity': 0.8
-            }
-        });
+    map.addLayer({
+        id: 'impact_zones_outline',
+        type: 'line',
+        source: 'impact_zones',
+        paint: {
+            'line-color': zoneColor,
+            'line-width': ['case', isCrater, 3, 2],
+            'line-opacity': 0.8
+        }
     });
     
     //document.getElementById('mapLegend').style.display = 'block';
@@ -369,25 +400,3 @@ function removeAllImpactLayers(map) {
         }
     });
 }
-
-function createCircle(center, radiusKm, points = 64) {
-    const coords = [];
-    const distanceX = radiusKm / (111.32 * Math.cos(center.lat * Math.PI / 180));
-    const distanceY = radiusKm / 110.574;
-
-    for (let i = 0; i < points; i++) {
-        const theta = (i / points) * (2 * Math.PI);
-        const x = distanceX * Math.cos(theta);
-        const y = distanceY * Math.sin(theta);
-        coords.push([center.lng + x, center.lat + y]);
-    }
-    coords.push(coords[0]);
-
-    return {
-        type: 'Feature',
-        geometry: {
-            type: 'Polygon',
-            coordinates: [coords]
-        }
-    };
-}
\ No newline at end of file